@@ -12,6 +12,8 @@ if str(repo_root) not in sys.path:
     sys.path.insert(0, str(repo_root))
 
 from src.db import get_conn
+from src.cost_estimator import format_ms
+from src.dispatcher import RunCancelled, cancel_run, dispatch_run, estimate_run, new_run_id
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'  # Change this in production
@@ -40,6 +42,22 @@ def update_progress(step, message, progress_percent):
     # Print progress to terminal
     print(f"[{step.upper()}] {progress_percent}% - {message}")
 
+def _run_params():
+    """Query params scoping strategy_run_results to this session's run"""
+    return {'run_id': session.get('run_id')}
+
+def _run_finished(run_id):
+    """The run already ended (its page is being opened to run the upload again)"""
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT status IN ('done', 'failed', 'cancelled') FROM backtest_run WHERE run_id = %s",
+                            (run_id,))
+                row = cur.fetchone()
+        return bool(row and row[0])
+    except Exception:
+        return False
+
 def get_progress():
     """Get current progress from session"""
     return session.get('progress', {
@@ -121,72 +139,17 @@ def download_template():
 def process_uploaded_csv(df):
     try:
         start_time = time.time()
-        update_progress('database_prep', 'Preparing database...', 10)
-        
-        # Insert into strategy_settings
-        print(f"📊 Processing {len(df)} strategies from uploaded file...")
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                update_progress('clearing_data', 'Clearing existing strategy data...', 20)
-                print("🧹 Clearing existing strategy data...")
-                # Clear existing strategies
-                cur.execute("DELETE FROM strategy_settings")
-                
-                update_progress('inserting_strategies', f'Inserting {len(df)} strategies into database...', 30)
-                print("🔌 Database connection established")
-                
-                for i, (_, row) in enumerate(df.iterrows()):
-                    cur.execute("""
-                        INSERT INTO strategy_settings (
-                            strategy_name, big_candle_tf, small_candle_tf, preferred_breakout_type,
-                            breakout_threshold_pct, option_entry_price_cap, hedge_entry_price_cap,
-                            num_entry_legs, num_hedge_legs, sl_percentage, eod_time, no_of_lots,
-                            lot_size, hedge_exit_entry_ratio, hedge_exit_multiplier, leg_profit_pct,
-                            portfolio_profit_target_pct, portfolio_stop_loss_pct, portfolio_capital,
-                            max_reentry_rounds, sl_type, box_sl_trigger_pct, box_sl_hard_pct,
-                            reentry_breakout_type, one_m_candle_tf, entry_candle, switch_pct,
-                            width_sl_pct, from_date, to_date
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        row['strategy_name'], row['big_candle_tf'], row['small_candle_tf'], 
-                        row['preferred_breakout_type'], row['breakout_threshold_pct'], 
-                        row['option_entry_price_cap'], row['hedge_entry_price_cap'], 
-                        row['num_entry_legs'], row['num_hedge_legs'], row['sl_percentage'], 
-                        row['eod_time'], row['no_of_lots'], row['lot_size'], 
-                        row['hedge_exit_entry_ratio'], row['hedge_exit_multiplier'], 
-                        row['leg_profit_pct'], row['portfolio_profit_target_pct'], 
-                        row['portfolio_stop_loss_pct'], row['portfolio_capital'], 
-                        row['max_reentry_rounds'], row['sl_type'], row['box_sl_trigger_pct'], 
-                        row['box_sl_hard_pct'], row['reentry_breakout_type'], 
-                        row['one_m_candle_tf'], row['entry_candle'], row['switch_pct'], 
-                        row['width_sl_pct'], row['from_date'], row['to_date']
-                    ))
-                    
-                    # Update progress for each strategy
-                    progress = 30 + int((i + 1) / len(df) * 30)
-                    update_progress('inserting_strategies', f'Inserted strategy {i+1}/{len(df)}: {row["strategy_name"]}', progress)
-                
-                conn.commit()
-                print(f"✅ Successfully inserted {len(df)} strategies into database")
-        
-        update_progress('running_backtest', 'Running backtesting algorithms...', 70)
-        print("🚀 Starting backtesting execution...")
-        
-        # Clear previous results before running new backtest
-        print("🗑️ Clearing previous backtest results...")
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute("DELETE FROM strategy_run_results")
-                conn.commit()
-        
-        # Run the strategy (assumes views are already refreshed)
-        update_progress('running_strategy', 'Executing trading strategy...', 75)
-        print("⚡ Executing main trading strategy (round 1)...")
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute("CALL sp_run_strategy()")
-                conn.commit()
-        
+        update_progress('database_prep', 'Preparing isolated run...', 10)
+
+        # Each upload runs in its own leased schemas; results are tagged with run_id.
+        # The id is handed out by /upload so /cancel_run can name the run.
+        run_id = session.get('run_id') or new_run_id()
+        session['run_id'] = run_id
+        print(f"📊 Processing {len(df)} strategies from uploaded file as run {run_id}...")
+
+        update_progress('running_strategy', f'Executing {len(df)} strategies...', 30)
+        dispatch_run(df, run_id=run_id)
+
         update_progress('processing_results', 'Processing backtest results...', 90)
         print("📈 Processing and aggregating backtest results...")
         
@@ -197,7 +160,11 @@ def process_uploaded_csv(df):
         session['processing_duration'] = duration
         
         return {'status': 'success'}
-        
+
+    except RunCancelled as e:
+        update_progress('cancelled', str(e), 0)
+        print(f"🛑 {e}")
+        return {'status': 'cancelled'}
     except Exception as e:
         update_progress('error', f'Error: {str(e)}', 0)
         print(f"❌ Error during backtesting: {str(e)}")
@@ -225,10 +192,12 @@ def upload_file():
             try:
                 with get_conn() as conn:
                     with conn.cursor() as cur:
-                        cur.execute("DELETE FROM strategy_run_results")
+                        cur.execute("DELETE FROM strategy_run_results WHERE run_id = %(run_id)s", _run_params())
                         conn.commit()
             except:
                 pass  # Ignore errors if table doesn't exist or connection fails
+            # One run per upload, stable across page renders so a cancel always names it
+            session['run_id'] = new_run_id()
             
             # Read the CSV file
             df = pd.read_csv(filepath)
@@ -241,10 +210,23 @@ def upload_file():
             # Convert to dict for template display
             uploaded_data = df.to_dict('records')
             column_names = list(df.columns)
+
+            # Predicted run time; the preview still works without it
+            estimate = None
+            try:
+                estimate = estimate_run(df)
+                for row in uploaded_data:
+                    cost = estimate['strategies'].get(row.get('strategy_name'), {})
+                    row['est_time'] = 'cached' if cost.get('cached') else format_ms(cost.get('est_ms'))
+                estimate['total'] = format_ms(estimate['total_ms'])
+                estimate['makespan'] = format_ms(estimate['makespan_ms'])
+            except Exception as e:
+                print(f"⚠️ Could not estimate run time: {str(e)}")
             
             return render_template('index.html', 
                                  uploaded_data=uploaded_data,
                                  column_names=column_names,
+                                 estimate=estimate,
                                  show_confirm=True)
             
         except Exception as e:
@@ -267,7 +249,10 @@ def confirm_run():
 
 @app.route('/processing')
 def processing():
-    return render_template('processing.html')
+    # Re-rendering keeps the upload's run; only a finished one is replaced (re-running it)
+    if 'run_id' not in session or _run_finished(session['run_id']):
+        session['run_id'] = new_run_id()
+    return render_template('processing.html', run_id=session['run_id'])
 
 @app.route('/start_processing', methods=['POST'])
 def start_processing():
@@ -286,6 +271,18 @@ def start_processing():
         update_progress('error', f'Error starting processing: {str(e)}', 0)
         return jsonify({'status': 'error', 'message': str(e)})
 
+@app.route('/cancel_run', methods=['POST'])
+def cancel_run_route():
+    """Stop an in-flight run; the pipeline stops at its next stage boundary"""
+    run_id = (request.get_json(silent=True) or {}).get('run_id') or session.get('run_id')
+    if not run_id:
+        return jsonify({'status': 'error', 'message': 'No run to cancel'})
+    try:
+        signalled = cancel_run(run_id)
+        return jsonify({'status': 'cancelling', 'run_id': run_id, 'backends': signalled})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
 @app.route('/cancel_upload')
 def cancel_upload():
     # Clear uploaded file from session
@@ -296,10 +293,11 @@ def cancel_upload():
     try:
         with get_conn() as conn:
             with conn.cursor() as cur:
-                cur.execute("DELETE FROM strategy_run_results")
+                cur.execute("DELETE FROM strategy_run_results WHERE run_id = %(run_id)s", _run_params())
                 conn.commit()
     except:
         pass  # Ignore errors if table doesn't exist or connection fails
+    session.pop('run_id', None)
     
     flash('Upload cancelled. You can now upload a new file.')
     return redirect(url_for('index'))
@@ -309,7 +307,7 @@ def results():
     # Get results and analysis
     with get_conn() as conn:
         # Get all results
-        results_df = pd.read_sql("SELECT * FROM strategy_run_results ORDER BY strategy_name, trade_date", conn)
+        results_df = pd.read_sql("SELECT * FROM strategy_run_results WHERE run_id = %(run_id)s ORDER BY strategy_name, trade_date", conn, params=_run_params())
         
         # Analysis: Daily metrics per strategy
         analysis_query = """
@@ -321,10 +319,11 @@ def results():
             MIN(r.pnl_amount) as worst_trade,
             MAX(r.pnl_amount) as best_trade
         FROM strategy_run_results r
+        WHERE r.run_id = %(run_id)s
         GROUP BY r.strategy_name, r.trade_date
         ORDER BY r.strategy_name, r.trade_date
         """
-        analysis_df = pd.read_sql(analysis_query, conn)
+        analysis_df = pd.read_sql(analysis_query, conn, params=_run_params())
         
         # Calculate overall strategy performance for top strategies
         overall_query = """
@@ -341,12 +340,13 @@ def results():
                 COUNT(*) as total_trades,
                 SUM(r.pnl_amount) as total_pnl
             FROM strategy_run_results r
+            WHERE r.run_id = %(run_id)s
             GROUP BY r.strategy_name, r.trade_date
         ) daily
         GROUP BY strategy_name
         ORDER BY total_pnl DESC
         """
-        overall_df = pd.read_sql(overall_query, conn)
+        overall_df = pd.read_sql(overall_query, conn, params=_run_params())
         
         # Top 3 strategies
         top_strategies = overall_df.head(3).to_dict('records')
@@ -370,10 +370,11 @@ def download_analysis():
             MIN(r.pnl_amount) as worst_trade,
             MAX(r.pnl_amount) as best_trade
         FROM strategy_run_results r
+        WHERE r.run_id = %(run_id)s
         GROUP BY r.strategy_name, r.trade_date
         ORDER BY r.strategy_name, r.trade_date
         """
-        daily_df = pd.read_sql(daily_query, conn)
+        daily_df = pd.read_sql(daily_query, conn, params=_run_params())
         
         # Overall strategy summary
         overall_query = """
@@ -390,14 +391,15 @@ def download_analysis():
                 COUNT(*) as total_trades,
                 SUM(r.pnl_amount) as total_pnl
             FROM strategy_run_results r
+            WHERE r.run_id = %(run_id)s
             GROUP BY r.strategy_name, r.trade_date
         ) daily
         GROUP BY strategy_name
         ORDER BY total_pnl DESC
         """
-        overall_df = pd.read_sql(overall_query, conn)
+        overall_df = pd.read_sql(overall_query, conn, params=_run_params())
         
-        results_df = pd.read_sql("SELECT * FROM strategy_run_results ORDER BY strategy_name, trade_date", conn)
+        results_df = pd.read_sql("SELECT * FROM strategy_run_results WHERE run_id = %(run_id)s ORDER BY strategy_name, trade_date", conn, params=_run_params())
     
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
@@ -421,7 +423,7 @@ def download_analysis():
 @app.route('/download_results')
 def download_results():
     with get_conn() as conn:
-        df = pd.read_sql("SELECT * FROM strategy_run_results ORDER BY strategy_name, trade_date", conn)
+        df = pd.read_sql("SELECT * FROM strategy_run_results WHERE run_id = %(run_id)s ORDER BY strategy_name, trade_date", conn, params=_run_params())
     
     # Compute no trade dates for each strategy
     no_trade_dates = []
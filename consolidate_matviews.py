@@ -1,124 +1,53 @@
 #!/usr/bin/env python3
 """
-Consolidate all SQL files referenced in refresh_matviews_sequential.py into one file
+Consolidate the run-schema stage files (src/run_schema.py) into one file.
+
+With --fuse the output is the optimized pipeline: every stage read by exactly
+one other stage is inlined into it as a CTE (see src/stage_fusion.py), and
+stages read by several stages or by procedures stay materialized.
+scripts/compare_fused_pipeline.py times both versions.
 """
 
-import os
+import argparse
 from pathlib import Path
 
-# SQL files in the order from refresh_matviews_sequential.py
-sql_files_order = [
-    'create_v_strategy_config.sql',
-    # base tables / filtered views
-    'create_heikin_ashi_tables.sql',
-    'create_mv_ha_candles.sql',
-    'create_mv_nifty_options_filtered.sql',
-    'create_mv_all_5min_breakouts.sql',
-
-    # ranking and reentry helpers (must run before strike selection)
-    'create_mv_ranked_breakouts_with_rounds.sql',
-    'create_mv_ranked_breakouts_with_rounds_for_reentry.sql',
-
-    # strike selection / breakout context
-    'create_mv_base_strike_selection.sql',
-    'create_mv_breakout_context_round1.sql',
-
-    # live prices and legs
-    'create_mv_entry_and_hedge_legs.sql',
-    'create_mv_live_prices_entry_round1.sql',
-
-    # entry SL detection & executions
-    'create_mv_entry_sl_hits_round1.sql',
-    'create_mv_entry_sl_executions_round1.sql',
-
-    # entry lifecycle
-    'create_mv_entry_open_legs_round1.sql',
-    'create_mv_entry_profit_booking_round1.sql',
-    'create_mv_entry_eod_close_round1.sql',
-    'create_mv_entry_closed_legs_round1.sql',
-    'create_mv_entry_round1_stats.sql',
-
-    # hedge exit logic
-    'create_mv_hedge_exit_on_all_entry_sl.sql',
-    'create_mv_hedge_exit_partial_conditions.sql',
-    'create_mv_hedge_closed_legs_round1.sql',
-    'create_mv_hedge_eod_exit_round1.sql',
-
-    # entry-exit interactions
-    'create_mv_entry_exit_on_partial_hedge_round1.sql',
-    'create_mv_double_buy_legs_round1.sql',
-    'create_mv_entry_final_exit_round1.sql',
-
-    # rehedge pipeline
-    'create_mv_rehedge_trigger_round1.sql',
-    'create_mv_rehedge_candidate_round1.sql',
-    'create_mv_rehedge_selected_round1.sql',
-    'create_mv_rehedge_leg_round1.sql',
-    'create_mv_rehedge_eod_exit_round1.sql',
-    #consolidation
-    'create_mv_all_legs_round1.sql',
-    'sp_insert_sl_legs_into_book.sql',
-    'create_mv_reentry_triggered_breakouts.sql',
-    # reentry pipeline
-    'create_mv_reentry_base_strike_selection.sql',
-    'create_mv_reentry_legs_and_hedge_legs.sql',
-    'create_mv_reentry_live_prices.sql',
-    'create_mv_reentry_breakout_context.sql',
-    'create_mv_reentry_sl_hits.sql',
-    'create_mv_reentry_sl_executions.sql',
-    'create_mv_reentry_open_legs.sql',
-    'create_mv_reentry_profit_booking.sql',
-    'create_mv_reentry_eod_close.sql',
-    'create_mv_reentry_final_exit.sql',
-    'create_mv_reentry_legs_stats.sql',
-    'create_mv_hedge_reentry_exit_on_all_entry_sl.sql',
-    'create_mv_hedge_reentry_exit_on_partial_conditions.sql',
-    'create_mv_hedge_reentry_closed_legs.sql',
-    'create_mv_hedge_reentry_eod_exit.sql',
-    'create_mv_reentry_exit_on_partial_hedge.sql',
-    'create_mv_double_buy_legs_reentry.sql',
-    # rehedge pipeline
-    'create_mv_rehedge_trigger_reentry.sql',
-    'create_mv_rehedge_candidate_reentry.sql',
-    'create_mv_rehedge_selected_reentry.sql',
-    'create_mv_rehedge_leg_reentry.sql',
-    'create_mv_rehedge_eod_exit_reentry.sql',
-    # final aggregation
-    'create_mv_all_legs_reentry.sql',
-
-        # stored procedure
-    'sp_run_reentry_loop.sql',
-    # additional views
-    'create_mv_entry_leg_live_prices.sql',
-    'create_mv_all_entries_sl_tracking_adjusted.sql',
-    'create_mv_portfolio_mtm_pnl.sql',
-    'create_mv_portfolio_final_pnl.sql',
-    'create_strategy_run_results.sql',
-    'sp_run_strategy.sql',
-]
-
-def consolidate_matviews_sql():
-    sql_dir = Path('sql')
-    output_file = Path('consolidated_matviews.sql')
+from src.run_schema import load_run_schema_sql
+from src.stage_fusion import EXTERNAL_SQL, plan_fusion
+
+SQL_DIR = Path(__file__).resolve().parent / 'sql'
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--fuse', action='store_true',
+                   help='Inline single-consumer stages into their consumer (src/stage_fusion.py)')
+    return p.parse_args()
+
+
+def consolidate_matviews_sql(fuse: bool = False):
+    files = load_run_schema_sql(fused=fuse)
+    output_file = Path('consolidated_matviews_fused.sql' if fuse else 'consolidated_matviews.sql')
 
     with open(output_file, 'w', encoding='utf-8') as outfile:
         # Write header
         outfile.write('-- =====================================================\n')
         outfile.write('-- New_BackTest_Pulse Materialized Views Initialization\n')
         outfile.write('-- Consolidated SQL file for matviews sequential setup\n')
-        outfile.write('-- Generated from refresh_matviews_sequential.py order\n')
+        outfile.write('-- Generated from the src/run_schema.py stage order\n')
+        if fuse:
+            external = [(name, (SQL_DIR / name).read_text(encoding='utf-8')) for name in EXTERNAL_SQL]
+            plan = plan_fusion(load_run_schema_sql(fused=False), external)
+            outfile.write(f'-- Fused: {len(plan)} single-consumer stages inlined as CTEs\n')
+            for stage, consumer in sorted(plan.items()):
+                outfile.write(f'--   {stage} -> {consumer}\n')
         outfile.write('-- =====================================================\n\n')
 
         current_section = ""
         section_counter = 0
 
-        for sql_file in sql_files_order:
-            sql_path = sql_dir / sql_file
-
-            if not sql_path.exists():
-                print(f"Warning: {sql_file} not found, skipping...")
-                outfile.write(f'-- Warning: {sql_file} not found, skipping...\n\n')
-                continue
+        for file_name, content in files:
+            # Section rules match the stage name without its numeric prefix
+            sql_file = file_name.split('_', 1)[1] if file_name[0].isdigit() else file_name
 
             # Determine section based on file content/purpose
             if sql_file == 'create_v_strategy_config.sql':
@@ -175,19 +104,15 @@ def consolidate_matviews_sql():
                 section_counter += 1
 
             # Write file header
-            outfile.write(f'-- File: {sql_file}\n')
-
-            # Read and write file content
-            try:
-                with open(sql_path, 'r', encoding='utf-8') as infile:
-                    content = infile.read().strip()
-                    if content:
-                        outfile.write(content)
-                        outfile.write('\n\n')
-                    else:
-                        outfile.write('-- (empty file)\n\n')
-            except Exception as e:
-                outfile.write(f'-- Error reading file: {e}\n\n')
+            outfile.write(f'-- File: {file_name}\n')
+
+            # Write file content
+            content = content.strip()
+            if content:
+                outfile.write(content)
+                outfile.write('\n\n')
+            else:
+                outfile.write('-- (empty file)\n\n')
 
         # Add the final CALL statement
         outfile.write('-- =====================================================\n')
@@ -202,7 +127,7 @@ def consolidate_matviews_sql():
         outfile.write('-- =====================================================\n')
 
     print(f"Consolidated matviews SQL file created: {output_file}")
-    print(f"Total SQL files processed: {len(sql_files_order)}")
+    print(f"Total SQL files processed: {len(files)}")
 
 if __name__ == '__main__':
-    consolidate_matviews_sql()
\ No newline at end of file
+    consolidate_matviews_sql(parse_args().fuse)
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""Find the fastest session profile per stage for stage_resource_profile.
+
+Every stage (matview refresh or wrk_* fill) is timed under the baseline
+session settings and under each candidate profile (work_mem, parallel
+workers, JIT, planner toggles). Each trial runs in its own transaction that is
+rolled back, so the pipeline's tables are left as they were; load a
+strategy first (e.g. CALL sp_run_strategy()) so every stage has input.
+With --apply the winning profile is stored in stage_resource_profile
+(sql/83_create_stage_resource_profile.sql) when it beats the baseline by at
+least --min-gain; a stage whose baseline wins gets its profile removed.
+
+Usage:
+    python .\\scripts\\benchmark_stage_profiles.py --stage mv_portfolio_mtm_pnl --repeat 3
+    python .\\scripts\\benchmark_stage_profiles.py --schema bt_run_1 --apply
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.db import get_conn
+from src.stage_graph import build_stage_graph, topological_order
+from src.stage_scheduler import prepare_session
+
+PROFILE_COLUMNS = [
+    'work_mem', 'max_parallel_workers_per_gather', 'jit',
+    'enable_hashagg', 'enable_hashjoin', 'enable_mergejoin', 'enable_nestloop',
+    'enable_seqscan', 'enable_sort', 'enable_partitionwise_join',
+    'enable_partitionwise_aggregate', 'synchronous_commit',
+]
+
+CANDIDATES = [
+    {'work_mem': '64MB'},
+    {'work_mem': '256MB'},
+    {'work_mem': '1GB'},
+    {'max_parallel_workers_per_gather': 0},
+    {'max_parallel_workers_per_gather': 4},
+    {'work_mem': '256MB', 'max_parallel_workers_per_gather': 4},
+    {'jit': False},
+    {'enable_nestloop': False},
+    {'enable_mergejoin': False},
+    {'enable_partitionwise_join': True, 'enable_partitionwise_aggregate': True},
+]
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--schema', default='public', help='Pipeline schema (public or a bt_run_<n> run schema)')
+    p.add_argument('--stage', action='append', help='Only this stage (repeatable); default every matview/fill stage')
+    p.add_argument('--stage-backend', choices=['matview', 'unlogged'], default='matview')
+    p.add_argument('--repeat', type=int, default=3, help='Timed runs per profile (median is used)')
+    p.add_argument('--min-gain', type=float, default=0.1,
+                   help='Minimum speed-up over the baseline (0.1 = 10%%) for a profile to be kept')
+    p.add_argument('--apply', action='store_true', help='Store the winners in stage_resource_profile')
+    return p.parse_args()
+
+
+def describe(profile: dict) -> str:
+    return ', '.join(f'{k}={v}' for k, v in profile.items()) or 'baseline'
+
+
+def guc_value(value) -> str:
+    if isinstance(value, bool):
+        return 'on' if value else 'off'
+    return str(value)
+
+
+def time_stage(conn, stage, profile: dict, schema: str, settings: dict) -> float:
+    """One rolled-back run of ``stage`` under ``profile``; seconds."""
+    try:
+        with conn.cursor() as cur:
+            prepare_session(cur, schema, settings)
+            # stored profiles would otherwise be layered on top of the candidate
+            cur.execute("SELECT set_config('backtest.stage_profiles', 'off', true)")
+            for name, value in profile.items():
+                cur.execute("SELECT set_config(%s, %s, true)", (name, guc_value(value)))
+            cur.execute("SELECT fn_apply_stage_backend()")
+            start = time.perf_counter()
+            cur.execute(stage.sql)
+            return time.perf_counter() - start
+    finally:
+        conn.rollback()
+
+
+def benchmark(conn, stage, schema: str, settings: dict, repeat: int) -> list[tuple[float, dict]]:
+    """``[(median seconds, profile)]`` for the baseline and every candidate."""
+    time_stage(conn, stage, {}, schema, settings)   # warm the cache
+    results = []
+    for profile in [{}] + CANDIDATES:
+        runs = [time_stage(conn, stage, profile, schema, settings) for _ in range(repeat)]
+        results.append((statistics.median(runs), profile))
+    return results
+
+
+def store_profile(conn, stage_name: str, profile: dict, best_s: float, baseline_s: float):
+    cols = ', '.join(PROFILE_COLUMNS)
+    placeholders = ', '.join(['%s'] * len(PROFILE_COLUMNS))
+    updates = ', '.join(f'{c} = EXCLUDED.{c}' for c in PROFILE_COLUMNS)
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO public.stage_resource_profile
+                (stage_name, {cols}, benchmarked_ms, baseline_ms, updated_at)
+            VALUES (%s, {placeholders}, %s, %s, now())
+            ON CONFLICT (stage_name) DO UPDATE
+            SET {updates},
+                benchmarked_ms = EXCLUDED.benchmarked_ms,
+                baseline_ms = EXCLUDED.baseline_ms,
+                updated_at = now()
+            """,
+            [stage_name] + [profile.get(c) for c in PROFILE_COLUMNS] + [best_s * 1000, baseline_s * 1000],
+        )
+    conn.commit()
+
+
+def drop_profile(conn, stage_name: str):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM public.stage_resource_profile WHERE stage_name = %s", (stage_name,))
+    conn.commit()
+
+
+def main():
+    args = parse_args()
+    settings = {'stage_backend': args.stage_backend}
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            prepare_session(cur, args.schema)
+        graph = build_stage_graph(conn, args.schema)
+        conn.rollback()
+
+        names = [n for n in topological_order(graph) if graph[n].kind in ('matview', 'fill')]
+        if args.stage:
+            unknown = set(args.stage) - set(names)
+            if unknown:
+                print(f"❌ Unknown stage(s): {', '.join(sorted(unknown))}")
+                sys.exit(1)
+            names = [n for n in names if n in args.stage]
+
+        print(f"⏱️ Benchmarking {len(names)} stages x {len(CANDIDATES) + 1} profiles x {args.repeat} runs")
+        kept = 0
+        for name in names:
+            results = benchmark(conn, graph[name], args.schema, settings, args.repeat)
+            baseline_s = results[0][0]
+            best_s, best = min(results, key=lambda r: r[0])
+            gain = 1 - best_s / baseline_s if baseline_s else 0.0
+            if best and gain >= args.min_gain:
+                kept += 1
+                print(f"✅ {name}: {describe(best)} {baseline_s:.2f}s -> {best_s:.2f}s ({gain:.0%} faster)")
+                if args.apply:
+                    store_profile(conn, name, best, best_s, baseline_s)
+            else:
+                print(f"➖ {name}: baseline {baseline_s:.2f}s (best {describe(best)} {best_s:.2f}s)")
+                if args.apply:
+                    drop_profile(conn, name)
+
+    print(f"\n{kept} of {len(names)} stages have a faster profile"
+          + ('' if args.apply else ' (rerun with --apply to store them)'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Check an alternative engine against the SQL pipeline leg by leg (src/parity.py).
+
+Runs the CSV through dispatch_run and the engine, diffs the two runs'
+strategy_run_results rows per leg and prints mismatches by stage of origin.
+``--template`` runs both inside a fresh clone of a template database
+(src/template_db.py), so a small fixture template gives a quick local check;
+``--from/--to`` clip every strategy to the fixture's dates. ``--runs A B``
+only diffs two finished runs (A from SQL, B from the engine).
+``--frontier`` runs the SQL pipeline twice instead, with the re-entry frontier
+off (A) and on (B); use strategies with max_reentry_rounds >= 3.
+Exits 1 when any leg differs.
+
+Usage:
+    python .\\scripts\\check_parity.py --csv .\\test_strategies.csv --template bt_fixture --from 2025-01-01 --to 2025-01-10
+    python .\\scripts\\check_parity.py --csv .\\test_strategies.csv --out .\\parity.csv
+    python .\\scripts\\check_parity.py --csv .\\test_strategies.csv --template bt_fixture --frontier
+    python .\\scripts\\check_parity.py --runs 20250101120000-aaaa 20250101120500-bbbb
+"""
+import argparse
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+
+import pandas as pd
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.parity import ENGINES, Mismatch, check_frontier_parity, check_parity, compare_runs, summarize
+from src.template_db import cloned_database
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--csv', help='Strategy settings CSV (same format as the web upload)')
+    p.add_argument('--runs', nargs=2, metavar=('SQL_RUN', 'ENGINE_RUN'), help='Diff two finished runs instead')
+    p.add_argument('--engine', choices=sorted(ENGINES), default='numpy')
+    p.add_argument('--frontier', action='store_true',
+                   help='Diff SQL runs with backtest.reentry_frontier off and on instead of an engine')
+    p.add_argument('--template', help='Run inside a throwaway clone of this template database')
+    p.add_argument('--from', dest='from_date', help='Clip every strategy to start on this date')
+    p.add_argument('--to', dest='to_date', help='Clip every strategy to end on this date')
+    p.add_argument('--tolerance', type=float, default=0.01, help='Allowed price / pnl difference')
+    p.add_argument('--show', type=int, default=20, help='Mismatching fields to print')
+    p.add_argument('--out', help='Write every mismatch to this CSV')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.csv and not args.runs:
+        sys.exit('--csv or --runs is required')
+
+    if args.runs:
+        report = compare_runs(*args.runs, tolerance=args.tolerance)
+    else:
+        df = pd.read_csv(args.csv)
+        if args.from_date:
+            df['from_date'] = args.from_date
+        if args.to_date:
+            df['to_date'] = args.to_date
+        with cloned_database(args.template) if args.template else nullcontext():
+            if args.frontier:
+                report = check_frontier_parity(df, args.tolerance)
+            else:
+                report = check_parity(df, args.engine, args.tolerance)
+
+    sql_side, engine_side = ('frontier off', 'frontier on') if args.frontier else ('SQL', args.engine)
+    print(f"🔎 {sql_side} run {report.sql_run}: {report.sql_legs} legs, "
+          f"{engine_side} run {report.engine_run}: {report.engine_legs} legs")
+    if args.out:
+        pd.DataFrame(report.mismatches, columns=Mismatch._fields).to_csv(args.out, index=False)
+        print(f"📝 {len(report.mismatches)} mismatches written to {args.out}")
+    if report.ok:
+        print("✅ Every leg matches")
+        return
+
+    print(f"❌ {len(report.mismatches)} mismatching fields\n")
+    print(summarize(report.mismatches).to_string(index=False))
+    print()
+    for m in report.mismatches[:args.show]:
+        print(f"   {m.strategy_name} {m.trade_date} {m.expiry_date} r{m.entry_round} {m.leg_type} "
+              f"{m.option_type}{m.strike:g} {m.field}: {sql_side}={m.sql_value} {engine_side}={m.engine_value} ({m.stage})")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
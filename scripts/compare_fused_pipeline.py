@@ -0,0 +1,89 @@
+"""Time the fused stage pipeline (src/stage_fusion.py) against the unfused one.
+
+Runs the same strategy CSV once on a run schema built from the plain stage
+files and once on one built with single-consumer stages inlined, then
+compares per-stage time from run_stage_metrics (a fused consumer is set
+against itself plus the stages it absorbed) and checks both runs produced
+the same rows.
+
+Usage:
+    python .\\scripts\\compare_fused_pipeline.py --csv .\\test_strategies.csv
+    python .\\scripts\\compare_fused_pipeline.py --plan-only
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.db import get_conn
+from src.dispatcher import diff_runs, dispatch_run
+from src.run_schema import SQL_DIR, load_run_schema_sql
+from src.stage_fusion import EXTERNAL_SQL, plan_fusion
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--csv', help='Strategy settings CSV (same format as the web upload)')
+    p.add_argument('--stage-backend', choices=['matview', 'unlogged'])
+    p.add_argument('--plan-only', action='store_true', help='Print the fusion plan and exit')
+    return p.parse_args()
+
+
+def stage_ms(run_id: str) -> dict[str, float]:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT stage_name, SUM(duration_ms) FROM run_stage_metrics WHERE run_id = %s GROUP BY stage_name",
+                (run_id,),
+            )
+            return {name: float(ms) for name, ms in cur.fetchall()}
+
+
+def absorbed(plan: dict[str, str], consumer: str) -> list[str]:
+    """Every stage (transitively) inlined into ``consumer``."""
+    direct = [s for s, c in plan.items() if c == consumer]
+    return direct + [s for d in direct for s in absorbed(plan, d)]
+
+
+def main():
+    args = parse_args()
+    external = [(name, (SQL_DIR / name).read_text(encoding='utf8')) for name in EXTERNAL_SQL]
+    plan = plan_fusion(load_run_schema_sql(fused=False), external)
+    consumers = sorted({c for c in plan.values() if c not in plan})
+    print(f"🔗 {len(plan)} stages inlined into {len(consumers)} consumers")
+    for consumer in consumers:
+        print(f"    {consumer} <- {', '.join(sorted(absorbed(plan, consumer)))}")
+    if args.plan_only:
+        return
+    if not args.csv:
+        sys.exit('--csv is required unless --plan-only is given')
+
+    df = pd.read_csv(args.csv)
+    runs = {}
+    for label, fused in (('unfused', False), ('fused', True)):
+        result = dispatch_run(df, workers=1, stage_backend=args.stage_backend,
+                              use_cache=False, shards=0, fused=fused)
+        runs[label] = (result['run_id'], sum(s['duration'] for s in result['shares']))
+
+    ms_a, ms_b = stage_ms(runs['unfused'][0]), stage_ms(runs['fused'][0])
+    print(f"\n{'stage':<45} {'unfused ms':>12} {'fused ms':>12}")
+    for consumer in consumers:
+        before = ms_a.get(consumer, 0) + sum(ms_a.get(s, 0) for s in absorbed(plan, consumer))
+        print(f"{consumer:<45} {before:>12,.0f} {ms_b.get(consumer, 0):>12,.0f}")
+    print(f"{'all stages':<45} {sum(ms_a.values()):>12,.0f} {sum(ms_b.values()):>12,.0f}")
+    print(f"{'wall (incl. schema build)':<45} {runs['unfused'][1] * 1000:>12,.0f} {runs['fused'][1] * 1000:>12,.0f}")
+
+    only_a, only_b = diff_runs(runs['unfused'][0], runs['fused'][0])
+    if only_a or only_b:
+        print(f"❌ Results differ: {only_a} rows only unfused, {only_b} only fused")
+        sys.exit(1)
+    print("✅ Fused and unfused runs produced the same rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Compare captured stage plans (run_stage_plans) between two runs.
+
+For every stage captured in both runs the plan trees are walked side by side
+and shape changes are flagged: a join switching strategy (Hash Join ->
+Nested Loop), a scan switching access path (Index Scan -> Seq Scan), nodes
+appearing/disappearing, plus large row misestimates and buffer growth.
+
+Capture plans first with e.g. ``SET backtest.plan_capture_ms = 2000;``.
+
+Usage:
+    python .\\scripts\\compare_stage_plans.py --run-a 20250101120000-ab12cd34 --run-b 20250102120000-ef56ab78
+    python .\\scripts\\compare_stage_plans.py --run-a A --run-b B --stage mv_entry_sl_hits_round1 --tree
+"""
+import argparse
+import difflib
+import json
+import sys
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.db import get_conn
+
+JOIN_NODES = {'Hash Join', 'Merge Join', 'Nested Loop'}
+SCAN_NODES = {'Seq Scan', 'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan', 'Bitmap Index Scan'}
+
+# Latest capture per stage (and re-entry round) of a run
+_PLANS_SQL = """
+SELECT DISTINCT ON (stage_name, reentry_round)
+    stage_name, reentry_round, stage_ms, plan
+FROM run_stage_plans
+WHERE run_id = %s
+  AND (%s IS NULL OR stage_name = %s)
+ORDER BY stage_name, reentry_round, captured_at DESC
+"""
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--run-a', required=True, help='Baseline run_id')
+    p.add_argument('--run-b', required=True, help='Run_id to compare against the baseline')
+    p.add_argument('--stage', help='Only this stage')
+    p.add_argument('--tree', action='store_true', help='Print a diff of the plan trees for changed stages')
+    p.add_argument('--misestimate', type=float, default=10.0,
+                   help='Flag nodes whose actual/estimated rows ratio exceeds this factor')
+    return p.parse_args()
+
+
+def load_plans(conn, run_id: str, stage: str | None = None) -> dict:
+    with conn.cursor() as cur:
+        cur.execute(_PLANS_SQL, (run_id, stage, stage))
+        rows = cur.fetchall()
+    plans = {}
+    for stage_name, reentry_round, stage_ms, plan in rows:
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plans[(stage_name, reentry_round)] = {'stage_ms': float(stage_ms or 0), 'plan': plan[0]}
+    return plans
+
+
+def node_label(node: dict) -> str:
+    """Node type plus what it works on: relation, index or join type."""
+    label = node['Node Type']
+    if node.get('Join Type') and label in JOIN_NODES:
+        label += f" ({node['Join Type']})"
+    target = node.get('Relation Name') or node.get('Index Name')
+    if target:
+        label += f' on {target}'
+    return label
+
+
+def walk(node: dict, depth: int = 0):
+    """Pre-order ``(depth, node)`` over a plan tree."""
+    yield depth, node
+    for child in node.get('Plans', []):
+        yield from walk(child, depth + 1)
+
+
+def shape_lines(plan: dict) -> list[str]:
+    return [f"{'  ' * depth}{node_label(node)}" for depth, node in walk(plan['Plan'])]
+
+
+def _strategy_changes(nodes_a, nodes_b, kinds: set[str]) -> list[str]:
+    """Pair nodes of ``kinds`` in tree order and report any strategy switch."""
+    a = [n for _, n in nodes_a if n['Node Type'] in kinds]
+    b = [n for _, n in nodes_b if n['Node Type'] in kinds]
+    changes = []
+    for na, nb in zip(a, b):
+        if na['Node Type'] != nb['Node Type']:
+            where = nb.get('Relation Name') or na.get('Relation Name') or ''
+            changes.append(f"{na['Node Type']} -> {nb['Node Type']}" + (f' on {where}' if where else ''))
+    if len(a) != len(b):
+        changes.append(f'{len(a)} -> {len(b)} {"/".join(sorted(kinds))} nodes')
+    return changes
+
+
+def misestimates(plan: dict, factor: float) -> list[str]:
+    found = []
+    for _, node in walk(plan['Plan']):
+        if 'Actual Rows' not in node:
+            continue
+        est = max(node.get('Plan Rows', 0), 1)
+        act = max(node['Actual Rows'] * node.get('Actual Loops', 1), 1)
+        ratio = act / est if act >= est else est / act
+        if ratio >= factor:
+            found.append(f"{node_label(node)}: est {node.get('Plan Rows', 0):,} vs actual {act:,}")
+    return found
+
+
+def total_buffers(plan: dict) -> int:
+    root = plan['Plan']
+    return sum(root.get(k, 0) for k in ('Shared Hit Blocks', 'Shared Read Blocks', 'Temp Read Blocks'))
+
+
+def compare(a: dict, b: dict, misestimate_factor: float = 10.0) -> dict:
+    """Shape / strategy / estimate differences between two captures of one stage."""
+    nodes_a, nodes_b = list(walk(a['plan']['Plan'])), list(walk(b['plan']['Plan']))
+    lines_a, lines_b = shape_lines(a['plan']), shape_lines(b['plan'])
+    return {
+        'shape_changed': lines_a != lines_b,
+        'joins': _strategy_changes(nodes_a, nodes_b, JOIN_NODES),
+        'scans': _strategy_changes(nodes_a, nodes_b, SCAN_NODES),
+        'misestimates': misestimates(b['plan'], misestimate_factor),
+        'ms': (a['stage_ms'], b['stage_ms']),
+        'buffers': (total_buffers(a['plan']), total_buffers(b['plan'])),
+        'tree_diff': list(difflib.unified_diff(lines_a, lines_b, 'run_a', 'run_b', lineterm='')),
+    }
+
+
+def main():
+    args = parse_args()
+    with get_conn() as conn:
+        plans_a = load_plans(conn, args.run_a, args.stage)
+        plans_b = load_plans(conn, args.run_b, args.stage)
+
+    common = sorted(set(plans_a) & set(plans_b), key=lambda k: (k[0], k[1] or 0))
+    if not common:
+        print('No stage captured in both runs (set backtest.plan_capture_ms on both).')
+        return
+
+    changed = 0
+    for key in common:
+        result = compare(plans_a[key], plans_b[key], args.misestimate)
+        stage, rnd = key
+        title = stage + (f' (round {rnd})' if rnd is not None else '')
+        ms_a, ms_b = result['ms']
+        if not (result['shape_changed'] or result['joins'] or result['scans']):
+            print(f"✅ {title}: same plan shape ({ms_a / 1000:.2f}s -> {ms_b / 1000:.2f}s)")
+            continue
+        changed += 1
+        print(f"⚠️ {title}: plan changed ({ms_a / 1000:.2f}s -> {ms_b / 1000:.2f}s, "
+              f"buffers {result['buffers'][0]:,} -> {result['buffers'][1]:,})")
+        for change in result['joins'] + result['scans']:
+            print(f"    {change}")
+        for line in result['misestimates']:
+            print(f"    misestimate: {line}")
+        if args.tree:
+            print('\n'.join(f'      {line}' for line in result['tree_diff']))
+
+    only_a = sorted(k[0] for k in set(plans_a) - set(plans_b))
+    only_b = sorted(k[0] for k in set(plans_b) - set(plans_a))
+    print(f"\n{changed} of {len(common)} stages changed plan shape")
+    if only_a:
+        print(f"Only in {args.run_a}: {', '.join(only_a)}")
+    if only_b:
+        print(f"Only in {args.run_b}: {', '.join(only_b)}")
+
+
+if __name__ == '__main__':
+    main()
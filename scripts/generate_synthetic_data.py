@@ -0,0 +1,76 @@
+"""Generate synthetic Nifty50, Nifty_options and ha_* data and COPY it in (src/synthetic.py).
+
+Creates the parent tables if missing (sql/create_nifty50.sql,
+sql/create_nifty_options.sql, sql/create_heikin_ashi_tables.sql) and the
+partitions covering --from..--to, then loads one day at a time. The same
+--seed and --from always give the same rows. ``--dry-run`` only prints how
+many rows a window would produce.
+
+Usage:
+    python .\\scripts\\generate_synthetic_data.py --from 2024-01-01 --to 2024-01-07 --seed 1
+    python .\\scripts\\generate_synthetic_data.py --from 2015-01-01 --to 2024-12-31 --expiries 4 --replace
+    python .\\scripts\\generate_synthetic_data.py --from 2015-01-01 --to 2024-12-31 --dry-run
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src import synthetic
+from src.db import execute_sql
+
+PARENT_SQL = ['create_nifty50.sql', 'create_nifty_options.sql', 'create_heikin_ashi_tables.sql']
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--from', dest='from_date', required=True, help='First date (YYYY-MM-DD)')
+    p.add_argument('--to', dest='to_date', required=True, help='Last date (YYYY-MM-DD)')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--start-spot', type=float, default=22000.0, help='Nifty50 level on the first day')
+    p.add_argument('--vol', type=float, default=0.14, help='Annualized volatility of spot and ATM options')
+    p.add_argument('--strike-range', type=int, default=2000, help='Strikes within +- this of the day open')
+    p.add_argument('--expiries', type=int, default=2, help='Weekly expiries listed per day')
+    p.add_argument('--gap-rate', type=float, default=0.0, help='Share of option minutes left out')
+    p.add_argument('--big-tf', type=int, default=15, help='ha_big candle minutes')
+    p.add_argument('--small-tf', type=int, default=5, help='ha_small candle minutes')
+    p.add_argument('--replace', action='store_true', help='Delete existing rows in the window first')
+    p.add_argument('--dry-run', action='store_true', help='Only print the expected row counts')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    from_date = datetime.strptime(args.from_date, '%Y-%m-%d').date()
+    to_date = datetime.strptime(args.to_date, '%Y-%m-%d').date()
+    cfg = synthetic.SyntheticConfig(
+        seed=args.seed, start_spot=args.start_spot, annual_vol=args.vol, strike_range=args.strike_range,
+        n_expiries=args.expiries, gap_rate=args.gap_rate, big_tf=args.big_tf, small_tf=args.small_tf,
+    )
+
+    days = len(synthetic.trading_days(from_date, to_date))
+    strikes = 2 * (cfg.strike_range // synthetic.STRIKE_STEP) + 1
+    options = days * synthetic.SESSION_MINUTES * strikes * 2 * cfg.n_expiries * (1 - cfg.gap_rate)
+    print(f"📅 {days} trading days: {days * synthetic.SESSION_MINUTES:,} Nifty50 rows, "
+          f"~{options:,.0f} Nifty_options rows ({strikes} strikes x 2 types x {cfg.n_expiries} expiries)")
+    if args.dry_run:
+        return
+
+    for name in PARENT_SQL:
+        execute_sql((repo_root / 'sql' / name).read_text())
+    start = time.time()
+    counts = synthetic.load(from_date, to_date, cfg, replace=args.replace)
+    elapsed = time.time() - start
+    for table, rows in counts.items():
+        print(f"   {table}: {rows:,} rows")
+    print(f"✅ Loaded {sum(counts.values()):,} rows in {elapsed:.1f}s "
+          f"({sum(counts.values()) / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -23,7 +23,15 @@ SQL_DIR = repo_root / 'sql'
 # Ordered list of SQL filenames (relative to repo root). Edit if you add new
 # matviews that have dependencies.
 ORDERED_SQL = [
+    # stage backend helpers (fn_refresh_stage) used by every procedure below
+    '73_create_stage_backend.sql',
+    '75_create_run_stage_metrics.sql',
+    '76_create_run_stage_plans.sql',
+    '83_create_stage_resource_profile.sql',
+    '77_create_filtered_view_window.sql',
+    '78_create_market_data_indexes.sql',
     '1_create_v_strategy_config.sql',
+    '79_create_stage_memo.sql',
     '2_create_filtered_views.sql'
     # base tables / filtered views
     # 'create_heikin_ashi_tables.sql',
@@ -104,6 +112,7 @@ ORDERED_SQL = [
     # final aggregation
 
     '55_create_mv_all_legs_reentry.sql',
+    '84_create_wrk_all_legs_reentry.sql',
 
         # stored procedure
     # '56_sp_run_reentry_loop.sql',
@@ -116,9 +125,17 @@ ORDERED_SQL = [
     '59_create_mv_portfolio_mtm_pnl.sql',
     '60_create_mv_portfolio_final_pnl.sql',
     '61_create_strategy_run_results.sql',
+    '80_create_strategy_result_cache.sql',
+    '81_create_batch_progress.sql',
+    '82_create_batch_sizing.sql',
+    '85_create_run_cost_estimate.sql',
+    '86_create_option_partitions.sql',
+    '87_create_run_prewarm.sql',
     # '62_sp_run_strategy.sql',
     # '67_call_sp_run_strategy.sql',
     '68_create_sp_run_strategy_batched.sql',
+    # capture stage queries for the unlogged backend (re-run after stage SQL edits)
+    '74_call_sp_build_unlogged_stages.sql',
     # '69_call_sp_run_strategy_batched.sql'
 
 
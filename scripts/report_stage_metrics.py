@@ -0,0 +1,89 @@
+"""Rank pipeline stages by cumulative time recorded in run_stage_metrics.
+
+Usage:
+    python .\\scripts\\report_stage_metrics.py
+    python .\\scripts\\report_stage_metrics.py --run-id 20250101120000-ab12cd34 --limit 20
+    python .\\scripts\\report_stage_metrics.py --since 2025-01-01 --by-round
+    python .\\scripts\\report_stage_metrics.py --run-id 20250101120000-ab12cd34 --memo
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.db import get_conn
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--run-id', help='Only this run')
+    p.add_argument('--since', help='Only stages started on/after this date')
+    p.add_argument('--limit', type=int, default=30)
+    p.add_argument('--by-round', action='store_true', help='Split re-entry stages by round')
+    p.add_argument('--memo', action='store_true', help='Cross-strategy memo hit rates instead of timings')
+    return p.parse_args()
+
+
+def load_report(run_id: str | None = None, since: str | None = None, by_round: bool = False) -> pd.DataFrame:
+    round_col = ', reentry_round' if by_round else ''
+    query = f"""
+    SELECT
+        stage_name{round_col},
+        COUNT(*)                                  AS executions,
+        COUNT(DISTINCT run_id)                    AS runs,
+        ROUND(SUM(duration_ms) / 1000.0, 2)       AS total_s,
+        ROUND(AVG(duration_ms) / 1000.0, 3)       AS avg_s,
+        ROUND(MAX(duration_ms) / 1000.0, 3)       AS max_s,
+        ROUND(100.0 * SUM(duration_ms) / SUM(SUM(duration_ms)) OVER (), 1) AS pct_total,
+        ROUND(AVG(output_rows))                   AS avg_rows,
+        pg_size_pretty(MAX(relation_bytes))       AS max_size
+    FROM run_stage_metrics
+    WHERE (%(run_id)s IS NULL OR run_id = %(run_id)s)
+      AND (%(since)s IS NULL OR started_at >= %(since)s::date)
+    GROUP BY stage_name{round_col}
+    ORDER BY total_s DESC
+    """
+    with get_conn() as conn:
+        return pd.read_sql(query, conn, params={'run_id': run_id, 'since': since})
+
+
+def load_memo_report(run_id: str | None = None, since: str | None = None) -> pd.DataFrame:
+    query = """
+    SELECT
+        stage_name,
+        COUNT(DISTINCT run_id)                          AS runs,
+        SUM(strategies)                                 AS strategies,
+        SUM(computed)                                   AS computed,
+        SUM(reused)                                     AS reused,
+        ROUND(100.0 * SUM(reused) / NULLIF(SUM(strategies), 0), 1) AS hit_pct
+    FROM run_stage_memo
+    WHERE (%(run_id)s IS NULL OR run_id = %(run_id)s)
+      AND (%(since)s IS NULL OR recorded_at >= %(since)s::date)
+    GROUP BY stage_name
+    ORDER BY stage_name
+    """
+    with get_conn() as conn:
+        return pd.read_sql(query, conn, params={'run_id': run_id, 'since': since})
+
+
+def main():
+    args = parse_args()
+    if args.memo:
+        df = load_memo_report(args.run_id, args.since)
+        print(df.to_string(index=False) if not df.empty else 'No memo statistics recorded yet.')
+        return
+    df = load_report(args.run_id, args.since, args.by_round)
+    if df.empty:
+        print('No stage metrics recorded yet.')
+        return
+    print(df.head(args.limit).to_string(index=False))
+    print(f"\n{len(df)} stages, {df['total_s'].sum():.1f}s total")
+
+
+if __name__ == '__main__':
+    main()
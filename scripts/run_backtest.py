@@ -0,0 +1,61 @@
+"""Run a strategy CSV through the dispatcher from the command line.
+
+``--shards N`` cuts every strategy's date range into N contiguous slices run
+on N sessions at once (useful for one long-range strategy); ``--partitions``
+runs one share per Nifty_options monthly partition, ``--workers`` at a time.
+``--verify`` also runs it unsharded and checks both runs produced the same rows.
+
+Usage:
+    python .\\scripts\\run_backtest.py --csv .\\data\\strategy.csv --shards 8
+    python .\\scripts\\run_backtest.py --csv .\\data\\strategy.csv --partitions --workers 6 --verify
+    python .\\scripts\\run_backtest.py --csv .\\data\\strategy.csv --shards 8 --verify
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.dispatcher import diff_runs, dispatch_run
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--csv', required=True, help='Strategy settings CSV (same format as the web upload)')
+    p.add_argument('--shards', type=int, help='Date shards per strategy (default: split by strategy)')
+    p.add_argument('--partitions', action='store_true', help='One share per Nifty_options monthly partition')
+    p.add_argument('--workers', type=int, help='Sessions when not date-sharding')
+    p.add_argument('--stage-backend', choices=['matview', 'unlogged'])
+    p.add_argument('--no-cache', action='store_true', help='Skip the result cache')
+    p.add_argument('--no-prewarm', action='store_true', help='Skip the buffer-cache warm-up')
+    p.add_argument('--verify', action='store_true', help='Also run unsharded and compare the rows')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    df = pd.read_csv(args.csv)
+    use_cache = False if args.no_cache or args.verify else None
+
+    sharded = dispatch_run(df, workers=args.workers, stage_backend=args.stage_backend,
+                           use_cache=use_cache, shards=args.shards, partitions=args.partitions or None,
+                           prewarm_cache=False if args.no_prewarm else None)
+    print(f"✅ Run {sharded['run_id']} finished")
+    if not args.verify:
+        return
+
+    serial = dispatch_run(df, workers=args.workers, stage_backend=args.stage_backend,
+                          use_cache=False, shards=0, partitions=False)
+    only_a, only_b = diff_runs(sharded['run_id'], serial['run_id'])
+    if only_a or only_b:
+        print(f"❌ Runs differ: {only_a} rows only in {sharded['run_id']}, {only_b} only in {serial['run_id']}")
+        sys.exit(1)
+    print(f"✅ {sharded['run_id']} and {serial['run_id']} produced the same rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Run a strategy CSV across several Postgres instances (src/coordinator.py).
+
+Every ``--instance`` must hold the market data and the full SQL install;
+results are gathered into the PG* (primary) database. ``--verify`` also runs
+the CSV on the primary alone and checks both runs produced the same rows.
+
+Usage:
+    python .\\scripts\\run_distributed.py --csv .\\data\\strategy.csv --instance localhost:5433 --instance localhost:5434
+    python .\\scripts\\run_distributed.py --csv .\\data\\strategy.csv --shards 8 --sessions 3 --verify
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.coordinator import default_instances, distribute_run, parse_instances
+from src.dispatcher import diff_runs, dispatch_run
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--csv', required=True, help='Strategy settings CSV (same format as the web upload)')
+    p.add_argument('--instance', action='append',
+                   help='host:port[/dbname] of a worker instance (repeatable; default BACKTEST_INSTANCES)')
+    p.add_argument('--sessions', type=int, help='Concurrent tasks per instance')
+    p.add_argument('--shards', type=int, help='Date shards per strategy (default: tasks of whole strategies)')
+    p.add_argument('--retries', type=int, default=2, help='Re-dispatches of a failed task')
+    p.add_argument('--stage-backend', choices=['matview', 'unlogged'])
+    p.add_argument('--no-cache', action='store_true', help='Skip the result cache')
+    p.add_argument('--verify', action='store_true', help='Also run on the primary alone and compare the rows')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    instances = parse_instances(','.join(args.instance)) if args.instance else default_instances()
+    if not instances:
+        print("❌ No instances: pass --instance or set BACKTEST_INSTANCES")
+        sys.exit(1)
+    df = pd.read_csv(args.csv)
+    use_cache = False if args.no_cache or args.verify else None
+
+    distributed = distribute_run(df, instances, sessions=args.sessions, stage_backend=args.stage_backend,
+                                 use_cache=use_cache, shards=args.shards, retries=args.retries)
+    if not args.verify:
+        return
+
+    local = dispatch_run(df, stage_backend=args.stage_backend, use_cache=False, shards=0, partitions=False)
+    only_a, only_b = diff_runs(distributed['run_id'], local['run_id'])
+    if only_a or only_b:
+        print(f"❌ Runs differ: {only_a} rows only in {distributed['run_id']}, {only_b} only in {local['run_id']}")
+        sys.exit(1)
+    print(f"✅ {distributed['run_id']} and {local['run_id']} produced the same rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Run a strategy CSV on the in-memory NumPy engine (src/engine).
+
+Results land in strategy_run_results under a new run_id, like a dispatched
+run's, without building any pipeline stage.
+
+Usage:
+    python .\\scripts\\run_engine.py --csv .\\data\\strategy.csv
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.engine import run_engine
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--csv', required=True, help='Strategy settings CSV (same format as the web upload)')
+    p.add_argument('--run-id', help='Run id (default: a new one)')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    df = pd.read_csv(args.csv)
+    run_engine(df, run_id=args.run_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Run the strategy pipeline as a dependency graph across parallel sessions.
+
+Stage dependencies come from pg_depend/pg_rewrite (see src/stage_graph.py);
+independent branches (e.g. the rehedge and double-buy chains) run
+concurrently, up to --max-workers sessions. Loads strategy_settings into the
+runtime config first and appends results to strategy_run_results, exactly as
+CALL sp_run_strategy() does.
+
+Usage:
+    python .\\scripts\\run_stage_dag.py --max-workers 6
+    python .\\scripts\\run_stage_dag.py --dry-run
+"""
+import argparse
+import sys
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.db import get_conn
+from src.stage_graph import build_stage_graph, topological_order
+from src.stage_scheduler import prepare_session, run_stage_dag
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--schema', default='public', help='Pipeline schema (public or a bt_run_<n> run schema)')
+    p.add_argument('--max-workers', type=int, default=4, help='Parallel sessions cap')
+    p.add_argument('--stage-backend', choices=['matview', 'unlogged'], default='matview')
+    p.add_argument('--run-id', help='Tag results with this run_id (backtest.run_id)')
+    p.add_argument('--plan-capture-ms', type=int,
+                   help='Capture EXPLAIN (ANALYZE, BUFFERS) of stages slower than this into run_stage_plans')
+    p.add_argument('--dry-run', action='store_true', help='Print the DAG levels and exit')
+    return p.parse_args()
+
+
+def print_levels(stages):
+    level = {}
+    for name in topological_order(stages):
+        level[name] = 1 + max((level[d] for d in stages[name].deps), default=-1)
+    for lvl in range(max(level.values()) + 1):
+        names = sorted(n for n, l in level.items() if l == lvl)
+        print(f"level {lvl:2d} ({len(names)}): {', '.join(names)}")
+
+
+def main():
+    args = parse_args()
+    settings = {'stage_backend': args.stage_backend}
+    if args.run_id:
+        settings['run_id'] = args.run_id
+    if args.plan_capture_ms is not None:
+        settings['plan_capture_ms'] = args.plan_capture_ms
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            prepare_session(cur, args.schema)
+        stages = build_stage_graph(conn, args.schema)
+
+    print(f"{len(stages)} stages in {args.schema}")
+    if args.dry_run:
+        print_levels(stages)
+        return
+
+    report = run_stage_dag(args.schema, args.max_workers, settings, stages)
+
+    print(f"\nWall time:   {report['wall']:.1f}s")
+    print(f"Serial time: {report['serial']:.1f}s (sum of stages)")
+    print(f"Critical path: {report['critical_path_seconds']:.1f}s")
+    for name in report['critical_path']:
+        print(f"  {report['durations'].get(name, 0.0):8.2f}s  {name}")
+
+
+if __name__ == '__main__':
+    main()
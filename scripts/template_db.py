@@ -0,0 +1,91 @@
+"""Build the golden template database and manage clones of it (src/template_db.py).
+
+``build`` copies the schema, pipeline objects, config tables and the market
+data of --from..--to out of the PG* database into the template; ``exec``
+runs a command against a fresh clone (PGDATABASE set) and drops the clone
+afterwards; ``gc`` drops clones a crashed process left behind.
+
+Usage:
+    python .\\scripts\\template_db.py build --from 2024-01-01 --to 2024-03-31
+    python .\\scripts\\template_db.py exec -- python .\\scripts\\run_backtest.py --csv .\\data\\strategy.csv
+    python .\\scripts\\template_db.py clone
+    python .\\scripts\\template_db.py list
+    python .\\scripts\\template_db.py drop bt_clone_0123456789ab
+    python .\\scripts\\template_db.py gc --max-age-hours 2
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src import template_db
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument('--template', help='Template database (default BACKTEST_TEMPLATE_DB)')
+    sub = p.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='(Re)build the template from the PG* database')
+    build.add_argument('--from', dest='from_date', required=True, help='First market-data date to copy')
+    build.add_argument('--to', dest='to_date', required=True, help='Last market-data date to copy')
+
+    run = sub.add_parser('exec', help='Run a command against a throwaway clone')
+    run.add_argument('--keep', action='store_true', help='Keep the clone afterwards')
+    run.add_argument('cmd', nargs=argparse.REMAINDER, help='Command (after --)')
+
+    sub.add_parser('clone', help='Create a clone and print its name')
+    sub.add_parser('list', help='List clones')
+    drop = sub.add_parser('drop', help='Drop a clone')
+    drop.add_argument('name')
+    gc = sub.add_parser('gc', help='Drop stale clones')
+    gc.add_argument('--max-age-hours', type=float, default=6)
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == 'build':
+        template_db.build_template(args.from_date, args.to_date, args.template)
+
+    elif args.command == 'exec':
+        cmd = args.cmd[1:] if args.cmd[:1] == ['--'] else args.cmd
+        if not cmd:
+            print("❌ Nothing to run: pass a command after --")
+            sys.exit(1)
+        start = time.time()
+        with template_db.cloned_database(args.template, keep=args.keep) as name:
+            print(f"🧬 Cloned {name} in {time.time() - start:.1f}s")
+            code = subprocess.run(cmd, env={**os.environ, 'PGDATABASE': name}).returncode
+        print(f"🧹 {name} {'kept' if args.keep else 'dropped'}")
+        sys.exit(code)
+
+    elif args.command == 'clone':
+        start = time.time()
+        name = template_db.clone(args.template)
+        print(f"🧬 Cloned {name} in {time.time() - start:.1f}s (PGDATABASE={name})")
+
+    elif args.command == 'list':
+        clones = template_db.list_clones()
+        for name, created in clones:
+            print(f"{name}  created {created or 'unknown'}")
+        print(f"{len(clones)} clones")
+
+    elif args.command == 'drop':
+        template_db.drop(args.name)
+        print(f"🗑️ Dropped {args.name}")
+
+    elif args.command == 'gc':
+        dropped = template_db.drop_stale(args.max_age_hours)
+        print(f"🗑️ Dropped {len(dropped)} stale clones" + (f": {', '.join(dropped)}" if dropped else ''))
+
+
+if __name__ == '__main__':
+    main()
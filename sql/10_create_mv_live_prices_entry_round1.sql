@@ -2,6 +2,7 @@
 TRUNCATE TABLE public.wrk_live_prices_entry_round1;
 
 INSERT INTO public.wrk_live_prices_entry_round1 (
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -19,7 +20,7 @@ INSERT INTO public.wrk_live_prices_entry_round1 (
     option_close
 )
 WITH strategy AS (
-    SELECT eod_time FROM public.v_strategy_config LIMIT 1
+    SELECT strategy_name, eod_time FROM public.v_strategy_config
 ),
 legs AS (
     SELECT *
@@ -27,6 +28,7 @@ legs AS (
     WHERE entry_round = 1
 )
 SELECT 
+    l.strategy_name,
     l.trade_date,
     l.expiry_date,
     l.breakout_time,
@@ -43,7 +45,7 @@ SELECT
     o.open  AS option_open,
     o.close AS option_close
 FROM legs l
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = l.strategy_name
 JOIN public.v_nifty_options_filtered o
   ON o.date = l.trade_date
  AND o.expiry = l.expiry_date
@@ -3,6 +3,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_entry_sl_hits_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_entry_sl_hits_round1 AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         'box_with_buffer_sl' AS sl_type,
         'pct_based_breakout' AS preferred_breakout_type,
         sl_percentage,
@@ -28,6 +29,7 @@ entry_live_prices AS (
    ===================================================== */
 regular_sl AS (
     SELECT
+        lp.strategy_name,
         trade_date,
         expiry_date,
         option_type,
@@ -36,10 +38,10 @@ regular_sl AS (
         MIN(ltp_time) AS exit_time,
         'SL_HIT_REGULAR_SL' AS exit_reason
     FROM entry_live_prices lp
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = lp.strategy_name
     WHERE s.sl_type = 'regular_system_sl'
       AND lp.option_high >= ROUND(lp.entry_price * (1 + s.sl_percentage), 2)
-    GROUP BY trade_date, expiry_date, option_type, strike, entry_round
+    GROUP BY lp.strategy_name, trade_date, expiry_date, option_type, strike, entry_round
 ),
 
 /* =====================================================
@@ -47,6 +49,7 @@ regular_sl AS (
    ===================================================== */
 box_hard_sl AS (
     SELECT
+        lp.strategy_name,
         trade_date,
         expiry_date,
         option_type,
@@ -55,10 +58,10 @@ box_hard_sl AS (
         MIN(ltp_time) AS exit_time,
         'SL_HIT_BOX_HARD_SL' AS exit_reason
     FROM entry_live_prices lp
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = lp.strategy_name
     WHERE s.sl_type = 'box_with_buffer_sl'
       AND lp.option_high >= ROUND(lp.entry_price * (1 + s.box_sl_hard_pct), 2)
-    GROUP BY trade_date, expiry_date, option_type, strike, entry_round
+    GROUP BY lp.strategy_name, trade_date, expiry_date, option_type, strike, entry_round
 ),
 
 /* =====================================================
@@ -67,12 +70,13 @@ box_hard_sl AS (
 box_trigger_price_hit AS (
     SELECT lp.*
     FROM entry_live_prices lp
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = lp.strategy_name
     WHERE s.sl_type = 'box_with_buffer_sl'
       AND lp.option_high >= ROUND(lp.entry_price * (1 + s.box_sl_trigger_pct), 2)
 )	,
 option_universe AS (
     SELECT DISTINCT
+        strategy_name,
         trade_date,
         expiry_date,
         option_type,
@@ -82,6 +86,7 @@ option_universe AS (
 ),
 trigger_times AS (
     SELECT
+        t.strategy_name,
         t.trade_date,
         t.expiry_date,
         t.option_type,
@@ -100,6 +105,7 @@ trigger_times AS (
 ,
 breakout_candles AS (
     SELECT
+        tr.strategy_name,
         tr.trade_date,
         tr.expiry_date,
         tr.option_type,
@@ -116,10 +122,11 @@ breakout_candles AS (
       ON n.trade_date = tr.trade_date
 
     JOIN mv_breakout_context_round1 nr
-      ON nr.trade_date = tr.trade_date
+      ON nr.strategy_name = tr.strategy_name
+     AND nr.trade_date = tr.trade_date
      AND nr.temp_entry_round = '1'
 
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = tr.strategy_name
 
     WHERE
         s.preferred_breakout_type = 'pct_based_breakout'
@@ -144,12 +151,14 @@ breakout_candles AS (
 
 box_trigger_sl AS (
     SELECT  distinct on (        
+		l.strategy_name,
 		l.trade_date,
         l.expiry_date,
         l.option_type,
         l.strike,
         l.entry_round
          )
+        l.strategy_name,
         l.trade_date,
         l.expiry_date,
         l.option_type,
@@ -159,13 +168,14 @@ box_trigger_sl AS (
 		'SL_HIT_BOX_TRIGGER_SL' AS exit_reason
     FROM trigger_times l
     JOIN breakout_candles bc
-      ON bc.trade_date  = l.trade_date
+      ON bc.strategy_name = l.strategy_name
+     AND bc.trade_date  = l.trade_date
      AND bc.expiry_date = l.expiry_date
      AND bc.option_type = l.option_type
      AND bc.strike      = l.strike
      AND bc.entry_round = l.entry_round
      AND bc.candle_time = l.prev_candle_time
-	 order by l.trade_date,l.expiry_date,l.option_type,l.strike,l.entry_round,l.trigger_time
+	 order by l.strategy_name,l.trade_date,l.expiry_date,l.option_type,l.strike,l.entry_round,l.trigger_time
 )
 -- SELECT * fROM box_trigger_sl where trade_date in ('2025-09-29','2025-04-30') 
 -- order by  strike,exit_time
@@ -176,6 +186,7 @@ box_trigger_sl AS (
    ===================================================== */
 box_width_sl AS (
     SELECT
+        lp.strategy_name,
         lp.trade_date,
         lp.expiry_date,
         lp.option_type,
@@ -185,11 +196,12 @@ box_width_sl AS (
         'SL_HIT_BOX_WIDTH_SL' AS exit_reason
     FROM entry_live_prices lp
     JOIN mv_breakout_context_round1 nr
-      ON nr.trade_date = lp.trade_date
+      ON nr.strategy_name = lp.strategy_name
+     AND nr.trade_date = lp.trade_date
     JOIN v_ha_1m_filtered n
       ON n.trade_date = lp.trade_date
      AND n.candle_time = lp.ltp_time
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = lp.strategy_name
     WHERE
         (lp.option_type = 'P'
          AND n.ha_close <=
@@ -201,6 +213,7 @@ box_width_sl AS (
              nr.breakout_low
              + (nr.breakout_high - nr.breakout_low) * s.width_sl_pct)
     GROUP BY
+        lp.strategy_name,
         lp.trade_date,
         lp.expiry_date,
         lp.option_type,
@@ -226,6 +239,7 @@ ranked_sl AS (
         *,
         ROW_NUMBER() OVER (
             PARTITION BY
+                strategy_name,
                 trade_date,
                 expiry_date,
                 option_type,
@@ -245,6 +259,7 @@ ranked_sl AS (
 )
 
 SELECT
+    strategy_name,
     trade_date,
     expiry_date,
     option_type,
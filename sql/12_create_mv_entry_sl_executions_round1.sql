@@ -29,6 +29,7 @@ sl_hits AS (
    ===================================================== */
 sl_executed AS (
     SELECT
+        lp.strategy_name,
         lp.trade_date,
         lp.expiry_date,
         lp.breakout_time,
@@ -82,17 +83,18 @@ sl_executed AS (
 
     FROM sl_hits sh
     JOIN entry_live_prices lp
-      ON lp.trade_date  = sh.trade_date
+      ON lp.strategy_name = sh.strategy_name
+     AND lp.trade_date  = sh.trade_date
      AND lp.expiry_date = sh.expiry_date
      AND lp.option_type = sh.option_type
      AND lp.strike      = sh.strike
      AND lp.entry_round = sh.entry_round
      AND lp.ltp_time    = sh.exit_time
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = sh.strategy_name
 )
 
 SELECT *
 FROM sl_executed
-ORDER BY trade_date, expiry_date, exit_time, strike;
+ORDER BY strategy_name, trade_date, expiry_date, exit_time, strike;
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_sl_executions_round1_date ON public.mv_entry_sl_executions_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_sl_executions_round1_date ON public.mv_entry_sl_executions_round1 (strategy_name, trade_date, expiry_date);
@@ -18,6 +18,7 @@ entry_legs AS (
    ===================================================== */
 sl_hit_keys AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         option_type,
@@ -30,6 +31,7 @@ sl_hit_keys AS (
    OPEN ENTRY LEGS (NO SL HIT)
    ===================================================== */
 SELECT
+    e.strategy_name,
     e.trade_date,
     e.expiry_date,
     e.breakout_time,
@@ -45,11 +47,12 @@ FROM entry_legs e
 WHERE NOT EXISTS (
     SELECT 1
     FROM sl_hit_keys s
-    WHERE s.trade_date  = e.trade_date
+    WHERE s.strategy_name = e.strategy_name
+      AND s.trade_date  = e.trade_date
       AND s.expiry_date = e.expiry_date
       AND s.option_type = e.option_type
       AND s.strike      = e.strike
       AND s.entry_round = e.entry_round
 );
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_open_legs_round1_date ON public.mv_entry_open_legs_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_open_legs_round1_date ON public.mv_entry_open_legs_round1 (strategy_name, trade_date, expiry_date);
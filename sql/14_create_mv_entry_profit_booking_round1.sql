@@ -4,6 +4,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_entry_profit_booking_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_entry_profit_booking_round1 AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         leg_profit_pct,
         no_of_lots,
         lot_size
@@ -23,6 +24,7 @@ open_entry_legs AS (
    ===================================================== */
 live_prices AS (
     SELECT
+        l.strategy_name,
         l.trade_date,
         l.expiry_date,
         l.breakout_time,
@@ -50,6 +52,7 @@ live_prices AS (
    ===================================================== */
 profit_hit AS (
     SELECT
+        lp.strategy_name,
         lp.trade_date,
         lp.expiry_date,
         lp.option_type,
@@ -57,10 +60,11 @@ profit_hit AS (
         lp.entry_round,
         MIN(lp.ltp_time) AS exit_time
     FROM live_prices lp
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = lp.strategy_name
     WHERE lp.option_open
           <= ROUND(lp.entry_price * (1 - s.leg_profit_pct), 2)
     GROUP BY
+        lp.strategy_name,
         lp.trade_date,
         lp.expiry_date,
         lp.option_type,
@@ -72,6 +76,7 @@ profit_hit AS (
    FINAL PROFIT BOOKED LEGS
    ===================================================== */
 SELECT
+    lp.strategy_name,
     lp.trade_date,
     lp.expiry_date,
     lp.breakout_time,
@@ -94,13 +99,14 @@ SELECT
     ) AS pnl_amount
 FROM profit_hit p
 JOIN live_prices lp
-  ON lp.trade_date  = p.trade_date
+  ON lp.strategy_name = p.strategy_name
+ AND lp.trade_date  = p.trade_date
  AND lp.expiry_date = p.expiry_date
  AND lp.option_type = p.option_type
  AND lp.strike      = p.strike
  AND lp.entry_round = p.entry_round
  AND lp.ltp_time    = p.exit_time
-JOIN strategy s ON TRUE
-ORDER BY trade_date, expiry_date, exit_time, strike;
+JOIN strategy s ON s.strategy_name = p.strategy_name
+ORDER BY strategy_name, trade_date, expiry_date, exit_time, strike;
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_profit_booking_round1_date ON public.mv_entry_profit_booking_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_profit_booking_round1_date ON public.mv_entry_profit_booking_round1 (strategy_name, trade_date, expiry_date);
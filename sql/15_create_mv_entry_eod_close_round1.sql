@@ -3,6 +3,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_entry_eod_close_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_entry_eod_close_round1 AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         sl_type,
         sl_percentage,
         box_sl_hard_pct,
@@ -21,7 +22,8 @@ open_entry_legs AS (
     WHERE NOT EXISTS (
         SELECT 1
         FROM mv_entry_profit_booking_round1 p
-        WHERE p.trade_date  = mv_entry_open_legs_round1.trade_date
+        WHERE p.strategy_name = mv_entry_open_legs_round1.strategy_name
+          AND p.trade_date  = mv_entry_open_legs_round1.trade_date
           AND p.expiry_date = mv_entry_open_legs_round1.expiry_date
           AND p.option_type = mv_entry_open_legs_round1.option_type
           AND p.strike      = mv_entry_open_legs_round1.strike
@@ -34,6 +36,7 @@ open_entry_legs AS (
    ===================================================== */
 eod_prices AS (
     SELECT
+        s.strategy_name,
         o.date   AS trade_date,
         o.expiry AS expiry_date,
         o.option_type,
@@ -49,6 +52,7 @@ eod_prices AS (
    FINAL EOD EXIT
    ===================================================== */
 SELECT
+    l.strategy_name,
     l.trade_date,
     l.expiry_date,
     l.breakout_time,
@@ -71,11 +75,12 @@ SELECT
     ) AS pnl_amount
 FROM open_entry_legs l
 JOIN eod_prices e
-  ON e.trade_date  = l.trade_date
+  ON e.strategy_name = l.strategy_name
+ AND e.trade_date  = l.trade_date
  AND e.expiry_date = l.expiry_date
  AND e.option_type = l.option_type
  And e.strike      = l.strike
-JOIN strategy s ON TRUE
-ORDER BY trade_date, expiry_date, strike;
+JOIN strategy s ON s.strategy_name = l.strategy_name
+ORDER BY strategy_name, trade_date, expiry_date, strike;
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_eod_close_round1_date ON public.mv_entry_eod_close_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_eod_close_round1_date ON public.mv_entry_eod_close_round1 (strategy_name, trade_date, expiry_date);
@@ -8,6 +8,7 @@ WITH
    ===================================================== */
 sl_exits AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         breakout_time,
@@ -31,6 +32,7 @@ sl_exits AS (
    ===================================================== */
 profit_exits AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         breakout_time,
@@ -54,6 +56,7 @@ profit_exits AS (
    ===================================================== */
 eod_exits AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         breakout_time,
@@ -90,6 +93,7 @@ ranked AS (
     SELECT *,
            ROW_NUMBER() OVER (
                PARTITION BY
+                   strategy_name,
                    trade_date,
                    expiry_date,
                    option_type,
@@ -101,6 +105,7 @@ ranked AS (
 )
 
 SELECT
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -118,6 +123,6 @@ SELECT
     pnl_amount
 FROM ranked
 WHERE rn = 1
-ORDER BY trade_date, expiry_date, entry_time, strike;
+ORDER BY strategy_name, trade_date, expiry_date, entry_time, strike;
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_closed_legs_round1_date ON public.mv_entry_closed_legs_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_closed_legs_round1_date ON public.mv_entry_closed_legs_round1 (strategy_name, trade_date, expiry_date);
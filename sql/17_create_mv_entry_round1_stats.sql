@@ -17,6 +17,7 @@ legs AS (
    ===================================================== */
 entry_sl_hits AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         option_type,
@@ -39,6 +40,7 @@ live_prices AS (
    FINAL AGGREGATION (TIME-SAFE)
    ===================================================== */
 SELECT
+    lp.strategy_name,
     lp.trade_date,
     lp.expiry_date,
     lp.entry_round,
@@ -52,7 +54,8 @@ SELECT
           AND EXISTS (
               SELECT 1
               FROM entry_sl_hits s
-              WHERE s.trade_date  = l.trade_date
+              WHERE s.strategy_name = l.strategy_name
+                AND s.trade_date  = l.trade_date
                 AND s.expiry_date = l.expiry_date
                 AND s.option_type = l.option_type
                 AND s.strike      = l.strike
@@ -69,16 +72,18 @@ SELECT
 
 FROM live_prices lp
 JOIN legs l
-  ON l.trade_date  = lp.trade_date
+  ON l.strategy_name = lp.strategy_name
+ AND l.trade_date  = lp.trade_date
  AND l.expiry_date = lp.expiry_date
  AND l.option_type = lp.option_type
  AND l.strike      = lp.strike
  AND l.entry_round = lp.entry_round
 
 GROUP BY
+    lp.strategy_name,
     lp.trade_date,
     lp.expiry_date,
     lp.entry_round,
     lp.ltp_time;
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_round1_stats_date ON public.mv_entry_round1_stats (trade_date, expiry_date, entry_round);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_round1_stats_date ON public.mv_entry_round1_stats (strategy_name, trade_date, expiry_date, entry_round);
@@ -3,6 +3,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_hedge_exit_on_all_entry_sl CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_hedge_exit_on_all_entry_sl AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         no_of_lots,
         lot_size
     FROM v_strategy_config
@@ -12,6 +13,7 @@ WITH strategy AS (
    ===================================================== */
 entry_last_sl_time AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round,
@@ -20,6 +22,7 @@ entry_last_sl_time AS (
     WHERE leg_type = 'ENTRY'
       AND exit_reason LIKE 'SL_%'
     GROUP BY
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round
@@ -30,13 +33,15 @@ entry_last_sl_time AS (
    ===================================================== */
 all_entry_sl_completed AS (
     SELECT
+        s.strategy_name,
         s.trade_date,
         s.expiry_date,
         s.entry_round,
         t.exit_time
     FROM mv_entry_round1_stats s
     JOIN entry_last_sl_time t
-      ON s.trade_date  = t.trade_date
+      ON s.strategy_name = t.strategy_name
+     AND s.trade_date  = t.trade_date
      AND s.expiry_date = t.expiry_date
      AND s.entry_round = t.entry_round
      AND s.ltp_time = t.exit_time
@@ -65,6 +70,7 @@ hedge_prices AS (
    5. FINAL HEDGE EXIT
    ===================================================== */
 SELECT
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     h.breakout_time,
@@ -97,23 +103,26 @@ SELECT
 
 FROM all_entry_sl_completed a
 JOIN hedge_legs h
-  ON h.trade_date  = a.trade_date
+  ON h.strategy_name = a.strategy_name
+ AND h.trade_date  = a.trade_date
  AND h.expiry_date = a.expiry_date
  AND h.entry_round = a.entry_round
 
 JOIN hedge_prices p
-  ON p.trade_date  = h.trade_date
+  ON p.strategy_name = h.strategy_name
+ AND p.trade_date  = h.trade_date
  AND p.expiry_date = h.expiry_date
  AND p.option_type = h.option_type
  AND p.strike      = h.strike
  AND p.entry_round = h.entry_round
  AND p.ltp_time    = a.exit_time
 
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = h.strategy_name
 
 ORDER BY
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     a.exit_time;
 
-CREATE INDEX IF NOT EXISTS idx_mv_hedge_exit_on_all_entry_sl_date ON public.mv_hedge_exit_on_all_entry_sl (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_hedge_exit_on_all_entry_sl_date ON public.mv_hedge_exit_on_all_entry_sl (strategy_name, trade_date, expiry_date);
@@ -3,6 +3,7 @@ CREATE MATERIALIZED VIEW public.mv_hedge_exit_partial_conditions AS
 
 WITH strategy AS (
     SELECT
+        strategy_name,
         hedge_exit_entry_ratio,
         hedge_exit_multiplier,
         no_of_lots,
@@ -15,6 +16,7 @@ WITH strategy AS (
    ===================================================== */
 excluded_rounds AS (
     SELECT DISTINCT
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round
@@ -26,6 +28,7 @@ excluded_rounds AS (
    ===================================================== */
 exit_candidates AS (
     SELECT
+        s.strategy_name,
         s.trade_date,
         s.expiry_date,
         s.entry_round,
@@ -41,9 +44,10 @@ exit_candidates AS (
                 THEN 'EXIT_3X_HEDGE'
         END AS exit_reason
     FROM mv_entry_round1_stats s
-    JOIN strategy c ON TRUE
+    JOIN strategy c ON c.strategy_name = s.strategy_name
     LEFT JOIN excluded_rounds e
-      ON e.trade_date  = s.trade_date
+      ON e.strategy_name = s.strategy_name
+     AND e.trade_date  = s.trade_date
      AND e.expiry_date = s.expiry_date
      AND e.entry_round = s.entry_round
     WHERE e.trade_date IS NULL
@@ -60,14 +64,15 @@ exit_candidates AS (
    3. EARLIEST VALID EXIT PER ROUND
    ===================================================== */
 earliest_exit AS (
-    SELECT DISTINCT ON (trade_date, expiry_date, entry_round)
+    SELECT DISTINCT ON (strategy_name, trade_date, expiry_date, entry_round)
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round,
         exit_time,
         exit_reason
     FROM exit_candidates
-    ORDER BY trade_date, expiry_date, entry_round, exit_time
+    ORDER BY strategy_name, trade_date, expiry_date, entry_round, exit_time
 ),
 
 /* =====================================================
@@ -110,6 +115,7 @@ entry_prices AS (
    8. FINAL HEDGE EXIT (PARTIAL CONDITIONS)
    ===================================================== */
 SELECT
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     h.breakout_time,
@@ -137,19 +143,21 @@ SELECT
 
 FROM earliest_exit e
 JOIN hedge_legs h
-  ON h.trade_date  = e.trade_date
+  ON h.strategy_name = e.strategy_name
+ AND h.trade_date  = e.trade_date
  AND h.expiry_date = e.expiry_date
  AND h.entry_round = e.entry_round
 
 JOIN hedge_prices p
-  ON p.trade_date  = h.trade_date
+  ON p.strategy_name = h.strategy_name
+ AND p.trade_date  = h.trade_date
  AND p.expiry_date = h.expiry_date
  AND p.option_type = h.option_type
  AND p.strike      = h.strike
  AND p.entry_round = h.entry_round
  AND p.ltp_time    = e.exit_time
 
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = h.strategy_name
 
 UNION ALL
 
@@ -157,6 +165,7 @@ UNION ALL
    9. FINAL ENTRY EXIT (CORRESPONDING TO HEDGE EXIT)
    ===================================================== */
 SELECT
+    en.strategy_name,
     en.trade_date,
     en.expiry_date,
     en.breakout_time,
@@ -184,21 +193,24 @@ SELECT
 
 FROM earliest_exit e
 JOIN entry_legs en
-  ON en.trade_date  = e.trade_date
+  ON en.strategy_name = e.strategy_name
+ AND en.trade_date  = e.trade_date
  AND en.expiry_date = e.expiry_date
  AND en.entry_round = e.entry_round
 
 JOIN entry_prices ep
-  ON ep.trade_date  = en.trade_date
+  ON ep.strategy_name = en.strategy_name
+ AND ep.trade_date  = en.trade_date
  AND ep.expiry_date = en.expiry_date
  AND ep.option_type = en.option_type
  AND ep.strike      = en.strike
  AND ep.entry_round = en.entry_round
  AND ep.ltp_time    = e.exit_time
 
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = en.strategy_name
 
 ORDER BY
+    strategy_name,
     trade_date,
     expiry_date,
     exit_time;
@@ -10,9 +10,10 @@ SELECT *
 FROM mv_hedge_exit_partial_conditions
 
 ORDER BY
+    strategy_name,
     trade_date,
     expiry_date,
     entry_round,
     exit_time;
 
-CREATE INDEX IF NOT EXISTS idx_mv_hedge_closed_legs_round1_date ON public.mv_hedge_closed_legs_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_hedge_closed_legs_round1_date ON public.mv_hedge_closed_legs_round1 (strategy_name, trade_date, expiry_date);
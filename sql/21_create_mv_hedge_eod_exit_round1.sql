@@ -3,6 +3,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_hedge_eod_exit_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_hedge_eod_exit_round1 AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         eod_time,
         no_of_lots,
         lot_size
@@ -23,6 +24,7 @@ hedge_legs AS (
    ===================================================== */
 closed_hedges AS (
     SELECT DISTINCT
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round
@@ -36,7 +38,8 @@ open_hedges AS (
     SELECT h.*
     FROM hedge_legs h
     LEFT JOIN closed_hedges c
-      ON c.trade_date  = h.trade_date
+      ON c.strategy_name = h.strategy_name
+     AND c.trade_date  = h.trade_date
      AND c.expiry_date = h.expiry_date
      AND c.entry_round = h.entry_round
     WHERE c.trade_date IS NULL
@@ -55,6 +58,7 @@ hedge_eod_price AS (
    5. FINAL HEDGE EOD EXIT
    ===================================================== */
 SELECT 
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     h.breakout_time,
@@ -85,9 +89,10 @@ SELECT
     ) AS pnl_amount
 
 FROM open_hedges h
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = h.strategy_name
 JOIN hedge_eod_price p
-  ON p.trade_date  = h.trade_date
+  ON p.strategy_name = h.strategy_name
+ AND p.trade_date  = h.trade_date
  AND p.expiry_date = h.expiry_date
  AND p.option_type = h.option_type
  AND p.strike      = h.strike
@@ -95,8 +100,9 @@ JOIN hedge_eod_price p
  AND p.ltp_time::TIME = s.eod_time::TIME
 
 ORDER BY
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     s.eod_time;
 
-CREATE INDEX IF NOT EXISTS idx_mv_hedge_eod_exit_round1_date ON public.mv_hedge_eod_exit_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_hedge_eod_exit_round1_date ON public.mv_hedge_eod_exit_round1 (strategy_name, trade_date, expiry_date);
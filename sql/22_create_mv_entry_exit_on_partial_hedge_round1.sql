@@ -3,6 +3,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_entry_exit_on_partial_hedge_round1 CA
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_entry_exit_on_partial_hedge_round1 AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         no_of_lots,
         lot_size
     FROM v_strategy_config
@@ -13,6 +14,7 @@ WITH strategy AS (
    ===================================================== */
 partial_hedge_exit AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round,
@@ -42,6 +44,7 @@ entry_prices AS (
    4. FORCE ENTRY EXIT
    ===================================================== */
 SELECT 
+    e.strategy_name,
     e.trade_date,
     e.expiry_date,
     e.breakout_time,
@@ -70,23 +73,26 @@ SELECT
 
 FROM partial_hedge_exit p
 JOIN entry_legs e
-  ON e.trade_date  = p.trade_date
+  ON e.strategy_name = p.strategy_name
+ AND e.trade_date  = p.trade_date
  AND e.expiry_date = p.expiry_date
  AND e.entry_round = p.entry_round
 
 JOIN entry_prices p_price
-  ON p_price.trade_date  = e.trade_date
+  ON p_price.strategy_name = e.strategy_name
+ AND p_price.trade_date  = e.trade_date
  AND p_price.expiry_date = e.expiry_date
  AND p_price.option_type = e.option_type
  AND p_price.strike      = e.strike
  AND p_price.entry_round = e.entry_round
  AND p_price.ltp_time    = p.exit_time
 
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = e.strategy_name
 
 ORDER BY
+    e.strategy_name,
     e.trade_date,
     e.expiry_date,
     p.exit_time;
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_exit_on_partial_hedge_round1_date ON public.mv_entry_exit_on_partial_hedge_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_exit_on_partial_hedge_round1_date ON public.mv_entry_exit_on_partial_hedge_round1 (strategy_name, trade_date, expiry_date);
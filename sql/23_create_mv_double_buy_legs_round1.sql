@@ -3,6 +3,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_double_buy_legs_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_double_buy_legs_round1 AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         eod_time,
         no_of_lots,
         lot_size
@@ -40,6 +41,7 @@ eod_prices AS (
    4. DOUBLE BUY LEG
    ===================================================== */
 SELECT 
+    e.strategy_name,
     e.trade_date,
     e.expiry_date,
     e.breakout_time,
@@ -69,19 +71,21 @@ SELECT
 
 FROM sl_exited_entries s
 JOIN entry_legs e
-  ON e.trade_date  = s.trade_date
+  ON e.strategy_name = s.strategy_name
+ AND e.trade_date  = s.trade_date
  AND e.expiry_date = s.expiry_date
  AND e.option_type = s.option_type
  AND e.strike      = s.strike
  AND e.entry_round = s.entry_round
 
-JOIN strategy c ON TRUE
+JOIN strategy c ON c.strategy_name = e.strategy_name
 JOIN eod_prices p
-  ON p.trade_date  = e.trade_date
+  ON p.strategy_name = e.strategy_name
+ AND p.trade_date  = e.trade_date
  AND p.expiry_date = e.expiry_date
  AND p.option_type = e.option_type
  AND p.strike      = e.strike
  AND p.entry_round = e.entry_round
  AND p.ltp_time::TIME = c.eod_time::TIME;
 
-CREATE INDEX IF NOT EXISTS idx_mv_double_buy_legs_round1_date ON public.mv_double_buy_legs_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_double_buy_legs_round1_date ON public.mv_double_buy_legs_round1 (strategy_name, trade_date, expiry_date);
@@ -10,6 +10,7 @@ all_entry_exits AS (
 
     /* 1️⃣ ENTRY SL exits */
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         breakout_time,
@@ -34,6 +35,7 @@ all_entry_exits AS (
 
     /* 2️⃣ ENTRY exits due to partial hedge exit */
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         breakout_time,
@@ -62,6 +64,7 @@ ranked_entry_exits AS (
     SELECT *,
            ROW_NUMBER() OVER (
                PARTITION BY
+                   strategy_name,
                    trade_date,
                    expiry_date,
                    option_type,
@@ -76,6 +79,7 @@ ranked_entry_exits AS (
    3. FINAL ENTRY EXIT
    ===================================================== */
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -95,10 +99,11 @@ SELECT
 FROM ranked_entry_exits
 WHERE rn = 1
 ORDER BY
+    strategy_name,
     trade_date,
     expiry_date,
     entry_round,
     exit_time,
     strike;
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_final_exit_round1_date ON public.mv_entry_final_exit_round1 (trade_date, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_final_exit_round1_date ON public.mv_entry_final_exit_round1 (strategy_name, trade_date, expiry_date);
@@ -2,6 +2,7 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_rehedge_candidate_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_rehedge_candidate_round1 AS
 SELECT
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     h.entry_round,
@@ -18,7 +19,8 @@ SELECT
     o.time AS option_time
 FROM mv_hedge_exit_on_all_entry_sl h
 JOIN mv_rehedge_trigger_round1 t
-  ON h.trade_date  = t.trade_date
+  ON h.strategy_name = t.strategy_name
+ AND h.trade_date  = t.trade_date
  AND h.expiry_date = t.expiry_date
  AND h.entry_round = t.entry_round
  -- AND h.exit_time = t.rehedge_trigger_time
@@ -31,4 +33,4 @@ JOIN v_nifty_options_filtered o
  AND o.time > t.rehedge_trigger_time
 ;
 
-CREATE INDEX IF NOT EXISTS idx_mv_rehedge_candidate_round1_date ON public.mv_rehedge_candidate_round1 (trade_date, expiry_date, entry_round);
+CREATE INDEX IF NOT EXISTS idx_mv_rehedge_candidate_round1_date ON public.mv_rehedge_candidate_round1 (strategy_name, trade_date, expiry_date, entry_round);
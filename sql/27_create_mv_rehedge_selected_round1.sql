@@ -6,11 +6,11 @@ FROM (
     SELECT
         *,
         ROW_NUMBER() OVER (
-            PARTITION BY trade_date, expiry_date, entry_round
+            PARTITION BY strategy_name, trade_date, expiry_date, entry_round
             ORDER BY option_time, premium_diff
         ) AS rn
     FROM mv_rehedge_candidate_round1
 ) x
 WHERE rn = 1;
 
-CREATE INDEX IF NOT EXISTS idx_mv_rehedge_selected_round1_date ON public.mv_rehedge_selected_round1 (trade_date, expiry_date, entry_round);
+CREATE INDEX IF NOT EXISTS idx_mv_rehedge_selected_round1_date ON public.mv_rehedge_selected_round1 (strategy_name, trade_date, expiry_date, entry_round);
@@ -2,6 +2,7 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_rehedge_leg_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_rehedge_leg_round1 AS
 SELECT
+    strategy_name,
     trade_date,
     expiry_date,
     NULL::TIME AS breakout_time,
@@ -20,4 +21,4 @@ SELECT
     0 AS pnl_amount
 FROM mv_rehedge_selected_round1;
 
-CREATE INDEX IF NOT EXISTS idx_mv_rehedge_leg_round1_date ON public.mv_rehedge_leg_round1 (trade_date, expiry_date, entry_round);
+CREATE INDEX IF NOT EXISTS idx_mv_rehedge_leg_round1_date ON public.mv_rehedge_leg_round1 (strategy_name, trade_date, expiry_date, entry_round);
@@ -3,6 +3,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_rehedge_eod_exit_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_rehedge_eod_exit_round1 AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         eod_time,
         no_of_lots,
         lot_size
@@ -10,6 +11,7 @@ WITH strategy AS (
 )
 
 SELECT 
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     h.breakout_time,
@@ -36,7 +38,7 @@ SELECT
     ) AS pnl_amount
 
 FROM mv_rehedge_leg_round1 h
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = h.strategy_name
 JOIN v_nifty_options_filtered o
   ON o.date = h.trade_date
  AND o.expiry = h.expiry_date
@@ -44,4 +46,4 @@ JOIN v_nifty_options_filtered o
  AND o.strike = h.strike
  AND o.time::TIME = s.eod_time::TIME;
 
-CREATE INDEX IF NOT EXISTS idx_mv_rehedge_eod_exit_round1_date ON public.mv_rehedge_eod_exit_round1 (trade_date, expiry_date, entry_round);
+CREATE INDEX IF NOT EXISTS idx_mv_rehedge_eod_exit_round1_date ON public.mv_rehedge_eod_exit_round1 (strategy_name, trade_date, expiry_date, entry_round);
@@ -1,14 +1,36 @@
--- Materialized views that cache per-strategy filtered rows using runtime_strategy_config
-DROP MATERIALIZED VIEW IF EXISTS public.v_ha_big_filtered CASCADE;
-DROP MATERIALIZED VIEW IF EXISTS public.v_ha_small_filtered CASCADE;
-DROP MATERIALIZED VIEW IF EXISTS public.v_ha_1m_filtered CASCADE;
+-- Date-bound views over the market data, used by every stage via v_*_filtered
+-- No rows are copied: fn_refresh_filtered_view (77_create_filtered_view_window.sql)
+-- rebinds each view with literal from/to dates so the planner prunes the
+-- partitions of the base tables at plan time.
+-- Base-table indexes that replace the old matview indexes: 78_create_market_data_indexes.sql
 
-DROP MATERIALIZED VIEW IF EXISTS public.v_nifty50_filtered CASCADE;
-DROP MATERIALIZED VIEW IF EXISTS public.v_nifty_options_filtered CASCADE;
+-- Replace the earlier materialized copies (and their dependent stages, which
+-- the following files recreate)
+DO $$
+DECLARE
+    v TEXT;
+BEGIN
+    FOREACH v IN ARRAY ARRAY[
+        'v_ha_big_filtered', 'v_ha_small_filtered', 'v_ha_1m_filtered',
+        'v_nifty50_filtered', 'v_nifty_options_filtered'
+    ] LOOP
+        IF EXISTS (
+            SELECT 1 FROM pg_class
+            WHERE oid = to_regclass(format('%I.%I', current_schema(), v))
+              AND relkind = 'm'
+        ) THEN
+            EXECUTE format('DROP MATERIALIZED VIEW %I.%I CASCADE', current_schema(), v);
+        END IF;
+    END LOOP;
+END;
+$$;
 
-CREATE MATERIALIZED VIEW IF NOT EXISTS public.v_ha_big_filtered AS
+INSERT INTO public.filtered_view_window (view_name, select_sql)
+VALUES
+(
+'v_ha_big_filtered',
+$sql$
 SELECT
-  -- r.strategy_name,
   h.trade_date,
   h.candle_time,
   h.open,
@@ -20,12 +42,13 @@ SELECT
   h.ha_low,
   h.ha_close
 FROM public.ha_big h
-WHERE  h.trade_date >= (SELECT from_date FROM runtime_strategy_dates LIMIT 1)
-  AND  h.trade_date <= (SELECT to_date FROM runtime_strategy_dates LIMIT 1);
-
-CREATE MATERIALIZED VIEW IF NOT EXISTS public.v_ha_small_filtered AS
+WHERE h.trade_date BETWEEN %1$L::date AND %2$L::date
+$sql$
+),
+(
+'v_ha_small_filtered',
+$sql$
 SELECT
-  -- r.strategy_name,
   h.trade_date,
   h.candle_time,
   h.open,
@@ -37,12 +60,13 @@ SELECT
   h.ha_low,
   h.ha_close
 FROM public.ha_small h
-WHERE h.trade_date >= (SELECT from_date FROM runtime_strategy_dates LIMIT 1)
-  AND h.trade_date <= (SELECT to_date FROM runtime_strategy_dates LIMIT 1);
-
-CREATE MATERIALIZED VIEW IF NOT EXISTS public.v_ha_1m_filtered AS
+WHERE h.trade_date BETWEEN %1$L::date AND %2$L::date
+$sql$
+),
+(
+'v_ha_1m_filtered',
+$sql$
 SELECT
-  -- r.strategy_name,
   h.trade_date,
   h.candle_time,
   h.open,
@@ -54,13 +78,13 @@ SELECT
   h.ha_low,
   h.ha_close
 FROM public.ha_1m h
-WHERE h.trade_date >= (SELECT from_date FROM runtime_strategy_dates LIMIT 1)
-  AND h.trade_date <= (SELECT to_date FROM runtime_strategy_dates LIMIT 1);
-
--- Source market data views
-CREATE MATERIALIZED VIEW IF NOT EXISTS public.v_nifty50_filtered AS
+WHERE h.trade_date BETWEEN %1$L::date AND %2$L::date
+$sql$
+),
+(
+'v_nifty50_filtered',
+$sql$
 SELECT
-  -- r.strategy_name,
   m.date,
   m.time,
   m.open,
@@ -71,12 +95,13 @@ SELECT
   m.oi,
   m.option_nm
 FROM public."Nifty50" m
-WHERE m.date >= (SELECT from_date FROM runtime_strategy_dates LIMIT 1)
-  AND m.date <= (SELECT to_date FROM runtime_strategy_dates LIMIT 1);
-
-CREATE MATERIALIZED VIEW IF NOT EXISTS public.v_nifty_options_filtered AS
+WHERE m.date BETWEEN %1$L::date AND %2$L::date
+$sql$
+),
+(
+'v_nifty_options_filtered',
+$sql$
 SELECT
-  -- r.strategy_name,
   o.date,
   o.time,
   o.open,
@@ -89,26 +114,17 @@ SELECT
   o.strike,
   o.expiry
 FROM public."Nifty_options" o
-WHERE o.date >= (SELECT from_date FROM runtime_strategy_dates LIMIT 1)
-  AND o.date <= (SELECT to_date FROM runtime_strategy_dates LIMIT 1);
-
-DROP INDEX IF EXISTS ux_v_ha_big_filtered;
-CREATE UNIQUE INDEX ux_v_ha_big_filtered
-ON public.v_ha_big_filtered (trade_date, candle_time);
-
-DROP INDEX IF EXISTS ux_v_ha_small_filtered;
-CREATE UNIQUE INDEX ux_v_ha_small_filtered
-ON public.v_ha_small_filtered (trade_date, candle_time);
-
-DROP INDEX IF EXISTS ux_v_ha_1m_filtered;
-CREATE UNIQUE INDEX ux_v_ha_1m_filtered
-ON public.v_ha_1m_filtered (trade_date, candle_time);
-
-DROP INDEX IF EXISTS ux_v_nifty50_filtered;
-CREATE UNIQUE INDEX ux_v_nifty50_filtered
-ON public.v_nifty50_filtered (date, time);
+WHERE o.date BETWEEN %1$L::date AND %2$L::date
+$sql$
+)
+ON CONFLICT (view_name) DO UPDATE
+SET select_sql = EXCLUDED.select_sql,
+    from_date  = NULL,
+    to_date    = NULL;
 
-DROP INDEX IF EXISTS ux_v_nifty_options_filtered;
-CREATE UNIQUE INDEX ux_v_nifty_options_filtered
-ON public.v_nifty_options_filtered
-(date, expiry, option_type, strike, time);
+-- Create the views with an empty window; the first run binds real dates
+SELECT fn_bind_filtered_view('v_ha_big_filtered', NULL, NULL);
+SELECT fn_bind_filtered_view('v_ha_small_filtered', NULL, NULL);
+SELECT fn_bind_filtered_view('v_ha_1m_filtered', NULL, NULL);
+SELECT fn_bind_filtered_view('v_nifty50_filtered', NULL, NULL);
+SELECT fn_bind_filtered_view('v_nifty_options_filtered', NULL, NULL);
@@ -6,6 +6,7 @@ CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_all_legs_round1 AS
    ENTRY – FINAL EXIT (risk + soft exits)
    ===================================================== */
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -25,6 +26,7 @@ SELECT
 FROM mv_entry_final_exit_round1
 UNION ALL
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -44,6 +46,7 @@ SELECT
 FROM mv_double_buy_legs_round1
 UNION ALL
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -64,6 +67,7 @@ FROM mv_hedge_closed_legs_round1
 
 UNION ALL
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -87,6 +91,7 @@ FROM mv_hedge_eod_exit_round1
    ===================================================== */
 UNION ALL
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -106,6 +111,7 @@ SELECT
 FROM mv_rehedge_eod_exit_round1
 
 ORDER BY
+    strategy_name,
     trade_date,
     expiry_date,
     entry_round,
@@ -114,4 +120,4 @@ ORDER BY
     strike,
     leg_type;
 
-CREATE INDEX IF NOT EXISTS idx_mv_all_legs_round1_date ON public.mv_all_legs_round1 (trade_date, expiry_date, entry_round);
+CREATE INDEX IF NOT EXISTS idx_mv_all_legs_round1_date ON public.mv_all_legs_round1 (strategy_name, trade_date, expiry_date, entry_round);
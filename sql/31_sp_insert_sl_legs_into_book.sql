@@ -1,9 +1,14 @@
 --DELETE FROM strategy_leg_book;
-CREATE OR REPLACE PROCEDURE insert_sl_legs_into_book(p_strategy_name TEXT)
+-- p_strategy_name NULL books the round-1 legs of every strategy in v_strategy_config
+CREATE OR REPLACE PROCEDURE insert_sl_legs_into_book(p_strategy_name TEXT DEFAULT NULL)
 LANGUAGE plpgsql
 AS $$
 BEGIN
-    DELETE FROM strategy_leg_book ;--WHERE strategy_name = p_strategy_name;
+    DELETE FROM strategy_leg_book
+    WHERE strategy_name IN (
+        SELECT strategy_name FROM v_strategy_config
+        WHERE p_strategy_name IS NULL OR strategy_name = p_strategy_name
+    );
     INSERT INTO strategy_leg_book (
         strategy_name,
         trade_date,
@@ -21,7 +26,7 @@ BEGIN
         exit_reason
     )
     SELECT DISTINCT ON (
-    p_strategy_name    ,
+    strategy_name,
     trade_date,
     expiry_date,
     option_type,
@@ -29,7 +34,7 @@ BEGIN
     entry_round,
     leg_type
 )
-    p_strategy_name        AS strategy_name,
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -44,8 +49,9 @@ BEGIN
     entry_round,
     exit_reason
 FROM mv_all_legs_round1 sl
+WHERE p_strategy_name IS NULL OR sl.strategy_name = p_strategy_name
 ORDER BY
-p_strategy_name,
+    strategy_name,
     trade_date,
     expiry_date,
     option_type,
@@ -54,15 +60,9 @@ p_strategy_name,
     leg_type,
     exit_time;
 
-    RAISE NOTICE '✅ SL legs inserted into strategy_leg_book for strategy %', p_strategy_name;
+    RAISE NOTICE '✅ SL legs inserted into strategy_leg_book for strategy %', COALESCE(p_strategy_name, '<all>');
 END;
 $$;
 
 
-DO $$
-DECLARE
-    strat_name TEXT;
-BEGIN
-    SELECT strategy_name INTO strat_name FROM v_strategy_config LIMIT 1;
-    CALL insert_sl_legs_into_book(strat_name);
-END $$;
\ No newline at end of file
+CALL insert_sl_legs_into_book();
@@ -3,10 +3,10 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_reentry_triggered_breakouts CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_reentry_triggered_breakouts AS
 WITH config AS (
     SELECT 
+        strategy_name,
         max_reentry_rounds,
         reentry_breakout_type
     FROM public.v_strategy_config
-    LIMIT 1
 ),
 
 /* =====================================================
@@ -14,14 +14,26 @@ WITH config AS (
    ===================================================== */
 first_sl_hit AS (
     SELECT 
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round,
         MIN(exit_time) AS first_sl_exit_time
 --FROM public.mv_all_legs_round1
-FROM strategy_leg_book
+FROM strategy_leg_book b
     WHERE exit_reason LIKE 'SL_HIT_%'
-    GROUP BY trade_date, expiry_date, entry_round
+      -- inside fn_run_reentry_loop only the newest booked round of each day;
+      -- older rounds' successors are already in the book
+      AND (
+            fn_backtest_setting('reentry_frontier', 'off') = 'off'
+         OR entry_round = (
+                SELECT MAX(f.entry_round)
+                FROM strategy_leg_book f
+                WHERE f.strategy_name = b.strategy_name
+                  AND f.trade_date = b.trade_date
+            )
+      )
+    GROUP BY strategy_name, trade_date, expiry_date, entry_round
 )
 --SELECT * FROM first_sl_hit 
  ,
@@ -31,6 +43,7 @@ FROM strategy_leg_book
    ===================================================== */
 scan_start_time AS (
     SELECT 
+        f.strategy_name,
         f.trade_date,
         f.expiry_date,
         f.entry_round + 1 AS next_entry_round,
@@ -41,7 +54,7 @@ scan_start_time AS (
         ) AS scan_start_time,
         c.max_reentry_rounds
     FROM first_sl_hit f
-    JOIN config c ON TRUE
+    JOIN config c ON c.strategy_name = f.strategy_name
     WHERE f.entry_round < c.max_reentry_rounds
 )
 -- * FROM scan_start_time where trade_Date='2025-05-13'
@@ -53,20 +66,22 @@ scan_start_time AS (
    ===================================================== */
 ranked_next_breakouts AS (
     SELECT 
+        b.strategy_name,
         b.trade_date,
         b.breakout_time,
         b.breakout_type,
         b.entry_option_type,
         s.next_entry_round,
         ROW_NUMBER() OVER (
-            PARTITION BY b.trade_date, s.next_entry_round
+            PARTITION BY b.strategy_name, b.trade_date, s.next_entry_round
             ORDER BY b.breakout_time
         ) AS rn
     FROM public.mv_ranked_breakouts_with_rounds_for_reentry b
     JOIN scan_start_time s
-      ON b.trade_date = s.trade_date
+      ON b.strategy_name = s.strategy_name
+     AND b.trade_date = s.trade_date
      AND b.breakout_time >= s.scan_start_time
-     JOIN config c on True
+     JOIN config c on c.strategy_name = b.strategy_name
 	WHERE
         (
             c.reentry_breakout_type = 'full_candle_breakout'
@@ -88,6 +103,7 @@ ranked_next_breakouts AS (
    STEP 4: PICK FIRST BREAKOUT FOR EACH RE-ENTRY ROUND
    ===================================================== */
 SELECT 
+    strategy_name,
     trade_date,
     breakout_time,
     breakout_time + INTERVAL '5 minutes' AS entry_time,
@@ -97,4 +113,4 @@ SELECT
 FROM ranked_next_breakouts
 WHERE rn = 1;
 
---CREATE INDEX IF NOT EXISTS idx_mv_reentry_triggered_breakouts_date_round ON public.mv_reentry_triggered_breakouts (trade_date, entry_round);
+--CREATE INDEX IF NOT EXISTS idx_mv_reentry_triggered_breakouts_date_round ON public.mv_reentry_triggered_breakouts (strategy_name, trade_date, entry_round);
@@ -4,6 +4,7 @@ WITH
 -- 1️⃣ Only required breakout rows
 breakout_info AS (
     SELECT
+        strategy_name,
         trade_date,
         entry_time,
         breakout_time,
@@ -17,6 +18,7 @@ breakout_info AS (
 -- 2️⃣ Spot price at entry time
 base AS (
     SELECT 
+        b.strategy_name,
         b.trade_date,
         b.breakout_time,
         b.entry_time,
@@ -78,14 +80,14 @@ strike_candidates AS (
      AND o.time   = b.entry_time
      AND o.expiry = b.expiry_date
      AND o.option_type = b.entry_option_type
-    JOIN v_strategy_config s ON TRUE
+    JOIN v_strategy_config s ON s.strategy_name = b.strategy_name
 ),
 
 -- 6️⃣ Rank once
 ranked_strikes AS (
     SELECT *,
            ROW_NUMBER() OVER (
-               PARTITION BY trade_date, expiry_date,entry_round
+               PARTITION BY strategy_name, trade_date, expiry_date,entry_round
                ORDER BY priority, premium_diff
            ) AS rn
     FROM strike_candidates
@@ -2,21 +2,19 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_reentry_legs_and_hedge_legs CASCADE;
 CREATE MATERIALIZED VIEW mv_reentry_legs_and_hedge_legs AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         num_entry_legs,
         num_hedge_legs,
         hedge_entry_price_cap
     FROM v_strategy_config
 ),
-current_strategy AS (
-    SELECT strategy_name FROM current_reentry_strategy
-),
 
 /* =========================
    ENTRY LEGS
    ========================= */
 entry_strike_cte AS (
     SELECT 
-        c.strategy_name,
+        s.strategy_name,
         o.date AS trade_date,
         o.expiry AS expiry_date,
         s.breakout_time,
@@ -30,8 +28,7 @@ entry_strike_cte AS (
         'RE-ENTRY'::TEXT AS leg_type,
         'SELL'::TEXT AS transaction_type
     FROM mv_reentry_base_strike_selection s
-    JOIN strategy st ON TRUE
-    JOIN current_strategy c ON TRUE
+    JOIN strategy st ON st.strategy_name = s.strategy_name
     JOIN v_nifty_options_filtered o 
       ON o.date   = s.trade_date
      AND o.expiry = s.expiry_date
@@ -51,6 +48,7 @@ entry_strike_cte AS (
    ========================= */
 hedge_ranked AS (
     SELECT
+        b.strategy_name,
         b.trade_date,
         b.breakout_time,
         b.entry_time,
@@ -75,7 +73,7 @@ hedge_ranked AS (
         ABS(o.open - s.hedge_entry_price_cap) AS premium_diff,
 
         ROW_NUMBER() OVER (
-            PARTITION BY b.trade_date, b.expiry_date, b.entry_round
+            PARTITION BY b.strategy_name, b.trade_date, b.expiry_date, b.entry_round
             ORDER BY
                 CASE
                     WHEN o.strike = b.atm_strike
@@ -87,7 +85,7 @@ hedge_ranked AS (
         ) AS rn
 
     FROM mv_reentry_base_strike_selection b
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = b.strategy_name
     JOIN v_nifty_options_filtered o 
       ON o.date   = b.trade_date
      AND o.time   = b.entry_time
@@ -110,7 +108,7 @@ selected_hedge_base_strike AS (
    ========================= */
 hedge_strike_cte AS (
     SELECT 
-        c.strategy_name,
+        s.strategy_name,
         o.date AS trade_date,
         o.expiry AS expiry_date,
         s.breakout_time,
@@ -124,8 +122,7 @@ hedge_strike_cte AS (
         'HEDGE-RE-ENTRY'::TEXT AS leg_type,
         'SELL'::TEXT AS transaction_type
     FROM selected_hedge_base_strike s
-    JOIN strategy st ON TRUE
-    JOIN current_strategy c ON TRUE
+    JOIN strategy st ON st.strategy_name = s.strategy_name
     JOIN v_nifty_options_filtered o 
       ON o.date   = s.trade_date
      AND o.expiry = s.expiry_date
@@ -1,6 +1,7 @@
 TRUNCATE TABLE public.wrk_reentry_live_prices;
 
 INSERT INTO public.wrk_reentry_live_prices (
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -18,7 +19,7 @@ INSERT INTO public.wrk_reentry_live_prices (
     option_close
 )
 WITH strategy AS (
-    SELECT eod_time FROM v_strategy_config
+    SELECT strategy_name, eod_time FROM v_strategy_config
 ),
 legs AS (
     SELECT *
@@ -26,6 +27,7 @@ legs AS (
    -- WHERE entry_round = 1
 )
 SELECT 
+    l.strategy_name,
     l.trade_date,
     l.expiry_date,
     l.breakout_time,
@@ -42,7 +44,7 @@ SELECT
     o.open  AS option_open,
     o.close AS option_close
 FROM legs l
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = l.strategy_name
 JOIN v_nifty_options_filtered o
   ON o.date = l.trade_date
  AND o.expiry = l.expiry_date
@@ -1,9 +1,10 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_reentry_breakout_context CASCADE;
 CREATE MATERIALIZED VIEW mv_reentry_breakout_context AS
 WITH strategy AS (
-    SELECT entry_candle FROM v_strategy_config
+    SELECT strategy_name, entry_candle, from_date, to_date FROM v_strategy_config
 )
 SELECT
+    s.strategy_name,
     trade_date,
     ha_high AS breakout_high,
     ha_low  AS breakout_low,
@@ -17,5 +18,6 @@ FROM (
         ROW_NUMBER() OVER (PARTITION BY trade_date ORDER BY candle_time) AS rn
     FROM v_ha_big_filtered
 ) x
-JOIN strategy s ON TRUE
+JOIN strategy s
+  ON x.trade_date BETWEEN s.from_date AND s.to_date
 WHERE rn = s.entry_candle;
\ No newline at end of file
@@ -28,6 +28,7 @@ sl_hits AS (
    ===================================================== */
 sl_executed AS (
     SELECT
+        lp.strategy_name,
         lp.trade_date,
         lp.expiry_date,
         lp.breakout_time,
@@ -81,15 +82,16 @@ CASE
         ) AS pnl_amount
     FROM sl_hits sh
     JOIN entry_live_prices lp
-      ON lp.trade_date  = sh.trade_date
+      ON lp.strategy_name = sh.strategy_name
+     AND lp.trade_date  = sh.trade_date
      AND lp.expiry_date = sh.expiry_date
      AND lp.option_type = sh.option_type
      AND lp.strike      = sh.strike
      AND lp.entry_round = sh.entry_round
      AND lp.ltp_time    = sh.exit_time
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = sh.strategy_name
 )
 
 SELECT *
 FROM sl_executed
-ORDER BY trade_date, expiry_date, exit_time, strike;
\ No newline at end of file
+ORDER BY strategy_name, trade_date, expiry_date, exit_time, strike;
\ No newline at end of file
@@ -16,6 +16,7 @@ entry_legs AS (
    ===================================================== */
 sl_hit_keys AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         option_type,
@@ -28,6 +29,7 @@ sl_hit_keys AS (
    OPEN ENTRY LEGS (NO SL HIT)
    ===================================================== */
 SELECT
+    e.strategy_name,
     e.trade_date,
     e.expiry_date,
     e.breakout_time,
@@ -43,7 +45,8 @@ FROM entry_legs e
 WHERE NOT EXISTS (
     SELECT 1
     FROM sl_hit_keys s
-    WHERE s.trade_date  = e.trade_date
+    WHERE s.strategy_name = e.strategy_name
+      AND s.trade_date  = e.trade_date
       AND s.expiry_date = e.expiry_date
       AND s.option_type = e.option_type
       AND s.strike      = e.strike
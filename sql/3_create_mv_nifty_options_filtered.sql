@@ -1,5 +1,19 @@
--- Materialized view for Nifty options filtered by runtime_strategy_config date ranges
-CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_nifty_options_filtered AS
+
+-- Nifty options rows per strategy date range (runtime_strategy_config)
+-- A plain view over the date-bound v_nifty_options_filtered; nothing is copied
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE oid = to_regclass(format('%I.mv_nifty_options_filtered', current_schema()))
+          AND relkind = 'm'
+    ) THEN
+        EXECUTE format('DROP MATERIALIZED VIEW %I.mv_nifty_options_filtered CASCADE', current_schema());
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE VIEW public.mv_nifty_options_filtered AS
 SELECT
   r.strategy_name,
   o.date,
@@ -13,11 +27,7 @@ SELECT
   o.oi,
   o.option_type,
   o.strike
-FROM public."Nifty_options" o
+FROM public.v_nifty_options_filtered o
 JOIN public.runtime_strategy_config r
   ON o.date >= r.from_date
  AND o.date <= r.to_date;
-
-CREATE UNIQUE INDEX CONCURRENTLY ux_mv_nifty_options_filtered
-ON mv_nifty_options_filtered
-(date, expiry, option_type, strike, time);
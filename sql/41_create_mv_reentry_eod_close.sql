@@ -2,6 +2,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_reentry_eod_close CASCADE;
 CREATE MATERIALIZED VIEW mv_reentry_eod_close AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         sl_type,
         sl_percentage,
         box_sl_hard_pct,
@@ -20,7 +21,8 @@ open_entry_legs AS (
     WHERE NOT EXISTS (
         SELECT 1
         FROM mv_reentry_profit_booking p
-        WHERE p.trade_date  = mv_reentry_open_legs.trade_date
+        WHERE p.strategy_name = mv_reentry_open_legs.strategy_name
+          AND p.trade_date  = mv_reentry_open_legs.trade_date
           AND p.expiry_date = mv_reentry_open_legs.expiry_date
           AND p.option_type = mv_reentry_open_legs.option_type
           AND p.strike      = mv_reentry_open_legs.strike
@@ -33,6 +35,7 @@ open_entry_legs AS (
    ===================================================== */
 eod_prices AS (
     SELECT
+        s.strategy_name,
         o.date   AS trade_date,
         o.expiry AS expiry_date,
         o.option_type,
@@ -48,6 +51,7 @@ eod_prices AS (
    FINAL EOD EXIT
    ===================================================== */
 SELECT
+    l.strategy_name,
     l.trade_date,
     l.expiry_date,
     l.breakout_time,
@@ -70,9 +74,10 @@ SELECT
     ) AS pnl_amount
 FROM open_entry_legs l
 JOIN eod_prices e
-  ON e.trade_date  = l.trade_date
+  ON e.strategy_name = l.strategy_name
+ AND e.trade_date  = l.trade_date
  AND e.expiry_date = l.expiry_date
  AND e.option_type = l.option_type
  And e.strike      = l.strike
-JOIN strategy s ON TRUE
-ORDER BY trade_date, expiry_date, strike;
\ No newline at end of file
+JOIN strategy s ON s.strategy_name = l.strategy_name
+ORDER BY strategy_name, trade_date, expiry_date, strike;
\ No newline at end of file
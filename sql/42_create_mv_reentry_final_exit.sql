@@ -7,6 +7,7 @@ WITH
    ===================================================== */
 sl_exits AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         breakout_time,
@@ -30,6 +31,7 @@ sl_exits AS (
    ===================================================== */
 profit_exits AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         breakout_time,
@@ -53,6 +55,7 @@ profit_exits AS (
    ===================================================== */
 eod_exits AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         breakout_time,
@@ -89,6 +92,7 @@ ranked AS (
     SELECT *,
            ROW_NUMBER() OVER (
                PARTITION BY
+                   strategy_name,
                    trade_date,
                    expiry_date,
                    option_type,
@@ -100,6 +104,7 @@ ranked AS (
 )
 
 SELECT
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -117,4 +122,4 @@ SELECT
     pnl_amount
 FROM ranked
 WHERE rn = 1
-ORDER BY trade_date, expiry_date, entry_time, strike;
\ No newline at end of file
+ORDER BY strategy_name, trade_date, expiry_date, entry_time, strike;
\ No newline at end of file
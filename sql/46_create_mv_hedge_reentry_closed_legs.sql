@@ -9,6 +9,7 @@ SELECT *
 FROM mv_hedge_reentry_exit_on_partial_conditions
 
 ORDER BY
+    strategy_name,
     trade_date,
     expiry_date,
     entry_round,
@@ -2,6 +2,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_hedge_reentry_eod_exit CASCADE;
 CREATE MATERIALIZED VIEW mv_hedge_reentry_eod_exit AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         eod_time,
         no_of_lots,
         lot_size
@@ -22,6 +23,7 @@ hedge_legs AS (
    ===================================================== */
 closed_hedges AS (
     SELECT DISTINCT
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round
@@ -35,7 +37,8 @@ open_hedges AS (
     SELECT h.*
     FROM hedge_legs h
     LEFT JOIN closed_hedges c
-      ON c.trade_date  = h.trade_date
+      ON c.strategy_name = h.strategy_name
+     AND c.trade_date  = h.trade_date
      AND c.expiry_date = h.expiry_date
      AND c.entry_round = h.entry_round
     WHERE c.trade_date IS NULL
@@ -54,6 +57,7 @@ hedge_eod_price AS (
    5. FINAL HEDGE EOD EXIT
    ===================================================== */
 SELECT
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     h.breakout_time,
@@ -84,9 +88,10 @@ SELECT
     ) AS pnl_amount
 
 FROM open_hedges h
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = h.strategy_name
 JOIN hedge_eod_price p
-  ON p.trade_date  = h.trade_date
+  ON p.strategy_name = h.strategy_name
+ AND p.trade_date  = h.trade_date
  AND p.expiry_date = h.expiry_date
  AND p.option_type = h.option_type
  AND p.strike      = h.strike
@@ -96,6 +101,7 @@ JOIN hedge_eod_price p
 
 
 ORDER BY
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     s.eod_time;
\ No newline at end of file
@@ -2,6 +2,7 @@ DROP MATERIALIZED VIEW IF EXISTS public.mv_reentry_exit_on_partial_hedge CASCADE
 CREATE MATERIALIZED VIEW mv_reentry_exit_on_partial_hedge AS
 WITH strategy AS (
     SELECT
+        strategy_name,
         no_of_lots,
         lot_size
     FROM v_strategy_config
@@ -12,6 +13,7 @@ WITH strategy AS (
    ===================================================== */
 partial_hedge_exit AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         entry_round,
@@ -41,6 +43,7 @@ entry_prices AS (
    4. FORCE ENTRY EXIT
    ===================================================== */
 SELECT
+    e.strategy_name,
     e.trade_date,
     e.expiry_date,
     e.breakout_time,
@@ -69,21 +72,24 @@ SELECT
 
 FROM partial_hedge_exit p
 JOIN entry_legs e
-  ON e.trade_date  = p.trade_date
+  ON e.strategy_name = p.strategy_name
+ AND e.trade_date  = p.trade_date
  AND e.expiry_date = p.expiry_date
  AND e.entry_round = p.entry_round
 
 JOIN entry_prices p_price
-  ON p_price.trade_date  = e.trade_date
+  ON p_price.strategy_name = e.strategy_name
+ AND p_price.trade_date  = e.trade_date
  AND p_price.expiry_date = e.expiry_date
  AND p_price.option_type = e.option_type
  AND p_price.strike      = e.strike
  AND p_price.entry_round = e.entry_round
  AND p_price.ltp_time    = p.exit_time
 
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = e.strategy_name
 
 ORDER BY
+    e.strategy_name,
     e.trade_date,
     e.expiry_date,
     p.exit_time;
\ No newline at end of file
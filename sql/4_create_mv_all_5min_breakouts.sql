@@ -1,13 +1,26 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_all_5min_breakouts CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_all_5min_breakouts AS
-WITH ha_bounds AS (
+WITH
+-- Memoized (79_create_stage_memo.sql): computed for group leaders only,
+-- fanned out to every strategy of the group in the final SELECT
+cfg AS (
+    SELECT c.*
+    FROM v_strategy_config c
+    JOIN v_stage_groups g
+      ON g.strategy_name = c.strategy_name
+     AND g.stage_name = 'mv_all_5min_breakouts'
+    WHERE g.leader_strategy = g.strategy_name
+),
+
+ha_bounds AS (
     SELECT
+        s.strategy_name,
         h.trade_date,
         h.candle_time,
         h.ha_high,
         h.ha_low
     FROM (
-        SELECT 
+        SELECT
             trade_date,
             candle_time,
             ha_high,
@@ -15,12 +28,14 @@ WITH ha_bounds AS (
             ROW_NUMBER() OVER (PARTITION BY trade_date ORDER BY candle_time) AS rn
         FROM v_ha_big_filtered
     ) h
-    JOIN v_strategy_config s
+    JOIN cfg s
       ON h.rn = s.entry_candle
+     AND h.trade_date BETWEEN s.from_date AND s.to_date
 ),
 
 combined AS (
     SELECT
+        h.strategy_name,
         f.trade_date,
         f.candle_time,
         f.ha_open,
@@ -62,8 +77,8 @@ combined AS (
     FROM v_ha_small_filtered f
     JOIN ha_bounds h
       ON f.trade_date = h.trade_date
-    JOIN v_strategy_config s
-      ON TRUE
+    JOIN cfg s
+      ON s.strategy_name = h.strategy_name
     WHERE f.candle_time >=
           TIME '09:15:00'
           + (s.entry_candle * s.big_candle_tf || ' minutes')::interval
@@ -71,20 +86,24 @@ combined AS (
 )
 
 SELECT
-    trade_date,
-    candle_time AS breakout_time,
-    candle_time + (s.small_candle_tf || ' minutes')::interval AS entry_time,
-    ha_open,
-    ha_close,
-    ha_high,
-    ha_low,
-    ha_15m_high,
-    ha_15m_low,
-    breakout_type
-FROM combined
-JOIN v_strategy_config s ON TRUE
-WHERE breakout_type IS NOT NULL
-  AND trade_date BETWEEN s.from_date AND s.to_date;
+    g.strategy_name,
+    c.trade_date,
+    c.candle_time AS breakout_time,
+    c.candle_time + (s.small_candle_tf || ' minutes')::interval AS entry_time,
+    c.ha_open,
+    c.ha_close,
+    c.ha_high,
+    c.ha_low,
+    c.ha_15m_high,
+    c.ha_15m_low,
+    c.breakout_type
+FROM combined c
+JOIN cfg s ON s.strategy_name = c.strategy_name
+JOIN v_stage_groups g
+  ON g.stage_name = 'mv_all_5min_breakouts'
+ AND g.leader_strategy = c.strategy_name
+WHERE c.breakout_type IS NOT NULL
+  AND c.trade_date BETWEEN s.from_date AND s.to_date;
 
 -- create an index to speed lookups
-CREATE INDEX IF NOT EXISTS idx_mv_all_5min_breakouts_date_time ON public.mv_all_5min_breakouts (trade_date, breakout_time);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_mv_all_5min_breakouts_date_time ON public.mv_all_5min_breakouts (strategy_name, trade_date, breakout_time);
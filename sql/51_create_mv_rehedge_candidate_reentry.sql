@@ -1,6 +1,7 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_rehedge_candidate_reentry CASCADE;
 CREATE MATERIALIZED VIEW mv_rehedge_candidate_reentry AS
 SELECT
+    h.strategy_name,
     h.trade_date,
     h.expiry_date,
     h.entry_round,
@@ -17,7 +18,8 @@ SELECT
     o.time AS option_time
 FROM mv_hedge_reentry_exit_on_all_entry_sl h
 JOIN mv_rehedge_trigger_reentry t
-  ON h.trade_date  = t.trade_date
+  ON h.strategy_name = t.strategy_name
+ AND h.trade_date  = t.trade_date
  AND h.expiry_date = t.expiry_date
  AND h.entry_round = t.entry_round
  --AND h.exit_time=t.rehedge_trigger_time
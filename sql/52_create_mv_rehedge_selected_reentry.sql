@@ -5,7 +5,7 @@ FROM (
     SELECT
         *,
         ROW_NUMBER() OVER (
-            PARTITION BY trade_date, expiry_date, entry_round
+            PARTITION BY strategy_name, trade_date, expiry_date, entry_round
             ORDER BY option_time, premium_diff
         ) AS rn
     FROM mv_rehedge_candidate_reentry
@@ -1,6 +1,7 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_rehedge_leg_reentry CASCADE;
 CREATE MATERIALIZED VIEW mv_rehedge_leg_reentry AS
 SELECT
+    strategy_name,
     trade_date,
     expiry_date,
     NULL::TIME AS breakout_time,
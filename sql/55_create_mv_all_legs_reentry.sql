@@ -5,6 +5,7 @@ CREATE MATERIALIZED VIEW mv_all_legs_reentry AS
    ENTRY – FINAL EXIT (risk + soft exits)
    ===================================================== */
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -24,6 +25,7 @@ SELECT
 FROM mv_reentry_final_exit
 UNION ALL
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -43,6 +45,7 @@ SELECT
 FROM mv_double_buy_legs_reentry
 UNION ALL
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -63,6 +66,7 @@ FROM mv_hedge_reentry_closed_legs
 
 UNION ALL
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -86,6 +90,7 @@ FROM mv_hedge_reentry_eod_exit
    ===================================================== */
 UNION ALL
 SELECT 
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -105,6 +110,7 @@ SELECT
 FROM mv_rehedge_eod_exit_reentry
 
 ORDER BY
+    strategy_name,
     trade_date,
     expiry_date,
     entry_round,
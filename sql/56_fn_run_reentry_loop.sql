@@ -1,58 +1,107 @@
-CREATE OR REPLACE FUNCTION fn_run_reentry_loop(p_strategy_name TEXT)
+-- p_strategy_name NULL runs the loop for every strategy in v_strategy_config at once;
+-- each round is keyed by strategy_name so finished strategies just re-produce booked legs.
+-- Round N+1 is triggered by the first SL hit of round N, and those exits all come
+-- from mv_reentry_final_exit: the hedge, double-buy and re-hedge stages after it
+-- never feed back into mv_reentry_triggered_breakouts. So the loop runs in two phases:
+--   1. per round, only the entry-leg chain (mv_reentry_triggered_breakouts ..
+--      mv_reentry_final_exit) is refreshed and its legs are booked, until a round
+--      books nothing or every strategy is at max_reentry_rounds. With
+--      backtest.reentry_frontier on (the default) each pass computes just the next
+--      round of every day, starting from each day's newest booked round;
+--      SET backtest.reentry_frontier = 'off' recomputes every round each pass.
+--   2. once, with the frontier off, the whole re-entry chain over every booked
+--      round; its mv_all_legs_reentry rows add the hedge / double-buy / re-hedge
+--      legs to strategy_leg_book (the entry legs are already there) and fill
+--      wrk_all_legs_reentry, which the stages after the loop read.
+-- Every re-entry stage is scoped by entry_round, so strategy_leg_book gets the same
+-- rows as refreshing the whole chain every round.
+-- mv_ranked_breakouts_with_rounds_for_reentry and mv_reentry_breakout_context do not
+-- depend on the leg book; callers refresh them before the loop.
+CREATE OR REPLACE FUNCTION fn_run_reentry_loop(p_strategy_name TEXT DEFAULT NULL)
 RETURNS VOID
 LANGUAGE plpgsql
 AS $$
 DECLARE
     v_max_rounds    INT;
     v_current_round INT;
+    v_pending       INT;
     v_inserted_rows INT;
+    v_stage_start   TIMESTAMPTZ;
+    v_profile       JSONB;
+    v_all_rounds    BOOLEAN := false;
+    v_saved         TEXT := COALESCE(current_setting('backtest.reentry_frontier', true), '');
+    v_frontier      TEXT := fn_backtest_setting('reentry_frontier', 'on');
 BEGIN
-    SELECT max_reentry_rounds
+    PERFORM fn_apply_stage_backend();
+
+    SELECT MAX(max_reentry_rounds)
     INTO v_max_rounds
-    FROM strategy_settings
-    WHERE strategy_name = p_strategy_name;
+    FROM v_strategy_config
+    WHERE p_strategy_name IS NULL OR strategy_name = p_strategy_name;
 
     IF v_max_rounds IS NULL THEN
         RAISE EXCEPTION
             'No max_reentry_rounds found for strategy_name = %',
-            p_strategy_name;
+            COALESCE(p_strategy_name, '<all>');
     END IF;
 
     RAISE NOTICE
         'Re-entry loop started for strategy %, max rounds = %',
-        p_strategy_name, v_max_rounds;
+        COALESCE(p_strategy_name, '<all>'), v_max_rounds;
 
     LOOP
-        SELECT COALESCE(MAX(entry_round), 0)
-        INTO v_current_round
-        FROM strategy_leg_book
-        WHERE strategy_name = p_strategy_name;
+        PERFORM public.fn_check_cancel();
 
-        IF v_current_round >= v_max_rounds THEN
-            RAISE NOTICE
-                'Reached max re-entry round %, stopping.',
-                v_current_round;
-            EXIT;
+        IF NOT v_all_rounds THEN
+            -- strategies that still have re-entry rounds left to book
+            SELECT COUNT(*), COALESCE(MIN(b.current_round), 0)
+            INTO v_pending, v_current_round
+            FROM (
+                SELECT s.strategy_name,
+                       s.max_reentry_rounds,
+                       COALESCE(MAX(l.entry_round), 0) AS current_round
+                FROM v_strategy_config s
+                LEFT JOIN strategy_leg_book l
+                  ON l.strategy_name = s.strategy_name
+                WHERE p_strategy_name IS NULL OR s.strategy_name = p_strategy_name
+                GROUP BY s.strategy_name, s.max_reentry_rounds
+            ) b
+            WHERE b.current_round < b.max_reentry_rounds;
+
+            IF v_pending = 0 THEN
+                RAISE NOTICE
+                    'Reached max re-entry round for all strategies.';
+                v_all_rounds := true;
+            END IF;
         END IF;
 
-        RAISE NOTICE
-            'Processing re-entry round %',
-            v_current_round + 1;
+        IF v_all_rounds THEN
+            RAISE NOTICE 'Processing the hedge legs of every re-entry round';
+            PERFORM set_config('backtest.reentry_round', '', true);
+            PERFORM set_config('backtest.reentry_frontier', 'off', true);
+        ELSE
+            RAISE NOTICE
+                'Processing re-entry round %',
+                v_current_round + 1;
+            PERFORM set_config('backtest.reentry_round', (v_current_round + 1)::text, true);
+            PERFORM set_config('backtest.reentry_frontier', v_frontier, true);
+        END IF;
 
         /* ===============================
            REFRESH RE-ENTRY VIEWS
            =============================== */
 
-        REFRESH MATERIALIZED VIEW mv_ranked_breakouts_with_rounds_for_reentry;
-        REFRESH MATERIALIZED VIEW mv_reentry_triggered_breakouts;
-        REFRESH MATERIALIZED VIEW mv_reentry_base_strike_selection;
-        REFRESH MATERIALIZED VIEW mv_reentry_breakout_context;
-        REFRESH MATERIALIZED VIEW mv_reentry_legs_and_hedge_legs;
+        PERFORM fn_refresh_stage('mv_reentry_triggered_breakouts');
+        PERFORM fn_refresh_stage('mv_reentry_base_strike_selection');
+        PERFORM fn_refresh_stage('mv_reentry_legs_and_hedge_legs');
 
+        v_profile := fn_apply_stage_profile('wrk_reentry_live_prices');
+        v_stage_start := clock_timestamp();
         TRUNCATE TABLE wrk_reentry_live_prices;
 
         INSERT INTO wrk_reentry_live_prices
         SELECT
+            l.strategy_name,
             l.trade_date,
             l.expiry_date,
             l.breakout_time,
@@ -69,34 +118,94 @@ BEGIN
             o.open,
             o.close
         FROM mv_reentry_legs_and_hedge_legs l
-        JOIN v_strategy_config s ON TRUE
+        JOIN v_strategy_config s ON s.strategy_name = l.strategy_name
         JOIN v_nifty_options_filtered o
           ON o.date = l.trade_date
          AND o.expiry = l.expiry_date
          AND o.option_type = l.option_type
          AND o.strike = l.strike
          AND o.time BETWEEN l.entry_time AND s.eod_time;
+        PERFORM fn_record_stage_metric('wrk_reentry_live_prices', v_stage_start);
+        PERFORM fn_restore_stage_profile(v_profile);
+
+        PERFORM fn_refresh_stage('mv_reentry_sl_hits');
+        PERFORM fn_refresh_stage('mv_reentry_sl_executions');
+        PERFORM fn_refresh_stage('mv_reentry_open_legs');
+        PERFORM fn_refresh_stage('mv_reentry_profit_booking');
+        PERFORM fn_refresh_stage('mv_reentry_eod_close');
+        PERFORM fn_refresh_stage('mv_reentry_final_exit');
+
+        IF NOT v_all_rounds THEN
+            -- the entry legs of this round; their SL hits trigger the next one
+            INSERT INTO strategy_leg_book (
+                strategy_name,
+                trade_date,
+                expiry_date,
+                breakout_time,
+                entry_time,
+                exit_time,
+                option_type,
+                strike,
+                entry_price,
+                exit_price,
+                transaction_type,
+                leg_type,
+                entry_round,
+                exit_reason
+            )
+            SELECT
+                strategy_name,
+                trade_date,
+                expiry_date,
+                breakout_time,
+                entry_time,
+                exit_time,
+                option_type,
+                strike,
+                entry_price,
+                exit_price,
+                transaction_type,
+                leg_type,
+                entry_round,
+                exit_reason
+            FROM mv_reentry_final_exit
+            WHERE p_strategy_name IS NULL OR strategy_name = p_strategy_name
+            ON CONFLICT DO NOTHING;
 
-        REFRESH MATERIALIZED VIEW mv_reentry_breakout_context;
-        REFRESH MATERIALIZED VIEW mv_reentry_sl_hits;
-        REFRESH MATERIALIZED VIEW mv_reentry_sl_executions;
-        REFRESH MATERIALIZED VIEW mv_reentry_open_legs;
-        REFRESH MATERIALIZED VIEW mv_reentry_profit_booking;
-        REFRESH MATERIALIZED VIEW mv_reentry_eod_close;
-        REFRESH MATERIALIZED VIEW mv_reentry_final_exit;
-        REFRESH MATERIALIZED VIEW mv_reentry_legs_stats;
-        REFRESH MATERIALIZED VIEW mv_hedge_reentry_exit_on_all_entry_sl;
-        REFRESH MATERIALIZED VIEW mv_hedge_reentry_exit_on_partial_conditions;
-        REFRESH MATERIALIZED VIEW mv_hedge_reentry_closed_legs;
-        REFRESH MATERIALIZED VIEW mv_hedge_reentry_eod_exit;
-        REFRESH MATERIALIZED VIEW mv_reentry_exit_on_partial_hedge;
-        REFRESH MATERIALIZED VIEW mv_double_buy_legs_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_trigger_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_candidate_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_selected_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_leg_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_eod_exit_reentry;
-        REFRESH MATERIALIZED VIEW mv_all_legs_reentry;
+            GET DIAGNOSTICS v_inserted_rows = ROW_COUNT;
+
+            IF v_inserted_rows = 0 THEN
+                RAISE NOTICE
+                    'No re-entry legs generated for round %.',
+                    v_current_round + 1;
+                v_all_rounds := true;
+            ELSE
+                RAISE NOTICE
+                    'Inserted % re-entry legs for round %',
+                    v_inserted_rows,
+                    v_current_round + 1;
+            END IF;
+
+            CONTINUE;
+        END IF;
+
+        PERFORM fn_refresh_stage('mv_reentry_legs_stats');
+        PERFORM fn_refresh_stage('mv_hedge_reentry_exit_on_all_entry_sl');
+        PERFORM fn_refresh_stage('mv_hedge_reentry_exit_on_partial_conditions');
+        PERFORM fn_refresh_stage('mv_hedge_reentry_closed_legs');
+        PERFORM fn_refresh_stage('mv_hedge_reentry_eod_exit');
+        PERFORM fn_refresh_stage('mv_reentry_exit_on_partial_hedge');
+        PERFORM fn_refresh_stage('mv_double_buy_legs_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_trigger_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_candidate_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_selected_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_leg_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_eod_exit_reentry');
+        PERFORM fn_refresh_stage('mv_all_legs_reentry');
+
+        TRUNCATE TABLE wrk_all_legs_reentry;
+        INSERT INTO wrk_all_legs_reentry
+        SELECT * FROM mv_all_legs_reentry;
 
         INSERT INTO strategy_leg_book (
             strategy_name,
@@ -115,7 +224,7 @@ BEGIN
             exit_reason
         )
         SELECT
-            p_strategy_name,
+            strategy_name,
             trade_date,
             expiry_date,
             breakout_time,
@@ -130,36 +239,29 @@ BEGIN
             entry_round,
             exit_reason
         FROM mv_all_legs_reentry
+        WHERE p_strategy_name IS NULL OR strategy_name = p_strategy_name
         ON CONFLICT DO NOTHING;
 
         GET DIAGNOSTICS v_inserted_rows = ROW_COUNT;
 
         -- COMMIT;  -- Removed: COMMIT not allowed inside stored procedures in transaction context
 
-        IF v_inserted_rows = 0 THEN
-            RAISE NOTICE
-                'No re-entry legs generated for round %, stopping.',
-                v_current_round + 1;
-            EXIT;
-        END IF;
-
         RAISE NOTICE
-            'Inserted % re-entry legs for round %',
-            v_inserted_rows,
-            v_current_round + 1;
+            'Inserted % hedge / double-buy / re-hedge re-entry legs',
+            v_inserted_rows;
+        EXIT;
     END LOOP;
 
+    PERFORM set_config('backtest.reentry_frontier', v_saved, true);
+
     RAISE NOTICE
         'Re-entry loop completed for strategy %',
-        p_strategy_name;
+        COALESCE(p_strategy_name, '<all>');
 END;
 $$;
 
 
 DO $$
-DECLARE
-    strat_name TEXT;
 BEGIN
-    SELECT strategy_name INTO strat_name FROM v_strategy_config LIMIT 1;
-    PERFORM fn_run_reentry_loop(strat_name);
+    PERFORM fn_run_reentry_loop();
 END $$;
\ No newline at end of file
@@ -2,11 +2,12 @@ TRUNCATE TABLE public.wrk_entry_leg_live_prices;
 
 INSERT INTO public.wrk_entry_leg_live_prices
 WITH legs AS (
-    SELECT * FROM mv_all_legs_reentry
+    SELECT * FROM wrk_all_legs_reentry
     UNION ALL
     SELECT * FROM mv_all_legs_round1
 )
 SELECT 
+    l.strategy_name,
     l.trade_date,
     l.expiry_date,
     l.breakout_time,
@@ -1,6 +1,7 @@
 CREATE MATERIALIZED VIEW mv_all_entries_sl_tracking_adjusted AS
 WITH config AS (
     SELECT 
+        strategy_name,
         sl_type,
         sl_percentage,
         box_sl_trigger_pct,
@@ -13,6 +14,7 @@ WITH config AS (
 
 next_round_reentry_times AS (
     SELECT
+        strategy_name,
         trade_date,
         entry_round - 1 AS prior_round,
         entry_time AS next_round_start_time
@@ -20,7 +22,7 @@ next_round_reentry_times AS (
 ),
 
 all_legs AS (
-       SELECT * FROM mv_all_legs_REENTRY
+       SELECT * FROM wrk_all_legs_reentry
     UNION ALL
     SELECT * FROM mv_all_legs_round1
 ),
@@ -44,7 +46,8 @@ adjusted_exit_time_data AS (
         END AS adjusted_exit_reason
     FROM all_legs l
     LEFT JOIN next_round_reentry_times r
-      ON r.trade_date = l.trade_date
+      ON r.strategy_name = l.strategy_name
+     AND r.trade_date = l.trade_date
      AND r.prior_round = l.entry_round
 ),
 
@@ -60,7 +63,8 @@ END AS adjusted_exit_price
         -- COALESCE(p.option_open,l.exit_price) AS adjusted_exit_price
     FROM adjusted_exit_time_data l
     LEFT JOIN wrk_entry_leg_live_prices p
-      ON p.trade_date  = l.trade_date
+      ON p.strategy_name = l.strategy_name
+     AND p.trade_date  = l.trade_date
      AND p.expiry_date = l.expiry_date
      AND p.option_type = l.option_type
      AND p.strike      = l.strike
@@ -69,8 +73,9 @@ END AS adjusted_exit_price
 )
 
 SELECT DISTINCT ON (
-    trade_date, expiry_date,entry_time, option_type, strike, leg_type, entry_round
+    adjusted_exit_price_data.strategy_name, trade_date, expiry_date,entry_time, option_type, strike, leg_type, entry_round
 )
+    adjusted_exit_price_data.strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -95,7 +100,7 @@ SELECT DISTINCT ON (
         2
     ) AS pnl_amount
 FROM adjusted_exit_price_data
-JOIN config ON TRUE
+JOIN config ON config.strategy_name = adjusted_exit_price_data.strategy_name
 --where trade_date='2025-04-03'
 ORDER BY
-    trade_date, expiry_date,entry_time, option_type, strike, leg_type, entry_round, adjusted_exit_time;
\ No newline at end of file
+    adjusted_exit_price_data.strategy_name, trade_date, expiry_date,entry_time, option_type, strike, leg_type, entry_round, adjusted_exit_time;
\ No newline at end of file
@@ -1,6 +1,7 @@
 CREATE MATERIALIZED VIEW mv_portfolio_mtm_pnl AS
 WITH config AS (
     SELECT 
+        strategy_name,
         portfolio_capital,
         portfolio_profit_target_pct,
         portfolio_stop_loss_pct,
@@ -15,15 +16,19 @@ all_legs AS (
 
 all_times AS (
     SELECT DISTINCT
-        date,
-        expiry,
-        time
-    FROM v_nifty_options_filtered
-    WHERE time >= '09:36:00'
+        s.strategy_name,
+        o.date,
+        o.expiry,
+        o.time
+    FROM v_nifty_options_filtered o
+    JOIN v_strategy_config s
+      ON o.date BETWEEN s.from_date AND s.to_date
+    WHERE o.time >= '09:36:00'
 ),
 
 closed_pnl_at_time AS (
     SELECT
+        l.strategy_name,
         l.trade_date,
         l.expiry_date,
         t.time,
@@ -36,16 +41,18 @@ closed_pnl_at_time AS (
         ) AS realized_pnl
     FROM all_times t
     JOIN all_legs l
-      ON l.trade_date = t.date
+      ON l.strategy_name = t.strategy_name
+     AND l.trade_date = t.date
      AND l.expiry_date = t.expiry
-    JOIN config c ON TRUE
+    JOIN config c ON c.strategy_name = l.strategy_name
     WHERE l.exit_time IS NOT NULL
       AND l.exit_time < t.time
-    GROUP BY l.trade_date, l.expiry_date, t.time
+    GROUP BY l.strategy_name, l.trade_date, l.expiry_date, t.time
 ),
 
 open_mtm_at_time AS (
     SELECT
+        l.strategy_name,
         l.trade_date,
         l.expiry_date,
         t.time,
@@ -58,7 +65,8 @@ open_mtm_at_time AS (
         ) AS unrealized_pnl
     FROM all_times t
     JOIN all_legs l
-      ON l.trade_date = t.date
+      ON l.strategy_name = t.strategy_name
+     AND l.trade_date = t.date
      AND l.expiry_date = t.date
     JOIN v_nifty_options_filtered o
       ON o.date  = l.trade_date
@@ -66,13 +74,14 @@ open_mtm_at_time AS (
      AND o.option_type = l.option_type
      AND o.strike      = l.strike
      AND o.time        = t.time
-    JOIN config c ON TRUE
+    JOIN config c ON c.strategy_name = l.strategy_name
     WHERE l.entry_time <= t.time
       AND (l.exit_time IS NULL OR t.time < l.exit_time)
-    GROUP BY l.trade_date, l.expiry_date, t.time
+    GROUP BY l.strategy_name, l.trade_date, l.expiry_date, t.time
 )
 
 SELECT
+    t.strategy_name,
     t.date,
     t.expiry,
     t.time,
@@ -81,11 +90,13 @@ SELECT
     ROUND(COALESCE(o.unrealized_pnl, 0), 2) AS unrealized_pnl
 FROM all_times t
 LEFT JOIN closed_pnl_at_time c
-  ON c.trade_date = t.date
+  ON c.strategy_name = t.strategy_name
+ AND c.trade_date = t.date
  AND c.expiry_date = t.expiry
  AND c.time = t.time
 LEFT JOIN open_mtm_at_time o
-  ON o.trade_date = t.date
+  ON o.strategy_name = t.strategy_name
+ AND o.trade_date = t.date
  AND o.expiry_date = t.expiry
  AND o.time = t.time
-ORDER BY date, expiry, time;
\ No newline at end of file
+ORDER BY strategy_name, date, expiry, time;
\ No newline at end of file
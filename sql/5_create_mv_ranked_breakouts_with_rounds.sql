@@ -1,13 +1,26 @@
 -- Create ranked breakouts with entry rounds
 DROP MATERIALIZED VIEW IF EXISTS public.mv_ranked_breakouts_with_rounds CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_ranked_breakouts_with_rounds AS
-WITH filtered AS (
+WITH
+-- Memoized (79_create_stage_memo.sql): computed for group leaders only,
+-- fanned out to every strategy of the group in the final SELECT
+cfg AS (
+    SELECT c.*
+    FROM v_strategy_config c
+    JOIN v_stage_groups g
+      ON g.strategy_name = c.strategy_name
+     AND g.stage_name = 'mv_ranked_breakouts_with_rounds'
+    WHERE g.leader_strategy = g.strategy_name
+),
+
+filtered AS (
     SELECT
+        b.strategy_name,
         b.trade_date,
         b.breakout_time,
         b.breakout_type
     FROM public.mv_all_5min_breakouts b
-    JOIN public.v_strategy_config s ON TRUE
+    JOIN cfg s ON s.strategy_name = b.strategy_name
     WHERE
         (
             s.preferred_breakout_type = 'full_candle_breakout'
@@ -26,27 +39,32 @@ WITH filtered AS (
 ),
 ranked AS (
     SELECT
+        strategy_name,
         trade_date,
         breakout_time,
         breakout_type,
         ROW_NUMBER() OVER (
-            PARTITION BY trade_date
+            PARTITION BY strategy_name, trade_date
             ORDER BY breakout_time
         ) AS entry_round
     FROM filtered
 )
 SELECT
-    trade_date,
-    breakout_time,
-    breakout_time + INTERVAL '5 minute' AS entry_time,
-    breakout_type,
+    g.strategy_name,
+    r.trade_date,
+    r.breakout_time,
+    r.breakout_time + INTERVAL '5 minute' AS entry_time,
+    r.breakout_type,
     CASE
-        WHEN breakout_type IN ('full_body_bullish', 'pct_breakout_bullish')
+        WHEN r.breakout_type IN ('full_body_bullish', 'pct_breakout_bullish')
         THEN 'P'
         ELSE 'C'
     END AS entry_option_type,
-    entry_round
-FROM ranked;
+    r.entry_round
+FROM ranked r
+JOIN v_stage_groups g
+  ON g.stage_name = 'mv_ranked_breakouts_with_rounds'
+ AND g.leader_strategy = r.strategy_name;
 
 -- index to speed lookups
-CREATE INDEX IF NOT EXISTS idx_mv_ranked_breakouts_date_time ON public.mv_ranked_breakouts_with_rounds (trade_date, breakout_time);
+CREATE INDEX IF NOT EXISTS idx_mv_ranked_breakouts_date_time ON public.mv_ranked_breakouts_with_rounds (strategy_name, trade_date, breakout_time);
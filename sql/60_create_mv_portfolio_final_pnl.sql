@@ -1,6 +1,7 @@
 CREATE MATERIALIZED VIEW mv_portfolio_final_pnl AS
 WITH config AS (
     SELECT 
+        strategy_name,
         portfolio_capital,
         portfolio_profit_target_pct  AS portfolio_profit_target_pct,
         portfolio_stop_loss_pct AS  portfolio_stop_loss_pct,
@@ -18,7 +19,8 @@ portfolio_mtm_pnl AS (
    1. First portfolio-level exit trigger (profit / loss)
    ============================================================ */
 portfolio_exit_trigger AS (
-    SELECT DISTINCT ON (date, expiry)
+    SELECT DISTINCT ON (m.strategy_name, date, expiry)
+        m.strategy_name,
         date,
         expiry,
         time AS exit_time,
@@ -29,11 +31,11 @@ portfolio_exit_trigger AS (
             WHEN total_pnl <= -portfolio_capital * portfolio_stop_loss_pct
                 THEN 'Portfolio Exit - Loss'
         END AS exit_reason
-    FROM portfolio_mtm_pnl
-    CROSS JOIN config
+    FROM portfolio_mtm_pnl m
+    JOIN config c ON c.strategy_name = m.strategy_name
     WHERE total_pnl >= portfolio_capital * portfolio_profit_target_pct
        OR total_pnl <= -portfolio_capital * portfolio_stop_loss_pct
-    ORDER BY date, expiry, time
+    ORDER BY m.strategy_name, date, expiry, time
 ),
 
 /* ============================================================
@@ -43,7 +45,8 @@ open_legs_at_exit AS (
     SELECT l.*
     FROM mv_all_entries_sl_tracking_adjusted l
     JOIN portfolio_exit_trigger p
-      ON p.date  = l.trade_date
+      ON p.strategy_name = l.strategy_name
+     AND p.date  = l.trade_date
      AND p.expiry = l.expiry_date
     WHERE l.entry_time <= p.exit_time
       AND (l.exit_time IS NULL OR p.exit_time <= l.exit_time)
@@ -54,6 +57,7 @@ open_legs_at_exit AS (
    ============================================================ */
 exit_priced_legs AS (
     SELECT 
+        l.strategy_name,
         l.trade_date,
         l.expiry_date,
         l.breakout_time,
@@ -71,7 +75,8 @@ exit_priced_legs AS (
         p.exit_reason
     FROM open_legs_at_exit l
     JOIN portfolio_exit_trigger p
-      ON p.date  = l.trade_date
+      ON p.strategy_name = l.strategy_name
+     AND p.date  = l.trade_date
      AND p.expiry = l.expiry_date
     JOIN v_nifty_options_filtered o
       ON o.date  = l.trade_date
@@ -93,17 +98,18 @@ exit_legs_with_pnl AS (
             ELSE ROUND((e.exit_price - e.entry_price) * c.lot_size * c.no_of_lots, 2)
         END AS pnl_amount
     FROM exit_priced_legs e
-    CROSS JOIN config c
+    JOIN config c ON c.strategy_name = e.strategy_name
 ),
 
 /* ============================================================
    5. Remove invalid legs (entry after exit)
    ============================================================ */
 invalid_legs AS (
-    SELECT *
+    SELECT l.*
     FROM mv_all_entries_sl_tracking_adjusted l
     JOIN portfolio_exit_trigger p
-      ON p.date  = l.trade_date
+      ON p.strategy_name = l.strategy_name
+     AND p.date  = l.trade_date
      AND p.expiry = l.expiry_date
     WHERE l.entry_time > p.exit_time
 ),
@@ -114,7 +120,8 @@ valid_legs AS (
     WHERE NOT EXISTS (
         SELECT 1
         FROM invalid_legs i
-        WHERE i.trade_date  = l.trade_date
+        WHERE i.strategy_name = l.strategy_name
+          AND i.trade_date  = l.trade_date
           AND i.expiry_date = l.expiry_date
           AND i.option_type = l.option_type
           AND i.strike      = l.strike
@@ -137,6 +144,7 @@ all_leg_exits AS (
    ============================================================ */
 reentry_exit_summary AS (
     SELECT
+        strategy_name,
         trade_date,
         expiry_date,
         MAX(exit_time) AS max_exit_time,
@@ -144,11 +152,12 @@ reentry_exit_summary AS (
         COUNT(*) AS total_reentry_legs
     FROM all_leg_exits
     WHERE leg_type = 'RE-ENTRY'
-    GROUP BY trade_date, expiry_date
+    GROUP BY strategy_name, trade_date, expiry_date
 ),
 
 hedge_exit_on_reentry_completion AS (
     SELECT
+        h.strategy_name,
         h.trade_date,
         h.expiry_date,
         h.breakout_time,
@@ -171,7 +180,8 @@ hedge_exit_on_reentry_completion AS (
         END AS pnl_amount
     FROM all_leg_exits h
     JOIN reentry_exit_summary r
-      ON r.trade_date  = h.trade_date
+      ON r.strategy_name = h.strategy_name
+     AND r.trade_date  = h.trade_date
      AND r.expiry_date = h.expiry_date
     JOIN v_nifty_options_filtered o
       ON o.date  = h.trade_date
@@ -179,7 +189,7 @@ hedge_exit_on_reentry_completion AS (
      AND o.option_type = h.option_type
      AND o.strike      = h.strike
      AND o.time        = r.max_exit_time
-    CROSS JOIN config c
+    JOIN config c ON c.strategy_name = h.strategy_name
     WHERE h.leg_type = 'HEDGE-REENTRY'
       AND r.exited_count = r.total_reentry_legs
       AND r.max_exit_time <> c.eod_time
@@ -200,6 +210,7 @@ ranked_legs AS (
     SELECT *,
            ROW_NUMBER() OVER (
                PARTITION BY
+                   strategy_name,
                    trade_date,
                    expiry_date,
                    option_type,
@@ -212,6 +223,7 @@ ranked_legs AS (
 )
 
 SELECT
+    strategy_name,
     trade_date,
     expiry_date,
     breakout_time,
@@ -229,9 +241,9 @@ SELECT
     exit_reason,
     pnl_amount,
     ROUND(
-        SUM(pnl_amount) OVER (PARTITION BY trade_date, expiry_date),
+        SUM(pnl_amount) OVER (PARTITION BY strategy_name, trade_date, expiry_date),
         2
     ) AS total_pnl_per_day
 FROM ranked_legs
 WHERE rn = 1
-ORDER BY trade_date, expiry_date, entry_time, option_type, leg_type,strike;
\ No newline at end of file
+ORDER BY strategy_name, trade_date, expiry_date, entry_time, option_type, leg_type,strike;
\ No newline at end of file
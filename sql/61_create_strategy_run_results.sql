@@ -17,5 +17,6 @@ CREATE TABLE IF NOT EXISTS strategy_run_results (
     exit_price NUMERIC,
     exit_reason TEXT,
     pnl_amount NUMERIC,
-    total_pnl_per_day NUMERIC
+    total_pnl_per_day NUMERIC,
+    run_id TEXT DEFAULT current_setting('backtest.run_id', true)
 );
\ No newline at end of file
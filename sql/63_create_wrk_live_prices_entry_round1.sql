@@ -1,6 +1,7 @@
 -- Working table: live option prices for entry round 1
 DROP TABLE IF EXISTS public.wrk_live_prices_entry_round1 CASCADE;
 CREATE TABLE IF NOT EXISTS public.wrk_live_prices_entry_round1 (
+    strategy_name    text,
     trade_date       date,
     expiry_date      date,
     breakout_time    time,
@@ -19,4 +20,4 @@ CREATE TABLE IF NOT EXISTS public.wrk_live_prices_entry_round1 (
 );
 CREATE INDEX IF NOT EXISTS idx_wrk_lpr1_main
 ON public.wrk_live_prices_entry_round1
-(trade_date, expiry_date, option_type, strike, ltp_time);
\ No newline at end of file
+(strategy_name, trade_date, expiry_date, option_type, strike, ltp_time);
\ No newline at end of file
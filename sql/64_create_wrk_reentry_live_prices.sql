@@ -1,6 +1,7 @@
 -- Working table: live option prices for reentry
 DROP TABLE IF EXISTS public.wrk_reentry_live_prices CASCADE;
 CREATE TABLE IF NOT EXISTS public.wrk_reentry_live_prices (
+    strategy_name    text,
     trade_date       date,
     expiry_date      date,
     breakout_time    time,
@@ -19,4 +20,4 @@ CREATE TABLE IF NOT EXISTS public.wrk_reentry_live_prices (
 );
 CREATE INDEX IF NOT EXISTS idx_wrk_reentry_lp_main
 ON public.wrk_reentry_live_prices
-(trade_date, expiry_date, option_type, strike, ltp_time);
\ No newline at end of file
+(strategy_name, trade_date, expiry_date, option_type, strike, ltp_time);
\ No newline at end of file
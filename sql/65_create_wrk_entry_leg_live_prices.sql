@@ -1,6 +1,7 @@
 -- Working table: entry leg live prices with exit info and nifty context
 DROP TABLE IF EXISTS public.wrk_entry_leg_live_prices CASCADE;
 CREATE TABLE IF NOT EXISTS public.wrk_entry_leg_live_prices (
+    strategy_name    text,
     trade_date       date,
     expiry_date      date,
     breakout_time    time,
@@ -29,8 +30,8 @@ CREATE TABLE IF NOT EXISTS public.wrk_entry_leg_live_prices (
 );
 CREATE INDEX IF NOT EXISTS idx_wrk_elp_main
 ON public.wrk_entry_leg_live_prices
-(trade_date, expiry_date, option_type, strike, ltp_time);
+(strategy_name, trade_date, expiry_date, option_type, strike, ltp_time);
 
 CREATE INDEX IF NOT EXISTS idx_wrk_elp_exit_time
 ON public.wrk_entry_leg_live_prices
-(trade_date, ltp_time);
\ No newline at end of file
+(strategy_name, trade_date, ltp_time);
\ No newline at end of file
@@ -1,5 +1,14 @@
+-- Batches already stored by an earlier (interrupted) call with the same
+-- backtest.run_id are skipped, see 81_create_batch_progress.sql.
+-- Without a backtest.run_id, or with p_resume => false, the run starts over.
+-- A run that completes closes its batches, so calling it again recomputes.
+-- p_batch_type 'auto' sizes every batch from the estimated option rows and
+-- the observed stage timings, see 82_create_batch_sizing.sql.
+DROP PROCEDURE IF EXISTS sp_run_strategy_batched(TEXT);
+
 CREATE OR REPLACE PROCEDURE sp_run_strategy_batched(
-    p_batch_type TEXT DEFAULT 'quarter'   -- 'month', 'quarter', 'halfyear', 'week', 'day'
+    p_batch_type TEXT DEFAULT 'quarter',   -- 'month', 'quarter', 'halfyear', 'week', 'day', 'auto'
+    p_resume     BOOLEAN DEFAULT true
 )
 LANGUAGE plpgsql
 AS $$
@@ -7,11 +16,35 @@ DECLARE
     rec RECORD;
     v_batch_start DATE;
     v_batch_end   DATE;
-    v_base_views_refreshed BOOLEAN := FALSE;
+    v_stage_start TIMESTAMPTZ;
+    v_profile     JSONB;
+    v_run_key     TEXT := fn_backtest_setting('run_id', 'batched');
+    -- every call without a run_id shares 'batched', so only an explicit run_id resumes
+    v_resume      BOOLEAN := p_resume AND fn_backtest_setting('run_id', NULL) IS NOT NULL;
+    v_settings    TEXT;
+    v_rows        BIGINT;
+    v_done_to     DATE;
+    -- 'auto' batch sizing
+    v_budget_ms   NUMERIC := fn_backtest_setting('batch_budget_ms', '300000')::numeric;
+    v_target_rows NUMERIC;
+    v_est_rows    NUMERIC;
+    v_batch_clock TIMESTAMPTZ;
+    v_elapsed_ms  NUMERIC;
+    v_temp_bytes  BIGINT;
+    -- temp written blocks per stage for the 'auto' spill check (82_create_batch_sizing.sql)
+    v_track_spills BOOLEAN := p_batch_type = 'auto'
+                              AND fn_backtest_setting('track_spills', 'on') <> 'off';
 BEGIN
     -- Disable JIT for large analytical workloads
     PERFORM set_config('jit', 'off', true);
 
+    IF NOT v_resume THEN
+        DELETE FROM batch_run_progress WHERE run_key = v_run_key;
+    END IF;
+
+    -- matview or unlogged stages (backtest.stage_backend); re-applied after each COMMIT
+    PERFORM fn_apply_stage_backend();
+
     FOR rec IN SELECT * FROM strategy_settings LOOP
 
         IF rec.from_date IS NULL OR rec.to_date IS NULL THEN
@@ -24,6 +57,15 @@ BEGIN
             'Starting strategy % (% → %)',
             rec.strategy_name, rec.from_date, rec.to_date;
 
+        v_settings := fn_settings_hash(to_jsonb(rec));
+
+        IF p_batch_type = 'auto' THEN
+            v_target_rows := COALESCE(
+                v_budget_ms / NULLIF(fn_batch_ms_per_row(rec.strategy_name), 0),
+                fn_backtest_setting('batch_target_rows', '2000000')::numeric
+            );
+        END IF;
+
         /* =========================================
            🧹 Cleanup old results for this strategy
            ========================================= */
@@ -49,30 +91,35 @@ VALUES (
     rec.to_date
 );
 
-IF NOT v_base_views_refreshed THEN
-    RAISE NOTICE 'Refreshing base filtered MVs (once per run)';
-
-    COMMIT;  -- must not be inside a transaction
+-- Rebind the date-bound market-data views to this strategy's range
+RAISE NOTICE 'Binding base filtered views for % → %', rec.from_date, rec.to_date;
 
-REFRESH MATERIALIZED VIEW public.v_ha_big_filtered;
-REFRESH MATERIALIZED VIEW public.v_ha_small_filtered;
-REFRESH MATERIALIZED VIEW public.v_ha_1m_filtered;
-REFRESH MATERIALIZED VIEW public.v_nifty50_filtered;
-REFRESH MATERIALIZED VIEW public.v_nifty_options_filtered;
-    
+COMMIT;  -- must not be inside a transaction
+PERFORM fn_apply_stage_backend();
 
-    v_base_views_refreshed := TRUE;
+PERFORM fn_refresh_filtered_views();
 
-    COMMIT;  -- clean boundary before batch work starts
-END IF;
+COMMIT;  -- clean boundary before batch work starts
 
         WHILE v_batch_start <= rec.to_date LOOP
+            PERFORM fn_apply_stage_backend();
+
+            v_done_to := fn_batch_done_until(v_run_key, rec.strategy_name, v_settings, v_batch_start);
+            IF v_done_to IS NOT NULL THEN
+                RAISE NOTICE
+                    'Skipping batch % → % (already stored)',
+                    v_batch_start, v_done_to;
+                v_batch_start := v_done_to + INTERVAL '1 day';
+                CONTINUE;
+            END IF;
 
             /* =========================================
                1️⃣ Resolve batch end date
                ========================================= */
             v_batch_end :=
                 CASE
+                    WHEN p_batch_type = 'auto' THEN
+                        fn_auto_batch_end(v_batch_start, rec.to_date, v_target_rows)
                     WHEN p_batch_type = 'day' THEN
                         v_batch_start
                     WHEN p_batch_type = 'week' THEN
@@ -104,9 +151,25 @@ END IF;
                         )
                 END;
 
+            -- Committed up front so an interrupted batch stays visible as 'running'
+            PERFORM fn_batch_started(v_run_key, rec.strategy_name, v_settings, v_batch_start, v_batch_end);
+            COMMIT;
+            PERFORM fn_apply_stage_backend();
+
+            v_est_rows    := fn_estimate_option_rows(v_batch_start, v_batch_end);
+            v_batch_clock := clock_timestamp();
+
             RAISE NOTICE
-                'Running batch % → %',
-                v_batch_start, v_batch_end;
+                'Running batch % → % (~% option rows)',
+                v_batch_start, v_batch_end, round(v_est_rows);
+
+            -- run_stage_metrics context for this batch
+            PERFORM set_config('backtest.strategy', rec.strategy_name, true);
+            PERFORM set_config('backtest.batch_from', v_batch_start::text, true);
+            PERFORM set_config('backtest.batch_to', v_batch_end::text, true);
+            IF v_track_spills THEN
+                PERFORM set_config('backtest.track_spills', 'on', true);
+            END IF;
 
             /* =========================================
                2️⃣ Reset runtime config (PER BATCH)
@@ -153,7 +216,8 @@ END IF;
                ========================================= */
 
             -- Always refresh core config
-            REFRESH MATERIALIZED VIEW v_strategy_config;
+            PERFORM fn_refresh_stage('v_strategy_config');
+            PERFORM fn_refresh_stage('v_stage_groups');
 
             -- For large batches (>30 days), refresh all filtered views
             -- For small batches, they auto-update as regular views
@@ -169,18 +233,20 @@ END IF;
 
             -- Core strategy views (always refresh)
             --REFRESH MATERIALIZED VIEW mv_nifty_options_filtered;
-            REFRESH MATERIALIZED VIEW mv_all_5min_breakouts;
-            REFRESH MATERIALIZED VIEW mv_ranked_breakouts_with_rounds;
-            REFRESH MATERIALIZED VIEW mv_ranked_breakouts_with_rounds_for_reentry;
-            REFRESH MATERIALIZED VIEW mv_base_strike_selection;
-            REFRESH MATERIALIZED VIEW mv_breakout_context_round1;
-            REFRESH MATERIALIZED VIEW mv_entry_and_hedge_legs;
+            PERFORM fn_refresh_stage('mv_all_5min_breakouts');
+            PERFORM fn_refresh_stage('mv_ranked_breakouts_with_rounds');
+            PERFORM fn_refresh_stage('mv_ranked_breakouts_with_rounds_for_reentry');
+            PERFORM fn_refresh_stage('mv_base_strike_selection');
+            PERFORM fn_refresh_stage('mv_breakout_context_round1');
+            PERFORM fn_refresh_stage('mv_entry_and_hedge_legs');
         -- REFRESH MATERIALIZED VIEW mv_live_prices_entry_round1;
+        v_profile := fn_apply_stage_profile('wrk_live_prices_entry_round1');
+        v_stage_start := clock_timestamp();
         TRUNCATE TABLE wrk_live_prices_entry_round1;
 
 INSERT INTO wrk_live_prices_entry_round1
 WITH strategy AS (
-    SELECT eod_time FROM v_strategy_config LIMIT 1
+    SELECT strategy_name, eod_time FROM v_strategy_config
 ),
 legs AS (
     SELECT *
@@ -188,6 +254,7 @@ legs AS (
     WHERE entry_round = 1
 )
 SELECT
+    l.strategy_name,
     l.trade_date,
     l.expiry_date,
     l.breakout_time,
@@ -204,48 +271,53 @@ SELECT
     o.open  AS option_open,
     o.close AS option_close
 FROM legs l
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = l.strategy_name
 JOIN v_nifty_options_filtered o
   ON o.date = l.trade_date
  AND o.expiry = l.expiry_date
  AND o.option_type = l.option_type
  AND o.strike = l.strike
  AND o.time BETWEEN l.entry_time AND s.eod_time;
-        REFRESH MATERIALIZED VIEW mv_entry_sl_hits_round1;
-        REFRESH MATERIALIZED VIEW mv_entry_sl_executions_round1;
-        REFRESH MATERIALIZED VIEW mv_entry_open_legs_round1;
-        REFRESH MATERIALIZED VIEW mv_entry_profit_booking_round1;
-        REFRESH MATERIALIZED VIEW mv_entry_eod_close_round1;
-        REFRESH MATERIALIZED VIEW mv_entry_closed_legs_round1;
-        REFRESH MATERIALIZED VIEW mv_entry_round1_stats;
-        REFRESH MATERIALIZED VIEW mv_hedge_exit_on_all_entry_sl;
-        REFRESH MATERIALIZED VIEW mv_hedge_exit_partial_conditions;
-        REFRESH MATERIALIZED VIEW mv_hedge_closed_legs_round1;
-        REFRESH MATERIALIZED VIEW mv_hedge_eod_exit_round1;
-        REFRESH MATERIALIZED VIEW mv_entry_exit_on_partial_hedge_round1;
-        REFRESH MATERIALIZED VIEW mv_double_buy_legs_round1;
-        REFRESH MATERIALIZED VIEW mv_entry_final_exit_round1;
-        REFRESH MATERIALIZED VIEW mv_rehedge_trigger_round1;
-        REFRESH MATERIALIZED VIEW mv_rehedge_candidate_round1;
-        REFRESH MATERIALIZED VIEW mv_rehedge_selected_round1;
-        REFRESH MATERIALIZED VIEW mv_rehedge_leg_round1;
-        REFRESH MATERIALIZED VIEW mv_rehedge_eod_exit_round1;
-        REFRESH MATERIALIZED VIEW mv_all_legs_round1;
+        PERFORM fn_record_stage_metric('wrk_live_prices_entry_round1', v_stage_start);
+        PERFORM fn_restore_stage_profile(v_profile);
+        PERFORM fn_refresh_stage('mv_entry_sl_hits_round1');
+        PERFORM fn_refresh_stage('mv_entry_sl_executions_round1');
+        PERFORM fn_refresh_stage('mv_entry_open_legs_round1');
+        PERFORM fn_refresh_stage('mv_entry_profit_booking_round1');
+        PERFORM fn_refresh_stage('mv_entry_eod_close_round1');
+        PERFORM fn_refresh_stage('mv_entry_closed_legs_round1');
+        PERFORM fn_refresh_stage('mv_entry_round1_stats');
+        PERFORM fn_refresh_stage('mv_hedge_exit_on_all_entry_sl');
+        PERFORM fn_refresh_stage('mv_hedge_exit_partial_conditions');
+        PERFORM fn_refresh_stage('mv_hedge_closed_legs_round1');
+        PERFORM fn_refresh_stage('mv_hedge_eod_exit_round1');
+        PERFORM fn_refresh_stage('mv_entry_exit_on_partial_hedge_round1');
+        PERFORM fn_refresh_stage('mv_double_buy_legs_round1');
+        PERFORM fn_refresh_stage('mv_entry_final_exit_round1');
+        PERFORM fn_refresh_stage('mv_rehedge_trigger_round1');
+        PERFORM fn_refresh_stage('mv_rehedge_candidate_round1');
+        PERFORM fn_refresh_stage('mv_rehedge_selected_round1');
+        PERFORM fn_refresh_stage('mv_rehedge_leg_round1');
+        PERFORM fn_refresh_stage('mv_rehedge_eod_exit_round1');
+        PERFORM fn_refresh_stage('mv_all_legs_round1');
         CALL insert_sl_legs_into_book(rec.strategy_name);
-        REFRESH MATERIALIZED VIEW mv_reentry_triggered_breakouts;
-        REFRESH MATERIALIZED VIEW mv_reentry_base_strike_selection;
-        REFRESH MATERIALIZED VIEW mv_reentry_legs_and_hedge_legs;
+        PERFORM fn_refresh_stage('mv_reentry_triggered_breakouts');
+        PERFORM fn_refresh_stage('mv_reentry_base_strike_selection');
+        PERFORM fn_refresh_stage('mv_reentry_legs_and_hedge_legs');
         -- REFRESH MATERIALIZED VIEW mv_reentry_live_prices;
+        v_profile := fn_apply_stage_profile('wrk_reentry_live_prices');
+        v_stage_start := clock_timestamp();
         TRUNCATE TABLE wrk_reentry_live_prices;
 
 INSERT INTO wrk_reentry_live_prices
 WITH strategy AS (
-    SELECT eod_time FROM v_strategy_config
+    SELECT strategy_name, eod_time FROM v_strategy_config
 ),
 legs AS (
     SELECT * FROM mv_reentry_legs_and_hedge_legs
 )
 SELECT
+    l.strategy_name,
     l.trade_date,
     l.expiry_date,
     l.breakout_time,
@@ -262,47 +334,52 @@ SELECT
     o.open  AS option_open,
     o.close AS option_close
 FROM legs l
-JOIN strategy s ON TRUE
+JOIN strategy s ON s.strategy_name = l.strategy_name
 JOIN v_nifty_options_filtered o
   ON o.date = l.trade_date
  AND o.expiry = l.expiry_date
  AND o.option_type = l.option_type
  AND o.strike = l.strike
  AND o.time BETWEEN l.entry_time AND s.eod_time;
+        PERFORM fn_record_stage_metric('wrk_reentry_live_prices', v_stage_start);
+        PERFORM fn_restore_stage_profile(v_profile);
 
         -- Refresh reentry views (grouped to reduce peak lock usage)
-        REFRESH MATERIALIZED VIEW mv_reentry_breakout_context;
-        REFRESH MATERIALIZED VIEW mv_reentry_sl_hits;
-        REFRESH MATERIALIZED VIEW mv_reentry_sl_executions;
-        REFRESH MATERIALIZED VIEW mv_reentry_open_legs;
-        REFRESH MATERIALIZED VIEW mv_reentry_profit_booking;
-        REFRESH MATERIALIZED VIEW mv_reentry_eod_close;
-        REFRESH MATERIALIZED VIEW mv_reentry_final_exit;
-        REFRESH MATERIALIZED VIEW mv_reentry_legs_stats;
-        REFRESH MATERIALIZED VIEW mv_hedge_reentry_exit_on_all_entry_sl;
-        REFRESH MATERIALIZED VIEW mv_hedge_reentry_exit_on_partial_conditions;
-        REFRESH MATERIALIZED VIEW mv_hedge_reentry_closed_legs;
-        REFRESH MATERIALIZED VIEW mv_hedge_reentry_eod_exit;
-        REFRESH MATERIALIZED VIEW mv_reentry_exit_on_partial_hedge;
-        REFRESH MATERIALIZED VIEW mv_double_buy_legs_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_trigger_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_candidate_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_selected_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_leg_reentry;
-        REFRESH MATERIALIZED VIEW mv_rehedge_eod_exit_reentry;
-        REFRESH MATERIALIZED VIEW mv_all_legs_reentry;
+        PERFORM fn_refresh_stage('mv_reentry_breakout_context');
+        PERFORM fn_refresh_stage('mv_reentry_sl_hits');
+        PERFORM fn_refresh_stage('mv_reentry_sl_executions');
+        PERFORM fn_refresh_stage('mv_reentry_open_legs');
+        PERFORM fn_refresh_stage('mv_reentry_profit_booking');
+        PERFORM fn_refresh_stage('mv_reentry_eod_close');
+        PERFORM fn_refresh_stage('mv_reentry_final_exit');
+        PERFORM fn_refresh_stage('mv_reentry_legs_stats');
+        PERFORM fn_refresh_stage('mv_hedge_reentry_exit_on_all_entry_sl');
+        PERFORM fn_refresh_stage('mv_hedge_reentry_exit_on_partial_conditions');
+        PERFORM fn_refresh_stage('mv_hedge_reentry_closed_legs');
+        PERFORM fn_refresh_stage('mv_hedge_reentry_eod_exit');
+        PERFORM fn_refresh_stage('mv_reentry_exit_on_partial_hedge');
+        PERFORM fn_refresh_stage('mv_double_buy_legs_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_trigger_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_candidate_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_selected_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_leg_reentry');
+        PERFORM fn_refresh_stage('mv_rehedge_eod_exit_reentry');
+        PERFORM fn_refresh_stage('mv_all_legs_reentry');
         -- CALL sp_run_reentry_loop(rec.strategy_name);
         PERFORM fn_run_reentry_loop(rec.strategy_name);
         -- REFRESH MATERIALIZED VIEW mv_entry_leg_live_prices;
+        v_profile := fn_apply_stage_profile('wrk_entry_leg_live_prices');
+        v_stage_start := clock_timestamp();
         TRUNCATE TABLE wrk_entry_leg_live_prices;
 
 INSERT INTO wrk_entry_leg_live_prices
 WITH legs AS (
-    SELECT * FROM mv_all_legs_reentry
+    SELECT * FROM wrk_all_legs_reentry
     UNION ALL
     SELECT * FROM mv_all_legs_round1
 )
 SELECT
+    l.strategy_name,
     l.trade_date,
     l.expiry_date,
     l.breakout_time,
@@ -337,12 +414,19 @@ JOIN v_nifty_options_filtered o
 JOIN v_nifty50_filtered n
   ON n.date = l.trade_date
  AND n.time = o.time;
+        PERFORM fn_record_stage_metric('wrk_entry_leg_live_prices', v_stage_start);
+        PERFORM fn_restore_stage_profile(v_profile);
+
+        PERFORM fn_refresh_stage('mv_all_entries_sl_tracking_adjusted');
+        PERFORM fn_refresh_stage('mv_portfolio_mtm_pnl');
+        PERFORM fn_refresh_stage('mv_portfolio_final_pnl');
 
-        REFRESH MATERIALIZED VIEW mv_all_entries_sl_tracking_adjusted;
-        REFRESH MATERIALIZED VIEW mv_portfolio_mtm_pnl;
-        REFRESH MATERIALIZED VIEW mv_portfolio_final_pnl;
+-- Store final results; rows a failed attempt of this batch may have left are replaced
+        DELETE FROM strategy_run_results
+        WHERE strategy_name = rec.strategy_name
+          AND run_id IS NOT DISTINCT FROM current_setting('backtest.run_id', true)
+          AND trade_date BETWEEN v_batch_start AND v_batch_end;
 
--- Store final results
         INSERT INTO strategy_run_results (
             strategy_name,
             trade_date,
@@ -384,6 +468,27 @@ JOIN v_nifty50_filtered n
             total_pnl_per_day
         FROM mv_portfolio_final_pnl
         WHERE trade_date BETWEEN v_batch_start AND v_batch_end;
+        GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+        v_elapsed_ms := EXTRACT(EPOCH FROM clock_timestamp() - v_batch_clock) * 1000;
+        v_temp_bytes := fn_batch_temp_blocks(rec.strategy_name, v_batch_start, v_batch_end, v_batch_clock)
+                        * current_setting('block_size')::bigint;
+
+        -- Same transaction as the results: 'done' iff they are stored
+        PERFORM fn_batch_finished(v_run_key, rec.strategy_name, v_batch_start, v_batch_end, v_rows,
+                                  v_est_rows, v_elapsed_ms, v_temp_bytes);
+
+        -- 'auto': shrink after an over-budget or spilling batch, else grow toward the budget
+        IF p_batch_type = 'auto' AND v_est_rows > 0 THEN
+            IF v_elapsed_ms > v_budget_ms OR v_temp_bytes > 0 THEN
+                v_target_rows := v_est_rows / 2;
+            ELSE
+                v_target_rows := v_est_rows * LEAST(v_budget_ms / GREATEST(v_elapsed_ms, 1), 2);
+            END IF;
+            RAISE NOTICE
+                'Batch took % ms, spilled % bytes; next target ~% option rows',
+                round(v_elapsed_ms), v_temp_bytes, round(v_target_rows);
+        END IF;
 
             -- Memory management: analyze tables after large inserts
             -- IF (SELECT COUNT(*) FROM strategy_leg_book WHERE strategy_name = rec.strategy_name) > 5000 THEN
@@ -397,6 +502,7 @@ JOIN v_nifty50_filtered n
                🔑 RELEASE LOCKS FOR THIS BATCH
                ========================================= */
             COMMIT;  -- Ensure all locks are released before next batch starts
+
             v_batch_start := v_batch_end + INTERVAL '1 day';
         
 
@@ -413,6 +519,8 @@ END LOOP;
 
     END LOOP;
 
+    PERFORM fn_batch_run_closed(v_run_key);
+
     RAISE NOTICE 'All strategies completed (batched run).';
 END;
 $$;
\ No newline at end of file
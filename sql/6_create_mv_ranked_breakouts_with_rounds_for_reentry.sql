@@ -2,10 +2,11 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_ranked_breakouts_with_rounds_for_reentry CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_ranked_breakouts_with_rounds_for_reentry AS
 WITH strategy AS (
-    SELECT reentry_breakout_type FROM public.strategy_settings LIMIT 1
+    SELECT strategy_name, reentry_breakout_type FROM public.v_strategy_config
 ),
 filtered_breakouts AS (
     SELECT
+        b.strategy_name,
         b.trade_date,
         b.breakout_time,
         b.entry_time,
@@ -17,9 +18,11 @@ filtered_breakouts AS (
         b.ha_15m_low,
         b.breakout_type
     FROM public.mv_all_5min_breakouts b
-    CROSS JOIN strategy s
+    JOIN strategy s
+      ON s.strategy_name = b.strategy_name
     JOIN public.mv_ranked_breakouts_with_rounds r
-      ON b.trade_date = r.trade_date
+      ON b.strategy_name = r.strategy_name
+     AND b.trade_date = r.trade_date
     WHERE b.breakout_type IS NOT NULL
   AND r.entry_round = 1
   AND (
@@ -43,10 +46,11 @@ filtered_breakouts AS (
 ,
 ranked AS (
     SELECT *,
-        ROW_NUMBER() OVER (PARTITION BY trade_date ORDER BY breakout_time) AS entry_round
+        ROW_NUMBER() OVER (PARTITION BY strategy_name, trade_date ORDER BY breakout_time) AS entry_round
     FROM filtered_breakouts
 )
 SELECT
+    strategy_name,
     trade_date,
     breakout_time AS breakout_time,
     (breakout_time + INTERVAL '5 minute') AS entry_time,
@@ -59,4 +63,4 @@ SELECT
     entry_round
 FROM ranked;
 
-CREATE INDEX IF NOT EXISTS idx_mv_ranked_breakouts_reentry_date_time ON public.mv_ranked_breakouts_with_rounds_for_reentry (trade_date, breakout_time);
+CREATE INDEX IF NOT EXISTS idx_mv_ranked_breakouts_reentry_date_time ON public.mv_ranked_breakouts_with_rounds_for_reentry (strategy_name, trade_date, breakout_time);
@@ -28,18 +28,23 @@ $$;
 \echo Applying SQL files in sequence
 \echo ===============================
 
+\i sql/73_create_stage_backend.sql
+\i sql/75_create_run_stage_metrics.sql
+\i sql/76_create_run_stage_plans.sql
+\i sql/83_create_stage_resource_profile.sql
+\i sql/77_create_filtered_view_window.sql
+\i sql/78_create_market_data_indexes.sql
+
 \i sql/1_create_v_strategy_config.sql
 SELECT public.refresh_mv_if_exists('v_strategy_config');
 
+\i sql/79_create_stage_memo.sql
+SELECT public.refresh_mv_if_exists('v_stage_groups');
+
 \i sql/2_create_filtered_views.sql
-SELECT public.refresh_mv_if_exists('v_ha_big_filtered');
-SELECT public.refresh_mv_if_exists('v_ha_small_filtered');
-SELECT public.refresh_mv_if_exists('v_ha_1m_filtered');
-SELECT public.refresh_mv_if_exists('v_nifty50_filtered');
-SELECT public.refresh_mv_if_exists('v_nifty_options_filtered');
+SELECT public.fn_refresh_filtered_views();
 
 \i sql/3_create_mv_nifty_options_filtered.sql
-SELECT public.refresh_mv_if_exists('mv_nifty_options_filtered');
 
 \i sql/4_create_mv_all_5min_breakouts.sql
 SELECT public.refresh_mv_if_exists('mv_all_5min_breakouts');
@@ -200,6 +205,8 @@ SELECT public.refresh_mv_if_exists('mv_rehedge_eod_exit_reentry');
 \i sql/55_create_mv_all_legs_reentry.sql
 SELECT public.refresh_mv_if_exists('mv_all_legs_reentry');
 
+\i sql/84_create_wrk_all_legs_reentry.sql
+
 \i sql/56_fn_run_reentry_loop.sql
 \i sql/66_run_reentry_loop.sql
 
@@ -218,7 +225,14 @@ SELECT public.refresh_mv_if_exists('mv_portfolio_mtm_pnl');
 SELECT public.refresh_mv_if_exists('mv_portfolio_final_pnl');
 
 \i sql/61_create_strategy_run_results.sql
+\i sql/80_create_strategy_result_cache.sql
+\i sql/81_create_batch_progress.sql
+\i sql/82_create_batch_sizing.sql
+\i sql/85_create_run_cost_estimate.sql
+\i sql/86_create_option_partitions.sql
+\i sql/87_create_run_prewarm.sql
 \i sql/68_create_sp_run_strategy_batched.sql
+\i sql/74_call_sp_build_unlogged_stages.sql
 
 \echo =====================================
 \echo Full SQL pipeline setup is complete.
@@ -226,6 +240,15 @@ SELECT public.refresh_mv_if_exists('mv_portfolio_final_pnl');
 
 -- Run the complete strategy directly in Postgres (no Python required):
 -- CALL public.sp_run_strategy_batched('quarter');
+-- Same run on UNLOGGED stage tables instead of REFRESH MATERIALIZED VIEW:
+-- SET backtest.stage_backend = 'unlogged';
+-- CALL public.sp_run_strategy_batched('quarter');
+-- With SET backtest.run_id, calling it again after an interruption resumes at
+-- the first unfinished batch (batch_run_progress); start over with:
+-- CALL public.sp_run_strategy_batched('quarter', p_resume => false);
+-- Batches sized from option-row estimates and observed timings:
+-- SET backtest.batch_budget_ms = 300000;
+-- CALL public.sp_run_strategy_batched('auto');
 
 -- Optional cleanup helper after setup:
 -- DROP FUNCTION IF EXISTS public.refresh_mv_if_exists(text);
@@ -0,0 +1,174 @@
+-- Run registry and isolated run-schema pool for concurrent backtests
+CREATE TABLE IF NOT EXISTS public.backtest_run (
+    run_id          TEXT PRIMARY KEY,
+    status          TEXT NOT NULL DEFAULT 'queued',   -- queued | running | done | failed | cancelling | cancelled
+    n_strategies    INT,
+    n_cached        INT NOT NULL DEFAULT 0,     -- served from strategy_result_cache
+    n_workers       INT,
+    created_at      TIMESTAMP NOT NULL DEFAULT now(),
+    started_at      TIMESTAMP,
+    finished_at     TIMESTAMP,
+    error           TEXT
+);
+
+-- One row per built run schema; run_id IS NULL means the schema is free to lease
+CREATE TABLE IF NOT EXISTS public.backtest_run_schema (
+    schema_name     TEXT PRIMARY KEY,
+    run_id          TEXT,
+    build_hash      TEXT,
+    built_at        TIMESTAMP,
+    leased_at       TIMESTAMP
+);
+
+CREATE SEQUENCE IF NOT EXISTS public.backtest_run_schema_seq;
+
+ALTER TABLE public.backtest_run
+    ADD COLUMN IF NOT EXISTS n_cached INT NOT NULL DEFAULT 0;
+
+-- Results are shared across runs and tagged with the session's backtest.run_id
+ALTER TABLE public.strategy_run_results
+    ADD COLUMN IF NOT EXISTS run_id TEXT DEFAULT current_setting('backtest.run_id', true);
+
+CREATE INDEX IF NOT EXISTS idx_strategy_run_results_run
+ON public.strategy_run_results (run_id, strategy_name, trade_date);
+
+
+-- Lease a free run schema for p_run_id; NULL when the pool is exhausted
+CREATE OR REPLACE FUNCTION public.fn_lease_run_schema(p_run_id TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_schema TEXT;
+BEGIN
+    UPDATE public.backtest_run_schema
+    SET run_id = p_run_id,
+        leased_at = now()
+    WHERE schema_name = (
+        SELECT schema_name
+        FROM public.backtest_run_schema
+        WHERE run_id IS NULL
+        ORDER BY schema_name
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING schema_name INTO v_schema;
+
+    RETURN v_schema;
+END;
+$$;
+
+
+-- Register a newly created run schema, already leased to p_run_id
+CREATE OR REPLACE FUNCTION public.fn_new_run_schema(p_run_id TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_schema TEXT;
+BEGIN
+    v_schema := 'bt_run_' || nextval('public.backtest_run_schema_seq');
+
+    EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', v_schema);
+
+    INSERT INTO public.backtest_run_schema (schema_name, run_id, leased_at)
+    VALUES (v_schema, p_run_id, now());
+
+    RETURN v_schema;
+END;
+$$;
+
+
+CREATE OR REPLACE PROCEDURE public.sp_release_run_schema(p_schema TEXT)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.backtest_run_schema
+    SET run_id = NULL,
+        leased_at = NULL
+    WHERE schema_name = p_schema;
+END;
+$$;
+
+
+-- Cooperative cancellation: fn_cancel_run flags the run and cancels the
+-- current statement of every backend registered for it; fn_check_cancel
+-- (called by fn_refresh_stage and every re-entry round) stops the pipeline
+-- at the next check. Aborted transactions roll back, so shared tables only
+-- keep what was committed before the cancel.
+ALTER TABLE public.backtest_run
+    ADD COLUMN IF NOT EXISTS cancel_requested_at TIMESTAMP;
+
+-- Sessions working on a run; backend_start tells a reused pid apart
+CREATE TABLE IF NOT EXISTS public.backtest_run_backend (
+    run_id          TEXT NOT NULL,
+    pid             INT NOT NULL,
+    backend_start   TIMESTAMPTZ NOT NULL,
+    schema_name     TEXT,
+    registered_at   TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (run_id, pid, backend_start)
+);
+
+
+CREATE OR REPLACE FUNCTION public.fn_register_run_backend(p_run_id TEXT, p_schema TEXT DEFAULT NULL)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+INSERT INTO public.backtest_run_backend (run_id, pid, backend_start, schema_name)
+SELECT p_run_id, a.pid, a.backend_start, p_schema
+FROM pg_stat_activity a
+WHERE a.pid = pg_backend_pid()
+ON CONFLICT DO NOTHING;
+$$;
+
+
+-- Raise query_canceled when the session's backtest.run_id has been cancelled
+CREATE OR REPLACE FUNCTION public.fn_check_cancel()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_run_id TEXT := NULLIF(current_setting('backtest.run_id', true), '');
+BEGIN
+    IF v_run_id IS NOT NULL AND EXISTS (
+        SELECT 1
+        FROM public.backtest_run
+        WHERE run_id = v_run_id
+          AND cancel_requested_at IS NOT NULL
+    ) THEN
+        RAISE EXCEPTION 'Run % cancelled', v_run_id
+            USING ERRCODE = 'query_canceled';
+    END IF;
+END;
+$$;
+
+
+-- Flag p_run_id as cancelled and interrupt its live backends; returns the
+-- number of backends signalled. A run that has no backtest_run row yet (the
+-- page was opened but dispatch has not started) gets one carrying the pending
+-- cancel, which the dispatcher honours when it starts the run.
+CREATE OR REPLACE FUNCTION public.fn_cancel_run(p_run_id TEXT)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_signalled INT;
+BEGIN
+    INSERT INTO public.backtest_run AS r (run_id, status, cancel_requested_at)
+    VALUES (p_run_id, 'cancelling', now())
+    ON CONFLICT (run_id) DO UPDATE
+    SET cancel_requested_at = COALESCE(r.cancel_requested_at, now()),
+        status = CASE WHEN r.status IN ('queued', 'running') THEN 'cancelling' ELSE r.status END;
+
+    SELECT COUNT(*) FILTER (WHERE pg_cancel_backend(a.pid))
+    INTO v_signalled
+    FROM public.backtest_run_backend b
+    JOIN pg_stat_activity a
+      ON a.pid = b.pid
+     AND a.backend_start = b.backend_start
+    WHERE b.run_id = p_run_id
+      AND a.pid <> pg_backend_pid();
+
+    RETURN v_signalled;
+END;
+$$;
@@ -0,0 +1,244 @@
+-- Selectable stage backend for the pipeline procedures
+--
+--   backtest.stage_backend = 'matview'  (default) REFRESH MATERIALIZED VIEW per stage
+--   backtest.stage_backend = 'unlogged' TRUNCATE + INSERT ... SELECT + ANALYZE into
+--                                       UNLOGGED copies of every stage
+--
+-- The unlogged copies live in a sibling schema (bt_unlogged for public,
+-- <schema>_unlogged for a run schema) that is put in front of search_path,
+-- so every unqualified stage reference in the procedures and in the captured
+-- stage queries resolves to the unlogged tables. Apply this file before the
+-- procedures that use it; 74_call_sp_build_unlogged_stages.sql captures the
+-- stages and must be re-run after changing any stage SQL.
+
+CREATE OR REPLACE FUNCTION fn_backtest_setting(p_name TEXT, p_default TEXT)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(NULLIF(current_setting('backtest.' || p_name, true), ''), p_default);
+$$;
+
+
+CREATE OR REPLACE FUNCTION fn_unlogged_schema()
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT CASE
+        WHEN current_schema() = 'public' THEN 'bt_unlogged'
+        ELSE current_schema() || '_unlogged'
+    END;
+$$;
+
+
+-- Stage registry: the defining query of every materialized stage
+CREATE TABLE IF NOT EXISTS public.pipeline_stage (
+    stage_name   TEXT PRIMARY KEY,
+    select_sql   TEXT NOT NULL,
+    captured_at  TIMESTAMP NOT NULL DEFAULT now()
+);
+
+
+-- Stages src/stage_fusion.py inlined into their consumer; fn_refresh_stage
+-- skips them. Recreated empty on every install, the fused build refills it
+DROP TABLE IF EXISTS public.pipeline_fused_stage;
+
+CREATE TABLE public.pipeline_fused_stage (
+    stage_name   TEXT PRIMARY KEY,
+    consumer     TEXT NOT NULL
+);
+
+
+-- (Re)create the UNLOGGED copy of every materialized view in the current schema
+CREATE OR REPLACE PROCEDURE sp_build_unlogged_stages()
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_src    TEXT := current_schema();
+    v_target TEXT := fn_unlogged_schema();
+    v_path   TEXT := current_setting('search_path');
+    rec      RECORD;
+    idx      RECORD;
+BEGIN
+    EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', v_target);
+
+    -- Capture definitions with only the pipeline schema visible so stage
+    -- names come out unqualified and resolve through search_path at run time
+    PERFORM set_config('search_path', quote_ident(v_src), true);
+
+    DELETE FROM pipeline_stage;
+
+    -- Drop copies of stages that are no longer materialized views
+    -- (e.g. the date-bound v_*_filtered views), they would shadow them
+    FOR rec IN
+        SELECT t.relname
+        FROM pg_class t
+        JOIN pg_namespace tn ON tn.oid = t.relnamespace
+        WHERE tn.nspname = v_target
+          AND t.relkind = 'r'
+          AND NOT EXISTS (
+              SELECT 1
+              FROM pg_class c
+              JOIN pg_namespace n ON n.oid = c.relnamespace
+              WHERE n.nspname = v_src
+                AND c.relname = t.relname
+                AND c.relkind = 'm'
+          )
+    LOOP
+        EXECUTE format('DROP TABLE %I.%I CASCADE', v_target, rec.relname);
+    END LOOP;
+
+    FOR rec IN
+        SELECT c.oid, c.relname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = v_src
+          AND c.relkind = 'm'
+    LOOP
+        INSERT INTO pipeline_stage (stage_name, select_sql)
+        VALUES (
+            rec.relname,
+            regexp_replace(pg_get_viewdef(rec.oid), ';\s*$', '')
+        );
+
+        EXECUTE format('DROP TABLE IF EXISTS %I.%I CASCADE', v_target, rec.relname);
+        EXECUTE format(
+            'CREATE UNLOGGED TABLE %I.%I AS SELECT * FROM %I.%I WITH NO DATA',
+            v_target, rec.relname, v_src, rec.relname
+        );
+
+        FOR idx IN
+            SELECT indexdef
+            FROM pg_indexes
+            WHERE schemaname = v_src
+              AND tablename = rec.relname
+        LOOP
+            EXECUTE replace(
+                idx.indexdef,
+                format(' ON %s.%s ', quote_ident(v_src), quote_ident(rec.relname)),
+                format(' ON %s.%s ', quote_ident(v_target), quote_ident(rec.relname))
+            );
+        END LOOP;
+    END LOOP;
+
+    PERFORM set_config('search_path', v_path, true);
+
+    RAISE NOTICE 'Unlogged stages built in % from %', v_target, v_src;
+END;
+$$;
+
+
+-- Put the unlogged schema in front of search_path (transaction-local) when
+-- the unlogged backend is selected; no-op for the matview backend
+CREATE OR REPLACE FUNCTION fn_apply_stage_backend()
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_backend TEXT := fn_backtest_setting('stage_backend', 'matview');
+    v_target  TEXT;
+BEGIN
+    IF v_backend = 'matview' THEN
+        RETURN v_backend;
+    END IF;
+
+    IF v_backend <> 'unlogged' THEN
+        RAISE EXCEPTION 'Unknown backtest.stage_backend %', v_backend;
+    END IF;
+
+    IF current_schema() LIKE '%\_unlogged' THEN
+        RETURN v_backend;
+    END IF;
+
+    v_target := fn_unlogged_schema();
+
+    IF NOT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = v_target) THEN
+        RAISE EXCEPTION 'Unlogged stage schema % not built', v_target
+            USING HINT = 'CALL sp_build_unlogged_stages() in the pipeline schema';
+    END IF;
+
+    PERFORM set_config(
+        'search_path',
+        quote_ident(v_target) || ', ' || current_setting('search_path'),
+        true
+    );
+
+    RETURN v_backend;
+END;
+$$;
+
+
+-- Materialize one stage with the selected backend, record it in
+-- run_stage_metrics (75_create_run_stage_metrics.sql) and, when
+-- backtest.plan_capture_ms is set, capture the plan of a slow stage
+-- (76_create_run_stage_plans.sql)
+-- With backtest.track_spills = 'on' the unlogged INSERT runs under
+-- EXPLAIN (ANALYZE, BUFFERS) so its temp written blocks are recorded too
+-- (82_create_batch_sizing.sql)
+CREATE OR REPLACE FUNCTION fn_refresh_stage(p_stage TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_sql       TEXT;
+    v_started   TIMESTAMPTZ := clock_timestamp();
+    v_rows      BIGINT;
+    v_temp_blks BIGINT;
+    v_plan      JSONB;
+    v_stage_ms  NUMERIC;
+    v_threshold NUMERIC := NULLIF(fn_backtest_setting('plan_capture_ms', ''), '')::numeric;
+    v_profile   JSONB;
+BEGIN
+    -- Stop between stages once the run is cancelled (72_create_backtest_run.sql)
+    PERFORM public.fn_check_cancel();
+
+    IF EXISTS (SELECT 1 FROM pipeline_fused_stage WHERE stage_name = p_stage) THEN
+        RETURN;   -- computed inside its consumer
+    END IF;
+
+    -- work_mem / parallelism / planner toggles for this stage (83_create_stage_resource_profile.sql)
+    v_profile := public.fn_apply_stage_profile(p_stage);
+
+    IF fn_backtest_setting('stage_backend', 'matview') = 'matview' THEN
+        EXECUTE format('REFRESH MATERIALIZED VIEW %I', p_stage);
+    ELSE
+        SELECT select_sql INTO v_sql
+        FROM pipeline_stage
+        WHERE stage_name = p_stage;
+
+        IF v_sql IS NULL THEN
+            RAISE EXCEPTION 'Stage % not captured in pipeline_stage', p_stage;
+        END IF;
+
+        EXECUTE format('TRUNCATE TABLE %I', p_stage);
+
+        IF fn_backtest_setting('track_spills', 'off') = 'on' THEN
+            -- Buffer counts of the top node include its children and parallel workers
+            EXECUTE format(
+                'EXPLAIN (ANALYZE, BUFFERS, TIMING OFF, FORMAT JSON) INSERT INTO %I %s',
+                p_stage, v_sql
+            ) INTO v_plan;
+
+            v_temp_blks := COALESCE((v_plan->0->'Plan'->>'Temp Written Blocks')::bigint, 0);
+            SELECT (p->>'Actual Rows')::bigint INTO v_rows
+            FROM jsonb_array_elements(v_plan->0->'Plan'->'Plans') p
+            WHERE p->>'Parent Relationship' = 'Outer';
+        ELSE
+            EXECUTE format('INSERT INTO %I %s', p_stage, v_sql);
+            GET DIAGNOSTICS v_rows = ROW_COUNT;
+        END IF;
+        EXECUTE format('ANALYZE %I', p_stage);
+    END IF;
+
+    v_stage_ms := EXTRACT(EPOCH FROM (clock_timestamp() - v_started)) * 1000;
+    PERFORM fn_record_stage_metric(p_stage, v_started, v_rows, v_temp_blks);
+
+    IF v_threshold IS NOT NULL AND v_stage_ms >= v_threshold THEN
+        PERFORM fn_capture_stage_plan(p_stage, v_stage_ms);
+    END IF;
+
+    PERFORM public.fn_restore_stage_profile(v_profile);
+END;
+$$;
+
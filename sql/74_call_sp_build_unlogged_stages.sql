@@ -0,0 +1 @@
+CALL sp_build_unlogged_stages();
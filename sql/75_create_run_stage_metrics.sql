@@ -0,0 +1,143 @@
+-- Per-stage timing / row-count ledger, written by fn_refresh_stage and the
+-- wrk_* fills in sp_run_strategy, sp_run_strategy_batched and fn_run_reentry_loop.
+-- Context comes from backtest.* settings set by the procedures:
+--   backtest.run_id, backtest.strategy, backtest.batch_from, backtest.batch_to,
+--   backtest.reentry_round, backtest.stage_backend
+-- SET backtest.stage_metrics = 'off' skips the extra count(*) per stage.
+-- temp_blks_written is filled by fn_refresh_stage when backtest.track_spills
+-- is on (unlogged backend), see 82_create_batch_sizing.sql.
+CREATE TABLE IF NOT EXISTS public.run_stage_metrics (
+    id              BIGSERIAL PRIMARY KEY,
+    run_id          TEXT,
+    strategy_name   TEXT,
+    batch_from      DATE,
+    batch_to        DATE,
+    reentry_round   INT,
+    stage_name      TEXT NOT NULL,
+    stage_schema    TEXT,
+    stage_backend   TEXT,
+    started_at      TIMESTAMPTZ NOT NULL,
+    finished_at     TIMESTAMPTZ NOT NULL,
+    duration_ms     NUMERIC GENERATED ALWAYS AS (
+                        EXTRACT(EPOCH FROM (finished_at - started_at)) * 1000
+                    ) STORED,
+    output_rows     BIGINT,
+    relation_bytes  BIGINT
+);
+
+CREATE INDEX IF NOT EXISTS idx_run_stage_metrics_run
+ON public.run_stage_metrics (run_id, stage_name);
+
+CREATE INDEX IF NOT EXISTS idx_run_stage_metrics_stage
+ON public.run_stage_metrics (stage_name, started_at);
+
+ALTER TABLE public.run_stage_metrics
+    ADD COLUMN IF NOT EXISTS temp_blks_written BIGINT;
+
+DROP FUNCTION IF EXISTS public.fn_record_stage_metric(TEXT, TIMESTAMPTZ, BIGINT);
+
+CREATE OR REPLACE FUNCTION public.fn_record_stage_metric(
+    p_stage     TEXT,
+    p_started   TIMESTAMPTZ,
+    p_rows      BIGINT DEFAULT NULL,
+    p_temp_blks BIGINT DEFAULT NULL
+)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_finished TIMESTAMPTZ := clock_timestamp();
+    v_rows     BIGINT := p_rows;
+    v_rel      REGCLASS := to_regclass(quote_ident(p_stage));
+BEGIN
+    IF fn_backtest_setting('stage_metrics', 'on') = 'off' THEN
+        RETURN;
+    END IF;
+
+    IF v_rows IS NULL AND v_rel IS NOT NULL THEN
+        EXECUTE format('SELECT count(*) FROM %s', v_rel) INTO v_rows;
+    END IF;
+
+    INSERT INTO public.run_stage_metrics (
+        run_id,
+        strategy_name,
+        batch_from,
+        batch_to,
+        reentry_round,
+        stage_name,
+        stage_schema,
+        stage_backend,
+        started_at,
+        finished_at,
+        output_rows,
+        relation_bytes,
+        temp_blks_written
+    )
+    VALUES (
+        NULLIF(fn_backtest_setting('run_id', ''), ''),
+        NULLIF(fn_backtest_setting('strategy', ''), ''),
+        NULLIF(fn_backtest_setting('batch_from', ''), '')::date,
+        NULLIF(fn_backtest_setting('batch_to', ''), '')::date,
+        NULLIF(fn_backtest_setting('reentry_round', ''), '')::int,
+        p_stage,
+        (SELECT n.nspname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace WHERE c.oid = v_rel),
+        fn_backtest_setting('stage_backend', 'matview'),
+        p_started,
+        v_finished,
+        v_rows,
+        CASE WHEN v_rel IS NOT NULL THEN pg_total_relation_size(v_rel) END,
+        p_temp_blks
+    );
+END;
+$$;
+
+
+-- Cross-strategy memo hit rates per run (79_create_stage_memo.sql)
+CREATE TABLE IF NOT EXISTS public.run_stage_memo (
+    id              BIGSERIAL PRIMARY KEY,
+    run_id          TEXT,
+    stage_name      TEXT NOT NULL,
+    strategies      INT NOT NULL,
+    computed        INT NOT NULL,
+    reused          INT NOT NULL,
+    hit_rate        NUMERIC GENERATED ALWAYS AS (
+                        CASE WHEN strategies > 0 THEN ROUND(reused::numeric / strategies, 4) END
+                    ) STORED,
+    recorded_at     TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_run_stage_memo_run
+ON public.run_stage_memo (run_id, stage_name);
+
+
+-- Record (and print) how many strategies each memoized stage computes vs reuses
+CREATE OR REPLACE FUNCTION public.fn_record_stage_memo()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    rec RECORD;
+BEGIN
+    FOR rec IN
+        SELECT
+            stage_name,
+            COUNT(*)::int                        AS strategies,
+            COUNT(DISTINCT leader_strategy)::int AS computed
+        FROM v_stage_groups
+        GROUP BY stage_name
+        ORDER BY stage_name
+    LOOP
+        RAISE NOTICE 'Memo %: % strategies, % computed, % reused',
+            rec.stage_name, rec.strategies, rec.computed, rec.strategies - rec.computed;
+
+        INSERT INTO public.run_stage_memo (run_id, stage_name, strategies, computed, reused)
+        VALUES (
+            NULLIF(fn_backtest_setting('run_id', ''), ''),
+            rec.stage_name,
+            rec.strategies,
+            rec.computed,
+            rec.strategies - rec.computed
+        );
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,81 @@
+-- Opt-in EXPLAIN capture for slow stages
+--   SET backtest.plan_capture_ms = 5000;        -- capture stages slower than 5 s
+--   SET backtest.plan_capture_analyze = 'off';  -- plain EXPLAIN instead of re-executing
+-- fn_refresh_stage calls fn_capture_stage_plan() after any stage over the threshold;
+-- scripts/compare_stage_plans.py diffs plan shapes between two runs.
+CREATE TABLE IF NOT EXISTS public.run_stage_plans (
+    id              BIGSERIAL PRIMARY KEY,
+    run_id          TEXT,
+    strategy_name   TEXT,
+    batch_from      DATE,
+    batch_to        DATE,
+    reentry_round   INT,
+    stage_name      TEXT NOT NULL,
+    stage_backend   TEXT,
+    stage_ms        NUMERIC,
+    analyzed        BOOLEAN NOT NULL,
+    captured_at     TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    plan            JSONB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_run_stage_plans_run
+ON public.run_stage_plans (run_id, stage_name);
+
+
+CREATE OR REPLACE FUNCTION public.fn_capture_stage_plan(p_stage TEXT, p_stage_ms NUMERIC)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_sql     TEXT;
+    v_analyze BOOLEAN := fn_backtest_setting('plan_capture_analyze', 'on') <> 'off';
+    v_plan    JSON;
+BEGIN
+    SELECT select_sql INTO v_sql
+    FROM pipeline_stage
+    WHERE stage_name = p_stage;
+
+    IF v_sql IS NULL THEN
+        SELECT regexp_replace(pg_get_viewdef(c.oid), ';\s*$', '') INTO v_sql
+        FROM pg_class c
+        WHERE c.oid = to_regclass(quote_ident(p_stage))
+          AND c.relkind = 'm';
+    END IF;
+
+    IF v_sql IS NULL THEN
+        RAISE NOTICE 'No query captured for stage %, skipping plan', p_stage;
+        RETURN;
+    END IF;
+
+    EXECUTE format(
+        'EXPLAIN (%s FORMAT JSON) %s',
+        CASE WHEN v_analyze THEN 'ANALYZE, BUFFERS,' ELSE '' END,
+        v_sql
+    ) INTO v_plan;
+
+    INSERT INTO public.run_stage_plans (
+        run_id,
+        strategy_name,
+        batch_from,
+        batch_to,
+        reentry_round,
+        stage_name,
+        stage_backend,
+        stage_ms,
+        analyzed,
+        plan
+    )
+    VALUES (
+        NULLIF(fn_backtest_setting('run_id', ''), ''),
+        NULLIF(fn_backtest_setting('strategy', ''), ''),
+        NULLIF(fn_backtest_setting('batch_from', ''), '')::date,
+        NULLIF(fn_backtest_setting('batch_to', ''), '')::date,
+        NULLIF(fn_backtest_setting('reentry_round', ''), '')::int,
+        p_stage,
+        fn_backtest_setting('stage_backend', 'matview'),
+        p_stage_ms,
+        v_analyze,
+        v_plan::jsonb
+    );
+END;
+$$;
@@ -0,0 +1,110 @@
+-- Date-bound market-data views (2_create_filtered_views.sql)
+-- The v_*_filtered stages are plain views over the partitioned base tables, so
+-- no market data is copied per run. fn_refresh_filtered_view() rebinds a view
+-- to MIN(from_date)..MAX(to_date) of runtime_strategy_dates as *literal*
+-- bounds: the planner prunes the monthly/yearly partitions at plan time,
+-- which it cannot do with a (SELECT ... FROM runtime_strategy_dates) subquery.
+-- filtered_view_window holds each view's SELECT template and its bound window;
+-- a run over the same window leaves the view untouched.
+-- Rebuilt on install; 2_create_filtered_views.sql registers the templates
+DROP TABLE IF EXISTS public.filtered_view_window;
+
+CREATE TABLE public.filtered_view_window (
+    view_name   TEXT PRIMARY KEY,
+    select_sql  TEXT NOT NULL,      -- format() template, %1$L / %2$L = from / to date
+    from_date   DATE,
+    to_date     DATE,
+    hits        BIGINT NOT NULL DEFAULT 0,
+    rebinds     BIGINT NOT NULL DEFAULT 0,
+    bound_at    TIMESTAMPTZ
+);
+
+
+-- (Re)create one view with literal date bounds in the pipeline schema
+CREATE OR REPLACE FUNCTION fn_bind_filtered_view(p_view TEXT, p_from DATE, p_to DATE)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_sql    TEXT;
+    v_schema TEXT;
+BEGIN
+    -- The view lives next to filtered_view_window, never in the unlogged
+    -- schema that fn_apply_stage_backend() may have put first on search_path
+    SELECT w.select_sql, n.nspname
+    INTO v_sql, v_schema
+    FROM filtered_view_window w
+    JOIN pg_class c     ON c.oid = 'filtered_view_window'::regclass
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE w.view_name = p_view;
+
+    IF v_sql IS NULL THEN
+        RAISE EXCEPTION 'Unknown filtered view %', p_view;
+    END IF;
+
+    EXECUTE format(
+        'CREATE OR REPLACE VIEW %I.%I AS %s',
+        v_schema, p_view, format(v_sql, p_from, p_to)
+    );
+
+    UPDATE filtered_view_window
+    SET from_date = p_from,
+        to_date   = p_to,
+        rebinds   = rebinds + 1,
+        bound_at  = clock_timestamp()
+    WHERE view_name = p_view;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION fn_refresh_filtered_view(p_view TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_from DATE;
+    v_to   DATE;
+    w      RECORD;
+BEGIN
+    SELECT MIN(from_date), MAX(to_date)
+    INTO v_from, v_to
+    FROM runtime_strategy_dates;
+
+    IF v_from IS NULL THEN
+        RAISE NOTICE 'No strategy dates loaded, % left as is', p_view;
+        RETURN;
+    END IF;
+
+    SELECT * INTO w
+    FROM filtered_view_window
+    WHERE view_name = p_view
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Unknown filtered view %', p_view;
+    END IF;
+
+    IF w.from_date = v_from AND w.to_date = v_to THEN
+        UPDATE filtered_view_window
+        SET hits = hits + 1
+        WHERE view_name = p_view;
+        RETURN;
+    END IF;
+
+    PERFORM fn_bind_filtered_view(p_view, v_from, v_to);
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION fn_refresh_filtered_views()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM fn_refresh_filtered_view('v_ha_big_filtered');
+    PERFORM fn_refresh_filtered_view('v_ha_small_filtered');
+    PERFORM fn_refresh_filtered_view('v_ha_1m_filtered');
+    PERFORM fn_refresh_filtered_view('v_nifty50_filtered');
+    PERFORM fn_refresh_filtered_view('v_nifty_options_filtered');
+END;
+$$;
@@ -0,0 +1,19 @@
+-- Composite indexes on the partitioned market-data tables
+-- The v_*_filtered stages read these tables directly (2_create_filtered_views.sql),
+-- so the lookups the old matview copies served through their unique indexes
+-- now use these. Created on the parent, so every existing and future
+-- partition gets its own copy; the first build locks each partition for writes.
+CREATE INDEX IF NOT EXISTS idx_nifty_options_date_expiry_type_strike_time
+ON public."Nifty_options" (date, expiry, option_type, strike, "time");
+
+CREATE INDEX IF NOT EXISTS idx_nifty50_date_time
+ON public."Nifty50" (date, "time");
+
+CREATE INDEX IF NOT EXISTS idx_ha_big_trade_time
+ON public.ha_big (trade_date, candle_time);
+
+CREATE INDEX IF NOT EXISTS idx_ha_small_trade_time
+ON public.ha_small (trade_date, candle_time);
+
+CREATE INDEX IF NOT EXISTS idx_ha_1m_trade_time
+ON public.ha_1m (trade_date, candle_time);
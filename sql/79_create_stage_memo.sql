@@ -0,0 +1,61 @@
+-- Cross-strategy memoization of the shared entry stages
+-- Each memoized stage is fingerprinted by the config columns it reads, including
+-- those of the stages feeding it. Strategies with equal fingerprints form a group;
+-- the stage is computed once for the group's leader (lowest strategy_name) and its
+-- rows are fanned out to every member at the end of the stage query.
+--   SET backtest.stage_memo = 'off';   -- every strategy computed on its own
+-- Per-run hit rates: run_stage_memo (75_create_run_stage_metrics.sql)
+DROP TABLE IF EXISTS public.stage_fingerprint CASCADE;
+
+CREATE TABLE public.stage_fingerprint (
+    stage_name      TEXT PRIMARY KEY,
+    config_columns  TEXT[] NOT NULL
+);
+
+INSERT INTO public.stage_fingerprint (stage_name, config_columns)
+VALUES
+    ('mv_all_5min_breakouts', ARRAY[
+        'big_candle_tf', 'small_candle_tf', 'entry_candle', 'breakout_threshold_pct',
+        'from_date', 'to_date']),
+    ('mv_ranked_breakouts_with_rounds', ARRAY[
+        'big_candle_tf', 'small_candle_tf', 'entry_candle', 'breakout_threshold_pct',
+        'from_date', 'to_date',
+        'preferred_breakout_type']),
+    ('mv_base_strike_selection', ARRAY[
+        'big_candle_tf', 'small_candle_tf', 'entry_candle', 'breakout_threshold_pct',
+        'from_date', 'to_date',
+        'preferred_breakout_type', 'option_entry_price_cap']),
+    ('mv_entry_and_hedge_legs', ARRAY[
+        'big_candle_tf', 'small_candle_tf', 'entry_candle', 'breakout_threshold_pct',
+        'from_date', 'to_date',
+        'preferred_breakout_type', 'option_entry_price_cap',
+        'num_entry_legs', 'num_hedge_legs', 'hedge_entry_price_cap']);
+
+CREATE MATERIALIZED VIEW public.v_stage_groups AS
+WITH fp AS (
+    SELECT
+        f.stage_name,
+        c.strategy_name,
+        md5((
+            SELECT jsonb_object_agg(e.key, e.value)
+            FROM jsonb_each(to_jsonb(c)) e
+            WHERE e.key = ANY (f.config_columns)
+        )::text) AS fingerprint
+    FROM public.v_strategy_config c
+    CROSS JOIN public.stage_fingerprint f
+)
+SELECT
+    stage_name,
+    strategy_name,
+    fingerprint,
+    CASE
+        WHEN fn_backtest_setting('stage_memo', 'on') = 'off' THEN strategy_name
+        ELSE MIN(strategy_name) OVER (PARTITION BY stage_name, fingerprint)
+    END AS leader_strategy
+FROM fp;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_v_stage_groups
+ON public.v_stage_groups (stage_name, strategy_name);
+
+CREATE INDEX IF NOT EXISTS idx_v_stage_groups_leader
+ON public.v_stage_groups (stage_name, leader_strategy);
@@ -2,22 +2,36 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_base_strike_selection CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_base_strike_selection AS
 WITH 
+-- Memoized (79_create_stage_memo.sql): computed for group leaders only,
+-- fanned out to every strategy of the group in the final SELECT
+cfg AS (
+    SELECT c.*
+    FROM v_strategy_config c
+    JOIN v_stage_groups g
+      ON g.strategy_name = c.strategy_name
+     AND g.stage_name = 'mv_base_strike_selection'
+    WHERE g.leader_strategy = g.strategy_name
+),
+
 -- 1️⃣ Only required breakout rows
 breakout_info AS (
     SELECT
-        trade_date,
-        entry_time,
-        breakout_time,
-        breakout_type,
-        entry_option_type,
-        entry_round
-    FROM public.mv_ranked_breakouts_with_rounds
-    WHERE entry_round = 1
+        r.strategy_name,
+        r.trade_date,
+        r.entry_time,
+        r.breakout_time,
+        r.breakout_type,
+        r.entry_option_type,
+        r.entry_round
+    FROM public.mv_ranked_breakouts_with_rounds r
+    JOIN cfg s ON s.strategy_name = r.strategy_name
+    WHERE r.entry_round = 1
 ),
 
 -- 2️⃣ Spot price at entry time
 base AS (
     SELECT 
+        b.strategy_name,
         b.trade_date,
         b.breakout_time,
         b.entry_time,
@@ -79,22 +93,41 @@ strike_candidates AS (
      AND o.time   = b.entry_time
      AND o.expiry = b.expiry_date
      AND o.option_type = b.entry_option_type
-    JOIN public.v_strategy_config s ON TRUE
+    JOIN cfg s ON s.strategy_name = b.strategy_name
 ),
 
 -- 6️⃣ Rank once
 ranked_strikes AS (
     SELECT *,
            ROW_NUMBER() OVER (
-               PARTITION BY trade_date, expiry_date
+               PARTITION BY strategy_name, trade_date, expiry_date
                ORDER BY priority, premium_diff
            ) AS rn
     FROM strike_candidates
 )
 
-SELECT *
-FROM ranked_strikes
-WHERE rn = 1;
+SELECT
+    g.strategy_name,
+    r.trade_date,
+    r.breakout_time,
+    r.entry_time,
+    r.breakout_direction,
+    r.entry_option_type,
+    r.entry_round,
+    r.spot_price,
+    r.expiry_date,
+    r.atm_strike,
+    r.strike,
+    r.entry_price,
+    r.option_entry_price_cap,
+    r.priority,
+    r.premium_diff,
+    r.rn
+FROM ranked_strikes r
+JOIN v_stage_groups g
+  ON g.stage_name = 'mv_base_strike_selection'
+ AND g.leader_strategy = r.strategy_name
+WHERE r.rn = 1;
 
 -- optional index for lookups
-CREATE INDEX IF NOT EXISTS idx_mv_base_strike_selection_date_time ON public.mv_base_strike_selection (trade_date, breakout_time);
+CREATE INDEX IF NOT EXISTS idx_mv_base_strike_selection_date_time ON public.mv_base_strike_selection (strategy_name, trade_date, breakout_time);
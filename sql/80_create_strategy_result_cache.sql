@@ -0,0 +1,208 @@
+-- Persistent per-strategy result cache (src/result_cache.py)
+-- A strategy's cache key hashes
+--   * its strategy_settings row (all columns except strategy_name),
+--   * the pipeline code version (build hash of the stage SQL, from Python),
+--   * a data stamp of the Nifty_options / Nifty50 / ha_* partitions that
+--     overlap its from_date..to_date (fn_market_data_stamp).
+-- A strategy whose key is cached is served from strategy_result_cache_rows
+-- into strategy_run_results without running the pipeline.
+CREATE TABLE IF NOT EXISTS public.strategy_result_cache (
+    cache_key       TEXT PRIMARY KEY,
+    settings_hash   TEXT NOT NULL,
+    data_stamp      TEXT NOT NULL,
+    code_version    TEXT NOT NULL,
+    strategy_name   TEXT NOT NULL,      -- name the results were computed under
+    from_date       DATE,
+    to_date         DATE,
+    source_run_id   TEXT,
+    n_rows          BIGINT NOT NULL,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    hits            BIGINT NOT NULL DEFAULT 0,
+    last_hit_at     TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS public.strategy_result_cache_rows (
+    cache_key TEXT NOT NULL REFERENCES public.strategy_result_cache (cache_key) ON DELETE CASCADE,
+    LIKE public.strategy_run_results
+);
+
+CREATE INDEX IF NOT EXISTS idx_strategy_result_cache_rows_key
+ON public.strategy_result_cache_rows (cache_key);
+
+
+-- Change stamp of the market data in [p_from, p_to]: for every partition whose
+-- range overlaps (plus DEFAULT partitions and unpartitioned tables) its
+-- relfilenode (changes on TRUNCATE / rewrite) and its insert/update/delete
+-- counters. A statistics reset only causes cache misses, never stale hits.
+CREATE OR REPLACE FUNCTION public.fn_market_data_stamp(p_from DATE, p_to DATE)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+WITH parents AS (
+    SELECT to_regclass(t) AS parent
+    FROM unnest(ARRAY[
+        'public."Nifty_options"', 'public."Nifty50"',
+        'public.ha_big', 'public.ha_small', 'public.ha_1m'
+    ]) AS t
+),
+rels AS (
+    SELECT
+        c.oid,
+        c.relname,
+        c.relfilenode,
+        regexp_match(
+            pg_get_expr(c.relpartbound, c.oid),
+            $re$FROM \('([^']+)'\) TO \('([^']+)'\)$re$
+        ) AS bounds
+    FROM parents p
+    JOIN pg_inherits i ON i.inhparent = p.parent
+    JOIN pg_class c    ON c.oid = i.inhrelid
+    UNION ALL
+    SELECT c.oid, c.relname, c.relfilenode, NULL
+    FROM parents p
+    JOIN pg_class c ON c.oid = p.parent
+    WHERE c.relkind = 'r'
+)
+SELECT md5(COALESCE(string_agg(
+    format('%s:%s:%s:%s:%s', r.relname, r.relfilenode,
+           s.n_tup_ins, s.n_tup_upd, s.n_tup_del),
+    ',' ORDER BY r.relname
+), ''))
+FROM rels r
+LEFT JOIN pg_stat_user_tables s ON s.relid = r.oid
+WHERE r.bounds IS NULL
+   OR (r.bounds[1]::date <= p_to AND r.bounds[2]::date > p_from);
+$$;
+
+
+-- Hash of a strategy_settings row (as jsonb) without its name; numbers are
+-- normalised so 60 and 60.0 from different CSV parses hash the same
+CREATE OR REPLACE FUNCTION public.fn_settings_hash(p_settings JSONB)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+SELECT md5(string_agg(
+    e.key || '=' || CASE jsonb_typeof(e.value)
+                        WHEN 'number' THEN trim_scale((e.value #>> '{}')::numeric)::text
+                        ELSE COALESCE(e.value #>> '{}', '')
+                    END,
+    '|' ORDER BY e.key
+))
+FROM jsonb_each(p_settings - 'strategy_name') e;
+$$;
+
+
+CREATE OR REPLACE FUNCTION public.fn_strategy_cache_key(p_settings JSONB, p_code_version TEXT)
+RETURNS TABLE (cache_key TEXT, settings_hash TEXT, data_stamp TEXT)
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+    md5(s.h || '|' || d.stamp || '|' || p_code_version),
+    s.h,
+    d.stamp
+FROM (SELECT public.fn_settings_hash(p_settings) AS h) s
+CROSS JOIN (
+    SELECT public.fn_market_data_stamp(
+        (p_settings ->> 'from_date')::date,
+        (p_settings ->> 'to_date')::date
+    ) AS stamp
+) d;
+$$;
+
+
+-- Copy cached rows into strategy_run_results for p_run_id under p_strategy_name
+CREATE OR REPLACE FUNCTION public.fn_serve_cached_result(
+    p_cache_key     TEXT,
+    p_strategy_name TEXT,
+    p_run_id        TEXT
+)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    INSERT INTO public.strategy_run_results (
+        strategy_name, execution_time, trade_date, expiry_date, breakout_time,
+        entry_time, spot_price, option_type, strike, entry_price, sl_level,
+        entry_round, leg_type, transaction_type, exit_time, exit_price,
+        exit_reason, pnl_amount, total_pnl_per_day, run_id
+    )
+    SELECT
+        p_strategy_name, r.execution_time, r.trade_date, r.expiry_date, r.breakout_time,
+        r.entry_time, r.spot_price, r.option_type, r.strike, r.entry_price, r.sl_level,
+        r.entry_round, r.leg_type, r.transaction_type, r.exit_time, r.exit_price,
+        r.exit_reason, r.pnl_amount, r.total_pnl_per_day, p_run_id
+    FROM public.strategy_result_cache_rows r
+    WHERE r.cache_key = p_cache_key;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    UPDATE public.strategy_result_cache
+    SET hits = hits + 1,
+        last_hit_at = now()
+    WHERE cache_key = p_cache_key;
+
+    RETURN v_rows;
+END;
+$$;
+
+
+-- Store the results p_run_id produced for p_strategy_name under p_cache_key
+CREATE OR REPLACE FUNCTION public.fn_store_cached_result(
+    p_cache_key     TEXT,
+    p_settings_hash TEXT,
+    p_data_stamp    TEXT,
+    p_code_version  TEXT,
+    p_strategy_name TEXT,
+    p_from_date     DATE,
+    p_to_date       DATE,
+    p_run_id        TEXT
+)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    INSERT INTO public.strategy_result_cache (
+        cache_key, settings_hash, data_stamp, code_version, strategy_name,
+        from_date, to_date, source_run_id, n_rows
+    )
+    VALUES (
+        p_cache_key, p_settings_hash, p_data_stamp, p_code_version, p_strategy_name,
+        p_from_date, p_to_date, p_run_id, 0
+    )
+    ON CONFLICT (cache_key) DO NOTHING;
+
+    IF NOT FOUND THEN
+        RETURN 0;   -- another run cached the same key first
+    END IF;
+
+    INSERT INTO public.strategy_result_cache_rows (
+        cache_key,
+        strategy_name, execution_time, trade_date, expiry_date, breakout_time,
+        entry_time, spot_price, option_type, strike, entry_price, sl_level,
+        entry_round, leg_type, transaction_type, exit_time, exit_price,
+        exit_reason, pnl_amount, total_pnl_per_day
+    )
+    SELECT
+        p_cache_key,
+        r.strategy_name, r.execution_time, r.trade_date, r.expiry_date, r.breakout_time,
+        r.entry_time, r.spot_price, r.option_type, r.strike, r.entry_price, r.sl_level,
+        r.entry_round, r.leg_type, r.transaction_type, r.exit_time, r.exit_price,
+        r.exit_reason, r.pnl_amount, r.total_pnl_per_day
+    FROM public.strategy_run_results r
+    WHERE r.run_id = p_run_id
+      AND r.strategy_name = p_strategy_name;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    UPDATE public.strategy_result_cache
+    SET n_rows = v_rows
+    WHERE cache_key = p_cache_key;
+
+    RETURN v_rows;
+END;
+$$;
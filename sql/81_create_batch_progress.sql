@@ -0,0 +1,128 @@
+-- Progress ledger for sp_run_strategy_batched (68_create_sp_run_strategy_batched.sql)
+-- One row per (run, strategy, batch window). A batch is marked 'running' and
+-- committed before its stages start, and marked 'done' in the same
+-- transaction that stores its results, so after an interruption the ledger
+-- shows the batch that failed and a new CALL skips every 'done' batch
+-- (matched by start date, so 'auto' windows that come out differently on the
+-- next call still resume correctly).
+-- run_key is backtest.run_id, or 'batched' when no run_id is set; only a call
+-- with an explicit run_id resumes. When the run completes its batches are
+-- marked 'closed' (kept for their sizing stats), so a later call with the same
+-- run_id computes everything again.
+-- settings_hash (fn_settings_hash, 80_create_strategy_result_cache.sql) ties
+-- the progress to the strategy's settings: editing a strategy restarts it.
+CREATE TABLE IF NOT EXISTS public.batch_run_progress (
+    run_key         TEXT NOT NULL,
+    strategy_name   TEXT NOT NULL,
+    batch_from      DATE NOT NULL,
+    batch_to        DATE NOT NULL,
+    settings_hash   TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'running',   -- 'running' | 'done' | 'closed'
+    attempts        INTEGER NOT NULL DEFAULT 1,
+    rows_stored     BIGINT,
+    started_at      TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    finished_at     TIMESTAMPTZ,
+    PRIMARY KEY (run_key, strategy_name, batch_from, batch_to)
+);
+
+-- Batch sizing inputs / outcome (82_create_batch_sizing.sql)
+ALTER TABLE public.batch_run_progress
+    ADD COLUMN IF NOT EXISTS est_rows NUMERIC,
+    ADD COLUMN IF NOT EXISTS elapsed_ms NUMERIC,
+    ADD COLUMN IF NOT EXISTS temp_bytes BIGINT;
+
+DROP FUNCTION IF EXISTS public.fn_batch_done(TEXT, TEXT, TEXT, DATE, DATE);
+DROP FUNCTION IF EXISTS public.fn_batch_finished(TEXT, TEXT, DATE, DATE, BIGINT);
+DROP FUNCTION IF EXISTS public.fn_batch_temp_bytes(TEXT, TEXT, DATE, DATE, BIGINT);
+
+
+-- End of the stored batch starting at p_batch_from, NULL if there is none.
+-- Drops the strategy's progress when its settings changed since it was
+-- recorded.
+CREATE OR REPLACE FUNCTION public.fn_batch_done_until(
+    p_run_key       TEXT,
+    p_strategy_name TEXT,
+    p_settings_hash TEXT,
+    p_batch_from    DATE
+)
+RETURNS DATE
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM public.batch_run_progress
+    WHERE run_key = p_run_key
+      AND strategy_name = p_strategy_name
+      AND settings_hash <> p_settings_hash;
+
+    RETURN (
+        SELECT MAX(batch_to)
+        FROM public.batch_run_progress
+        WHERE run_key = p_run_key
+          AND strategy_name = p_strategy_name
+          AND batch_from = p_batch_from
+          AND status = 'done'
+    );
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION public.fn_batch_started(
+    p_run_key       TEXT,
+    p_strategy_name TEXT,
+    p_settings_hash TEXT,
+    p_batch_from    DATE,
+    p_batch_to      DATE
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+INSERT INTO public.batch_run_progress (
+    run_key, strategy_name, batch_from, batch_to, settings_hash
+)
+VALUES (p_run_key, p_strategy_name, p_batch_from, p_batch_to, p_settings_hash)
+ON CONFLICT (run_key, strategy_name, batch_from, batch_to) DO UPDATE
+SET status      = 'running',
+    attempts    = batch_run_progress.attempts + 1,
+    rows_stored = NULL,
+    started_at  = clock_timestamp(),
+    finished_at = NULL;
+$$;
+
+
+CREATE OR REPLACE FUNCTION public.fn_batch_finished(
+    p_run_key       TEXT,
+    p_strategy_name TEXT,
+    p_batch_from    DATE,
+    p_batch_to      DATE,
+    p_rows_stored   BIGINT,
+    p_est_rows      NUMERIC DEFAULT NULL,
+    p_elapsed_ms    NUMERIC DEFAULT NULL,
+    p_temp_bytes    BIGINT DEFAULT NULL
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+UPDATE public.batch_run_progress
+SET status      = 'done',
+    rows_stored = p_rows_stored,
+    est_rows    = p_est_rows,
+    elapsed_ms  = p_elapsed_ms,
+    temp_bytes  = p_temp_bytes,
+    finished_at = clock_timestamp()
+WHERE run_key = p_run_key
+  AND strategy_name = p_strategy_name
+  AND batch_from = p_batch_from
+  AND batch_to = p_batch_to;
+$$;
+
+
+-- Called when a batched run completes: its batches no longer resume.
+CREATE OR REPLACE FUNCTION public.fn_batch_run_closed(p_run_key TEXT)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+UPDATE public.batch_run_progress
+SET status = 'closed'
+WHERE run_key = p_run_key
+  AND status = 'done';
+$$;
@@ -0,0 +1,161 @@
+-- Adaptive batch sizing for sp_run_strategy_batched('auto')
+-- A batch is grown day by day until the estimated Nifty_options rows in it
+-- reach a target. The estimate comes from partition statistics (reltuples
+-- of the monthly partitions, spread over their days). The first target of a
+-- strategy is backtest.batch_budget_ms divided by the ms per option row
+-- observed in run_stage_metrics for earlier batches, or
+-- backtest.batch_target_rows when there is no history yet. After every batch
+-- the procedure halves the target if the batch ran over budget or spilled to
+-- temp files, and otherwise grows it toward the budget (at most 2x). The
+-- spill signal is the batch's own temp written blocks, see
+-- fn_batch_temp_blocks.
+
+
+-- Estimated option rows per calendar day in [p_from, p_to]
+CREATE OR REPLACE FUNCTION public.fn_option_rows_per_day(p_from DATE, p_to DATE)
+RETURNS TABLE (trade_date DATE, est_rows NUMERIC)
+LANGUAGE sql
+STABLE
+AS $$
+WITH parts AS (
+    SELECT
+        GREATEST(c.reltuples, 0)::numeric AS reltuples,
+        regexp_match(
+            pg_get_expr(c.relpartbound, c.oid),
+            $re$FROM \('([^']+)'\) TO \('([^']+)'\)$re$
+        ) AS bounds
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass('public."Nifty_options"')
+),
+ranges AS (
+    SELECT reltuples, bounds[1]::date AS lo, bounds[2]::date AS hi
+    FROM parts
+    WHERE bounds IS NOT NULL
+),
+-- Unpartitioned table: rows per distinct date from the planner statistics
+flat AS (
+    SELECT GREATEST(c.reltuples, 0)::numeric
+           / NULLIF(CASE WHEN s.n_distinct < 0 THEN -s.n_distinct * c.reltuples
+                         ELSE s.n_distinct END, 0)::numeric AS per_day
+    FROM pg_class c
+    LEFT JOIN pg_stats s
+      ON s.schemaname = 'public'
+     AND s.tablename = 'Nifty_options'
+     AND s.attname = 'date'
+    WHERE c.oid = to_regclass('public."Nifty_options"')
+)
+SELECT
+    d::date,
+    COALESCE(
+        (SELECT r.reltuples / NULLIF(r.hi - r.lo, 0)
+         FROM ranges r
+         WHERE d::date >= r.lo AND d::date < r.hi
+         LIMIT 1),
+        (SELECT per_day FROM flat),
+        0
+    )
+FROM generate_series(p_from, p_to, INTERVAL '1 day') d;
+$$;
+
+
+CREATE OR REPLACE FUNCTION public.fn_estimate_option_rows(p_from DATE, p_to DATE)
+RETURNS NUMERIC
+LANGUAGE sql
+STABLE
+AS $$
+SELECT COALESCE(SUM(est_rows), 0)
+FROM public.fn_option_rows_per_day(p_from, p_to);
+$$;
+
+
+-- Observed stage time per estimated option row over the last 20 batch
+-- windows of p_strategy_name (of any strategy when it has none); NULL
+-- without history
+CREATE OR REPLACE FUNCTION public.fn_batch_ms_per_row(p_strategy_name TEXT)
+RETURNS NUMERIC
+LANGUAGE sql
+STABLE
+AS $$
+WITH windows AS (
+    SELECT
+        strategy_name,
+        batch_from,
+        batch_to,
+        SUM(duration_ms) AS stage_ms,
+        MAX(finished_at) AS finished_at
+    FROM public.run_stage_metrics
+    WHERE batch_from IS NOT NULL
+      AND batch_to IS NOT NULL
+    GROUP BY run_id, strategy_name, batch_from, batch_to
+),
+recent AS (
+    SELECT *
+    FROM windows
+    ORDER BY (strategy_name = p_strategy_name) DESC, finished_at DESC
+    LIMIT 20
+)
+SELECT SUM(stage_ms) / NULLIF(SUM(public.fn_estimate_option_rows(batch_from, batch_to)), 0)
+FROM recent;
+$$;
+
+
+-- Last day of a batch starting at p_start: at least one day, at most p_to,
+-- otherwise the last day whose cumulative estimate stays within p_target_rows
+CREATE OR REPLACE FUNCTION public.fn_auto_batch_end(p_start DATE, p_to DATE, p_target_rows NUMERIC)
+RETURNS DATE
+LANGUAGE sql
+STABLE
+AS $$
+SELECT GREATEST(p_start, COALESCE(MAX(trade_date), p_start))
+FROM (
+    SELECT
+        trade_date,
+        SUM(est_rows) OVER (ORDER BY trade_date) AS cum_rows
+    FROM public.fn_option_rows_per_day(p_start, p_to)
+) d
+WHERE cum_rows <= p_target_rows;
+$$;
+
+
+DROP FUNCTION IF EXISTS public.fn_temp_bytes();
+
+
+-- Temp blocks written by the stages of one batch since p_since:
+--   unlogged backend: run_stage_metrics.temp_blks_written, from the
+--                     EXPLAIN (ANALYZE, BUFFERS) INSERT that fn_refresh_stage
+--                     runs under backtest.track_spills
+--   matview backend:  the plans captured for slow stages
+--                     (backtest.plan_capture_ms, 76_create_run_stage_plans.sql);
+--                     a REFRESH cannot be explained, so faster stages are not seen
+-- The wrk_* fills in sp_run_strategy_batched are not counted.
+CREATE OR REPLACE FUNCTION public.fn_batch_temp_blocks(
+    p_strategy_name TEXT,
+    p_batch_from    DATE,
+    p_batch_to      DATE,
+    p_since         TIMESTAMPTZ
+)
+RETURNS BIGINT
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+    COALESCE((
+        SELECT SUM(temp_blks_written)
+        FROM public.run_stage_metrics
+        WHERE strategy_name = p_strategy_name
+          AND batch_from = p_batch_from
+          AND batch_to = p_batch_to
+          AND started_at >= p_since
+    ), 0)
+    + COALESCE((
+        SELECT SUM((plan->0->'Plan'->>'Temp Written Blocks')::bigint)
+        FROM public.run_stage_plans
+        WHERE strategy_name = p_strategy_name
+          AND batch_from = p_batch_from
+          AND batch_to = p_batch_to
+          AND captured_at >= p_since
+          AND analyzed
+          AND stage_backend = 'matview'
+    ), 0);
+$$;
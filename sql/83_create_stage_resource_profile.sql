@@ -0,0 +1,89 @@
+-- Per-stage session settings, applied with set_config(..., is_local => true)
+-- (= SET LOCAL) around each stage by fn_refresh_stage, the wrk_* fills in
+-- sp_run_strategy / sp_run_strategy_batched / fn_run_reentry_loop, and the
+-- stage DAG runner. NULL columns leave the session value alone.
+-- scripts/benchmark_stage_profiles.py times candidate profiles per stage and
+-- stores the fastest here. SET backtest.stage_profiles = 'off' ignores the table.
+CREATE TABLE IF NOT EXISTS public.stage_resource_profile (
+    stage_name                      TEXT PRIMARY KEY,
+    work_mem                        TEXT,
+    max_parallel_workers_per_gather INT,
+    jit                             BOOLEAN,
+    enable_hashagg                  BOOLEAN,
+    enable_hashjoin                 BOOLEAN,
+    enable_mergejoin                BOOLEAN,
+    enable_nestloop                 BOOLEAN,
+    enable_seqscan                  BOOLEAN,
+    enable_sort                     BOOLEAN,
+    enable_partitionwise_join       BOOLEAN,
+    enable_partitionwise_aggregate  BOOLEAN,
+    synchronous_commit              TEXT,
+    benchmarked_ms                  NUMERIC,    -- stage time under this profile
+    baseline_ms                     NUMERIC,    -- stage time without a profile
+    updated_at                      TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Starting points; benchmark_stage_profiles.py --apply replaces them
+INSERT INTO public.stage_resource_profile (stage_name, work_mem)
+VALUES
+    ('mv_portfolio_mtm_pnl', '256MB'),
+    ('mv_entry_round1_stats', '256MB')
+ON CONFLICT (stage_name) DO NOTHING;
+
+INSERT INTO public.stage_resource_profile (stage_name, max_parallel_workers_per_gather)
+VALUES
+    ('wrk_live_prices_entry_round1', 4),
+    ('wrk_reentry_live_prices', 4),
+    ('wrk_entry_leg_live_prices', 4)
+ON CONFLICT (stage_name) DO NOTHING;
+
+
+-- Apply p_stage's profile for the rest of the transaction; returns the
+-- previous values for fn_restore_stage_profile
+CREATE OR REPLACE FUNCTION public.fn_apply_stage_profile(p_stage TEXT)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_prev JSONB := '{}';
+    s      RECORD;
+BEGIN
+    IF COALESCE(NULLIF(current_setting('backtest.stage_profiles', true), ''), 'on') = 'off' THEN
+        RETURN v_prev;
+    END IF;
+
+    FOR s IN
+        SELECT
+            e.key AS name,
+            CASE jsonb_typeof(e.value)
+                WHEN 'boolean' THEN CASE WHEN (e.value)::boolean THEN 'on' ELSE 'off' END
+                ELSE e.value #>> '{}'
+            END AS value
+        FROM public.stage_resource_profile p
+        CROSS JOIN LATERAL jsonb_each(
+            to_jsonb(p) - ARRAY['stage_name', 'benchmarked_ms', 'baseline_ms', 'updated_at']
+        ) e
+        WHERE p.stage_name = p_stage
+          AND jsonb_typeof(e.value) <> 'null'
+    LOOP
+        v_prev := v_prev || jsonb_build_object(s.name, current_setting(s.name));
+        PERFORM set_config(s.name, s.value, true);
+    END LOOP;
+
+    RETURN v_prev;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION public.fn_restore_stage_profile(p_prev JSONB)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    s RECORD;
+BEGIN
+    FOR s IN SELECT key, value FROM jsonb_each_text(COALESCE(p_prev, '{}')) LOOP
+        PERFORM set_config(s.key, s.value, true);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,13 @@
+-- Working table: every re-entry round's legs (mv_all_legs_reentry rows)
+-- Filled by the all-rounds pass at the end of fn_run_reentry_loop for the
+-- stages after the loop (wrk_entry_leg_live_prices,
+-- mv_all_entries_sl_tracking_adjusted).
+-- Same columns and types as the matview.
+DROP TABLE IF EXISTS public.wrk_all_legs_reentry CASCADE;
+CREATE TABLE public.wrk_all_legs_reentry AS
+SELECT * FROM public.mv_all_legs_reentry
+WITH NO DATA;
+
+CREATE INDEX IF NOT EXISTS idx_wrk_all_legs_reentry_round
+ON public.wrk_all_legs_reentry
+(strategy_name, trade_date, entry_round);
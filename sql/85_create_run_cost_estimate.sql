@@ -0,0 +1,64 @@
+-- Run cost estimator (src/cost_estimator.py)
+-- A strategy's cost is modelled as
+--   est_rows * (entry_ms_per_row + round_ms_per_row * (max_reentry_rounds - 1))
+-- where est_rows is the Nifty_options rows in its date range from partition
+-- statistics (fn_estimate_option_rows, 82_create_batch_sizing.sql). The two
+-- rates are fitted on the last 20 finished runs: the dispatcher records every
+-- strategy it runs in run_strategy_estimate, and run_stage_metrics holds the
+-- stage time those runs spent outside (reentry_round NULL) and inside the
+-- re-entry loop.
+CREATE TABLE IF NOT EXISTS public.run_strategy_estimate (
+    run_id              TEXT NOT NULL,
+    strategy_name       TEXT NOT NULL,
+    from_date           DATE,
+    to_date             DATE,
+    max_reentry_rounds  INT,
+    est_rows            NUMERIC NOT NULL,
+    est_ms              NUMERIC,            -- prediction at dispatch (NULL without history)
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (run_id, strategy_name)
+);
+
+
+-- ms per estimated option row outside / per potential round inside the
+-- re-entry loop. Without recorded runs the entry rate falls back to the
+-- sp_run_strategy_batched history (fn_batch_ms_per_row), which already
+-- includes the loop; both are NULL without any history.
+CREATE OR REPLACE FUNCTION public.fn_run_cost_rates()
+RETURNS TABLE (entry_ms_per_row NUMERIC, round_ms_per_row NUMERIC, n_runs INT)
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH runs AS (
+        SELECT
+            e.run_id,
+            SUM(e.est_rows) AS est_rows,
+            SUM(e.est_rows * GREATEST(COALESCE(e.max_reentry_rounds, 1) - 1, 0)) AS round_rows,
+            MAX(e.created_at) AS created_at
+        FROM public.run_strategy_estimate e
+        JOIN public.backtest_run b
+          ON b.run_id = e.run_id
+         AND b.status = 'done'
+        GROUP BY e.run_id
+    ),
+    timed AS (
+        SELECT
+            r.est_rows,
+            r.round_rows,
+            SUM(m.duration_ms) FILTER (WHERE m.reentry_round IS NULL) AS entry_ms,
+            SUM(m.duration_ms) FILTER (WHERE m.reentry_round IS NOT NULL) AS round_ms
+        FROM runs r
+        JOIN public.run_stage_metrics m ON m.run_id = r.run_id
+        GROUP BY r.run_id, r.est_rows, r.round_rows, r.created_at
+        ORDER BY r.created_at DESC
+        LIMIT 20
+    )
+    SELECT
+        COALESCE(SUM(t.entry_ms) / NULLIF(SUM(t.est_rows), 0), public.fn_batch_ms_per_row(NULL)),
+        COALESCE(SUM(t.round_ms) / NULLIF(SUM(t.round_rows), 0), 0),
+        COUNT(*)::int
+    FROM timed t;
+END;
+$$;
@@ -0,0 +1,31 @@
+-- Nifty_options partitions overlapping [p_from, p_to], clipped to that range
+-- (to_date inclusive). Used by the partition-wise dispatch mode
+-- (src/dispatcher.py partition_strategies): one share per monthly partition,
+-- whose filtered views then prune Nifty_options, Nifty50 and ha_* to the
+-- partition's dates. Empty when Nifty_options is not partitioned.
+CREATE OR REPLACE FUNCTION public.fn_option_partitions(p_from DATE, p_to DATE)
+RETURNS TABLE (partition_name TEXT, from_date DATE, to_date DATE)
+LANGUAGE sql
+STABLE
+AS $$
+WITH parts AS (
+    SELECT
+        c.relname::text AS relname,
+        regexp_match(
+            pg_get_expr(c.relpartbound, c.oid),
+            $re$FROM \('([^']+)'\) TO \('([^']+)'\)$re$
+        ) AS bounds
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass('public."Nifty_options"')
+)
+SELECT
+    relname,
+    GREATEST(bounds[1]::date, p_from),
+    LEAST(bounds[2]::date - 1, p_to)
+FROM parts
+WHERE bounds IS NOT NULL
+  AND bounds[1]::date <= p_to
+  AND bounds[2]::date > p_from
+ORDER BY 2;
+$$;
@@ -0,0 +1,128 @@
+-- Buffer-cache warm-up of a run's date window (src/prewarm.py)
+-- Every Nifty_options / Nifty50 / ha_* partition overlapping [p_from, p_to]
+-- (DEFAULT partitions and unpartitioned tables whole), each followed by its
+-- indexes, is read ahead of the run:
+--   * resident  -- pg_buffercache shows >= 90% of its pages in shared buffers
+--   * buffer    -- pg_prewarm into shared buffers, up to p_budget_fraction of
+--                  shared_buffers for the whole call
+--   * read      -- pg_prewarm into the OS page cache once that budget is used
+--   * touch     -- no pg_prewarm: a sequential count(*) of the table (indexes
+--                  are then 'skipped')
+-- Without pg_buffercache nothing is reported resident.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_prewarm;
+    CREATE EXTENSION IF NOT EXISTS pg_buffercache;
+EXCEPTION
+    WHEN OTHERS THEN
+        RAISE NOTICE 'pg_prewarm / pg_buffercache not installed (%); warm-up falls back to sequential reads', SQLERRM;
+END $$;
+
+
+CREATE OR REPLACE FUNCTION public.fn_prewarm_run_window(
+    p_from            DATE,
+    p_to              DATE,
+    p_budget_fraction NUMERIC DEFAULT 0.75
+)
+RETURNS TABLE (
+    relation       TEXT,
+    kind           TEXT,
+    pages          BIGINT,
+    resident_pages BIGINT,
+    loaded_pages   BIGINT,
+    mode           TEXT,
+    ms             NUMERIC
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_prewarm  BOOLEAN := to_regprocedure('pg_prewarm(regclass,text,text,bigint,bigint)') IS NOT NULL;
+    v_bufcache BOOLEAN := to_regclass('pg_buffercache') IS NOT NULL;
+    v_budget   BIGINT;
+    v_used     BIGINT := 0;
+    v_started  TIMESTAMPTZ;
+    r          RECORD;
+BEGIN
+    -- shared_buffers is reported in 8kB blocks
+    SELECT (s.setting::numeric * p_budget_fraction)::bigint
+    INTO v_budget
+    FROM pg_settings s
+    WHERE s.name = 'shared_buffers';
+
+    FOR r IN
+        WITH parents AS (
+            SELECT u.ord, to_regclass(u.t) AS parent
+            FROM unnest(ARRAY[
+                'public."Nifty_options"', 'public."Nifty50"',
+                'public.ha_big', 'public.ha_small', 'public.ha_1m'
+            ]) WITH ORDINALITY AS u(t, ord)
+        ),
+        tables AS (
+            SELECT p.ord, c.oid
+            FROM parents p
+            JOIN pg_inherits i ON i.inhparent = p.parent
+            JOIN pg_class c    ON c.oid = i.inhrelid
+            CROSS JOIN LATERAL regexp_match(
+                pg_get_expr(c.relpartbound, c.oid),
+                $re$FROM \('([^']+)'\) TO \('([^']+)'\)$re$
+            ) AS b(bounds)
+            WHERE b.bounds IS NULL
+               OR (b.bounds[1]::date <= p_to AND b.bounds[2]::date > p_from)
+            UNION ALL
+            SELECT p.ord, c.oid
+            FROM parents p
+            JOIN pg_class c ON c.oid = p.parent
+            WHERE c.relkind = 'r'
+        ),
+        rels AS (
+            SELECT t.ord, t.oid AS tbl, t.oid AS rel, 'table' AS rel_kind
+            FROM tables t
+            UNION ALL
+            SELECT t.ord, t.oid, x.indexrelid, 'index'
+            FROM tables t
+            JOIN pg_index x ON x.indrelid = t.oid
+        )
+        SELECT
+            rels.rel::regclass AS rel,
+            rels.rel_kind,
+            pg_relation_size(rels.rel) / current_setting('block_size')::bigint AS rel_pages
+        FROM rels
+        ORDER BY rels.ord, rels.tbl::regclass::text, rels.rel_kind DESC, rels.rel::regclass::text
+    LOOP
+        v_started      := clock_timestamp();
+        relation       := r.rel::text;
+        kind           := r.rel_kind;
+        pages          := r.rel_pages;
+        resident_pages := NULL;
+        loaded_pages   := 0;
+
+        IF v_bufcache THEN
+            EXECUTE
+                'SELECT count(*) FROM pg_buffercache
+                 WHERE reldatabase = (SELECT oid FROM pg_database WHERE datname = current_database())
+                   AND relfilenode = pg_relation_filenode($1)'
+            INTO resident_pages
+            USING r.rel;
+        END IF;
+
+        IF r.rel_pages = 0 OR resident_pages >= 0.9 * r.rel_pages THEN
+            mode := 'resident';
+        ELSIF v_prewarm THEN
+            mode := CASE WHEN v_used + r.rel_pages <= v_budget THEN 'buffer' ELSE 'read' END;
+            EXECUTE 'SELECT pg_prewarm($1, $2)' INTO loaded_pages USING r.rel, mode;
+            IF mode = 'buffer' THEN
+                v_used := v_used + loaded_pages;
+            END IF;
+        ELSIF r.rel_kind = 'table' THEN
+            mode := 'touch';
+            EXECUTE format('SELECT count(*) FROM ONLY %s', r.rel);
+            loaded_pages := r.rel_pages;
+        ELSE
+            mode := 'skipped';
+        END IF;
+
+        ms := EXTRACT(EPOCH FROM (clock_timestamp() - v_started)) * 1000;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
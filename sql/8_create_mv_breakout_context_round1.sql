@@ -2,15 +2,16 @@
 DROP MATERIALIZED VIEW IF EXISTS public.mv_breakout_context_round1 CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_breakout_context_round1 AS
 WITH strategy AS (
-    SELECT entry_candle FROM public.v_strategy_config LIMIT 1
+    SELECT strategy_name, entry_candle, from_date, to_date FROM public.v_strategy_config
 )
 SELECT
+    s.strategy_name,
     x.trade_date,
     x.ha_high AS breakout_high,
     x.ha_low  AS breakout_low,
     '1' AS temp_entry_round
 FROM (
-    SELECT 
+    SELECT
         trade_date,
         candle_time,
         ha_high,
@@ -18,7 +19,8 @@ FROM (
         ROW_NUMBER() OVER (PARTITION BY trade_date ORDER BY candle_time) AS rn
     FROM public.v_ha_big_filtered
 ) x
-JOIN strategy s ON TRUE
+JOIN strategy s
+  ON x.trade_date BETWEEN s.from_date AND s.to_date
 WHERE x.rn = s.entry_candle;
 
-CREATE INDEX IF NOT EXISTS idx_mv_breakout_context_round1_date ON public.mv_breakout_context_round1 (trade_date);
+CREATE INDEX IF NOT EXISTS idx_mv_breakout_context_round1_date ON public.mv_breakout_context_round1 (strategy_name, trade_date);
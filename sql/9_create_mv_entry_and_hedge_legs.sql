@@ -1,12 +1,25 @@
 -- Materialized view: entry and hedge legs (round 1)
 DROP MATERIALIZED VIEW IF EXISTS public.mv_entry_and_hedge_legs CASCADE;
 CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_entry_and_hedge_legs AS
-WITH strategy AS (
+WITH
+-- Memoized (79_create_stage_memo.sql): computed for group leaders only,
+-- fanned out to every strategy of the group in the final SELECT
+cfg AS (
+    SELECT c.*
+    FROM v_strategy_config c
+    JOIN v_stage_groups g
+      ON g.strategy_name = c.strategy_name
+     AND g.stage_name = 'mv_entry_and_hedge_legs'
+    WHERE g.leader_strategy = g.strategy_name
+),
+
+strategy AS (
     SELECT
+        strategy_name,
         num_entry_legs,
         num_hedge_legs,
         hedge_entry_price_cap
-    FROM v_strategy_config
+    FROM cfg
 ),
 
 /* =========================
@@ -14,6 +27,7 @@ WITH strategy AS (
    ========================= */
 entry_strike_cte AS (
     SELECT 
+        s.strategy_name,
         o.date AS trade_date,
         o.expiry AS expiry_date,
         s.breakout_time,
@@ -27,7 +41,7 @@ entry_strike_cte AS (
         'ENTRY'::TEXT AS leg_type,
         'SELL'::TEXT AS transaction_type
     FROM mv_base_strike_selection s
-    JOIN strategy st ON TRUE
+    JOIN strategy st ON st.strategy_name = s.strategy_name
     JOIN v_nifty_options_filtered o 
       ON o.date   = s.trade_date
      AND o.expiry = s.expiry_date
@@ -47,6 +61,7 @@ entry_strike_cte AS (
    ========================= */
 hedge_ranked AS (
     SELECT
+        b.strategy_name,
         b.trade_date,
         b.breakout_time,
         b.entry_time,
@@ -71,7 +86,7 @@ hedge_ranked AS (
         ABS(o.open - s.hedge_entry_price_cap) AS premium_diff,
 
         ROW_NUMBER() OVER (
-            PARTITION BY b.trade_date, b.expiry_date, b.entry_round
+            PARTITION BY b.strategy_name, b.trade_date, b.expiry_date, b.entry_round
             ORDER BY
                 CASE
                     WHEN o.strike = b.atm_strike
@@ -83,7 +98,7 @@ hedge_ranked AS (
         ) AS rn
 
     FROM mv_base_strike_selection b
-    JOIN strategy s ON TRUE
+    JOIN strategy s ON s.strategy_name = b.strategy_name
     JOIN v_nifty_options_filtered o 
       ON o.date   = b.trade_date
      AND o.time   = b.entry_time
@@ -105,6 +120,7 @@ selected_hedge_base_strike AS (
    ========================= */
 hedge_strike_cte AS (
     SELECT 
+        s.strategy_name,
         o.date AS trade_date,
         o.expiry AS expiry_date,
         s.breakout_time,
@@ -118,7 +134,7 @@ hedge_strike_cte AS (
         'HEDGE'::TEXT AS leg_type,
         'SELL'::TEXT AS transaction_type
     FROM selected_hedge_base_strike s
-    JOIN strategy st ON TRUE
+    JOIN strategy st ON st.strategy_name = s.strategy_name
     JOIN v_nifty_options_filtered o 
       ON o.date   = s.trade_date
      AND o.expiry = s.expiry_date
@@ -136,8 +152,27 @@ hedge_strike_cte AS (
 /* =========================
    FINAL OUTPUT
    ========================= */
-SELECT * FROM entry_strike_cte
-UNION ALL
-SELECT * FROM hedge_strike_cte;
+SELECT
+    g.strategy_name,
+    l.trade_date,
+    l.expiry_date,
+    l.breakout_time,
+    l.entry_time,
+    l.breakout_direction,
+    l.option_type,
+    l.spot_price,
+    l.strike,
+    l.entry_price,
+    l.entry_round,
+    l.leg_type,
+    l.transaction_type
+FROM (
+    SELECT * FROM entry_strike_cte
+    UNION ALL
+    SELECT * FROM hedge_strike_cte
+) l
+JOIN v_stage_groups g
+  ON g.stage_name = 'mv_entry_and_hedge_legs'
+ AND g.leader_strategy = l.strategy_name;
 
-CREATE INDEX IF NOT EXISTS idx_mv_entry_and_hedge_legs_date_time ON public.mv_entry_and_hedge_legs (trade_date, breakout_time);
+CREATE INDEX IF NOT EXISTS idx_mv_entry_and_hedge_legs_date_time ON public.mv_entry_and_hedge_legs (strategy_name, trade_date, breakout_time);
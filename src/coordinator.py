@@ -0,0 +1,354 @@
+"""Distribute a run across several Postgres instances.
+
+One instance saturates at a handful of concurrent strategies, so the
+coordinator spreads a run over a list of instances (``BACKTEST_INSTANCES``,
+``host:port[/dbname]`` comma-separated), each holding a replica of the market
+data and the full SQL install. The run is cut into tasks -- groups of
+strategies dealt longest-first by estimated cost (``split_strategies``), or
+``shards`` date slices of every strategy -- which sit in one queue. Each
+instance pulls up to ``sessions`` tasks at a time and runs them through
+``run_share`` in one of its own run schemas. A finished task's
+``strategy_run_results`` rows are copied into the primary (the ``PG*``
+instance) and deleted from the worker.
+
+A failed task has its partial rows removed and goes back on the queue, up to
+``retries`` times; an instance that no longer answers is dropped from the
+pool and its tasks move to the others. Cancelling the run on the primary
+(``cancel_run``) cancels it on every instance.
+
+Several local clusters on different ports work as instances::
+
+    initdb -D /tmp/pg5433 && pg_ctl -D /tmp/pg5433 -o "-p 5433" -l /tmp/pg5433.log start
+    createdb -p 5433 Backtest_Pulse
+    pg_dump Backtest_Pulse | psql -p 5433 Backtest_Pulse
+"""
+import io
+import os
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+import pandas as pd
+
+from . import cost_estimator, result_cache
+from .db import get_conn
+from .dispatcher import (
+    RunCancelled, _cache_keys, _cancel_requested, _discard_results, _estimate_costs,
+    _serve_cached, _set_run_status, _start_run, _store_cached, default_stage_backend, new_run_id,
+    run_share, shard_strategies, split_strategies,
+)
+
+RESULT_COLUMNS = [
+    'strategy_name', 'execution_time', 'trade_date', 'expiry_date', 'breakout_time',
+    'entry_time', 'spot_price', 'option_type', 'strike', 'entry_price', 'sl_level',
+    'entry_round', 'leg_type', 'transaction_type', 'exit_time', 'exit_price',
+    'exit_reason', 'pnl_amount', 'total_pnl_per_day', 'run_id',
+]
+
+# Rows of one task (``r``): its strategies within their (clipped) date ranges
+_TASK_FILTER = """
+unnest(%s::text[], %s::date[], %s::date[]) AS t(strategy_name, from_date, to_date)
+WHERE r.run_id = %s
+  AND r.strategy_name = t.strategy_name
+  AND r.trade_date BETWEEN COALESCE(t.from_date, r.trade_date) AND COALESCE(t.to_date, r.trade_date)
+"""
+
+# Tasks per instance session when not date-sharding (smaller tasks re-dispatch cheaper)
+TASKS_PER_SESSION = 2
+
+
+class Instance(NamedTuple):
+    host: str
+    port: int
+    dbname: str | None = None
+
+    @property
+    def name(self) -> str:
+        return f'{self.host}:{self.port}' + (f'/{self.dbname}' if self.dbname else '')
+
+    def conn_params(self) -> dict:
+        params = {'host': self.host, 'port': self.port, 'connect_timeout': 10}
+        if self.dbname:
+            params['dbname'] = self.dbname
+        return params
+
+
+def parse_instances(spec: str) -> list[Instance]:
+    """``'host:port[/dbname],...'`` -> instances (port defaults to 5432)."""
+    instances = []
+    for item in filter(None, (s.strip() for s in spec.split(','))):
+        address, _, dbname = item.partition('/')
+        host, _, port = address.partition(':')
+        instances.append(Instance(host or 'localhost', int(port or 5432), dbname or None))
+    return instances
+
+
+def default_instances() -> list[Instance]:
+    """Instances from BACKTEST_INSTANCES (unset: none)."""
+    return parse_instances(os.getenv('BACKTEST_INSTANCES', ''))
+
+
+def default_sessions() -> int:
+    """Concurrent tasks per instance from BACKTEST_INSTANCE_SESSIONS (default 4)."""
+    return int(os.getenv('BACKTEST_INSTANCE_SESSIONS', 4))
+
+
+# Instance (None: the PG* database) -> server identity, looked up once per process
+_identities: dict = {}
+
+
+def server_identity(instance: Instance | None = None) -> tuple:
+    """``(system_identifier, database)`` of ``instance``, or of the ``PG*`` database.
+
+    Unlike the address, this is the same however the server is reached
+    (``localhost``, ``127.0.0.1``, a hostname, a forwarded port).
+    """
+    if instance not in _identities:
+        with get_conn(**(instance.conn_params() if instance else {})) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT (SELECT system_identifier FROM pg_control_system()), current_database()")
+                _identities[instance] = tuple(cur.fetchone())
+    return _identities[instance]
+
+
+def is_primary(instance: Instance) -> bool:
+    """``instance`` is the ``PG*`` database results are gathered into."""
+    return server_identity(instance) == server_identity()
+
+
+def alive(instance: Instance) -> bool:
+    try:
+        with get_conn(**instance.conn_params()) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+def _task_params(run_id: str, task: pd.DataFrame) -> list:
+    dates = lambda col: [None if pd.isna(d) else d for d in pd.to_datetime(task[col]).dt.date] \
+        if col in task.columns else [None] * len(task)
+    return [list(task['strategy_name']), dates('from_date'), dates('to_date'), run_id]
+
+
+def _register_run(instance: Instance, run_id: str, n_strategies: int):
+    """``backtest_run`` row on a worker, so its sessions can be cancelled there."""
+    with get_conn(**instance.conn_params()) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO public.backtest_run (run_id, status, n_strategies, started_at) "
+                "VALUES (%s, 'running', %s, now()) ON CONFLICT (run_id) DO NOTHING",
+                (run_id, n_strategies),
+            )
+        conn.commit()
+
+
+def _finish_run(instance: Instance, run_id: str, status: str):
+    try:
+        with get_conn(**instance.conn_params()) as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE public.backtest_run SET status = %s, finished_at = now() WHERE run_id = %s",
+                            (status, run_id))
+            conn.commit()
+    except Exception as e:
+        print(f"⚠️ {instance.name}: could not mark run {status}: {e}")
+
+
+def _discard_task(instance: Instance, run_id: str, task: pd.DataFrame):
+    """Remove whatever a failed task committed on ``instance``."""
+    try:
+        with get_conn(**instance.conn_params()) as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM public.strategy_run_results r USING " + _TASK_FILTER,
+                            _task_params(run_id, task))
+            conn.commit()
+    except Exception:
+        pass    # unreachable: nothing to gather from it anyway
+
+
+def gather_task(instance: Instance, run_id: str, task: pd.DataFrame) -> int:
+    """Copy a finished task's rows from ``instance`` into the primary, then delete them there.
+
+    The primary's rows are already in place: gathering them would copy them
+    onto themselves and then delete both copies.
+    """
+    if is_primary(instance):
+        return 0
+    columns = ', '.join(f'r.{c}' for c in RESULT_COLUMNS)
+    buf = io.StringIO()
+    with get_conn(**instance.conn_params()) as worker:
+        with worker.cursor() as cur:
+            select = cur.mogrify(f"SELECT {columns} FROM public.strategy_run_results r, " + _TASK_FILTER,
+                                 _task_params(run_id, task)).decode()
+            cur.copy_expert(f"COPY ({select}) TO STDOUT", buf)
+        n_rows = buf.getvalue().count('\n')
+        buf.seek(0)
+        with get_conn() as primary:
+            with primary.cursor() as cur:
+                cur.copy_expert(
+                    f"COPY public.strategy_run_results ({', '.join(RESULT_COLUMNS)}) FROM STDIN", buf)
+            primary.commit()
+        _discard_task(instance, run_id, task)
+    return n_rows
+
+
+def _cancel_everywhere(instances: list[Instance], run_id: str):
+    for instance in instances:
+        try:
+            with get_conn(**instance.conn_params()) as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT public.fn_cancel_run(%s)", (run_id,))
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ {instance.name}: cancel failed: {e}")
+
+
+def make_tasks(df: pd.DataFrame, n_slots: int, costs: pd.DataFrame | None = None,
+               shards: int | None = None) -> list[pd.DataFrame]:
+    """Tasks for ``n_slots`` concurrent sessions, most expensive first."""
+    if shards:
+        return shard_strategies(df, shards)
+    weights = None if costs is None else costs['weight']
+    tasks = split_strategies(df, max(1, min(len(df), n_slots * TASKS_PER_SESSION)), weights)
+    if weights is not None:
+        tasks.sort(key=lambda t: float(weights.loc[t['strategy_name']].sum()), reverse=True)
+    return tasks
+
+
+def distribute_run(df: pd.DataFrame, instances: list[Instance] | None = None, run_id: str | None = None,
+                   sessions: int | None = None, stage_backend: str | None = None,
+                   use_cache: bool | None = None, shards: int | None = None,
+                   fused: bool | None = None, retries: int = 2) -> dict:
+    """Execute every strategy in ``df`` as run ``run_id`` across ``instances``.
+
+    Results end up in the primary's ``strategy_run_results`` as with
+    ``dispatch_run``; cached strategies are served there without running.
+    """
+    instances = instances or default_instances()
+    if not instances:
+        raise ValueError('No instances: pass instances or set BACKTEST_INSTANCES')
+    run_id = run_id or new_run_id()
+    sessions = sessions or default_sessions()
+    stage_backend = stage_backend or default_stage_backend()
+    use_cache = result_cache.cache_enabled() if use_cache is None else use_cache
+
+    keys, hits = _cache_keys(df) if use_cache else ({}, set())
+    cached = [n for n in df['strategy_name'] if n in keys and keys[n].cache_key in hits]
+    todo = df[~df['strategy_name'].isin(cached)]
+    costs = _estimate_costs(todo) if not todo.empty else None
+    tasks = make_tasks(todo, len(instances) * sessions, costs, shards) if not todo.empty else []
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            _start_run(cur, run_id, len(df), len(cached), len(instances) * sessions)
+            if costs is not None:
+                cost_estimator.record(cur, run_id, costs)
+        conn.commit()
+
+    live = [i for i in instances if alive(i)]
+    for instance in set(instances) - set(live):
+        print(f"⚠️ {instance.name} is unreachable, skipping it")
+    for instance in live:
+        if not is_primary(instance):
+            _register_run(instance, run_id, len(todo))
+    print(f"🌐 Run {run_id}: {len(df)} strategies, {len(cached)} from cache, {len(todo)} in "
+          f"{len(tasks)} tasks on {len(live)} instances x {sessions} sessions ({stage_backend} stages)")
+
+    pending: queue.Queue = queue.Queue()
+    for task in tasks:
+        pending.put((task, 0))
+    lock = threading.Lock()
+    state = {'remaining': len(tasks), 'cancelled': False}
+    done, failed, dropped = [], [], set()
+
+    def settle(outcome: list, item):
+        with lock:
+            outcome.append(item)
+            state['remaining'] -= 1
+
+    def session(instance: Instance):
+        while True:
+            with lock:
+                if state['remaining'] == 0 or state['cancelled'] or instance in dropped:
+                    return
+            try:
+                task, attempt = pending.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                share = run_share(run_id, task, stage_backend, fused, instance.conn_params())
+                rows = gather_task(instance, run_id, task)
+                settle(done, {**share, 'instance': instance.name, 'rows': rows})
+            except Exception as e:
+                _discard_task(instance, run_id, task)
+                if state['cancelled']:
+                    return
+                if attempt < retries:
+                    print(f"🔁 {instance.name}: task of {len(task)} strategies failed ({e}), re-dispatching")
+                    pending.put((task, attempt + 1))
+                else:
+                    settle(failed, (instance.name, list(task['strategy_name']), str(e)))
+                if not alive(instance):
+                    with lock:
+                        dropped.add(instance)
+                    print(f"💀 {instance.name} stopped answering, dropped from the pool")
+                    return
+
+    def watch_cancel():
+        while True:
+            with lock:
+                if state['remaining'] == 0 or len(dropped) == len(live):
+                    return
+            if _cancel_requested(run_id):
+                state['cancelled'] = True
+                _cancel_everywhere([i for i in live if not is_primary(i)], run_id)
+                return
+            time.sleep(2)
+
+    start = time.time()
+    threads = [threading.Thread(target=session, args=(i,), daemon=True) for i in live for _ in range(sessions)]
+    threads.append(threading.Thread(target=watch_cancel, daemon=True))
+    try:
+        if cached:
+            _serve_cached(run_id, cached, keys)
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if state['cancelled']:
+            raise RunCancelled(f'Run {run_id} cancelled')
+        if failed or state['remaining']:
+            details = '; '.join(f"{name}: {', '.join(strategies)}: {err}" for name, strategies, err in failed)
+            raise RuntimeError(f"{len(failed)} tasks failed after {retries} retries, "
+                               f"{state['remaining']} left with no live instance"
+                               + (f' ({details})' if details else ''))
+        if use_cache and not todo.empty:
+            _store_cached(run_id, todo, keys)
+    except RunCancelled:
+        _discard_results(run_id)
+        _set_run_status(run_id, 'cancelled', finished_at=pd.Timestamp.now().to_pydatetime())
+        for instance in live:
+            if not is_primary(instance):
+                _finish_run(instance, run_id, 'cancelled')
+        raise
+    except Exception as e:
+        _set_run_status(run_id, 'failed', finished_at=pd.Timestamp.now().to_pydatetime(), error=str(e))
+        for instance in set(live) - dropped:
+            if not is_primary(instance):
+                _finish_run(instance, run_id, 'failed')
+        raise
+
+    _set_run_status(run_id, 'done', finished_at=pd.Timestamp.now().to_pydatetime())
+    for instance in set(live) - dropped:
+        if not is_primary(instance):
+            _finish_run(instance, run_id, 'done')
+    if cached:
+        print(f"♻️ {len(cached)} strategies served from the result cache")
+    for instance in live:
+        mine = [d for d in done if d['instance'] == instance.name]
+        print(f"✅ {instance.name}: {len(mine)} tasks, {sum(len(d['strategies']) for d in mine)} strategies, "
+              f"{sum(d['rows'] for d in mine)} rows gathered")
+    print(f"🏁 Run {run_id} finished in {time.time() - start:.1f}s")
+    return {'run_id': run_id, 'tasks': done, 'cached': cached, 'dropped': [i.name for i in dropped]}
@@ -0,0 +1,70 @@
+"""Per-strategy run cost estimates (``sql/85_create_run_cost_estimate.sql``).
+
+A strategy costs ``est_rows * (entry_ms_per_row + round_ms_per_row *
+(max_reentry_rounds - 1))``: option rows in its date range from partition
+statistics, times stage time per row fitted on earlier runs. Without timing
+history ``est_ms`` is None and strategies are weighed by rows times rounds,
+which still orders them for longest-first scheduling.
+"""
+from typing import NamedTuple
+
+import pandas as pd
+
+
+class CostRates(NamedTuple):
+    entry_ms_per_row: float | None
+    round_ms_per_row: float
+    n_runs: int
+
+
+def fetch_rates(cur) -> CostRates:
+    cur.execute("SELECT entry_ms_per_row, round_ms_per_row, n_runs FROM public.fn_run_cost_rates()")
+    entry, per_round, n_runs = cur.fetchone()
+    return CostRates(None if entry is None else float(entry), float(per_round or 0), n_runs)
+
+
+def estimate(cur, settings_table: str) -> pd.DataFrame:
+    """One row per strategy of ``settings_table``: dates, rounds, est_rows, est_ms and weight."""
+    rates = fetch_rates(cur)
+    cur.execute(
+        f"""
+        SELECT strategy_name, from_date, to_date, max_reentry_rounds,
+               public.fn_estimate_option_rows(from_date, to_date)
+        FROM {settings_table}
+        """
+    )
+    costs = pd.DataFrame(cur.fetchall(), columns=[
+        'strategy_name', 'from_date', 'to_date', 'max_reentry_rounds', 'est_rows'])
+    costs['est_rows'] = costs['est_rows'].astype(float)
+    extra_rounds = (costs['max_reentry_rounds'].fillna(1).astype(int) - 1).clip(lower=0)
+    if rates.entry_ms_per_row is None:
+        costs['est_ms'] = None
+        costs['weight'] = costs['est_rows'] * (1 + extra_rounds)
+    else:
+        costs['est_ms'] = costs['est_rows'] * (rates.entry_ms_per_row + rates.round_ms_per_row * extra_rounds)
+        costs['weight'] = costs['est_ms']
+    costs.attrs['rates'] = rates
+    return costs.set_index('strategy_name', drop=False)
+
+
+def record(cur, run_id: str, costs: pd.DataFrame):
+    """Store the strategies a run computes, for later rate fitting."""
+    for row in costs.itertuples(index=False):
+        cur.execute(
+            "INSERT INTO public.run_strategy_estimate "
+            "(run_id, strategy_name, from_date, to_date, max_reentry_rounds, est_rows, est_ms) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s) ON CONFLICT DO NOTHING",
+            (run_id, row.strategy_name, row.from_date, row.to_date, row.max_reentry_rounds,
+             row.est_rows, None if pd.isna(row.est_ms) else float(row.est_ms)),
+        )
+
+
+def format_ms(ms: float | None) -> str:
+    if ms is None or pd.isna(ms):
+        return 'n/a'
+    seconds = ms / 1000
+    if seconds < 90:
+        return f'{seconds:.0f}s'
+    if seconds < 90 * 60:
+        return f'{seconds / 60:.0f} min'
+    return f'{seconds / 3600:.1f} h'
@@ -15,12 +15,13 @@ def _conn_params_from_env():
 
 
 @contextmanager
-def get_conn(dict_cursor: bool = True):
+def get_conn(dict_cursor: bool = True, **overrides):
     """Yield a psycopg2 connection. Close on exit.
 
-    Uses environment variables: PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD
+    Uses environment variables: PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD;
+    ``overrides`` (e.g. host/port of another instance) take precedence.
     """
-    params = _conn_params_from_env()
+    params = {**_conn_params_from_env(), **overrides}
     conn = psycopg2.connect(**params)
     try:
         yield conn
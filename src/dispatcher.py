@@ -0,0 +1,496 @@
+"""Run-scoped backtest dispatcher.
+
+A run (one upload) is split across several DB sessions. Each session leases
+its own isolated schema (see ``src/run_schema.py``), loads its share of the
+strategies into that schema's ``strategy_settings`` and calls
+``sp_run_strategy()`` there. Every result row lands in the shared
+``public.strategy_run_results`` tagged with ``run_id``, so concurrent runs
+never see or clobber each other's working state. Strategies already in the
+result cache (``src/result_cache.py``) are served from it instead of being run.
+The rest are dealt longest-first by their estimated cost
+(``src/cost_estimator.py``); ``estimate_run`` predicts a run's duration before
+it starts.
+
+With ``shards`` set, the date range of every strategy is cut into that many
+contiguous slices instead, and share *k* runs slice *k* of all strategies.
+With ``partitions`` there is one share per ``Nifty_options`` monthly
+partition, run ``workers`` at a time, so each session's filtered views (and
+hash tables) cover a single partition of the options data and the matching
+``Nifty50`` / ``ha_*`` slices. Every stage is scoped to a ``trade_date``, so
+the merged rows are the same as a serial run's.
+
+Before the first share starts, the market-data partitions covering the
+union of the strategies' date ranges are read into the buffer cache
+(``src/prewarm.py``; off with BACKTEST_PREWARM=off).
+
+``cancel_run`` stops a run from another session: it flags the run and
+interrupts every backend registered for it, and the pipeline stops at its
+next stage or re-entry round (``public.fn_check_cancel``).
+"""
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+from psycopg2 import sql as pgsql
+
+from . import cost_estimator, prewarm, result_cache
+from .db import get_conn
+from .run_schema import lease_run_schema, release_run_schema, set_search_path
+
+STRATEGY_SETTINGS_COLUMNS = [
+    'strategy_name', 'big_candle_tf', 'small_candle_tf', 'preferred_breakout_type',
+    'breakout_threshold_pct', 'option_entry_price_cap', 'hedge_entry_price_cap',
+    'num_entry_legs', 'num_hedge_legs', 'sl_percentage', 'eod_time', 'no_of_lots',
+    'lot_size', 'hedge_exit_entry_ratio', 'hedge_exit_multiplier', 'leg_profit_pct',
+    'portfolio_profit_target_pct', 'portfolio_stop_loss_pct', 'portfolio_capital',
+    'max_reentry_rounds', 'sl_type', 'box_sl_trigger_pct', 'box_sl_hard_pct',
+    'reentry_breakout_type', 'one_m_candle_tf', 'entry_candle', 'switch_pct',
+    'width_sl_pct', 'from_date', 'to_date',
+]
+
+
+# Config columns of the first memoized stage (sql/79_create_stage_memo.sql)
+MEMO_KEY_COLUMNS = [
+    'big_candle_tf', 'small_candle_tf', 'entry_candle', 'breakout_threshold_pct',
+    'from_date', 'to_date',
+]
+
+
+class RunCancelled(RuntimeError):
+    """The run was stopped through ``cancel_run``."""
+
+
+def default_stage_backend() -> str:
+    """'matview' (REFRESH chain) or 'unlogged' (UNLOGGED stage tables), from BACKTEST_STAGE_BACKEND."""
+    return os.getenv('BACKTEST_STAGE_BACKEND', 'matview')
+
+
+def new_run_id() -> str:
+    return time.strftime('%Y%m%d%H%M%S') + '-' + uuid.uuid4().hex[:8]
+
+
+def default_shards() -> int | None:
+    """Date shards per run from BACKTEST_DATE_SHARDS (unset: split by strategy)."""
+    shards = os.getenv('BACKTEST_DATE_SHARDS')
+    return int(shards) if shards else None
+
+
+def default_partitions() -> bool:
+    """Partition-wise shares unless BACKTEST_PARTITION_SHARDS is unset or off."""
+    return os.getenv('BACKTEST_PARTITION_SHARDS', 'off') != 'off'
+
+
+def default_workers(n_strategies: int) -> int:
+    """Sessions per run: BACKTEST_RUN_WORKERS (default 4), never more than strategies."""
+    workers = int(os.getenv('BACKTEST_RUN_WORKERS', 4))
+    return max(1, min(workers, n_strategies))
+
+
+def split_strategies(df: pd.DataFrame, n: int, weights: pd.Series | None = None) -> list[pd.DataFrame]:
+    """Deal strategies into ``n`` shares, most expensive first, least-loaded share next.
+
+    ``weights`` (by strategy_name, e.g. estimated ms) defaults to the date
+    range length. Strategies sharing a memo fingerprint (``MEMO_KEY_COLUMNS``)
+    are kept together so their common stages are computed once, but a group
+    worth k fair shares (total / ``n``) is cut into k pieces first, so grouping
+    never costs parallelism (a sweep over SL or portfolio settings is one group).
+    """
+    if weights is None:
+        span = (pd.to_datetime(df['to_date']) - pd.to_datetime(df['from_date'])).dt.days + 1
+    else:
+        span = df['strategy_name'].map(weights).fillna(0).astype(float)
+    keys = [c for c in MEMO_KEY_COLUMNS if c in df.columns]
+    if keys:
+        groups = [g for _, g in df.groupby(keys, dropna=False, sort=False)]
+    else:
+        groups = [df.iloc[[i]] for i in range(len(df))]
+    fair = span.sum() / n if span.sum() > 0 else 1.0
+    pieces = []
+    for g in groups:
+        k = max(1, min(len(g), round(span.loc[g.index].sum() / fair)))
+        pieces += _deal([g.iloc[[i]] for i in range(len(g))], span, k)
+    return _deal(pieces, span, n)
+
+
+def _deal(parts: list[pd.DataFrame], span: pd.Series, n: int) -> list[pd.DataFrame]:
+    """Longest-processing-time-first: heaviest part next onto the least-loaded of ``n`` bins."""
+    parts = sorted(parts, key=lambda p: span.loc[p.index].sum(), reverse=True)
+    loads = [0] * n
+    members: list[list[pd.DataFrame]] = [[] for _ in range(n)]
+    for p in parts:
+        i = loads.index(min(loads))
+        members[i].append(p)
+        loads[i] += span.loc[p.index].sum()
+    return [pd.concat(m) for m in members if m]
+
+
+def shard_dates(from_date, to_date, n: int) -> list[tuple]:
+    """Cut ``from_date..to_date`` into at most ``n`` contiguous, near-equal day ranges."""
+    start, end = pd.Timestamp(from_date).date(), pd.Timestamp(to_date).date()
+    days = (end - start).days + 1
+    n = max(1, min(n, days))
+    bounds = [start + timedelta(days=days * i // n) for i in range(n + 1)]
+    return [(bounds[i], bounds[i + 1] - timedelta(days=1)) for i in range(n)]
+
+
+def shard_strategies(df: pd.DataFrame, n: int) -> list[pd.DataFrame]:
+    """Share *k* holds slice *k* of every strategy's date range."""
+    shares: list[list[dict]] = [[] for _ in range(n)]
+    for _, row in df.iterrows():
+        for k, (lo, hi) in enumerate(shard_dates(row['from_date'], row['to_date'], n)):
+            shares[k].append({**row.to_dict(), 'from_date': lo, 'to_date': hi})
+    return [pd.DataFrame(s, columns=df.columns) for s in shares if s]
+
+
+def month_ranges(from_date, to_date) -> list[tuple]:
+    """Calendar months of ``from_date..to_date``, clipped to it."""
+    start, end = pd.Timestamp(from_date).date(), pd.Timestamp(to_date).date()
+    ranges = []
+    while start <= end:
+        next_month = (pd.Timestamp(start) + pd.offsets.MonthBegin(1)).date()
+        ranges.append((start, min(end, next_month - timedelta(days=1))))
+        start = next_month
+    return ranges
+
+
+def option_partitions(from_date, to_date) -> list[tuple]:
+    """``(from, to)`` of the Nifty_options partitions overlapping the range (calendar months if unpartitioned)."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT from_date, to_date FROM public.fn_option_partitions(%s, %s)",
+                        (pd.Timestamp(from_date).date(), pd.Timestamp(to_date).date()))
+            ranges = [tuple(r) for r in cur.fetchall()]
+    return ranges or month_ranges(from_date, to_date)
+
+
+def partition_strategies(df: pd.DataFrame) -> list[pd.DataFrame]:
+    """One share per options partition: every strategy clipped to it, largest share first."""
+    from_dates, to_dates = pd.to_datetime(df['from_date']), pd.to_datetime(df['to_date'])
+    shares = []
+    for lo, hi in option_partitions(from_dates.min(), to_dates.max()):
+        rows = []
+        for (_, row), f, t in zip(df.iterrows(), from_dates, to_dates):
+            start, end = max(f.date(), lo), min(t.date(), hi)
+            if start <= end:
+                rows.append({**row.to_dict(), 'from_date': start, 'to_date': end})
+        if rows:
+            shares.append(pd.DataFrame(rows, columns=df.columns))
+    span = lambda s: ((pd.to_datetime(s['to_date']) - pd.to_datetime(s['from_date'])).dt.days + 1).sum()
+    return sorted(shares, key=span, reverse=True)
+
+
+def _set_run_status(run_id: str, status: str, **fields):
+    cols = ['status'] + list(fields)
+    assignments = pgsql.SQL(', ').join(
+        pgsql.SQL('{} = %s').format(pgsql.Identifier(c)) for c in cols)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                pgsql.SQL('UPDATE public.backtest_run SET {} WHERE run_id = %s').format(assignments),
+                [status, *fields.values(), run_id],
+            )
+        conn.commit()
+
+
+def cancel_run(run_id: str) -> int:
+    """Request cancellation of ``run_id``; returns the number of backends interrupted."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT public.fn_cancel_run(%s)", (run_id,))
+            signalled = cur.fetchone()[0]
+        conn.commit()
+    print(f"🛑 Cancel requested for run {run_id} ({signalled} backends interrupted)")
+    return signalled
+
+
+def _start_run(cur, run_id: str, n_strategies: int, n_cached: int, n_workers: int):
+    """Mark ``run_id`` running, keeping a cancel requested before it started."""
+    cur.execute(
+        "INSERT INTO public.backtest_run AS r (run_id, status, n_strategies, n_cached, n_workers, started_at) "
+        "VALUES (%s, 'running', %s, %s, %s, now()) "
+        "ON CONFLICT (run_id) DO UPDATE SET "
+        "status = CASE WHEN r.cancel_requested_at IS NULL THEN 'running' ELSE 'cancelling' END, "
+        "n_strategies = EXCLUDED.n_strategies, n_cached = EXCLUDED.n_cached, n_workers = EXCLUDED.n_workers, "
+        "started_at = EXCLUDED.started_at, finished_at = NULL, error = NULL",
+        (run_id, n_strategies, n_cached, n_workers),
+    )
+
+
+def _cancel_requested(run_id: str) -> bool:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT cancel_requested_at IS NOT NULL FROM public.backtest_run WHERE run_id = %s",
+                        (run_id,))
+            row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def _discard_results(run_id: str):
+    """Drop whatever a cancelled run committed (e.g. rows served from the cache)."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM public.strategy_run_results WHERE run_id = %s", (run_id,))
+        conn.commit()
+
+
+# Rows of run A missing from run B (execution_time differs by construction)
+_DIFF_SQL = """
+SELECT COUNT(*) FROM (
+    SELECT strategy_name, trade_date, expiry_date, breakout_time, entry_time,
+           spot_price, option_type, strike, entry_price, sl_level, entry_round,
+           leg_type, transaction_type, exit_time, exit_price, exit_reason,
+           pnl_amount, total_pnl_per_day
+    FROM public.strategy_run_results WHERE run_id = %s
+    EXCEPT ALL
+    SELECT strategy_name, trade_date, expiry_date, breakout_time, entry_time,
+           spot_price, option_type, strike, entry_price, sl_level, entry_round,
+           leg_type, transaction_type, exit_time, exit_price, exit_reason,
+           pnl_amount, total_pnl_per_day
+    FROM public.strategy_run_results WHERE run_id = %s
+) d
+"""
+
+
+def diff_runs(run_a: str, run_b: str) -> tuple[int, int]:
+    """``(rows only in a, rows only in b)`` ignoring run_id and execution_time."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_DIFF_SQL, (run_a, run_b))
+            only_a = cur.fetchone()[0]
+            cur.execute(_DIFF_SQL, (run_b, run_a))
+            only_b = cur.fetchone()[0]
+    return only_a, only_b
+
+
+def _insert_settings(cur, df: pd.DataFrame, table: str = 'strategy_settings'):
+    columns = [c for c in STRATEGY_SETTINGS_COLUMNS if c in df.columns]
+    stmt = pgsql.SQL('INSERT INTO {} ({}) VALUES ({})').format(
+        pgsql.Identifier(table),
+        pgsql.SQL(', ').join(map(pgsql.Identifier, columns)),
+        pgsql.SQL(', ').join(pgsql.Placeholder() * len(columns)),
+    )
+    for _, row in df.iterrows():
+        cur.execute(stmt, [None if pd.isna(row[c]) else row[c] for c in columns])
+
+
+def run_share(run_id: str, df: pd.DataFrame, stage_backend: str = 'matview',
+              fused: bool | None = None, conn_params: dict | None = None) -> dict:
+    """Run one share of a run's strategies in a leased schema on its own session.
+
+    ``conn_params`` points the session at another instance (``src/coordinator.py``).
+    """
+    start = time.time()
+    with get_conn(**(conn_params or {})) as conn:
+        schema = lease_run_schema(conn, run_id, fused)
+        try:
+            with conn.cursor() as cur:
+                set_search_path(cur, schema)
+                cur.execute("SELECT set_config('backtest.run_id', %s, false)", (run_id,))
+                # committed now so cancel_run can find this backend
+                cur.execute("SELECT public.fn_register_run_backend(%s, %s)", (run_id, schema))
+                conn.commit()
+                cur.execute("SELECT set_config('backtest.stage_backend', %s, false)", (stage_backend,))
+                if os.getenv('BACKTEST_PLAN_CAPTURE_MS'):
+                    cur.execute("SELECT set_config('backtest.plan_capture_ms', %s, false)",
+                                (os.getenv('BACKTEST_PLAN_CAPTURE_MS'),))
+                if os.getenv('BACKTEST_REENTRY_FRONTIER'):
+                    cur.execute("SELECT set_config('backtest.reentry_frontier', %s, false)",
+                                (os.getenv('BACKTEST_REENTRY_FRONTIER'),))
+                cur.execute("TRUNCATE strategy_settings, strategy_leg_book")
+                _insert_settings(cur, df)
+                cur.execute("CALL sp_run_strategy()")
+            conn.commit()
+        finally:
+            release_run_schema(conn, schema)
+    return {
+        'schema': schema,
+        'strategies': list(df['strategy_name']),
+        'duration': time.time() - start,
+    }
+
+
+def _cache_keys(df: pd.DataFrame) -> tuple[dict, set]:
+    """Cache key per strategy (typed through strategy_settings) and the keys already cached."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE result_cache_probe (LIKE public.strategy_settings) ON COMMIT DROP")
+            _insert_settings(cur, df, 'result_cache_probe')
+            keys = result_cache.fetch_keys(cur, 'result_cache_probe')
+            hits = result_cache.cached_keys(cur, keys.values())
+        conn.commit()
+    return keys, hits
+
+
+def _estimate_costs(df: pd.DataFrame) -> pd.DataFrame:
+    """``cost_estimator.estimate`` for ``df`` (typed through strategy_settings)."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE cost_estimate_probe (LIKE public.strategy_settings) ON COMMIT DROP")
+            _insert_settings(cur, df, 'cost_estimate_probe')
+            costs = cost_estimator.estimate(cur, 'cost_estimate_probe')
+        conn.commit()
+    return costs
+
+
+def estimate_run(df: pd.DataFrame, workers: int | None = None, use_cache: bool | None = None,
+                 shards: int | None = None, partitions: bool | None = None) -> dict:
+    """Predicted cost of dispatching ``df``: per strategy and the run's wall time.
+
+    Cached strategies cost nothing; the rest are dealt into shares exactly as
+    ``dispatch_run`` would, and the slowest share is the predicted duration.
+    ``total_ms`` / ``makespan_ms`` are None without timing history.
+    """
+    use_cache = result_cache.cache_enabled() if use_cache is None else use_cache
+    shards = default_shards() if shards is None else shards
+    partitions = default_partitions() if partitions is None else partitions
+
+    keys, hits = _cache_keys(df) if use_cache else ({}, set())
+    cached = {n for n in df['strategy_name'] if n in keys and keys[n].cache_key in hits}
+    costs = _estimate_costs(df)
+    todo = df[~df['strategy_name'].isin(cached)]
+    timed = costs.attrs['rates'].entry_ms_per_row is not None
+
+    total_ms = makespan_ms = None
+    n_shares = 0
+    if not todo.empty:
+        if partitions:
+            # months run `workers` at a time; treated as evenly sized
+            n_shares = min(len(partition_strategies(todo)), workers or default_workers(len(todo)))
+        elif shards:
+            n_shares = shards
+        else:
+            shares = split_strategies(todo, workers or default_workers(len(todo)), costs['weight'])
+            n_shares = len(shares)
+        if timed:
+            total_ms = float(costs.loc[todo['strategy_name'], 'est_ms'].sum())
+            if partitions or shards:
+                makespan_ms = total_ms / n_shares
+            else:
+                makespan_ms = max(float(costs.loc[s['strategy_name'], 'est_ms'].sum()) for s in shares)
+
+    return {
+        'strategies': {
+            name: {'est_rows': costs.at[name, 'est_rows'],
+                   'est_ms': 0.0 if name in cached else costs.at[name, 'est_ms'],
+                   'cached': name in cached}
+            for name in df['strategy_name']
+        },
+        'total_ms': total_ms,
+        'makespan_ms': makespan_ms,
+        'shares': n_shares,
+        'history_runs': costs.attrs['rates'].n_runs,
+    }
+
+
+def prewarm_run_window(df: pd.DataFrame) -> list:
+    """Warm the buffer cache for the date windows of ``df``; a failed warm-up only warns."""
+    results = []
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                for lo, hi in prewarm.date_windows(df):
+                    results += prewarm.prewarm(cur, lo, hi)
+            conn.commit()
+    except Exception as e:
+        print(f"⚠️ Buffer-cache warm-up skipped: {e}")
+        return results
+    print(f"🔥 Prewarmed {prewarm.summary(results)}")
+    return results
+
+
+def _serve_cached(run_id: str, names: list[str], keys: dict):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for name in names:
+                result_cache.serve(cur, keys[name], name, run_id)
+        conn.commit()
+
+
+def _store_cached(run_id: str, df: pd.DataFrame, keys: dict):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for _, row in df.iterrows():
+                name = row['strategy_name']
+                result_cache.store(cur, keys[name], name, row.get('from_date'), row.get('to_date'), run_id)
+        conn.commit()
+
+
+def dispatch_run(df: pd.DataFrame, run_id: str | None = None, workers: int | None = None,
+                 stage_backend: str | None = None, use_cache: bool | None = None,
+                 shards: int | None = None, fused: bool | None = None,
+                 partitions: bool | None = None, prewarm_cache: bool | None = None) -> dict:
+    """Execute every strategy in ``df`` as run ``run_id`` across ``workers`` sessions.
+
+    Blocks until all shares finish. Several runs may be dispatched concurrently
+    (e.g. from different web requests); they only share the schema pool.
+    Strategies found in the result cache are copied into the run's results
+    without running; the rest are run and then cached. ``shards`` runs the
+    rest date-sharded and ``partitions`` (default: BACKTEST_PARTITION_SHARDS)
+    one share per options partition (see module docstring) instead of split by
+    strategy.
+    ``fused`` picks the fused stage pipeline (default: BACKTEST_FUSED_STAGES).
+    ``prewarm_cache`` warms the run's date window first (default: BACKTEST_PREWARM).
+    """
+    run_id = run_id or new_run_id()
+    stage_backend = stage_backend or default_stage_backend()
+    use_cache = result_cache.cache_enabled() if use_cache is None else use_cache
+    shards = default_shards() if shards is None else shards
+    partitions = default_partitions() if partitions is None else partitions
+    prewarm_cache = prewarm.prewarm_enabled() if prewarm_cache is None else prewarm_cache
+
+    keys, hits = _cache_keys(df) if use_cache else ({}, set())
+    cached = [n for n in df['strategy_name'] if n in keys and keys[n].cache_key in hits]
+    todo = df[~df['strategy_name'].isin(cached)]
+    costs = _estimate_costs(todo) if not todo.empty else None
+    if todo.empty:
+        shares = []
+    elif partitions:
+        shares = partition_strategies(todo)
+    elif shards:
+        shares = shard_strategies(todo, shards)
+    else:
+        shares = split_strategies(todo, workers or default_workers(len(todo)), costs['weight'])
+    # partition shares queue for `workers` sessions, largest first
+    sessions = min(len(shares), workers or default_workers(len(todo))) if partitions else len(shares)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            _start_run(cur, run_id, len(df), len(cached), sessions)
+            if costs is not None:
+                cost_estimator.record(cur, run_id, costs)
+        conn.commit()
+    if _cancel_requested(run_id):
+        _set_run_status(run_id, 'cancelled', finished_at=pd.Timestamp.now().to_pydatetime())
+        raise RunCancelled(f'Run {run_id} cancelled before it started')
+
+    mode = 'partition shares' if partitions else 'date shards' if shards else 'shares'
+    print(f"🚀 Run {run_id}: {len(df)} strategies, {len(cached)} from cache, "
+          f"{len(todo)} across {len(shares)} {mode} on {sessions} sessions ({stage_backend} stages)")
+    if prewarm_cache and shares:
+        prewarm_run_window(todo)
+    try:
+        if cached:
+            _serve_cached(run_id, cached, keys)
+        shares_done = []
+        if shares:
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                shares_done = list(pool.map(lambda share: run_share(run_id, share, stage_backend, fused), shares))
+        if use_cache and not todo.empty:
+            _store_cached(run_id, todo, keys)
+    except Exception as e:
+        if _cancel_requested(run_id):
+            _discard_results(run_id)
+            _set_run_status(run_id, 'cancelled', finished_at=pd.Timestamp.now().to_pydatetime())
+            raise RunCancelled(f'Run {run_id} cancelled') from e
+        _set_run_status(run_id, 'failed', finished_at=pd.Timestamp.now().to_pydatetime(), error=str(e))
+        raise
+
+    _set_run_status(run_id, 'done', finished_at=pd.Timestamp.now().to_pydatetime())
+    if cached:
+        print(f"♻️ {len(cached)} strategies served from the result cache")
+    for s in shares_done:
+        print(f"✅ {s['schema']}: {len(s['strategies'])} strategies in {s['duration']:.1f}s")
+    return {'run_id': run_id, 'shares': shares_done, 'cached': cached}
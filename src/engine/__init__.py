@@ -0,0 +1,14 @@
+"""In-memory NumPy backtest engine.
+
+Runs the same strategy as the SQL matview chain (``sp_run_strategy``) without
+materializing any stage: one trading day of market data is loaded into arrays
+(``market``), the legs of every round are simulated on them (``lifecycle``)
+and the re-entry cut and portfolio exit are applied (``portfolio``). The
+rows are written to ``strategy_run_results`` in the pipeline's format
+(``runner``), which makes it a fast path for wide parameter sweeps.
+"""
+from .lifecycle import Leg, run_day
+from .market import Day, load_day, trading_days
+from .params import Params, load_params
+from .portfolio import adjust_exits, final_legs
+from .runner import run_engine, run_strategy_day, store
@@ -0,0 +1,483 @@
+"""Leg lifecycle of one strategy on one day: breakouts, legs, exits, re-entry.
+
+Each function mirrors a group of pipeline stages (named in its docstring) and
+keeps their observable behaviour, quirks included, because the engine is only
+usable while it matches ``mv_portfolio_final_pnl`` leg for leg:
+
+* SL detection runs with ``sl_type = 'box_with_buffer_sl'`` whatever the
+  settings say, as ``mv_entry_sl_hits_round1`` / ``mv_reentry_sl_hits`` pin it.
+* Leg profit booking looks at every option minute after entry, not only up to
+  ``eod_time``.
+* Stats minutes with hedge prices but no entry prices count as "all entry
+  legs hit SL" (0 = 0) for the rehedge trigger.
+* A round's legs carry no pnl here; ``mv_all_entries_sl_tracking_adjusted``
+  recomputes it from the exit price (``portfolio.adjust_exits``).
+
+Entries within a round are vectorized as ``[leg, minute]`` arrays. Ties the
+SQL leaves to ``ROW_NUMBER`` order go to the lowest strike.
+"""
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+
+from .market import MINUTES, Chain, Day
+from .params import Params
+
+# mv_entry_sl_hits_round1 / mv_reentry_sl_hits select this regardless of strategy_settings.sl_type
+SL_TYPE = 'box_with_buffer_sl'
+
+BREAKOUT_TYPES = ['full_body_bullish', 'pct_breakout_bullish', 'full_body_bearish', 'pct_breakout_bearish']
+
+ALLOWED_BREAKOUTS = {
+    'full_candle_breakout': ('full_body_bullish', 'full_body_bearish'),
+    'pct_based_breakout': tuple(BREAKOUT_TYPES),
+}
+
+MARKET_OPEN = 9 * 60 + 15
+
+# ranked_sl order for exits in the same minute
+SL_REASONS = ['SL_HIT_BOX_HARD_SL', 'SL_HIT_BOX_TRIGGER_SL', 'SL_HIT_BOX_WIDTH_SL', 'SL_HIT_REGULAR_SL']
+
+
+class Leg(NamedTuple):
+    strategy_name: str
+    trade_date: date
+    expiry_date: date
+    breakout_time: int | None
+    entry_time: int
+    spot_price: float
+    option_type: str
+    strike: float
+    entry_price: float
+    entry_round: int
+    leg_type: str
+    transaction_type: str
+    exit_time: int | None = None
+    exit_price: float | None = None
+    exit_reason: str | None = None
+    pnl_amount: float | None = None
+    total_pnl_per_day: float | None = None
+
+
+class RoundKind(NamedTuple):
+    """Leg names of round 1 and of the re-entry rounds."""
+    entry: str
+    hedge: str
+    double_buy: str
+    double_buy_reason: str
+    rehedge: str
+
+
+ROUND1 = RoundKind('ENTRY', 'HEDGE', 'DOUBLE_BUY', 'DOUBLE_BUY_EOD_EXIT', 'REHEDGE')
+REENTRY = RoundKind('RE-ENTRY', 'HEDGE-RE-ENTRY', 'DOUBLE_BUY_REENTRY', 'DOUBLE_BUY_REENTRY_EOD_EXIT', 'REHEDGE_RENTRY')
+
+
+class Side(NamedTuple):
+    """The entry or hedge legs of a round: rows of one chain bought at ``entry_time``."""
+    option_type: str
+    chain: Chain
+    rows: np.ndarray
+
+    @property
+    def strikes(self) -> np.ndarray:
+        return self.chain.strikes[self.rows]
+
+
+class Setup(NamedTuple):
+    round: int
+    expiry: date
+    breakout_time: int | None
+    entry_time: int
+    spot: float
+    entry: Side
+    hedge: Side | None
+
+
+def round2(x):
+    """Postgres ``ROUND(x, 2)`` (half away from zero) on floats."""
+    return np.sign(x) * np.floor(np.abs(x) * 100 + 0.5 + 1e-6) / 100
+
+
+def _first(mask: np.ndarray) -> np.ndarray:
+    """First True minute of every row of a ``[leg, minute]`` mask, -1 where none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), -1)
+
+
+def _opposite(option_type: str) -> str:
+    return 'P' if option_type == 'C' else 'C'
+
+
+# --- breakouts (mv_all_5min_breakouts, mv_ranked_breakouts_with_rounds[_for_reentry]) ---
+
+def box(day: Day, p: Params) -> tuple[float, float] | None:
+    """(ha_high, ha_low) of the ``entry_candle``-th big candle (also mv_breakout_context_round1)."""
+    if not 1 <= p.entry_candle <= len(day.big):
+        return None
+    _, _, _, high, low = day.big[p.entry_candle - 1]
+    return high, low
+
+
+def breakouts(day: Day, p: Params) -> list[tuple[int, str]]:
+    """``(breakout_time, breakout_type)`` of every small candle breaking out of the box."""
+    bounds = box(day, p)
+    if bounds is None or not len(day.small):
+        return []
+    high, low = bounds
+    minute, o, c, h, lo = day.small.T
+    margin = np.abs(c - o) * p.breakout_threshold_pct
+    kind = np.select(
+        [
+            (o > high) & (c > high) & (h > high) & (lo > high),
+            (c > high + margin) & (h > high),
+            (o < low) & (c < low) & (h < low) & (lo < low),
+            (c < low - margin) & (lo < low),
+        ],
+        BREAKOUT_TYPES,
+        default='',
+    )
+    keep = (minute >= MARKET_OPEN + p.entry_candle * p.big_candle_tf) & (kind != '')
+    return [(int(t), str(k)) for t, k in zip(minute[keep], kind[keep])]
+
+
+def _entry_option_type(breakout_type: str) -> str:
+    return 'P' if breakout_type.endswith('bullish') else 'C'
+
+
+# --- strikes and legs (mv_base_strike_selection, mv_entry_and_hedge_legs and re-entry twins) ---
+
+def _atm(spot: float) -> float:
+    units = spot / 50.0
+    return (np.ceil(units) if units - np.floor(units) > 0.5 else np.floor(units)) * 50
+
+
+def _pick(order_keys: tuple, available: np.ndarray) -> int | None:
+    """Index of the best available row by ``order_keys`` (primary key first)."""
+    candidates = np.flatnonzero(available)
+    if not len(candidates):
+        return None
+    ranked = np.lexsort(tuple(k[candidates] for k in reversed(order_keys)))
+    return int(candidates[ranked[0]])
+
+
+def _ladder(strikes: np.ndarray, available: np.ndarray, base: float, above: bool, legs: int) -> np.ndarray:
+    side = strikes >= base if above else strikes <= base
+    return np.flatnonzero(available & side & (np.abs(strikes - base) <= 50 * (legs - 1)))
+
+
+def setups(day: Day, p: Params, rnd: int, breakout_time: int, option_type: str) -> list[Setup]:
+    """Entry and hedge legs of a round, one setup per expiry of the entry option type."""
+    entry_time = breakout_time + 5
+    if entry_time >= MINUTES or np.isnan(day.spot_open[entry_time]):
+        return []
+    spot = float(day.spot_open[entry_time])
+    atm = _atm(spot)
+    out = []
+    for expiry in day.expiries():
+        chain = day.chains.get((expiry, option_type))
+        if chain is None:
+            continue
+        price = chain.open[:, entry_time]
+        available = ~np.isnan(price)
+        otm = chain.strikes > atm if option_type == 'P' else chain.strikes < atm
+        priority = np.where(otm & (price <= p.option_entry_price_cap), 1, 2)
+        base = _pick((priority, np.abs(price - p.option_entry_price_cap)), available)
+        if base is None:
+            continue
+        entry = Side(option_type, chain,
+                     _ladder(chain.strikes, available, chain.strikes[base], option_type == 'P', p.num_entry_legs))
+
+        hedge = None
+        hedge_type = _opposite(option_type)
+        hedge_chain = day.chains.get((expiry, hedge_type))
+        if hedge_chain is not None:
+            h_price = hedge_chain.open[:, entry_time]
+            h_available = ~np.isnan(h_price)
+            at_atm = (hedge_chain.strikes == atm) & (h_price <= p.hedge_entry_price_cap)
+            h_base = _pick((np.where(at_atm, 0, 1), np.abs(h_price - p.hedge_entry_price_cap)), h_available)
+            if h_base is not None:
+                hedge = Side(hedge_type, hedge_chain,
+                             _ladder(hedge_chain.strikes, h_available, hedge_chain.strikes[h_base],
+                                     hedge_type == 'C', p.num_hedge_legs))
+        out.append(Setup(rnd, expiry, breakout_time, entry_time, spot, entry, hedge))
+    return out
+
+
+# --- one round (SL hits ... rehedge EOD exit) ---
+
+class _Exits(NamedTuple):
+    time: np.ndarray      # -1 where the leg has no such exit
+    price: np.ndarray
+    reason: list
+
+
+def _switch_ok(day: Day, option_type: str, high: float, low: float, switch_pct: float) -> np.ndarray:
+    """Minutes whose previous completed 5-minute HA candle passes the box switch test."""
+    minute, o, c = day.small[:, 0].astype(int), day.small[:, 1], day.small[:, 2]
+    body = np.abs(o - c)
+    reach = high - np.minimum(o, c) if option_type == 'P' else np.maximum(o, c) - low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ok = np.where(body > 0, reach / body, np.nan) >= switch_pct
+    at = np.zeros(MINUTES, dtype=bool)
+    at[minute] = ok
+    t = np.arange(MINUTES)
+    prev = t - t % 5 - 5
+    out = np.zeros(MINUTES, dtype=bool)
+    out[prev >= 0] = at[prev[prev >= 0]]
+    return out
+
+
+def _width_ok(day: Day, option_type: str, high: float, low: float, width_pct: float) -> np.ndarray:
+    close = day.one_m_close
+    with np.errstate(invalid='ignore'):
+        if option_type == 'P':
+            return close <= high - (high - low) * width_pct
+        return close >= low + (high - low) * width_pct
+
+
+def _sl_exits(day: Day, p: Params, s: Setup, o, h, c, live) -> _Exits:
+    """mv_entry_sl_hits_round1 + mv_entry_sl_executions_round1 (re-entry: mv_reentry_sl_*)."""
+    minute = np.arange(MINUTES)
+    after = live & (minute > s.entry_time)
+    price = s.entry.chain.open[s.entry.rows, s.entry_time]
+    hard_level = round2(price * (1 + p.box_sl_hard_pct))
+    trigger_level = round2(price * (1 + p.box_sl_trigger_pct))
+    regular_level = round2(price * (1 + p.sl_percentage))
+    n = len(s.entry.rows)
+    none = np.full(n, -1)
+
+    context = box(day, p)
+    with np.errstate(invalid='ignore'):
+        if SL_TYPE == 'box_with_buffer_sl':
+            hard = _first(after & (h >= hard_level[:, None]))
+            trigger = none
+            if context is not None:
+                switch = _switch_ok(day, s.entry.option_type, *context, p.switch_pct)
+                trigger = _first(after & (h >= trigger_level[:, None]) & switch[None, :])
+            regular = none
+        else:
+            hard = trigger = none
+            regular = _first(after & (h >= regular_level[:, None]))
+        width = none
+        if context is not None:
+            # the re-entry width SL has no ltp_time > entry_time filter
+            window = after if s.round == 1 else live
+            width = _first(window & _width_ok(day, s.entry.option_type, *context, p.width_sl_pct)[None, :])
+
+    hits = np.stack([hard, trigger, width, regular])
+    rank = np.where(hits >= 0, hits * len(SL_REASONS) + np.arange(len(SL_REASONS))[:, None], np.iinfo(np.int64).max)
+    kind = rank.argmin(axis=0)
+    time = np.where(rank.min(axis=0) < np.iinfo(np.int64).max, hits[kind, np.arange(n)], -1)
+
+    exit_price = np.full(n, np.nan)
+    reasons = [None] * n
+    for i in np.flatnonzero(time >= 0):
+        t, k = time[i], kind[i]
+        reasons[i] = SL_REASONS[k]
+        if k == 0:
+            exit_price[i] = hard_level[i]
+        elif k == 1:
+            exit_price[i] = max(round2((h[i, t] + c[i, t]) / 2.0), trigger_level[i])
+        elif k == 2:
+            exit_price[i] = h[i, t]
+        else:
+            exit_price[i] = regular_level[i]
+    return _Exits(time, exit_price, reasons)
+
+
+def simulate_round(day: Day, p: Params, s: Setup) -> tuple[list[Leg], list[Leg]]:
+    """All legs of one round and expiry (mv_all_legs_round1 / mv_all_legs_reentry rows).
+
+    Returns ``(legs, entry_exits)``; ``entry_exits`` are the entry legs' final
+    exits the leg book (and so the next round's trigger) reads.
+    """
+    kind = ROUND1 if s.round == 1 else REENTRY
+    eod = p.eod_time
+    minute = np.arange(MINUTES)
+    window = (minute >= s.entry_time) & (minute <= eod)
+    E, H = s.entry, s.hedge
+    eo, eh, ec = E.chain.open[E.rows], E.chain.high[E.rows], E.chain.close[E.rows]
+    e_price = eo[:, s.entry_time]
+    e_live = ~np.isnan(eo) & window
+    n = len(E.rows)
+    if H is not None:
+        ho = H.chain.open[H.rows]
+        h_price = ho[:, s.entry_time]
+        h_live = ~np.isnan(ho) & window
+    else:
+        ho = np.empty((0, MINUTES))
+        h_price = np.empty(0)
+        h_live = np.zeros((0, MINUTES), dtype=bool)
+
+    def leg(side: Side, i: int, leg_type: str, entry_price: float, **exit) -> Leg:
+        return Leg(p.strategy_name, day.trade_date, s.expiry, s.breakout_time, s.entry_time, s.spot,
+                   side.option_type, float(side.strikes[i]), float(entry_price), s.round, leg_type, 'SELL',
+                   **exit)
+
+    # entry exits: SL, then leg profit, then EOD (closed legs)
+    sl = _sl_exits(day, p, s, eo, eh, ec, e_live)
+    has_sl = sl.time >= 0
+    with np.errstate(invalid='ignore'):
+        profit = _first(~np.isnan(eo) & (minute > s.entry_time)
+                        & (eo <= round2(e_price * (1 - p.leg_profit_pct))[:, None]))
+    closed = []
+    for i in range(n):
+        if has_sl[i]:
+            closed.append((int(sl.time[i]), float(sl.price[i]), sl.reason[i]))
+        elif profit[i] >= 0:
+            closed.append((int(profit[i]), float(eo[i, profit[i]]), 'PROFIT_BOOKED'))
+        elif eod < MINUTES and not np.isnan(eo[i, eod]):
+            closed.append((eod, float(eo[i, eod]), 'EOD_CLOSE'))
+        else:
+            closed.append(None)
+
+    # mv_entry_round1_stats: per minute with any leg price in the live window
+    any_row = e_live.any(axis=0) | h_live.any(axis=0)
+    total = e_live.sum(axis=0)
+    sl_legs = (e_live & has_sl[:, None]).sum(axis=0)
+    entry_ltp = np.where(total > 0, np.where(e_live, eo, 0).sum(axis=0), np.nan)
+    hedge_ltp = np.where(h_live.any(axis=0), np.where(h_live, ho, -np.inf).max(axis=0), np.nan)
+
+    legs: list[Leg] = []
+    # mv_hedge_exit_on_all_entry_sl
+    all_sl: list[Leg] = []
+    if has_sl.any():
+        last = int(sl.time[has_sl].max())
+        if any_row[last] and sl_legs[last] == total[last]:
+            all_sl = [leg(H, j, kind.hedge, h_price[j], exit_time=last, exit_price=float(ho[j, last]),
+                          exit_reason='ALL_ENTRY_SL')
+                      for j in range(len(h_price)) if h_live[j, last]]
+
+    # mv_hedge_exit_partial_conditions (hedge and entry rows)
+    partial: list[Leg] = []
+    partial_time = None
+    if not all_sl:
+        with np.errstate(invalid='ignore'):
+            lt_hedge = any_row & (sl_legs == 0) & (hedge_ltp * p.hedge_exit_entry_ratio > entry_ltp)
+            over_hedge = (any_row & (sl_legs > 0) & (sl_legs < total)
+                          & (hedge_ltp > p.hedge_exit_multiplier * entry_ltp))
+        hit = np.flatnonzero(lt_hedge | over_hedge)
+        if len(hit):
+            partial_time = t = int(hit[0])
+            reason = 'EXIT_50PCT_ENTRY_LT_HEDGE' if lt_hedge[t] else 'EXIT_3X_HEDGE'
+            partial = [leg(H, j, kind.hedge, h_price[j], exit_time=t, exit_price=float(ho[j, t]), exit_reason=reason)
+                       for j in range(len(h_price)) if h_live[j, t]]
+            partial += [leg(E, i, kind.entry, e_price[i], exit_time=t, exit_price=float(eo[i, t]), exit_reason=reason)
+                        for i in range(n) if e_live[i, t]]
+    legs += all_sl + partial
+
+    # mv_hedge_eod_exit_round1
+    if not all_sl and not partial and eod < MINUTES:
+        legs += [leg(H, j, kind.hedge, h_price[j], exit_time=eod, exit_price=float(ho[j, eod]), exit_reason='EOD_CLOSE')
+                 for j in range(len(h_price)) if h_live[j, eod]]
+
+    # mv_entry_final_exit_round1 (round 1 also exits on a partial hedge exit) / mv_reentry_final_exit
+    entry_exits = []
+    for i in range(n):
+        exits = [closed[i]] if closed[i] else []
+        if s.round == 1 and partial and e_live[i, partial_time]:
+            exits.append((partial_time, float(eo[i, partial_time]), 'EXIT_ON_PARTIAL_HEDGE'))
+        if exits:
+            t, price, reason = min(exits, key=lambda x: x[0])
+            entry_exits.append(leg(E, i, kind.entry, e_price[i], exit_time=t, exit_price=price, exit_reason=reason))
+    legs += entry_exits
+
+    # mv_double_buy_legs_round1: buy back every SL-hit entry at its SL price, sold at the EOD close
+    if eod < MINUTES:
+        for i in np.flatnonzero(has_sl):
+            if e_live[i, eod]:
+                legs.append(Leg(p.strategy_name, day.trade_date, s.expiry, s.breakout_time, int(sl.time[i]), s.spot,
+                                E.option_type, float(E.strikes[i]), float(sl.price[i]), s.round, kind.double_buy, 'BUY',
+                                exit_time=eod, exit_price=float(ec[i, eod]), exit_reason=kind.double_buy_reason))
+
+    # mv_rehedge_trigger / candidate / selected / leg / eod_exit
+    if has_sl.any() and all_sl and (any_row & (sl_legs == total)).any():
+        trigger = int(sl.time[has_sl].max())
+        best = None
+        for h in all_sl:
+            t = h.exit_time + 1
+            chain = day.chains.get((s.expiry, _opposite(h.option_type)))
+            if chain is None or t <= trigger or t >= MINUTES:
+                continue
+            price = chain.open[:, t]
+            j = _pick((np.abs(price - h.exit_price),), ~np.isnan(price))
+            if j is not None and (best is None or (t, abs(price[j] - h.exit_price)) < best[0]):
+                best = ((t, abs(price[j] - h.exit_price)), h, chain, j, float(price[j]))
+        if best is not None and eod < MINUTES:
+            _, h, chain, j, price = best
+            exit_price = chain.open[j, eod]
+            if not np.isnan(exit_price):
+                legs.append(Leg(p.strategy_name, day.trade_date, s.expiry, None, trigger + 1, h.spot_price,
+                                _opposite(h.option_type), float(chain.strikes[j]), price, s.round, kind.rehedge,
+                                'SELL', exit_time=eod, exit_price=float(exit_price), exit_reason='EOD CLOSE'))
+    return legs, entry_exits
+
+
+# --- the day (round 1, then mv_reentry_triggered_breakouts rounds) ---
+
+def _scan_start(t: int) -> int:
+    """date_trunc('hour', t) + ceil(minute / 5) * 5 minutes."""
+    return t - t % 60 + -(-(t % 60) // 5) * 5
+
+
+def day_breakouts(day: Day, p: Params) -> tuple[tuple[int, str] | None, list[tuple[int, str]]]:
+    """Round 1's breakout and the re-entry candidates (same direction as round 1's).
+
+    mv_ranked_breakouts_with_rounds_for_reentry.
+    """
+    found = breakouts(day, p)
+    first = next(((t, k) for t, k in found if k in ALLOWED_BREAKOUTS.get(p.preferred_breakout_type, ())), None)
+    if first is None:
+        return None, []
+    direction = first[1].rsplit('_', 1)[1]
+    reentry = [(t, k) for t, k in found
+               if k.endswith(direction) and k in ALLOWED_BREAKOUTS.get(p.reentry_breakout_type, ())]
+    return first, reentry
+
+
+def round_legs(day: Day, p: Params, rnd: int, breakout_time: int, breakout_type: str) -> tuple[list[Leg], list[int]]:
+    """One round's legs and the minutes of its entry legs' SL hits."""
+    legs, sl_exits = [], []
+    for s in setups(day, p, rnd, breakout_time, _entry_option_type(breakout_type)):
+        out, exits = simulate_round(day, p, s)
+        legs += out
+        sl_exits += [e.exit_time for e in exits if e.exit_reason.startswith('SL_HIT_')]
+    return legs, sl_exits
+
+
+def next_breakout(reentry: list[tuple[int, str]], sl_exits: list[int]) -> tuple[int, str] | None:
+    """The next round's breakout: the first candidate from the 5-minute candle after the first SL hit.
+
+    mv_reentry_triggered_breakouts.
+    """
+    scan = _scan_start(min(sl_exits))
+    return next(((t, k) for t, k in reentry if t >= scan), None)
+
+
+def run_day(day: Day, p: Params) -> tuple[list[Leg], dict]:
+    """Every round's legs of one day and ``{round: next round's entry_time}``.
+
+    A round's first SL hit opens the scan for the next round's breakout (same
+    direction as round 1's) until ``max_reentry_rounds`` or a round books nothing.
+    """
+    first, reentry = day_breakouts(day, p)
+    if first is None:
+        return [], {}
+
+    legs: list[Leg] = []
+    next_entry: dict = {}
+    rnd, (breakout_time, breakout_type) = 1, first
+    while True:
+        out, sl_exits = round_legs(day, p, rnd, breakout_time, breakout_type)
+        if not out:
+            break
+        legs += out
+        if rnd >= p.max_reentry_rounds or not sl_exits:
+            break
+        nxt = next_breakout(reentry, sl_exits)
+        if nxt is None:
+            break
+        breakout_time, breakout_type = nxt
+        next_entry[rnd] = breakout_time + 5
+        rnd += 1
+    return legs, next_entry
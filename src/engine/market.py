@@ -0,0 +1,120 @@
+"""One trading day of market data as NumPy arrays.
+
+Every intraday series sits on a minute-of-day axis (``MINUTES`` columns,
+NaN where the source table has no row), so "the row at ``time``" is an index
+and "the first minute after ``t`` where ..." is an ``argmax`` over a boolean
+mask. Option prices are one ``[strike, minute]`` grid per (expiry,
+option_type) chain.
+"""
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+
+MINUTES = 24 * 60
+
+_MINUTE = 'floor(extract(epoch FROM {}) / 60)::int'
+_TIME = _MINUTE.format('"time"')
+
+SPOT_SQL = f'SELECT {_TIME}, open::float8 FROM public."Nifty50" WHERE date = %s'
+
+CANDLE_SQL = (
+    f'SELECT {_MINUTE.format("candle_time")}, ha_open::float8, ha_close::float8, ha_high::float8, ha_low::float8 '
+    'FROM public.{} WHERE trade_date = %s ORDER BY candle_time'
+)
+
+OPTIONS_SQL = (
+    f'SELECT expiry, option_type, strike::float8, {_TIME}, '
+    'open::float8, high::float8, close::float8 '
+    'FROM public."Nifty_options" WHERE date = %s'
+)
+
+
+class Chain(NamedTuple):
+    """Contracts of one (expiry, option_type): ascending ``strikes`` and ``[strike, minute]`` price grids."""
+    strikes: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    close: np.ndarray
+
+    def row(self, strike: float) -> int | None:
+        i = int(np.searchsorted(self.strikes, strike))
+        return i if i < len(self.strikes) and self.strikes[i] == strike else None
+
+
+class Day(NamedTuple):
+    trade_date: date
+    spot_open: np.ndarray     # Nifty50 open by minute
+    big: np.ndarray           # ha_big rows (minute, ha_open, ha_close, ha_high, ha_low) by candle_time
+    small: np.ndarray         # ha_small rows, same columns
+    one_m_close: np.ndarray   # ha_1m ha_close by minute
+    chains: dict              # (expiry, option_type) -> Chain
+
+    def price(self, expiry, option_type: str, strike: float, minute: int, field: str = 'open') -> float | None:
+        """``field`` of one contract at ``minute`` (None without a row)."""
+        chain = self.chains.get((expiry, option_type))
+        i = chain.row(strike) if chain else None
+        if i is None or not 0 <= minute < MINUTES:
+            return None
+        value = getattr(chain, field)[i, minute]
+        return None if np.isnan(value) else float(value)
+
+    def expiries(self) -> list:
+        return sorted({expiry for expiry, _ in self.chains})
+
+
+def by_minute(minutes: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Scatter ``values`` onto the minute axis (NaN elsewhere)."""
+    out = np.full(MINUTES, np.nan)
+    out[minutes.astype(int)] = values
+    return out
+
+
+def _rows(cur, query: str, trade_date, width: int) -> np.ndarray:
+    cur.execute(query, (trade_date,))
+    rows = cur.fetchall()
+    return np.array(rows, dtype=float).reshape(len(rows), width)
+
+
+def _chains(rows: list) -> dict:
+    groups: dict = {}
+    for expiry, option_type, strike, minute, o, h, c in rows:
+        groups.setdefault((expiry, option_type), []).append((strike, minute, o, h, c))
+    chains = {}
+    for key, group in groups.items():
+        data = np.array(group, dtype=float)
+        strikes = np.unique(data[:, 0])
+        rows_ix = np.searchsorted(strikes, data[:, 0])
+        cols = data[:, 1].astype(int)
+        grids = []
+        for column in (2, 3, 4):
+            grid = np.full((len(strikes), MINUTES), np.nan)
+            grid[rows_ix, cols] = data[:, column]
+            grids.append(grid)
+        chains[key] = Chain(strikes, *grids)
+    return chains
+
+
+def trading_days(cur, from_date, to_date) -> list[date]:
+    """Dates in ``from_date..to_date`` with big candles (the pipeline's first stage needs them)."""
+    cur.execute(
+        "SELECT DISTINCT trade_date FROM public.ha_big WHERE trade_date BETWEEN %s AND %s ORDER BY 1",
+        (from_date, to_date),
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def load_day(cur, trade_date) -> Day:
+    spot = _rows(cur, SPOT_SQL, trade_date, 2)
+    one_m = _rows(cur, CANDLE_SQL.format('ha_1m'), trade_date, 5)
+    big = _rows(cur, CANDLE_SQL.format('ha_big'), trade_date, 5)
+    small = _rows(cur, CANDLE_SQL.format('ha_small'), trade_date, 5)
+    cur.execute(OPTIONS_SQL, (trade_date,))
+    return Day(
+        trade_date=trade_date,
+        spot_open=by_minute(spot[:, 0], spot[:, 1]),
+        big=big,
+        small=small,
+        one_m_close=by_minute(one_m[:, 0], one_m[:, 2]),
+        chains=_chains(cur.fetchall()),
+    )
@@ -0,0 +1,98 @@
+"""Strategy parameters as the pipeline sees them (``runtime_strategy_config``).
+
+The settings rows are typed and defaulted through a temp copy of
+``strategy_settings`` and converted the way ``sp_load_runtime_config`` does
+(percentages / 100), so the engine and the SQL chain read the same values.
+"""
+from datetime import date
+from typing import NamedTuple
+
+import pandas as pd
+
+from ..dispatcher import _insert_settings
+
+
+class Params(NamedTuple):
+    strategy_name: str
+    big_candle_tf: float
+    small_candle_tf: float
+    entry_candle: int
+    preferred_breakout_type: str
+    reentry_breakout_type: str
+    breakout_threshold_pct: float
+    sl_type: str
+    sl_percentage: float
+    box_sl_trigger_pct: float
+    box_sl_hard_pct: float
+    width_sl_pct: float
+    switch_pct: float
+    num_entry_legs: int
+    num_hedge_legs: int
+    option_entry_price_cap: float
+    hedge_entry_price_cap: float
+    hedge_exit_entry_ratio: float
+    hedge_exit_multiplier: float
+    leg_profit_pct: float
+    portfolio_profit_target_pct: float
+    portfolio_stop_loss_pct: float
+    portfolio_capital: float
+    no_of_lots: int
+    lot_size: int
+    max_reentry_rounds: int
+    eod_time: int             # minute of day
+    from_date: date
+    to_date: date
+
+    @property
+    def quantity(self) -> int:
+        return self.lot_size * self.no_of_lots
+
+
+PARAMS_SQL = """
+SELECT
+    strategy_name,
+    big_candle_tf::float8,
+    small_candle_tf::float8,
+    entry_candle,
+    preferred_breakout_type,
+    reentry_breakout_type,
+    breakout_threshold_pct::float8 / 100.0,
+    sl_type,
+    sl_percentage::float8 / 100.0,
+    box_sl_trigger_pct::float8 / 100.0,
+    box_sl_hard_pct::float8 / 100.0,
+    width_sl_pct::float8 / 100.0,
+    switch_pct::float8 / 100.0,
+    num_entry_legs,
+    num_hedge_legs,
+    option_entry_price_cap::float8,
+    hedge_entry_price_cap::float8,
+    hedge_exit_entry_ratio::float8 / 100.0,
+    hedge_exit_multiplier::float8,
+    leg_profit_pct::float8 / 100.0,
+    portfolio_profit_target_pct::float8 / 100.0,
+    portfolio_stop_loss_pct::float8 / 100.0,
+    portfolio_capital::float8,
+    no_of_lots,
+    lot_size,
+    max_reentry_rounds::int,
+    floor(extract(epoch FROM eod_time) / 60)::int,
+    from_date,
+    to_date
+FROM engine_settings
+ORDER BY strategy_name
+"""
+
+
+def load_params(cur, df: pd.DataFrame) -> list[Params]:
+    """``Params`` of every row of a strategy settings frame (same format as the web upload)."""
+    cur.execute("CREATE TEMP TABLE engine_settings (LIKE public.strategy_settings INCLUDING DEFAULTS) ON COMMIT DROP")
+    _insert_settings(cur, df, 'engine_settings')
+    cur.execute(PARAMS_SQL)
+    params = [Params(*row) for row in cur.fetchall()]
+    for p in params:
+        if p.from_date is None or p.to_date is None:
+            raise ValueError(f'Date range not defined for strategy {p.strategy_name}')
+        if p.from_date > p.to_date:
+            raise ValueError(f'from_date ({p.from_date}) cannot be after to_date ({p.to_date})')
+    return params
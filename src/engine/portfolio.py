@@ -0,0 +1,128 @@
+"""Cross-round and portfolio stages of one strategy-day (``58_*`` to ``60_*`` views).
+
+``adjust_exits`` closes a round's legs when the next round enters
+(mv_all_entries_sl_tracking_adjusted), ``portfolio_exit`` finds the first
+minute the expiry's MTM crosses the capital target or stop
+(mv_portfolio_mtm_pnl) and ``final_legs`` applies it
+(mv_portfolio_final_pnl). The SQL branch that completes ``'HEDGE-REENTRY'``
+legs never matches a leg type the pipeline produces, so it has no twin here.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from .lifecycle import Leg, round2
+from .market import Day
+from .params import Params
+
+MTM_START = 9 * 60 + 36
+
+
+def _sign(leg: Leg) -> int:
+    return -1 if leg.transaction_type == 'BUY' else 1
+
+
+def _pnl(leg: Leg, exit_price, quantity: int):
+    if exit_price is None:
+        return None
+    return float(round2(_sign(leg) * (leg.entry_price - exit_price) * quantity))
+
+
+def adjust_exits(day: Day, p: Params, legs: list[Leg], next_entry: dict) -> list[Leg]:
+    """Cut every round at the next round's entry and price the legs' pnl."""
+    out = {}
+    for leg in legs:
+        exit_time, exit_price, reason = leg.exit_time, leg.exit_price, leg.exit_reason
+        cut = next_entry.get(leg.entry_round)
+        if cut is not None and exit_time > cut:
+            exit_time, reason = cut, 'Closed due to re-entry'
+            exit_price = None
+            if not np.isnan(day.spot_open[cut]):
+                exit_price = day.price(leg.expiry_date, leg.option_type, leg.strike, cut)
+        if exit_time <= leg.entry_time:
+            continue
+        leg = leg._replace(exit_time=exit_time, exit_price=exit_price, exit_reason=reason,
+                           pnl_amount=_pnl(leg, exit_price, p.quantity))
+        key = (leg.expiry_date, leg.entry_time, leg.option_type, leg.strike, leg.leg_type, leg.entry_round)
+        if key not in out or leg.exit_time < out[key].exit_time:
+            out[key] = leg
+    return list(out.values())
+
+
+def portfolio_exit(day: Day, p: Params, expiry, legs: list[Leg]) -> tuple[int, str] | None:
+    """``(minute, reason)`` of the first portfolio profit/stop hit of one expiry."""
+    chains = {k: c for k, c in day.chains.items() if k[0] == expiry}
+    if not chains or not legs:
+        return None
+    has_rows = np.zeros(day.spot_open.shape, dtype=bool)
+    for c in chains.values():
+        has_rows |= ~np.isnan(c.open).all(axis=0)
+    n_expiries = np.zeros(day.spot_open.shape, dtype=int)
+    for e in day.expiries():
+        rows = np.zeros(day.spot_open.shape, dtype=bool)
+        for (ex, _), c in day.chains.items():
+            if ex == e:
+                rows |= ~np.isnan(c.open).all(axis=0)
+        n_expiries += rows
+
+    minutes = np.arange(len(has_rows))
+    realized = np.zeros(len(minutes))
+    unrealized = np.zeros(len(minutes))
+    q = p.quantity
+    for leg in legs:
+        sign = _sign(leg)
+        if leg.exit_price is not None:
+            realized[minutes > leg.exit_time] += sign * (leg.entry_price - leg.exit_price) * q
+        if expiry == day.trade_date:
+            chain = chains.get((expiry, leg.option_type))
+            i = chain.row(leg.strike) if chain else None
+            if i is not None:
+                live = (minutes >= leg.entry_time) & (minutes < leg.exit_time) & ~np.isnan(chain.open[i])
+                unrealized[live] += sign * (leg.entry_price - chain.open[i][live]) * q
+    # the SQL joins every expiry's option rows per minute, multiplying the unrealized sum
+    total = round2(realized + unrealized * n_expiries)
+
+    active = has_rows & (minutes >= MTM_START)
+    target = p.portfolio_capital * p.portfolio_profit_target_pct
+    stop = p.portfolio_capital * p.portfolio_stop_loss_pct
+    hit = np.flatnonzero(active & ((total >= target) | (total <= -stop)))
+    if not len(hit):
+        return None
+    t = int(hit[0])
+    return t, 'Portfolio Exit - Profit' if total[t] >= target else 'Portfolio Exit - Loss'
+
+
+def final_legs(day: Day, p: Params, legs: list[Leg]) -> list[Leg]:
+    """Apply each expiry's portfolio exit and stamp ``total_pnl_per_day``."""
+    by_expiry = defaultdict(list)
+    for leg in legs:
+        by_expiry[leg.expiry_date].append(leg)
+
+    out = []
+    for expiry, group in sorted(by_expiry.items()):
+        trigger = portfolio_exit(day, p, expiry, group)
+        if trigger is None:
+            final = group
+        else:
+            t, reason = trigger
+            invalid = {(l.option_type, l.strike, l.entry_round, l.leg_type) for l in group if l.entry_time > t}
+            candidates = [(l, 0) for l in group]
+            for l in group:
+                if l.entry_time <= t <= l.exit_time:
+                    price = day.price(expiry, l.option_type, l.strike, t)
+                    if price is not None:
+                        candidates.append((l._replace(exit_time=t, exit_price=price, exit_reason=reason,
+                                                      pnl_amount=_pnl(l, price, p.quantity)), 1))
+            best = {}
+            for l, portfolio_row in candidates:
+                key = (l.option_type, l.strike, l.leg_type, l.entry_round)
+                if (l.option_type, l.strike, l.entry_round, l.leg_type) in invalid:
+                    continue
+                rank = (l.exit_time is None, l.exit_time or 0, portfolio_row)
+                if key not in best or rank < best[key][0]:
+                    best[key] = (rank, l)
+            final = [l for _, l in best.values()]
+        pnls = [l.pnl_amount for l in final if l.pnl_amount is not None]
+        total = float(round2(sum(pnls))) if pnls else None
+        out += [l._replace(total_pnl_per_day=total) for l in final]
+    return out
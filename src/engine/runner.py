@@ -0,0 +1,100 @@
+"""Run a strategy frame through the engine and store it as a ``backtest_run``.
+
+Each trading day in the union of the strategies' date ranges is loaded once
+and every strategy covering it runs on the same arrays, so a sweep of many
+parameter sets costs one market-data read per day. Results are written to
+``strategy_run_results`` under the run's ``run_id`` like a dispatched run's.
+"""
+import time
+from datetime import time as dtime
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from .. import prewarm
+from ..db import get_conn
+from ..dispatcher import RunCancelled, _cancel_requested, _discard_results, _set_run_status, _start_run, new_run_id
+from .lifecycle import Leg, run_day
+from .market import load_day, trading_days
+from .params import Params, load_params
+from .portfolio import adjust_exits, final_legs
+
+RESULT_COLUMNS = [
+    'strategy_name', 'trade_date', 'expiry_date', 'breakout_time', 'entry_time', 'spot_price',
+    'option_type', 'strike', 'entry_price', 'sl_level', 'entry_round', 'leg_type',
+    'transaction_type', 'exit_time', 'exit_price', 'exit_reason', 'pnl_amount',
+    'total_pnl_per_day', 'run_id',
+]
+
+
+def _time(minute: int | None) -> dtime | None:
+    return None if minute is None else dtime(minute // 60, minute % 60)
+
+
+def _row(leg: Leg, run_id: str) -> tuple:
+    return (
+        leg.strategy_name, leg.trade_date, leg.expiry_date, _time(leg.breakout_time), _time(leg.entry_time),
+        leg.spot_price, leg.option_type, leg.strike, leg.entry_price, '0', leg.entry_round, leg.leg_type,
+        leg.transaction_type, _time(leg.exit_time), leg.exit_price, leg.exit_reason, leg.pnl_amount,
+        leg.total_pnl_per_day, run_id,
+    )
+
+
+def run_strategy_day(day, p: Params) -> list[Leg]:
+    """Final legs of one strategy on one loaded day (what the pipeline stores for it)."""
+    legs, next_entry = run_day(day, p)
+    if not legs:
+        return []
+    return final_legs(day, p, adjust_exits(day, p, legs, next_entry))
+
+
+def store(cur, run_id: str, legs: list[Leg]):
+    execute_values(
+        cur,
+        f"INSERT INTO public.strategy_run_results ({', '.join(RESULT_COLUMNS)}) VALUES %s",
+        [_row(leg, run_id) for leg in legs],
+    )
+
+
+def run_engine(df: pd.DataFrame, run_id: str | None = None) -> dict:
+    """Run every strategy in ``df`` in memory as run ``run_id``; one commit per trading day."""
+    run_id = run_id or new_run_id()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            _start_run(cur, run_id, len(df), 0, 1)
+        conn.commit()
+
+    print(f"🚀 Run {run_id}: {len(df)} strategies on the in-memory engine")
+    start = time.time()
+    n_days = n_rows = 0
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                params = load_params(cur, df)
+                conn.commit()
+                for lo, hi in prewarm.date_windows(df):
+                    for trade_date in trading_days(cur, lo, hi):
+                        if _cancel_requested(run_id):
+                            raise RunCancelled(f'Run {run_id} cancelled')
+                        day = load_day(cur, trade_date)
+                        legs = []
+                        for p in params:
+                            if p.from_date <= trade_date <= p.to_date:
+                                legs += run_strategy_day(day, p)
+                        if legs:
+                            store(cur, run_id, legs)
+                        conn.commit()
+                        n_days += 1
+                        n_rows += len(legs)
+    except RunCancelled:
+        _discard_results(run_id)
+        _set_run_status(run_id, 'cancelled', finished_at=pd.Timestamp.now().to_pydatetime())
+        raise
+    except Exception as e:
+        _set_run_status(run_id, 'failed', finished_at=pd.Timestamp.now().to_pydatetime(), error=str(e))
+        raise
+
+    duration = time.time() - start
+    _set_run_status(run_id, 'done', finished_at=pd.Timestamp.now().to_pydatetime())
+    print(f"✅ Run {run_id}: {n_rows} rows over {n_days} days in {duration:.1f}s")
+    return {'run_id': run_id, 'days': n_days, 'rows': n_rows, 'duration': duration}
@@ -0,0 +1,214 @@
+"""Leg-level parity between the SQL pipeline and an alternative engine.
+
+``check_parity`` runs the same strategy settings once through the SQL
+pipeline (``dispatch_run``) and once through an engine in ``ENGINES``, then
+pairs the two runs' ``strategy_run_results`` rows leg by leg: one leg per
+(strategy, trade_date, expiry, round, leg_type, option_type, strike), which is
+what ``mv_portfolio_final_pnl`` keeps. Each pair is compared on entry/exit
+time, prices, exit_reason and pnl_amount, and each mismatch is attributed to
+the stage that produces that value (``stage_of_origin``), so a report points
+at e.g. ``mv_reentry_sl_executions`` rather than at a row count.
+
+Run it inside ``template_db.cloned_database`` to get identical, small fixture
+data for both sides (``scripts/check_parity.py --template``).
+
+``check_frontier_parity`` diffs two SQL runs instead: the re-entry loop with
+``backtest.reentry_frontier`` off (every round recomputed each pass) against
+on (each pass starts from every day's newest booked round).
+"""
+import os
+from typing import NamedTuple
+
+import pandas as pd
+
+from .db import get_conn
+from .dispatcher import dispatch_run
+from .engine import run_engine
+
+# Alternative engines: callable(df, run_id=None) -> {'run_id': ...}
+ENGINES = {'numpy': run_engine}
+
+LEG_KEY = ['strategy_name', 'trade_date', 'expiry_date', 'entry_round', 'leg_type', 'option_type', 'strike']
+PRICE_FIELDS = ['entry_price', 'exit_price', 'pnl_amount']
+COMPARED = ['entry_time', 'entry_price', 'exit_time', 'exit_price', 'exit_reason', 'pnl_amount']
+
+# (round 1 stage, re-entry stage) creating each leg type
+LEG_STAGES = {
+    'ENTRY': ('mv_entry_and_hedge_legs', None),
+    'HEDGE': ('mv_entry_and_hedge_legs', None),
+    'RE-ENTRY': (None, 'mv_reentry_legs_and_hedge_legs'),
+    'HEDGE-RE-ENTRY': (None, 'mv_reentry_legs_and_hedge_legs'),
+    'DOUBLE_BUY': ('mv_double_buy_legs_round1', None),
+    'DOUBLE_BUY_REENTRY': (None, 'mv_double_buy_legs_reentry'),
+    'REHEDGE': ('mv_rehedge_selected_round1', None),
+    'REHEDGE_RENTRY': (None, 'mv_rehedge_selected_reentry'),
+}
+
+# (round 1 stage, re-entry stage) setting each exit_reason, matched by prefix
+EXIT_STAGES = [
+    ('SL_HIT_', ('mv_entry_sl_executions_round1', 'mv_reentry_sl_executions')),
+    ('PROFIT_BOOKED', ('mv_entry_profit_booking_round1', 'mv_reentry_profit_booking')),
+    ('ALL_ENTRY_SL', ('mv_hedge_exit_on_all_entry_sl', 'mv_hedge_reentry_exit_on_all_entry_sl')),
+    ('EXIT_50PCT_ENTRY_LT_HEDGE', ('mv_hedge_exit_partial_conditions', 'mv_hedge_reentry_exit_on_partial_conditions')),
+    ('EXIT_3X_HEDGE', ('mv_hedge_exit_partial_conditions', 'mv_hedge_reentry_exit_on_partial_conditions')),
+    ('EXIT_ON_PARTIAL_HEDGE', ('mv_entry_exit_on_partial_hedge_round1', 'mv_reentry_exit_on_partial_hedge')),
+    ('DOUBLE_BUY', ('mv_double_buy_legs_round1', 'mv_double_buy_legs_reentry')),
+    ('EOD CLOSE', ('mv_rehedge_eod_exit_round1', 'mv_rehedge_eod_exit_reentry')),
+    ('Closed due to re-entry', ('mv_all_entries_sl_tracking_adjusted', 'mv_all_entries_sl_tracking_adjusted')),
+    ('Portfolio Exit', ('mv_portfolio_mtm_pnl', 'mv_portfolio_mtm_pnl')),
+]
+
+HEDGE_LEGS = {'HEDGE', 'HEDGE-RE-ENTRY'}
+
+
+class Mismatch(NamedTuple):
+    strategy_name: str
+    trade_date: object
+    expiry_date: object
+    entry_round: int
+    leg_type: str
+    option_type: str
+    strike: float
+    field: str              # a COMPARED column, or 'leg' for a leg only one side has
+    sql_value: object
+    engine_value: object
+    stage: str
+
+
+class ParityReport(NamedTuple):
+    sql_run: str
+    engine_run: str
+    sql_legs: int
+    engine_legs: int
+    mismatches: list[Mismatch]
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches
+
+
+def _pick(stages: tuple, entry_round: int) -> str | None:
+    return stages[0] if entry_round == 1 else stages[1]
+
+
+def stage_of_origin(leg_type: str, entry_round: int, field: str, exit_reason: str | None) -> str:
+    """Pipeline stage producing ``field`` of a leg (the stage to look at when it differs)."""
+    creator = _pick(LEG_STAGES.get(leg_type, (None, None)), entry_round) or 'mv_portfolio_final_pnl'
+    if field == 'leg':
+        return creator
+    if field == 'entry_time' and leg_type in ('ENTRY', 'HEDGE'):
+        return 'mv_ranked_breakouts_with_rounds'
+    if field == 'entry_time' and leg_type in ('RE-ENTRY', 'HEDGE-RE-ENTRY'):
+        return 'mv_reentry_triggered_breakouts'
+    if field == 'entry_price':
+        return creator
+    reason = exit_reason or ''
+    if field == 'pnl_amount' and not reason.startswith('Portfolio Exit'):
+        return 'mv_all_entries_sl_tracking_adjusted'
+    if reason == 'EOD_CLOSE':
+        if leg_type in HEDGE_LEGS:
+            return _pick(('mv_hedge_eod_exit_round1', 'mv_hedge_reentry_eod_exit'), entry_round)
+        return _pick(('mv_entry_eod_close_round1', 'mv_reentry_eod_close'), entry_round)
+    for prefix, stages in EXIT_STAGES:
+        if reason.startswith(prefix):
+            return _pick(stages, entry_round)
+    return 'mv_portfolio_final_pnl'
+
+
+def load_legs(run_id: str) -> pd.DataFrame:
+    """A run's result rows, one per leg, with prices as floats."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {', '.join(LEG_KEY + COMPARED)} FROM public.strategy_run_results "
+                "WHERE run_id = %s ORDER BY entry_time, exit_time",
+                (run_id,),
+            )
+            rows = cur.fetchall()
+    return legs_frame(rows)
+
+
+def legs_frame(rows: list[tuple]) -> pd.DataFrame:
+    """Legs as ``diff_legs`` takes them, from ``LEG_KEY + COMPARED`` tuples."""
+    df = pd.DataFrame(rows, columns=LEG_KEY + COMPARED)
+    for col in PRICE_FIELDS + ['strike']:
+        df[col] = pd.to_numeric(df[col]).astype(float)
+    # legs sharing a key (should not happen after mv_portfolio_final_pnl) pair up in entry order
+    df['dup'] = df.groupby(LEG_KEY, dropna=False).cumcount()
+    return df
+
+
+def _same(field: str, a, b, tolerance: float) -> bool:
+    if pd.isna(a) or pd.isna(b):
+        return pd.isna(a) and pd.isna(b)
+    if field in PRICE_FIELDS:
+        return abs(a - b) <= tolerance
+    return a == b
+
+
+def diff_legs(sql: pd.DataFrame, engine: pd.DataFrame, tolerance: float = 0.01) -> list[Mismatch]:
+    """Every field of every leg where ``engine`` differs from ``sql`` (prices within ``tolerance``)."""
+    merged = sql.merge(engine, on=LEG_KEY + ['dup'], how='outer', suffixes=('_sql', '_engine'), indicator=True)
+    out = []
+    for r in merged.to_dict('records'):
+        key = [r[c] for c in LEG_KEY]
+        leg_type, entry_round = r['leg_type'], int(r['entry_round'])
+        if r['_merge'] != 'both':
+            side = 'sql' if r['_merge'] == 'left_only' else 'engine'
+            reason = r[f'exit_reason_{side}']
+            out.append(Mismatch(*key, 'leg', side == 'sql', side == 'engine',
+                                stage_of_origin(leg_type, entry_round, 'leg', reason)))
+            continue
+        reason = r['exit_reason_sql'] if pd.notna(r['exit_reason_sql']) else r['exit_reason_engine']
+        for field in COMPARED:
+            a, b = r[f'{field}_sql'], r[f'{field}_engine']
+            if not _same(field, a, b, tolerance):
+                out.append(Mismatch(*key, field, a, b, stage_of_origin(leg_type, entry_round, field, reason)))
+    return out
+
+
+def summarize(mismatches: list[Mismatch]) -> pd.DataFrame:
+    """Mismatch counts per stage of origin and field, most frequent first."""
+    if not mismatches:
+        return pd.DataFrame(columns=['stage', 'field', 'mismatches', 'legs', 'days'])
+    df = pd.DataFrame(mismatches, columns=Mismatch._fields)
+    df['leg'] = list(zip(*(df[c] for c in LEG_KEY)))
+    df['day'] = list(zip(df['strategy_name'], df['trade_date']))
+    return (df.groupby(['stage', 'field'])
+              .agg(mismatches=('leg', 'size'), legs=('leg', 'nunique'), days=('day', 'nunique'))
+              .reset_index()
+              .sort_values(['mismatches', 'stage'], ascending=[False, True])
+              .reset_index(drop=True))
+
+
+def compare_runs(sql_run: str, engine_run: str, tolerance: float = 0.01) -> ParityReport:
+    sql, engine = load_legs(sql_run), load_legs(engine_run)
+    return ParityReport(sql_run, engine_run, len(sql), len(engine), diff_legs(sql, engine, tolerance))
+
+
+def check_parity(df: pd.DataFrame, engine: str = 'numpy', tolerance: float = 0.01) -> ParityReport:
+    """Run ``df`` through the SQL pipeline and ``engine`` on the current database and diff the legs."""
+    sql_run = dispatch_run(df, workers=1, use_cache=False, shards=0, partitions=False, prewarm_cache=False)
+    engine_run = ENGINES[engine](df)
+    return compare_runs(sql_run['run_id'], engine_run['run_id'], tolerance)
+
+
+def check_frontier_parity(df: pd.DataFrame, tolerance: float = 0.01) -> ParityReport:
+    """Run ``df`` through the SQL pipeline with the re-entry frontier off, then on, and diff the legs.
+
+    Only strategies with ``max_reentry_rounds`` >= 3 exercise it: up to round 2
+    the only booked round is round 1 either way.
+    """
+    saved = os.environ.get('BACKTEST_REENTRY_FRONTIER')
+    runs = {}
+    try:
+        for frontier in ('off', 'on'):
+            os.environ['BACKTEST_REENTRY_FRONTIER'] = frontier
+            runs[frontier] = dispatch_run(df, workers=1, use_cache=False, shards=0, partitions=False,
+                                          prewarm_cache=False)['run_id']
+    finally:
+        if saved is None:
+            os.environ.pop('BACKTEST_REENTRY_FRONTIER', None)
+        else:
+            os.environ['BACKTEST_REENTRY_FRONTIER'] = saved
+    return compare_runs(runs['off'], runs['on'], tolerance)
@@ -0,0 +1,52 @@
+"""Pre-run buffer-cache warm-up (``sql/87_create_run_prewarm.sql``).
+
+The market-data partitions (and their indexes) covering the union of a run's
+strategy date ranges are read into shared buffers before the first stage, so
+the first strategy does not pay the cold reads. Relations already resident
+are skipped.
+"""
+import os
+from typing import NamedTuple
+
+import pandas as pd
+
+
+class PrewarmResult(NamedTuple):
+    relation: str
+    kind: str
+    pages: int
+    resident_pages: int | None
+    loaded_pages: int
+    mode: str
+    ms: float
+
+
+def prewarm_enabled() -> bool:
+    """Warm-up on unless BACKTEST_PREWARM=off."""
+    return os.getenv('BACKTEST_PREWARM', 'on') != 'off'
+
+
+def date_windows(df: pd.DataFrame) -> list[tuple]:
+    """Union of the strategies' ``from_date..to_date`` ranges as disjoint windows."""
+    ranges = sorted(zip(pd.to_datetime(df['from_date']).dt.date, pd.to_datetime(df['to_date']).dt.date))
+    windows: list[list] = []
+    for lo, hi in ranges:
+        if windows and (lo - windows[-1][1]).days <= 1:
+            windows[-1][1] = max(windows[-1][1], hi)
+        else:
+            windows.append([lo, hi])
+    return [tuple(w) for w in windows]
+
+
+def prewarm(cur, from_date, to_date, budget_fraction: float = 0.75) -> list[PrewarmResult]:
+    cur.execute("SELECT * FROM public.fn_prewarm_run_window(%s, %s, %s)", (from_date, to_date, budget_fraction))
+    return [PrewarmResult(rel, kind, pages, resident, loaded, mode, float(ms))
+            for rel, kind, pages, resident, loaded, mode, ms in cur.fetchall()]
+
+
+def summary(results: list[PrewarmResult], block_size: int = 8192) -> str:
+    loaded = sum(r.loaded_pages for r in results) * block_size
+    ms = sum(r.ms for r in results)
+    resident = sum(r.mode == 'resident' for r in results)
+    return (f"{loaded / 1024 ** 3:.2f} GB loaded in {ms / 1000:.1f}s "
+            f"({len(results)} relations, {resident} already resident)")
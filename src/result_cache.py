@@ -0,0 +1,61 @@
+"""Persistent per-strategy result cache (``sql/80_create_strategy_result_cache.sql``).
+
+A strategy is keyed by its settings row, the stage SQL build hash and a change
+stamp of the market-data partitions in its date range. When the key is
+cached, its rows are copied into ``strategy_run_results`` for the new run and
+the pipeline skips it; freshly computed strategies are stored after the run.
+"""
+import os
+from typing import NamedTuple
+
+from .run_schema import build_hash
+
+
+class CacheKey(NamedTuple):
+    cache_key: str
+    settings_hash: str
+    data_stamp: str
+
+
+def cache_enabled() -> bool:
+    """Result cache on unless BACKTEST_RESULT_CACHE=off."""
+    return os.getenv('BACKTEST_RESULT_CACHE', 'on') != 'off'
+
+
+def code_version() -> str:
+    return build_hash()
+
+
+def fetch_keys(cur, settings_table: str) -> dict[str, CacheKey]:
+    """``{strategy_name: CacheKey}`` for every row of ``settings_table``."""
+    cur.execute(
+        f"""
+        SELECT t.strategy_name, k.cache_key, k.settings_hash, k.data_stamp
+        FROM {settings_table} t
+        CROSS JOIN LATERAL public.fn_strategy_cache_key(to_jsonb(t), %s) k
+        """,
+        (code_version(),),
+    )
+    return {name: CacheKey(*key) for name, *key in cur.fetchall()}
+
+
+def cached_keys(cur, keys) -> set[str]:
+    cur.execute(
+        "SELECT cache_key FROM public.strategy_result_cache WHERE cache_key = ANY(%s)",
+        (list({k.cache_key for k in keys}),),
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+def serve(cur, key: CacheKey, strategy_name: str, run_id: str) -> int:
+    cur.execute("SELECT public.fn_serve_cached_result(%s, %s, %s)", (key.cache_key, strategy_name, run_id))
+    return cur.fetchone()[0]
+
+
+def store(cur, key: CacheKey, strategy_name: str, from_date, to_date, run_id: str) -> int:
+    cur.execute(
+        "SELECT public.fn_store_cached_result(%s, %s, %s, %s, %s, %s, %s, %s)",
+        (key.cache_key, key.settings_hash, key.data_stamp, code_version(),
+         strategy_name, from_date, to_date, run_id),
+    )
+    return cur.fetchone()[0]
@@ -0,0 +1,226 @@
+"""Isolated per-run schemas for concurrent backtests.
+
+Each run leases a schema (``bt_run_<n>``) from the ``backtest_run_schema``
+pool and executes the whole stage chain there with
+``search_path = <schema>, public``. Pipeline objects (config tables, filtered
+views, mv_*, wrk_* and procedures) are private to the schema; market data and
+``strategy_run_results`` stay shared in ``public``.
+"""
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from psycopg2 import sql as pgsql
+
+from .stage_fusion import EXTERNAL_SQL, fuse_files
+
+SQL_DIR = Path(__file__).resolve().parents[1] / 'sql'
+
+# Stage files executed into a run schema, in dependency order
+RUN_SCHEMA_SQL = [
+    '73_create_stage_backend.sql',
+    '77_create_filtered_view_window.sql',
+    '1_create_v_strategy_config.sql',
+    '79_create_stage_memo.sql',
+    '2_create_filtered_views.sql',
+    '3_create_mv_nifty_options_filtered.sql',
+    '4_create_mv_all_5min_breakouts.sql',
+    '5_create_mv_ranked_breakouts_with_rounds.sql',
+    '6_create_mv_ranked_breakouts_with_rounds_for_reentry.sql',
+    '7_create_mv_base_strike_selection.sql',
+    '8_create_mv_breakout_context_round1.sql',
+    '9_create_mv_entry_and_hedge_legs.sql',
+    '63_create_wrk_live_prices_entry_round1.sql',
+    '10_create_mv_live_prices_entry_round1.sql',
+    '11_create_mv_entry_sl_hits_round1.sql',
+    '12_create_mv_entry_sl_executions_round1.sql',
+    '13_create_mv_entry_open_legs_round1.sql',
+    '14_create_mv_entry_profit_booking_round1.sql',
+    '15_create_mv_entry_eod_close_round1.sql',
+    '16_create_mv_entry_closed_legs_round1.sql',
+    '17_create_mv_entry_round1_stats.sql',
+    '18_create_mv_hedge_exit_on_all_entry_sl.sql',
+    '19_create_mv_hedge_exit_partial_conditions.sql',
+    '20_create_mv_hedge_closed_legs_round1.sql',
+    '21_create_mv_hedge_eod_exit_round1.sql',
+    '22_create_mv_entry_exit_on_partial_hedge_round1.sql',
+    '23_create_mv_double_buy_legs_round1.sql',
+    '24_create_mv_entry_final_exit_round1.sql',
+    '25_create_mv_rehedge_trigger_round1.sql',
+    '26_create_mv_rehedge_candidate_round1.sql',
+    '27_create_mv_rehedge_selected_round1.sql',
+    '28_create_mv_rehedge_leg_round1.sql',
+    '29_create_mv_rehedge_eod_exit_round1.sql',
+    '30_create_mv_all_legs_round1.sql',
+    '31_sp_insert_sl_legs_into_book.sql',
+    '32_create_mv_reentry_triggered_breakouts.sql',
+    '33_create_mv_reentry_base_strike_selection.sql',
+    '34_create_mv_reentry_legs_and_hedge_legs.sql',
+    '64_create_wrk_reentry_live_prices.sql',
+    '35_create_mv_reentry_live_prices.sql',
+    '36_create_mv_reentry_breakout_context.sql',
+    '37_create_mv_reentry_sl_hits.sql',
+    '38_create_mv_reentry_sl_executions.sql',
+    '39_create_mv_reentry_open_legs.sql',
+    '40_create_mv_reentry_profit_booking.sql',
+    '41_create_mv_reentry_eod_close.sql',
+    '42_create_mv_reentry_final_exit.sql',
+    '43_create_mv_reentry_legs_stats.sql',
+    '44_create_mv_hedge_reentry_exit_on_all_entry_sl.sql',
+    '45_create_mv_hedge_reentry_exit_on_partial_conditions.sql',
+    '46_create_mv_hedge_reentry_closed_legs.sql',
+    '47_create_mv_hedge_reentry_eod_exit.sql',
+    '48_create_mv_reentry_exit_on_partial_hedge.sql',
+    '49_create_mv_double_buy_legs_reentry.sql',
+    '50_create_mv_rehedge_trigger_reentry.sql',
+    '51_create_mv_rehedge_candidate_reentry.sql',
+    '52_create_mv_rehedge_selected_reentry.sql',
+    '53_create_mv_rehedge_leg_reentry.sql',
+    '54_create_mv_rehedge_eod_exit_reentry.sql',
+    '55_create_mv_all_legs_reentry.sql',
+    '84_create_wrk_all_legs_reentry.sql',
+    '56_fn_run_reentry_loop.sql',
+    '65_create_wrk_entry_leg_live_prices.sql',
+    '57_create_mv_entry_leg_live_prices.sql',
+    '58_create_mv_all_entries_sl_tracking_adjusted.sql',
+    '59_create_mv_portfolio_mtm_pnl.sql',
+    '60_create_mv_portfolio_final_pnl.sql',
+    '62_sp_run_strategy.sql',
+    '74_call_sp_build_unlogged_stages.sql',
+]
+
+# Tables copied (structure only) from public before the stage files run
+RUN_SCHEMA_TABLES = [
+    'strategy_settings',
+    'runtime_strategy_config',
+    'runtime_strategy_dates',
+    'strategy_leg_book',
+]
+
+_CREATE_RE = re.compile(
+    r'CREATE\s+(?:OR\s+REPLACE\s+)?(?:UNLOGGED\s+)?'
+    r'(?:MATERIALIZED\s+VIEW|TABLE|VIEW|FUNCTION|PROCEDURE)\s+'
+    r'(?:IF\s+NOT\s+EXISTS\s+)?(?:public\.)?"?([A-Za-z0-9_]+)"?',
+    re.IGNORECASE,
+)
+
+# Date-bound views created through fn_bind_filtered_view (2_create_filtered_views.sql)
+_BIND_RE = re.compile(r"fn_bind_filtered_view\('(\w+)'")
+
+
+def fused_stages_enabled() -> bool:
+    """Single-consumer stages inlined into their consumer (BACKTEST_FUSED_STAGES=on)."""
+    return os.getenv('BACKTEST_FUSED_STAGES', 'off') == 'on'
+
+
+def load_run_schema_sql(fused: bool | None = None) -> list[tuple[str, str]]:
+    """Return ``(filename, sql_text)`` for every stage file, in order.
+
+    With ``fused`` (default: BACKTEST_FUSED_STAGES) the files come out of
+    ``stage_fusion.fuse_files``; their build hash differs, so pooled schemas
+    are rebuilt when the setting changes.
+    """
+    files = [(name, (SQL_DIR / name).read_text(encoding='utf8')) for name in RUN_SCHEMA_SQL]
+    if fused_stages_enabled() if fused is None else fused:
+        external = [(name, (SQL_DIR / name).read_text(encoding='utf8')) for name in EXTERNAL_SQL]
+        files, _ = fuse_files(files, external)
+    return files
+
+
+def build_hash(files: list[tuple[str, str]] | None = None) -> str:
+    """Hash of the stage SQL; a pooled schema built from other SQL is rebuilt."""
+    h = hashlib.sha256()
+    for name, text in files or load_run_schema_sql():
+        h.update(name.encode())
+        h.update(text.encode())
+    return h.hexdigest()[:16]
+
+
+def pipeline_object_names(files: list[tuple[str, str]]) -> set[str]:
+    """Names of every object the stage files create (plus the copied tables)."""
+    names = set(RUN_SCHEMA_TABLES)
+    for _, text in files:
+        names.update(n.lower() for n in _CREATE_RE.findall(text))
+        names.update(_BIND_RE.findall(text))
+    return names
+
+
+def rewrite_for_schema(text: str, schema: str, names: set[str]) -> str:
+    """Point ``public.<pipeline object>`` references at ``schema``.
+
+    Market data (``public.ha_big``, ``public."Nifty_options"`` ...) is left alone.
+    CONCURRENTLY is dropped because the objects are freshly created and a file
+    is executed as a single statement batch.
+    """
+    pattern = re.compile(r'\bpublic\.("?)(%s)\b' % '|'.join(sorted(names, key=len, reverse=True)),
+                         re.IGNORECASE)
+    text = pattern.sub(lambda m: f'{schema}.{m.group(1)}{m.group(2)}', text)
+    return re.sub(r'\bINDEX\s+CONCURRENTLY\b', 'INDEX', text, flags=re.IGNORECASE)
+
+
+def set_search_path(cur, schema: str):
+    cur.execute(pgsql.SQL('SET search_path TO {}, public').format(pgsql.Identifier(schema)))
+
+
+def build_run_schema(conn, schema: str, fused: bool | None = None) -> str:
+    """(Re)create every pipeline object inside ``schema``. Returns the build hash."""
+    files = load_run_schema_sql(fused)
+    names = pipeline_object_names(files)
+    digest = build_hash(files)
+    with conn.cursor() as cur:
+        cur.execute(pgsql.SQL('CREATE SCHEMA IF NOT EXISTS {}').format(pgsql.Identifier(schema)))
+        set_search_path(cur, schema)
+        for table in RUN_SCHEMA_TABLES:
+            cur.execute(pgsql.SQL('DROP TABLE IF EXISTS {}.{} CASCADE').format(
+                pgsql.Identifier(schema), pgsql.Identifier(table)))
+            cur.execute(pgsql.SQL('CREATE TABLE {}.{} (LIKE public.{} INCLUDING ALL)').format(
+                pgsql.Identifier(schema), pgsql.Identifier(table), pgsql.Identifier(table)))
+        for name, text in files:
+            try:
+                cur.execute(rewrite_for_schema(text, schema, names))
+            except Exception as e:
+                raise RuntimeError(f'Building {schema} failed at {name}: {e}') from e
+        cur.execute(
+            "UPDATE public.backtest_run_schema SET build_hash = %s, built_at = now() WHERE schema_name = %s",
+            (digest, schema),
+        )
+    conn.commit()
+    return digest
+
+
+def lease_run_schema(conn, run_id: str, fused: bool | None = None) -> str:
+    """Lease a pooled schema for ``run_id``, creating and building one if the pool is empty.
+
+    A pooled schema whose build hash no longer matches the stage SQL is rebuilt
+    before it is handed out; if that build fails the schema goes back to the
+    pool (still unbuilt, so the next lease retries) before the error is raised.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT public.fn_lease_run_schema(%s)", (run_id,))
+        schema = cur.fetchone()[0]
+        if schema is None:
+            cur.execute("SELECT public.fn_new_run_schema(%s)", (run_id,))
+            schema = cur.fetchone()[0]
+            stored = None
+        else:
+            cur.execute("SELECT build_hash FROM public.backtest_run_schema WHERE schema_name = %s", (schema,))
+            stored = cur.fetchone()[0]
+    conn.commit()
+
+    if stored != build_hash(load_run_schema_sql(fused)):
+        print(f"🏗️ Building run schema {schema}...")
+        try:
+            build_run_schema(conn, schema, fused)
+        except Exception:
+            release_run_schema(conn, schema)
+            raise
+    return schema
+
+
+def release_run_schema(conn, schema: str):
+    """Return ``schema`` to the pool (its leg book and wrk tables are reset on next use)."""
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute("CALL public.sp_release_run_schema(%s)", (schema,))
+    conn.commit()
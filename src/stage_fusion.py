@@ -0,0 +1,221 @@
+"""Stage fusion: inline single-consumer matviews into their consumer as CTEs.
+
+Many stages are read by exactly one downstream stage (e.g.
+``mv_rehedge_trigger_round1`` -> candidate -> selected -> leg), yet each pays
+a full materialization. ``fuse_files`` takes the run-schema stage files, counts
+the consumers of every ``CREATE MATERIALIZED VIEW`` stage and rewrites
+
+* a fusable stage's file to just drop the old matview, and
+* its consumer's definition to ``WITH <stage> AS (<stage query>) ...``,
+
+recursively, so a whole chain collapses into its last stage. A stage is
+fusable when its only reader is another matview stage and it reads no table
+the pipeline writes mid-run (``strategy_leg_book``, ``wrk_*``): refreshing
+it later, as part of its consumer, then gives the same rows. Stages read by
+procedures, wrk fills or several stages stay materialized, and a stage is
+never pulled into a consumer the re-entry loop refreshes every round unless
+the loop refreshes it too. Fused stages are
+registered in ``pipeline_fused_stage`` so ``fn_refresh_stage`` skips them.
+"""
+import re
+from typing import NamedTuple
+
+from .stage_graph import load_reentry_loop_stages
+
+# Tables written during a run; a stage reading them must keep its own refresh point
+MUTABLE_TABLES = {'strategy_leg_book'}
+MUTABLE_PREFIXES = ('wrk_',)
+
+# Shared (public) files that read pipeline stages outside the run-schema files
+EXTERNAL_SQL = ['68_create_sp_run_strategy_batched.sql', '66_run_reentry_loop.sql']
+
+_MATVIEW_RE = re.compile(
+    r'CREATE\s+MATERIALIZED\s+VIEW\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:public\.)?"?(\w+)"?\s*'
+    r'(\([^()]*\))?\s+AS\s+(.*)$',
+    re.IGNORECASE | re.DOTALL,
+)
+_WITH_DATA_RE = re.compile(r'\s+WITH\s+(?:NO\s+)?DATA\s*$', re.IGNORECASE)
+_OWN_STMT_RE = re.compile(
+    r'^\s*(?:DROP|CREATE\s+(?:UNIQUE\s+)?INDEX|REFRESH|ANALYZE|COMMENT)\b', re.IGNORECASE)
+_DOLLAR_RE = re.compile(r'\$[A-Za-z_]*\$')
+
+
+class StageDef(NamedTuple):
+    name: str
+    file: str
+    statement: str              # the CREATE MATERIALIZED VIEW statement as written
+    columns: str | None         # explicit column list, e.g. "(a, b)"
+    body: str                   # the defining query
+
+
+def _scan(text: str):
+    """Yield ``(kind, start, end)`` spans: code, comment, literal or a $tag$ marker."""
+    i, n, start = 0, len(text), 0
+    while i < n:
+        if text.startswith('--', i):
+            end = text.find('\n', i)
+            end, kind = (n if end < 0 else end), 'comment'
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            end, kind = (n if end < 0 else end + 2), 'comment'
+        elif text[i] == "'":
+            end = i + 1
+            while end < n and (text[end] != "'" or text.startswith("''", end)):
+                end += 2 if text.startswith("''", end) else 1
+            end, kind = min(end + 1, n), 'literal'
+        elif text[i] == '$' and (m := _DOLLAR_RE.match(text, i)):
+            end, kind = m.end(), 'dollar'
+        else:
+            i += 1
+            continue
+        yield 'code', start, i
+        yield kind, i, end
+        i = start = end
+    yield 'code', start, n
+
+
+def split_statements(text: str) -> list[str]:
+    """Split a SQL file on top-level ``;`` (outside comments, quotes and $$ bodies)."""
+    statements, start, in_dollar = [], 0, None
+    for kind, lo, hi in _scan(text):
+        if kind == 'dollar':
+            tag = text[lo:hi]
+            in_dollar = None if in_dollar == tag else (in_dollar or tag)
+        elif kind == 'code' and in_dollar is None:
+            for m in re.finditer(';', text[lo:hi]):
+                statements.append(text[start:lo + m.start()].strip())
+                start = lo + m.end()
+    tail = text[start:].strip()
+    if tail:
+        statements.append(tail)
+    return [s for s in statements if s]
+
+
+def code_only(text: str) -> str:
+    """Lower-cased ``text`` with comments and string literals blanked out.
+
+    Dollar-quoted function bodies are kept, so a procedure's reads count but
+    ``fn_refresh_stage('<stage>')`` calls do not.
+    """
+    out = []
+    for kind, lo, hi in _scan(text):
+        out.append(' ' * (hi - lo) if kind in ('comment', 'literal') else text[lo:hi])
+    return ''.join(out).lower()
+
+
+def references(text: str, names: set[str]) -> set[str]:
+    """Which of ``names`` the (code-only) ``text`` reads."""
+    words = set(re.findall(r'(?<![\w."])(?:public\.)?(\w+)', text))
+    return words & names
+
+
+def parse_stages(files: list[tuple[str, str]]) -> dict[str, StageDef]:
+    stages = {}
+    for fname, text in files:
+        for stmt in split_statements(text):
+            m = _MATVIEW_RE.search(stmt)
+            if m:
+                body = _WITH_DATA_RE.sub('', m.group(3)).strip()
+                stages[m.group(1).lower()] = StageDef(m.group(1).lower(), fname, stmt, m.group(2), body)
+    return stages
+
+
+def _with_body(statement: str, body: str) -> str:
+    """``statement`` with its defining query replaced (WITH [NO] DATA kept)."""
+    query = _MATVIEW_RE.search(statement).group(3)
+    suffix = _WITH_DATA_RE.search(query)
+    return statement[:len(statement) - len(query)] + body + (suffix.group(0) if suffix else '')
+
+
+def consumers(files: list[tuple[str, str]], stages: dict[str, StageDef],
+              external: list[tuple[str, str]] = ()) -> dict[str, set[str]]:
+    """``{stage: readers}``; readers are stage names or ``<file>`` for anything else."""
+    names = set(stages)
+    readers: dict[str, set[str]] = {name: set() for name in names}
+    for stage in stages.values():
+        for dep in references(code_only(stage.body), names) - {stage.name}:
+            readers[dep].add(stage.name)
+    for fname, text in list(files) + list(external):
+        for stmt in split_statements(text):
+            code = code_only(stmt)
+            if _MATVIEW_RE.search(stmt) or _OWN_STMT_RE.match(code):
+                continue
+            for dep in references(code, names):
+                readers[dep].add(f'<{fname}>')
+    return readers
+
+
+def _reads_mutable(stage: StageDef) -> bool:
+    words = set(re.findall(r'\w+', code_only(stage.body)))
+    return bool(words & MUTABLE_TABLES) or any(w.startswith(MUTABLE_PREFIXES) for w in words)
+
+
+def plan_fusion(files: list[tuple[str, str]], external: list[tuple[str, str]] = ()) -> dict[str, str]:
+    """``{fused stage: consumer}`` for every stage that can be inlined."""
+    stages = parse_stages(files)
+    loop_stages = load_reentry_loop_stages()
+    plan = {}
+    for name, readers in consumers(files, stages, external).items():
+        if len(readers) != 1:
+            continue
+        (consumer,) = readers
+        if consumer not in stages or _reads_mutable(stages[name]):
+            continue
+        if consumer in loop_stages and name not in loop_stages:
+            continue
+        plan[name] = consumer
+    return plan
+
+
+def inline_ctes(body: str, ctes: list[tuple[str, str | None, str]]) -> str:
+    """Prepend ``name [(cols)] AS (query)`` CTEs to ``body``, merging with its own WITH."""
+    if not ctes:
+        return body
+    body = re.sub(r'\bpublic\.("?)(%s)\b' % '|'.join(re.escape(n) for n, _, _ in ctes), r'\1\2',
+                  body, flags=re.IGNORECASE)
+    defs = ',\n'.join(f"{name}{' ' + cols if cols else ''} AS (\n{query}\n)" for name, cols, query in ctes)
+    # code_only keeps offsets, so a leading comment before WITH is skipped correctly
+    m = re.match(r'\s*with(?:\s+recursive)?\s', code_only(body))
+    if m:
+        return f'{body[:m.end()]}{defs},\n{body[m.end():]}'
+    return f'WITH {defs}\n{body}'
+
+
+def fuse_files(files: list[tuple[str, str]], external: list[tuple[str, str]] = ()) -> tuple[list, dict]:
+    """Fused copy of ``files`` (in the same order) plus the fusion plan.
+
+    The plan registration is placed right after ``73_create_stage_backend.sql``,
+    which creates ``pipeline_fused_stage``.
+    """
+    stages = parse_stages(files)
+    plan = plan_fusion(files, external)
+
+    # stages are parsed in file (= dependency) order, so producers compile first
+    compiled: dict[str, str] = {}
+    for name, stage in stages.items():
+        producers = [p for p in stages if plan.get(p) == name]
+        compiled[name] = inline_ctes(stage.body, [(p, stages[p].columns, compiled[p]) for p in producers])
+
+    fused = []
+    for fname, text in files:
+        for name, stage in stages.items():
+            if stage.file != fname:
+                continue
+            if name in plan:
+                text = (f'-- {name}: inlined into {plan[name]} (src/stage_fusion.py)\n'
+                        f'DROP MATERIALIZED VIEW IF EXISTS public.{name} CASCADE;\n')
+                break
+            if compiled[name] != stage.body:
+                text = text.replace(stage.statement, _with_body(stage.statement, compiled[name]), 1)
+        fused.append((fname, text))
+        if fname == '73_create_stage_backend.sql':
+            fused.append(('stage_fusion', fusion_registry_sql(plan)))
+    return fused, plan
+
+
+def fusion_registry_sql(plan: dict[str, str]) -> str:
+    rows = ',\n'.join(f"    ('{s}', '{c}')" for s, c in sorted(plan.items()))
+    sql = 'DELETE FROM public.pipeline_fused_stage;\n'
+    if rows:
+        sql += f'INSERT INTO public.pipeline_fused_stage (stage_name, consumer) VALUES\n{rows};\n'
+    return sql
@@ -0,0 +1,165 @@
+"""Stage dependency graph for the strategy pipeline.
+
+Materialized-view edges come from the catalog (``pg_rewrite`` rule ->
+``pg_depend`` -> referenced relation). The three wrk_* fills are read out of
+``sql/62_sp_run_strategy.sql`` and their inputs found by name. Four barrier
+steps mirror ``sp_run_strategy``:
+
+* ``filtered_views``     -- ``fn_refresh_filtered_views()``, rebinding the
+                            date-bound v_*_filtered views; every stage that
+                            reads one of them waits for it
+* ``strategy_leg_book``  -- ``CALL insert_sl_legs_into_book()``
+* ``reentry_loop``       -- ``fn_run_reentry_loop()``, after every stage the
+                            loop itself refreshes; anything outside the loop
+                            consuming one of those stages, or the
+                            ``wrk_all_legs_reentry`` rows it collects, waits for it
+* ``store_results``      -- ``CALL sp_store_run_results()``
+
+Only stages that (transitively) read ``runtime_strategy_config`` /
+``runtime_strategy_dates`` are part of a run; base candle matviews are not.
+"""
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+SQL_DIR = Path(__file__).resolve().parents[1] / 'sql'
+
+CONFIG_TABLES = {'runtime_strategy_config', 'runtime_strategy_dates'}
+FILTERED_VIEWS = {'v_ha_big_filtered', 'v_ha_small_filtered', 'v_ha_1m_filtered',
+                  'v_nifty50_filtered', 'v_nifty_options_filtered'}
+LOAD_CONFIG = 'load_config'
+BIND_VIEWS = 'filtered_views'
+STAGE_GROUPS = 'v_stage_groups'
+LEG_BOOK = 'strategy_leg_book'
+REENTRY_LEGS = 'wrk_all_legs_reentry'
+REENTRY_LOOP = 'reentry_loop'
+STORE_RESULTS = 'store_results'
+
+_MATVIEW_DEPS_SQL = """
+SELECT v.relname AS stage, d.relname AS dep
+FROM pg_rewrite r
+JOIN pg_class v      ON v.oid = r.ev_class
+JOIN pg_namespace n  ON n.oid = v.relnamespace
+JOIN pg_depend dep   ON dep.classid = 'pg_rewrite'::regclass
+                    AND dep.objid = r.oid
+                    AND dep.refclassid = 'pg_class'::regclass
+JOIN pg_class d      ON d.oid = dep.refobjid
+WHERE n.nspname = %s
+  AND v.relkind = 'm'
+  AND d.oid <> v.oid
+GROUP BY v.relname, d.relname
+"""
+
+_FILL_RE = re.compile(r'TRUNCATE TABLE (wrk_\w+);\s*(INSERT INTO \1\b.*?;)', re.S)
+
+
+@dataclass
+class Stage:
+    name: str
+    kind: str                      # matview | fill | call
+    sql: str
+    deps: set[str] = field(default_factory=set)
+
+
+def load_wrk_fills(path: Path | None = None) -> dict[str, str]:
+    """``{wrk_table: 'TRUNCATE ...; INSERT ...;'}`` as written in sp_run_strategy."""
+    text = (path or SQL_DIR / '62_sp_run_strategy.sql').read_text(encoding='utf8')
+    return {t: f'TRUNCATE TABLE {t};\n{ins}' for t, ins in _FILL_RE.findall(text)}
+
+
+def load_reentry_loop_stages(path: Path | None = None) -> set[str]:
+    """Stages (and wrk fills) that fn_run_reentry_loop rebuilds every round."""
+    text = (path or SQL_DIR / '56_fn_run_reentry_loop.sql').read_text(encoding='utf8')
+    return set(re.findall(r"fn_refresh_stage\('(\w+)'\)", text)) | set(re.findall(r'INSERT INTO (wrk_\w+)', text))
+
+
+def fetch_matview_deps(conn, schema: str = 'public') -> dict[str, set[str]]:
+    deps: dict[str, set[str]] = {}
+    with conn.cursor() as cur:
+        cur.execute(_MATVIEW_DEPS_SQL, (schema,))
+        for stage, dep in cur.fetchall():
+            deps.setdefault(stage, set()).add(dep)
+    return deps
+
+
+def _descendants(graph: dict[str, set[str]], roots: set[str]) -> set[str]:
+    """Nodes that (transitively) depend on any of ``roots``."""
+    found = set()
+    changed = True
+    while changed:
+        changed = False
+        for node, deps in graph.items():
+            if node not in found and deps & (roots | found):
+                found.add(node)
+                changed = True
+    return found
+
+
+def build_stage_graph(conn, schema: str = 'public') -> dict[str, Stage]:
+    matview_deps = fetch_matview_deps(conn, schema)
+    fills = load_wrk_fills()
+    known = set(matview_deps) | set(fills) | CONFIG_TABLES | FILTERED_VIEWS | {LEG_BOOK, REENTRY_LEGS}
+
+    raw: dict[str, set[str]] = {name: set(deps) for name, deps in matview_deps.items()}
+    for table, fill_sql in fills.items():
+        words = set(re.findall(r'\b\w+\b', fill_sql)) - {table}
+        raw[table] = words & known
+    raw[LEG_BOOK] = {'mv_all_legs_round1'}
+    for deps in raw.values():
+        if deps & FILTERED_VIEWS:
+            deps -= FILTERED_VIEWS
+            deps.add(BIND_VIEWS)
+    raw[BIND_VIEWS] = {'runtime_strategy_dates'}
+
+    # Only config-driven stages belong to a run
+    in_run = _descendants(raw, CONFIG_TABLES)
+    loop_stages = load_reentry_loop_stages() & in_run
+
+    stages: dict[str, Stage] = {LOAD_CONFIG: Stage(LOAD_CONFIG, 'call', 'CALL sp_load_runtime_config()')}
+    for name in sorted(in_run):
+        deps = {d for d in raw[name] if d in in_run}
+        if raw[name] & CONFIG_TABLES:
+            deps.add(LOAD_CONFIG)
+        if name not in loop_stages and raw[name] & (loop_stages | {REENTRY_LEGS}):
+            deps.add(REENTRY_LOOP)
+        if name == LEG_BOOK:
+            stages[name] = Stage(name, 'call', 'CALL insert_sl_legs_into_book()', deps)
+        elif name in fills:
+            stages[name] = Stage(name, 'fill', fills[name], deps)
+        elif name == STAGE_GROUPS:
+            # memo groups, plus the per-run hit-rate record sp_run_strategy writes
+            stages[name] = Stage(name, 'matview', f"SELECT fn_refresh_stage('{name}'); "
+                                                  "SELECT fn_record_stage_memo()", deps)
+        elif name == BIND_VIEWS:
+            stages[name] = Stage(name, 'call', 'SELECT fn_refresh_filtered_views()', deps)
+        else:
+            stages[name] = Stage(name, 'matview', f"SELECT fn_refresh_stage('{name}')", deps)
+
+    stages[REENTRY_LOOP] = Stage(REENTRY_LOOP, 'call', 'SELECT fn_run_reentry_loop()',
+                                 loop_stages | {LEG_BOOK})
+    stages[STORE_RESULTS] = Stage(STORE_RESULTS, 'call', 'CALL sp_store_run_results()',
+                                  {'mv_portfolio_final_pnl', REENTRY_LOOP})
+    return stages
+
+
+def topological_order(stages: dict[str, Stage]) -> list[str]:
+    order, done = [], set()
+    pending = dict(stages)
+    while pending:
+        ready = sorted(n for n, s in pending.items() if s.deps <= done)
+        if not ready:
+            raise ValueError(f'Cycle among stages: {sorted(pending)}')
+        for n in ready:
+            order.append(n)
+            done.add(n)
+            del pending[n]
+    return order
+
+
+def critical_path(stages: dict[str, Stage], durations: dict[str, float]) -> tuple[float, list[str]]:
+    """Longest duration-weighted chain through the DAG: (seconds, [stage, ...])."""
+    best: dict[str, tuple[float, list[str]]] = {}
+    for name in topological_order(stages):
+        prev = max((best[d] for d in stages[name].deps), default=(0.0, []), key=lambda b: b[0])
+        best[name] = (prev[0] + durations.get(name, 0.0), prev[1] + [name])
+    return max(best.values(), key=lambda b: b[0], default=(0.0, []))
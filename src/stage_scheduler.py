@@ -0,0 +1,84 @@
+"""Run the stage DAG across a pool of DB sessions.
+
+Every ready stage (all dependencies finished) is submitted to a thread pool
+of at most ``max_workers`` sessions; each stage runs and commits in its own
+session so downstream stages in other sessions see its output.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from psycopg2 import sql as pgsql
+
+from .db import get_conn
+from .stage_graph import Stage, build_stage_graph, critical_path
+
+
+def prepare_session(cur, schema: str = 'public', settings: dict | None = None):
+    """search_path + backtest.* settings for a pipeline session."""
+    if schema != 'public':
+        cur.execute(pgsql.SQL('SET search_path TO {}, public').format(pgsql.Identifier(schema)))
+    for name, value in (settings or {}).items():
+        cur.execute("SELECT set_config(%s, %s, false)", (f'backtest.{name}', str(value)))
+
+
+def run_stage(stage: Stage, schema: str = 'public', settings: dict | None = None) -> float:
+    """Execute one stage in a fresh session; returns its duration in seconds."""
+    start = time.time()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            prepare_session(cur, schema, settings)
+            if stage.kind == 'fill':
+                # matview stages apply their profile inside fn_refresh_stage
+                cur.execute("SELECT public.fn_apply_stage_profile(%s)", (stage.name,))
+            cur.execute("SELECT fn_apply_stage_backend(), clock_timestamp()")
+            started = cur.fetchone()[1]
+            cur.execute(stage.sql)
+            if stage.kind == 'fill':
+                # matview stages are recorded by fn_refresh_stage itself
+                cur.execute("SELECT fn_record_stage_metric(%s, %s)", (stage.name, started))
+        conn.commit()
+    return time.time() - start
+
+
+def run_stage_dag(schema: str = 'public', max_workers: int = 4, settings: dict | None = None,
+                  stages: dict[str, Stage] | None = None) -> dict:
+    """Execute the pipeline DAG; returns durations, wall time and the critical path."""
+    if stages is None:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                prepare_session(cur, schema)
+            stages = build_stage_graph(conn, schema)
+
+    durations: dict[str, float] = {}
+    done: set[str] = set()
+    running = {}
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while len(done) < len(stages):
+            for name, stage in sorted(stages.items()):
+                if name in done or name in running.values() or not stage.deps <= done:
+                    continue
+                if len(running) >= max_workers:
+                    break
+                print(f"▶️  {name} ({stage.kind})")
+                running[pool.submit(run_stage, stage, schema, settings)] = name
+
+            if not running:
+                raise RuntimeError(f'No runnable stages left: {sorted(set(stages) - done)}')
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                durations[name] = fut.result()
+                done.add(name)
+                print(f"✅ {name}: {durations[name]:.2f}s")
+
+    cp_seconds, cp_stages = critical_path(stages, durations)
+    return {
+        'wall': time.time() - start,
+        'serial': sum(durations.values()),
+        'durations': durations,
+        'critical_path': cp_stages,
+        'critical_path_seconds': cp_seconds,
+    }
@@ -0,0 +1,272 @@
+"""Seedable synthetic market data at production scale.
+
+Generates what the pipeline reads -- ``Nifty50`` spot minutes, weekly
+``Nifty_options`` chains and the ``ha_big`` / ``ha_small`` / ``ha_1m``
+Heikin-Ashi candles -- for any date range, without exchange data:
+
+* spot is a minute-level geometric random walk over the 375-minute session
+  (09:15-15:29) with an overnight gap, carried from day to day;
+* every trading day lists the next ``n_expiries`` weekly expiries (the expiry
+  day itself included), with strikes every 50 within ``strike_range`` of the
+  day's open;
+* premiums are Black-Scholes prices (with a volatility smile) of the spot at
+  each minute's open/high/low/close, so they move with spot: a call's high is
+  its price at the spot high, a put's at the spot low. Prices are on the 0.05
+  tick. ``gap_rate`` drops random option minutes like illiquid strikes do;
+* HA candles are built from the spot minutes the way
+  ``scripts/compute_heikin_ashi_py.py`` builds them.
+
+``load`` COPYs day by day into the partitioned parents (creating missing
+monthly/yearly partitions) and commits once per month, so it scales from a
+week to ten years in constant memory. The same seed and start date always
+produce the same rows.
+"""
+import io
+import math
+from datetime import date, timedelta
+from typing import Iterator, NamedTuple
+
+import numpy as np
+import pandas as pd
+from psycopg2 import errors as pgerrors
+from psycopg2 import sql as pgsql
+
+from .db import get_conn
+
+MARKET_OPEN = 9 * 60 + 15
+SESSION_MINUTES = 375
+EXPIRY_MINUTE = 15 * 60 + 30
+STRIKE_STEP = 50
+TICK = 0.05
+MINUTES_PER_YEAR = 365 * 24 * 60
+
+NIFTY50_COLUMNS = ['date', 'time', 'open', 'high', 'low', 'close', 'volume', 'oi', 'option_nm']
+OPTIONS_COLUMNS = ['symbol', 'date', 'expiry', 'strike', 'option_type', 'time',
+                   'open', 'high', 'low', 'close', 'volume', 'oi', 'option_nm']
+HA_COLUMNS = ['trade_date', 'candle_time', 'open', 'high', 'low', 'close', 'ha_open', 'ha_high', 'ha_low', 'ha_close']
+
+# Parent tables with their date column and partition naming (matches the create_*_partitions scripts)
+PARTITIONS = {
+    'Nifty50': ('date', 'yearly', 'Nifty50_y{year}'),
+    'Nifty_options': ('date', 'monthly', 'Nifty_options_{year}_{month:02d}'),
+    'ha_big': ('trade_date', 'monthly', 'ha_big_{year}_{month:02d}'),
+    'ha_small': ('trade_date', 'monthly', 'ha_small_{year}_{month:02d}'),
+    'ha_1m': ('trade_date', 'monthly', 'ha_1m_{year}_{month:02d}'),
+}
+
+_TIMES = np.array([f'{(MARKET_OPEN + m) // 60:02d}:{(MARKET_OPEN + m) % 60:02d}:00' for m in range(SESSION_MINUTES)])
+
+
+class SyntheticConfig(NamedTuple):
+    seed: int = 0
+    start_spot: float = 22000.0
+    annual_vol: float = 0.14
+    smile: float = 40.0             # iv = annual_vol * (1 + smile * ln(K/S)^2)
+    strike_range: int = 2000        # strikes within +- this of the day's open
+    n_expiries: int = 2             # weekly expiries listed per day
+    expiry_weekday: int = 3         # Thursday
+    gap_rate: float = 0.0           # share of option minutes left out
+    big_tf: int = 15
+    small_tf: int = 5
+
+
+class SyntheticDay(NamedTuple):
+    trade_date: date
+    nifty50: pd.DataFrame
+    options: pd.DataFrame
+    ha: dict                        # table -> DataFrame
+
+
+def trading_days(from_date: date, to_date: date) -> list[date]:
+    """Weekdays in ``from_date..to_date``."""
+    days, d = [], from_date
+    while d <= to_date:
+        if d.weekday() < 5:
+            days.append(d)
+        d += timedelta(days=1)
+    return days
+
+
+def weekly_expiries(trade_date: date, n: int, weekday: int = 3) -> list[date]:
+    first = trade_date + timedelta(days=(weekday - trade_date.weekday()) % 7)
+    return [first + timedelta(weeks=k) for k in range(n)]
+
+
+def _tick(x: np.ndarray) -> np.ndarray:
+    return np.maximum(np.round(x / TICK) * TICK, TICK)
+
+
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF (Abramowitz-Stegun 7.1.26, |error| < 1.5e-7)."""
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def black_scholes(spot: np.ndarray, strike: np.ndarray, years: np.ndarray, vol: np.ndarray, call: bool) -> np.ndarray:
+    """Undiscounted Black-Scholes premium (broadcasts over its arguments)."""
+    sd = vol * np.sqrt(years)
+    d1 = (np.log(spot / strike) + 0.5 * sd * sd) / sd
+    d2 = d1 - sd
+    if call:
+        return spot * _norm_cdf(d1) - strike * _norm_cdf(d2)
+    return strike * _norm_cdf(-d2) - spot * _norm_cdf(-d1)
+
+
+def spot_minutes(rng: np.random.Generator, day_open: float, cfg: SyntheticConfig) -> np.ndarray:
+    """``[minute, (open, high, low, close)]`` of one session starting at ``day_open``."""
+    sigma = cfg.annual_vol / math.sqrt(252 * SESSION_MINUTES)
+    closes = day_open * np.exp(np.cumsum(rng.normal(0.0, sigma, SESSION_MINUTES)))
+    opens = np.concatenate(([day_open], closes[:-1]))
+    wick = np.abs(rng.normal(0.0, sigma * 0.5, (2, SESSION_MINUTES)))
+    highs = np.maximum(opens, closes) * np.exp(wick[0])
+    lows = np.minimum(opens, closes) * np.exp(-wick[1])
+    return np.round(np.stack([opens, highs, lows, closes], axis=1), 2)
+
+
+def heikin_ashi(trade_date: date, ohlc: np.ndarray, interval: int) -> pd.DataFrame:
+    """HA candles of ``interval`` minutes anchored at 09:15 from one session's minutes."""
+    n = SESSION_MINUTES // interval + (SESSION_MINUTES % interval > 0)
+    starts = np.arange(n) * interval
+    ends = np.minimum(starts + interval, SESSION_MINUTES) - 1
+    o, c = ohlc[starts, 0], ohlc[ends, 3]
+    h = np.maximum.reduceat(ohlc[:, 1], starts)
+    lo = np.minimum.reduceat(ohlc[:, 2], starts)
+    ha_close = (o + h + lo + c) / 4.0
+    ha_open = np.empty(n)
+    ha_open[0] = o[0]
+    for i in range(1, n):
+        ha_open[i] = (ha_open[i - 1] + ha_close[i - 1]) / 2.0
+    ha_open, ha_close = np.round(ha_open, 2), np.round(ha_close, 2)
+    return pd.DataFrame({
+        'trade_date': trade_date,
+        'candle_time': _TIMES[starts],
+        'open': o, 'high': h, 'low': lo, 'close': c,
+        'ha_open': ha_open,
+        'ha_high': np.round(np.maximum.reduce([h, ha_open, ha_close]), 2),
+        'ha_low': np.round(np.minimum.reduce([lo, ha_open, ha_close]), 2),
+        'ha_close': ha_close,
+    })
+
+
+def option_chains(rng: np.random.Generator, trade_date: date, ohlc: np.ndarray, cfg: SyntheticConfig) -> pd.DataFrame:
+    """Every listed contract's minute bars for one session."""
+    centre = round(ohlc[0, 0] / STRIKE_STEP) * STRIKE_STEP
+    strikes = np.arange(centre - cfg.strike_range, centre + cfg.strike_range + 1, STRIKE_STEP, dtype=float)
+    minute_of_day = MARKET_OPEN + np.arange(SESSION_MINUTES)
+    frames = []
+    for expiry in weekly_expiries(trade_date, cfg.n_expiries, cfg.expiry_weekday):
+        to_expiry = (expiry - trade_date).days * 1440 + EXPIRY_MINUTE - minute_of_day
+        years = np.maximum(to_expiry, 1)[None, :] / MINUTES_PER_YEAR
+        vol = cfg.annual_vol * (1 + cfg.smile * np.log(strikes[:, None] / ohlc[None, :, 0]) ** 2)
+        k = strikes[:, None]
+        for option_type, call in (('C', True), ('P', False)):
+            o = _tick(black_scholes(ohlc[None, :, 0], k, years, vol, call))
+            hi = _tick(black_scholes(ohlc[None, :, 1 if call else 2], k, years, vol, call))
+            lo = _tick(black_scholes(ohlc[None, :, 2 if call else 1], k, years, vol, call))
+            c = _tick(black_scholes(ohlc[None, :, 3], k, years, vol, call))
+            hi, lo = np.maximum.reduce([hi, o, c]), np.minimum.reduce([lo, o, c])
+            keep = rng.random(o.shape) >= cfg.gap_rate
+            rows, cols = np.nonzero(keep)
+            suffix = 'CE' if call else 'PE'
+            names = np.array([f"NIFTY{expiry:%d%b%y}{int(s)}{suffix}".upper() for s in strikes])
+            frames.append(pd.DataFrame({
+                'symbol': 'NIFTY',
+                'date': trade_date,
+                'expiry': expiry,
+                'strike': strikes[rows],
+                'option_type': option_type,
+                'time': _TIMES[cols],
+                'open': o[keep], 'high': hi[keep], 'low': lo[keep], 'close': c[keep],
+                'volume': rng.integers(0, 5000, len(rows)) * 25,
+                'oi': rng.integers(0, 200000, len(rows)) * 25,
+                'option_nm': names[rows],
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def generate(from_date: date, to_date: date, cfg: SyntheticConfig = SyntheticConfig()) -> Iterator[SyntheticDay]:
+    """One ``SyntheticDay`` per trading day, spot carried over from the previous close."""
+    rng = np.random.default_rng(cfg.seed)
+    close = cfg.start_spot
+    for trade_date in trading_days(from_date, to_date):
+        day_open = round(close * math.exp(rng.normal(0.0, cfg.annual_vol / math.sqrt(252) * 0.3)), 2)
+        ohlc = spot_minutes(rng, day_open, cfg)
+        close = float(ohlc[-1, 3])
+        nifty50 = pd.DataFrame({
+            'date': trade_date, 'time': _TIMES,
+            'open': ohlc[:, 0], 'high': ohlc[:, 1], 'low': ohlc[:, 2], 'close': ohlc[:, 3],
+            'volume': 0, 'oi': 0, 'option_nm': None,
+        })
+        ha = {
+            'ha_big': heikin_ashi(trade_date, ohlc, cfg.big_tf),
+            'ha_small': heikin_ashi(trade_date, ohlc, cfg.small_tf),
+            'ha_1m': heikin_ashi(trade_date, ohlc, 1),
+        }
+        yield SyntheticDay(trade_date, nifty50, option_chains(rng, trade_date, ohlc, cfg), ha)
+
+
+def _partition_bounds(d: date, scheme: str) -> tuple[date, date]:
+    if scheme == 'yearly':
+        return date(d.year, 1, 1), date(d.year + 1, 1, 1)
+    return date(d.year, d.month, 1), date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+
+def ensure_partitions(cur, from_date: date, to_date: date):
+    """Create the monthly/yearly partitions covering the window where none exists yet."""
+    for parent, (_, scheme, pattern) in PARTITIONS.items():
+        d = from_date
+        while d <= to_date:
+            lo, hi = _partition_bounds(d, scheme)
+            cur.execute('SAVEPOINT synthetic_partition')
+            try:
+                cur.execute(pgsql.SQL('CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)').format(
+                    pgsql.Identifier('public', pattern.format(year=lo.year, month=lo.month)),
+                    pgsql.Identifier('public', parent)), (lo, hi))
+            except pgerrors.InvalidObjectDefinition:
+                # a partition under another name (e.g. monthly Nifty50) already covers it
+                cur.execute('ROLLBACK TO SAVEPOINT synthetic_partition')
+            cur.execute('RELEASE SAVEPOINT synthetic_partition')
+            d = hi
+
+
+def _copy(cur, table: str, df: pd.DataFrame, columns: list[str]) -> int:
+    buf = io.StringIO()
+    df.to_csv(buf, columns=columns, index=False, header=False, float_format='%.2f')
+    buf.seek(0)
+    cur.copy_expert(pgsql.SQL('COPY {} ({}) FROM STDIN WITH CSV').format(
+        pgsql.Identifier('public', table), pgsql.SQL(', ').join(map(pgsql.Identifier, columns))).as_string(cur), buf)
+    return len(df)
+
+
+def load(from_date: date, to_date: date, cfg: SyntheticConfig = SyntheticConfig(), replace: bool = False) -> dict:
+    """Generate ``from_date..to_date`` and COPY it into the market-data tables; rows per table.
+
+    ``replace`` first deletes whatever the tables hold in the window.
+    """
+    counts = dict.fromkeys(PARTITIONS, 0)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            ensure_partitions(cur, from_date, to_date)
+            if replace:
+                for table, (column, _, _) in PARTITIONS.items():
+                    cur.execute(pgsql.SQL('DELETE FROM {} WHERE {} BETWEEN %s AND %s').format(
+                        pgsql.Identifier('public', table), pgsql.Identifier(column)), (from_date, to_date))
+            conn.commit()
+            month = None
+            for day in generate(from_date, to_date, cfg):
+                if month is not None and (day.trade_date.year, day.trade_date.month) != month:
+                    conn.commit()
+                    print(f"   {month[0]}-{month[1]:02d}: {counts['Nifty_options']:,} option rows so far")
+                month = (day.trade_date.year, day.trade_date.month)
+                counts['Nifty50'] += _copy(cur, 'Nifty50', day.nifty50, NIFTY50_COLUMNS)
+                counts['Nifty_options'] += _copy(cur, 'Nifty_options', day.options, OPTIONS_COLUMNS)
+                for table, candles in day.ha.items():
+                    counts[table] += _copy(cur, table, candles, HA_COLUMNS)
+            conn.commit()
+            for table in PARTITIONS:
+                cur.execute(pgsql.SQL('ANALYZE {}').format(pgsql.Identifier('public', table)))
+            conn.commit()
+    return counts
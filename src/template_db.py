@@ -0,0 +1,197 @@
+"""Golden template database and throwaway clones of it.
+
+``build_template`` creates the template once from the ``PG*`` database: its
+schema and pipeline objects (``pg_dump --schema-only``, run schemas
+excluded), the small config tables in full and the market-data rows of a
+chosen date window. The result is marked ``IS_TEMPLATE`` so
+``clone`` can copy it with ``CREATE DATABASE ... TEMPLATE`` in seconds.
+
+``cloned_database`` is the per-test / per-benchmark entry point: it provisions
+a clone, points ``PGDATABASE`` at it for the duration of the block (so
+``get_conn`` and everything built on it use the clone) and drops it on exit.
+Clones carry their creation time in the database comment, and ``drop_stale``
+removes the ones a crashed process left behind.
+"""
+import os
+import subprocess
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+from psycopg2 import sql as pgsql
+
+from .db import _conn_params_from_env, get_conn
+
+CLONE_PREFIX = 'bt_clone_'
+CLONE_COMMENT = 'backtest clone created '
+
+# Market-data tables sliced to the template's window, with their date column
+MARKET_DATA = {
+    'Nifty_options': 'date',
+    'Nifty50': 'date',
+    'ha_big': 'trade_date',
+    'ha_small': 'trade_date',
+    'ha_1m': 'trade_date',
+}
+
+# Copied whole: configuration, and every table the SQL install seeds (pg_dump
+# --schema-only drops those rows; without stage_fingerprint the memoized stages
+# pick no leaders and a public-schema run silently finds no breakouts)
+CONFIG_TABLES = [
+    'strategy_settings', 'runtime_strategy_config',
+    'stage_resource_profile',   # 83_create_stage_resource_profile.sql
+    'stage_fingerprint',        # 79_create_stage_memo.sql
+    'filtered_view_window',     # 2_create_filtered_views.sql
+    'pipeline_stage',           # 74_call_sp_build_unlogged_stages.sql
+    'pipeline_fused_stage',     # src/stage_fusion.py
+]
+
+
+def default_template() -> str:
+    """Template database name from BACKTEST_TEMPLATE_DB."""
+    return os.getenv('BACKTEST_TEMPLATE_DB', 'backtest_pulse_template')
+
+
+@contextmanager
+def _admin_cursor():
+    """Autocommit cursor on the maintenance database (CREATE/DROP DATABASE)."""
+    with get_conn(dbname=os.getenv('BACKTEST_ADMIN_DB', 'postgres')) as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            yield cur
+
+
+def _exists(cur, name: str) -> bool:
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+    return cur.fetchone() is not None
+
+
+def _drop_database(cur, name: str):
+    cur.execute(pgsql.SQL('DROP DATABASE IF EXISTS {} WITH (FORCE)').format(pgsql.Identifier(name)))
+
+
+def _pg_env(dbname: str) -> dict:
+    params = _conn_params_from_env()
+    return {**os.environ, 'PGHOST': params['host'], 'PGPORT': str(params['port']),
+            'PGUSER': params['user'], 'PGPASSWORD': params['password'], 'PGDATABASE': dbname}
+
+
+def _copy_table(src, dst, table: str, column: str | None = None, window: tuple | None = None) -> int:
+    """Copy ``public.<table>`` (rows with ``column`` in ``window`` if given) from ``src`` to ``dst``."""
+    ident = pgsql.Identifier('public', table)
+    with src.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (ident.as_string(cur),))
+        if cur.fetchone()[0] is None:
+            return 0
+        select = pgsql.SQL('SELECT * FROM {}').format(ident)
+        if column:
+            select = pgsql.SQL('{} WHERE {} BETWEEN {} AND {}').format(
+                select, pgsql.Identifier(column), pgsql.Literal(window[0]), pgsql.Literal(window[1]))
+        with tempfile.TemporaryFile(mode='w+') as buf:
+            cur.copy_expert(pgsql.SQL('COPY ({}) TO STDOUT').format(select).as_string(cur), buf)
+            buf.seek(0)
+            with dst.cursor() as out:
+                out.copy_expert(pgsql.SQL('COPY {} FROM STDIN').format(ident).as_string(out), buf)
+                return out.rowcount
+
+
+def build_template(from_date, to_date, name: str | None = None) -> str:
+    """(Re)build template ``name`` from the ``PG*`` database with market data in ``from_date..to_date``."""
+    name = name or default_template()
+    source = _conn_params_from_env()['dbname']
+    start = time.time()
+
+    with _admin_cursor() as cur:
+        if _exists(cur, name):
+            # a template database cannot be dropped
+            cur.execute(pgsql.SQL('ALTER DATABASE {} IS_TEMPLATE false').format(pgsql.Identifier(name)))
+            _drop_database(cur, name)
+        cur.execute(pgsql.SQL('CREATE DATABASE {}').format(pgsql.Identifier(name)))
+
+    print(f"🏗️ Copying schema of {source} into {name}...")
+    dump = subprocess.run(
+        ['pg_dump', '--schema-only', '--no-owner', '--exclude-schema=bt_run_*', source],
+        env=_pg_env(source), capture_output=True, check=True,
+    )
+    subprocess.run(['psql', '-q', '-v', 'ON_ERROR_STOP=1', '-d', name], input=dump.stdout,
+                   env=_pg_env(name), capture_output=True, check=True)
+
+    total = 0
+    with get_conn() as src, get_conn(dbname=name) as dst:
+        for table in CONFIG_TABLES:
+            total += _copy_table(src, dst, table)
+        for table, column in MARKET_DATA.items():
+            rows = _copy_table(src, dst, table, column, (from_date, to_date))
+            print(f"   {table}: {rows} rows")
+            total += rows
+        dst.commit()
+        dst.autocommit = True
+        with dst.cursor() as cur:
+            cur.execute('VACUUM ANALYZE')
+
+    with _admin_cursor() as cur:
+        cur.execute(pgsql.SQL('ALTER DATABASE {} IS_TEMPLATE true').format(pgsql.Identifier(name)))
+        cur.execute(pgsql.SQL('COMMENT ON DATABASE {} IS {}').format(
+            pgsql.Identifier(name), pgsql.Literal(f'backtest template {from_date}..{to_date}')))
+    print(f"✅ Template {name} built in {time.time() - start:.1f}s ({total} rows)")
+    return name
+
+
+def clone(template: str | None = None, name: str | None = None) -> str:
+    """New database ``name`` (default ``bt_clone_<hex>``) copied from the template."""
+    template = template or default_template()
+    name = name or CLONE_PREFIX + uuid.uuid4().hex[:12]
+    with _admin_cursor() as cur:
+        if not _exists(cur, template):
+            raise RuntimeError(f'Template database {template} does not exist; build it first')
+        cur.execute(pgsql.SQL('CREATE DATABASE {} TEMPLATE {}').format(
+            pgsql.Identifier(name), pgsql.Identifier(template)))
+        cur.execute(pgsql.SQL('COMMENT ON DATABASE {} IS {}').format(
+            pgsql.Identifier(name), pgsql.Literal(CLONE_COMMENT + time.strftime('%Y-%m-%dT%H:%M:%S'))))
+    return name
+
+
+def drop(name: str):
+    with _admin_cursor() as cur:
+        _drop_database(cur, name)
+
+
+def list_clones() -> list[tuple[str, str | None]]:
+    """``[(name, created)]`` of every clone database."""
+    with _admin_cursor() as cur:
+        cur.execute(
+            "SELECT datname, shobj_description(oid, 'pg_database') FROM pg_database "
+            "WHERE datname LIKE %s ORDER BY datname",
+            (CLONE_PREFIX + '%',),
+        )
+        rows = cur.fetchall()
+    return [(name, (comment or '').removeprefix(CLONE_COMMENT) or None) for name, comment in rows]
+
+
+def drop_stale(max_age_hours: float = 6) -> list[str]:
+    """Drop clones older than ``max_age_hours`` (or without a creation stamp)."""
+    cutoff = time.time() - max_age_hours * 3600
+    dropped = []
+    for name, created in list_clones():
+        if created is None or time.mktime(time.strptime(created, '%Y-%m-%dT%H:%M:%S')) < cutoff:
+            drop(name)
+            dropped.append(name)
+    return dropped
+
+
+@contextmanager
+def cloned_database(template: str | None = None, keep: bool = False):
+    """Yield a fresh clone's name with ``PGDATABASE`` pointed at it; dropped on exit unless ``keep``."""
+    name = clone(template)
+    previous = os.environ.get('PGDATABASE')
+    os.environ['PGDATABASE'] = name
+    try:
+        yield name
+    finally:
+        if previous is None:
+            os.environ.pop('PGDATABASE', None)
+        else:
+            os.environ['PGDATABASE'] = previous
+        if not keep:
+            drop(name)
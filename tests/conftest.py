@@ -0,0 +1,79 @@
+"""Shared pytest setup: makes ``src`` importable when pytest runs from anywhere,
+and holds the scripted market days the engine and parity tests trade.
+
+The tests cover the pure-Python parts of the runner and need no database.
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.engine.market import MINUTES, Chain, Day, by_minute
+from src.engine.params import Params
+
+TRADE_DATE = date(2024, 1, 4)
+SESSION = np.arange(9 * 60 + 15, 15 * 60 + 30)
+STRIKES = np.arange(22300.0, 22701.0, 50.0)
+
+
+def _chain(prices: np.ndarray) -> Chain:
+    """One price per strike, flat over the session (open = high = close)."""
+    grid = np.full((len(STRIKES), MINUTES), np.nan)
+    grid[:, SESSION] = prices[:, None]
+    return Chain(STRIKES, grid, grid.copy(), grid.copy())
+
+
+def _scripted_day(trade_date: date, breakouts: tuple, spikes: tuple) -> Day:
+    spot = np.where(SESSION < 600, 22500.0, 22540.0)
+    big = np.array([[m, 22500.0, 22500.0, 22520.0, 22480.0] for m in range(555, 930, 15)])
+    small = np.array([[m, 22500.0, 22500.0, 22510.0, 22490.0] for m in range(555, 930, 5)])
+    for breakout in breakouts:
+        small[(breakout - 555) // 5] = [breakout, 22510.0, 22540.0, 22545.0, 22505.0]
+    puts = _chain(40 + (STRIKES - 22300) * 0.1)
+    for grid in (puts.open, puts.high, puts.close):
+        grid[:, list(spikes)] *= 2
+    calls = _chain(40 - (STRIKES - 22300) * 0.05)
+    return Day(trade_date, by_minute(SESSION, spot), big, small, by_minute(SESSION, spot),
+               {(trade_date, 'P'): puts, (trade_date, 'C'): calls})
+
+
+@pytest.fixture
+def day() -> Day:
+    """A scripted day for the engine.
+
+    Box (first 15-minute HA candle) 22480-22520. Bullish 5-minute breakouts at
+    10:00 and 11:40, every other small candle inside the box. Spot sits at
+    22540 after 10:00, so the ATM strike is 22550. Puts cost 40 + 0.1 per
+    point above 22300, calls 40 - 0.05 per point. Every put doubles for the
+    10:50 minute only, which hits the hard box SL of all entry legs at once.
+    """
+    return _scripted_day(TRADE_DATE, (600, 700), (650,))
+
+
+@pytest.fixture
+def three_round_day() -> Day:
+    """``day`` the next day with a third breakout at 13:20 and the puts doubling
+    again at 12:30, so round 2 hits its SL too and round 3 enters at 13:25."""
+    return _scripted_day(date(2024, 1, 5), (600, 700, 800), (650, 750))
+
+
+@pytest.fixture
+def params() -> Params:
+    """Runtime config (percentages already / 100) trading ``day``: 3 entry and 2 hedge legs, one re-entry."""
+    return Params(
+        strategy_name='s1', big_candle_tf=15, small_candle_tf=5, entry_candle=1,
+        preferred_breakout_type='pct_based_breakout', reentry_breakout_type='pct_based_breakout',
+        breakout_threshold_pct=0.0, sl_type='box_with_buffer_sl', sl_percentage=0.5,
+        box_sl_trigger_pct=0.2, box_sl_hard_pct=0.4, width_sl_pct=0.3, switch_pct=0.1,
+        num_entry_legs=3, num_hedge_legs=2, option_entry_price_cap=60, hedge_entry_price_cap=30,
+        hedge_exit_entry_ratio=0.5, hedge_exit_multiplier=3, leg_profit_pct=0.5,
+        portfolio_profit_target_pct=0.02, portfolio_stop_loss_pct=0.01, portfolio_capital=1e6,
+        no_of_lots=1, lot_size=75, max_reentry_rounds=2, eod_time=15 * 60 + 20,
+        from_date=TRADE_DATE, to_date=TRADE_DATE,
+    )
@@ -0,0 +1,65 @@
+"""Instance handling in ``src/coordinator.py``."""
+import pandas as pd
+import pytest
+
+from src import coordinator
+from src.coordinator import Instance, gather_task, is_primary, make_tasks, parse_instances
+
+
+def test_parse_instances():
+    assert parse_instances(' db1:5433/bt, db2 ,:5434,, ') == [
+        Instance('db1', 5433, 'bt'),
+        Instance('db2', 5432, None),
+        Instance('localhost', 5434, None),
+    ]
+    assert parse_instances('') == []
+
+
+def test_conn_params_and_name():
+    assert Instance('db1', 5433, 'bt').conn_params() == {
+        'host': 'db1', 'port': 5433, 'connect_timeout': 10, 'dbname': 'bt'}
+    assert Instance('db2', 5432).conn_params() == {'host': 'db2', 'port': 5432, 'connect_timeout': 10}
+    assert Instance('db1', 5433, 'bt').name == 'db1:5433/bt'
+
+
+@pytest.fixture
+def identities(monkeypatch):
+    """Two addresses of the primary server and one worker."""
+    ids = {
+        None: (7001, 'Backtest_Pulse'),
+        Instance('localhost', 5432): (7001, 'Backtest_Pulse'),
+        Instance('127.0.0.1', 5432, 'Backtest_Pulse'): (7001, 'Backtest_Pulse'),
+        Instance('localhost', 5432, 'other'): (7001, 'other'),
+        Instance('localhost', 5433): (7002, 'Backtest_Pulse'),
+    }
+    monkeypatch.setattr(coordinator, '_identities', ids)
+    return ids
+
+
+def test_primary_is_matched_by_server_identity(identities):
+    assert is_primary(Instance('localhost', 5432))
+    assert is_primary(Instance('127.0.0.1', 5432, 'Backtest_Pulse'))
+    assert not is_primary(Instance('localhost', 5432, 'other'))
+    assert not is_primary(Instance('localhost', 5433))
+
+
+def test_gather_is_a_no_op_on_the_primary(identities, monkeypatch):
+    def no_db(**params):
+        raise AssertionError('gather_task must not connect for the primary')
+    monkeypatch.setattr(coordinator, 'get_conn', no_db)
+    task = pd.DataFrame({'strategy_name': ['s0']})
+    assert gather_task(Instance('127.0.0.1', 5432, 'Backtest_Pulse'), 'run', task) == 0
+
+
+def test_make_tasks_longest_first():
+    df = pd.DataFrame({
+        'strategy_name': [f's{i}' for i in range(6)],
+        'from_date': ['2024-01-01'] * 6,
+        'to_date': ['2024-01-31'] * 6,
+    })
+    costs = pd.DataFrame({'weight': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]}, index=df['strategy_name'])
+    tasks = make_tasks(df, 2, costs)
+    loads = [costs.loc[t['strategy_name'], 'weight'].sum() for t in tasks]
+    assert len(tasks) == 4 and loads == sorted(loads, reverse=True)
+    assert sorted(n for t in tasks for n in t['strategy_name']) == list(df['strategy_name'])
+    assert [len(t) for t in make_tasks(df, 2, shards=3)] == [6, 6, 6]
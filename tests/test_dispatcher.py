@@ -0,0 +1,117 @@
+"""Share planning in ``src/dispatcher.py``: how a run's strategies are cut into shares."""
+from datetime import date
+
+import pandas as pd
+
+from src import dispatcher
+from src.dispatcher import month_ranges, partition_strategies, shard_dates, shard_strategies, split_strategies
+
+
+def strategies(n, **settings):
+    """``n`` strategies over the same month, sharing every memo key unless overridden."""
+    return pd.DataFrame({
+        'strategy_name': [f's{i}' for i in range(n)],
+        'from_date': ['2024-01-01'] * n,
+        'to_date': ['2024-01-31'] * n,
+        'big_candle_tf': 15,
+        'small_candle_tf': 5,
+        'entry_candle': 1,
+        'breakout_threshold_pct': 0.1,
+        **settings,
+    })
+
+
+def names(shares):
+    return sorted(sorted(s['strategy_name']) for s in shares)
+
+
+def test_split_keeps_every_strategy_once():
+    df = strategies(7, breakout_threshold_pct=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7])
+    shares = split_strategies(df, 3)
+    assert len(shares) == 3
+    assert sorted(n for s in shares for n in s['strategy_name']) == sorted(df['strategy_name'])
+
+
+def test_split_never_makes_more_shares_than_strategies():
+    df = strategies(2, breakout_threshold_pct=[0.1, 0.2])
+    assert len(split_strategies(df, 5)) == 2
+
+
+def test_split_balances_by_weight():
+    df = strategies(4, breakout_threshold_pct=[0.1, 0.2, 0.3, 0.4])
+    weights = pd.Series({'s0': 90.0, 's1': 40.0, 's2': 30.0, 's3': 20.0})
+    shares = split_strategies(df, 2, weights)
+    assert names(shares) == [['s0'], ['s1', 's2', 's3']]
+
+
+def test_memo_groups_smaller_than_a_share_stay_together():
+    # four fingerprints of two strategies each, each group half a share's worth
+    df = strategies(8, breakout_threshold_pct=[0.1, 0.1, 0.2, 0.2, 0.3, 0.3, 0.4, 0.4])
+    shares = split_strategies(df, 2)
+    assert sorted(len(s) for s in shares) == [4, 4]
+    for s in shares:
+        assert s['breakout_threshold_pct'].value_counts().eq(2).all()
+
+
+def test_large_memo_group_is_cut_into_fair_shares():
+    # a sweep over non-memo settings is one fingerprint; it must still use every share
+    df = strategies(10)
+    shares = split_strategies(df, 4)
+    assert sorted(len(s) for s in shares) == [2, 2, 3, 3]
+
+
+def test_split_without_memo_columns_deals_single_strategies():
+    df = strategies(6)[['strategy_name', 'from_date', 'to_date']]
+    df.loc[0, 'to_date'] = '2024-12-31'
+    shares = split_strategies(df, 3)
+    assert ['s0'] in names(shares)
+
+
+def test_shard_dates_cover_the_range_contiguously():
+    shards = shard_dates('2024-01-01', '2024-01-10', 3)
+    assert shards == [
+        (date(2024, 1, 1), date(2024, 1, 3)),
+        (date(2024, 1, 4), date(2024, 1, 6)),
+        (date(2024, 1, 7), date(2024, 1, 10)),
+    ]
+
+
+def test_shard_dates_never_cut_below_one_day():
+    assert shard_dates('2024-01-01', '2024-01-02', 5) == [
+        (date(2024, 1, 1), date(2024, 1, 1)),
+        (date(2024, 1, 2), date(2024, 1, 2)),
+    ]
+    assert shard_dates('2024-01-01', '2024-01-01', 0) == [(date(2024, 1, 1), date(2024, 1, 1))]
+
+
+def test_shard_strategies_slices_every_strategy():
+    df = strategies(2)
+    df.loc[1, 'to_date'] = '2024-01-02'
+    shares = shard_strategies(df, 3)
+    assert len(shares) == 3
+    # s1 spans two days, so it only appears in two shards
+    assert [list(s['strategy_name']) for s in shares] == [['s0', 's1'], ['s0', 's1'], ['s0']]
+    assert shares[2].iloc[0]['to_date'] == date(2024, 1, 31)
+
+
+def test_month_ranges_clip_to_the_range():
+    assert month_ranges('2024-01-15', '2024-03-05') == [
+        (date(2024, 1, 15), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 3, 1), date(2024, 3, 5)),
+    ]
+    assert month_ranges('2024-02-10', '2024-02-10') == [(date(2024, 2, 10), date(2024, 2, 10))]
+
+
+def test_partition_strategies_one_share_per_partition(monkeypatch):
+    monkeypatch.setattr(dispatcher, 'option_partitions', month_ranges)
+    df = strategies(2)
+    df['to_date'] = ['2024-03-10', '2024-01-20']
+    shares = partition_strategies(df)
+    # largest share first: January holds both strategies
+    assert [list(s['strategy_name']) for s in shares] == [['s0', 's1'], ['s0'], ['s0']]
+    jan, feb, mar = shares
+    assert list(jan['to_date']) == [date(2024, 1, 31), date(2024, 1, 20)]
+    assert (feb.iloc[0]['from_date'], feb.iloc[0]['to_date']) == (date(2024, 2, 1), date(2024, 2, 29))
+    assert (mar.iloc[0]['from_date'], mar.iloc[0]['to_date']) == (date(2024, 3, 1), date(2024, 3, 10))
+    assert list(jan.columns) == list(df.columns)
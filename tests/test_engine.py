@@ -0,0 +1,107 @@
+"""The in-memory engine (``src/engine``) on the scripted ``day`` from conftest."""
+import numpy as np
+
+from src.engine.lifecycle import _sl_exits, breakouts, run_day, setups
+from src.engine.runner import run_strategy_day
+
+
+def legs_by(legs, *fields):
+    return sorted(tuple(getattr(leg, f) for f in fields) for leg in legs)
+
+
+def test_breakouts_after_the_entry_candle(day, params):
+    assert breakouts(day, params) == [(600, 'pct_breakout_bullish'), (700, 'pct_breakout_bullish')]
+    # a breakout inside the entry candle's own window does not count
+    small = day.small.copy()
+    small[2] = [565, 22510.0, 22540.0, 22545.0, 22505.0]
+    assert breakouts(day._replace(small=small), params)[0] == (600, 'pct_breakout_bullish')
+
+
+def test_breakout_types(day, params):
+    small = day.small.copy()
+    small[(600 - 555) // 5] = [600, 22470.0, 22440.0, 22475.0, 22430.0]    # wholly below the box
+    small[(700 - 555) // 5] = [700, 22530.0, 22550.0, 22555.0, 22525.0]    # wholly above it
+    assert breakouts(day._replace(small=small), params) == [(600, 'full_body_bearish'), (700, 'full_body_bullish')]
+    # a close within the threshold margin is no pct breakout
+    assert breakouts(day, params._replace(breakout_threshold_pct=1.0)) == []
+
+
+def test_setups_pick_strike_ladders(day, params):
+    (s,) = setups(day, params, 1, 600, 'P')
+    assert (s.entry_time, s.spot) == (605, 22540.0)
+    assert list(s.entry.strikes) == [22500.0, 22550.0, 22600.0]
+    assert s.hedge.option_type == 'C'
+    assert list(s.hedge.strikes) == [22550.0, 22600.0]
+
+
+def _entry_arrays(day, s):
+    E = s.entry
+    o, h, c = E.chain.open[E.rows], E.chain.high[E.rows], E.chain.close[E.rows]
+    live = ~np.isnan(o) & (np.arange(o.shape[1]) >= s.entry_time)
+    return o, h, c, live
+
+
+def test_sl_exits_hard_box_sl(day, params):
+    (s,) = setups(day, params, 1, 600, 'P')
+    exits = _sl_exits(day, params, s, *_entry_arrays(day, s))
+    assert list(exits.time) == [650, 650, 650]
+    assert list(exits.price) == [84.0, 91.0, 98.0]
+    assert exits.reason == ['SL_HIT_BOX_HARD_SL'] * 3
+
+
+def test_sl_exits_width_sl_and_no_hit(day, params):
+    (s,) = setups(day, params, 2, 700, 'P')
+    exits = _sl_exits(day, params, s, *_entry_arrays(day, s))
+    assert list(exits.time) == [-1, -1, -1] and exits.reason == [None] * 3
+    # spot closing back inside the box (below 22508 for puts) is a width SL at that minute's high
+    close = day.one_m_close.copy()
+    close[760:] = 22500.0
+    exits = _sl_exits(day._replace(one_m_close=close), params, s, *_entry_arrays(day, s))
+    assert list(exits.time) == [760, 760, 760]
+    assert exits.reason == ['SL_HIT_BOX_WIDTH_SL'] * 3
+    assert list(exits.price) == [60.0, 65.0, 70.0]
+
+
+def test_run_day_rounds(day, params):
+    legs, next_entry = run_day(day, params)
+    assert next_entry == {1: 705}
+    round1 = [leg for leg in legs if leg.entry_round == 1]
+    assert legs_by(round1, 'leg_type', 'strike', 'exit_time', 'exit_reason') == [
+        ('DOUBLE_BUY', 22500.0, 920, 'DOUBLE_BUY_EOD_EXIT'),
+        ('DOUBLE_BUY', 22550.0, 920, 'DOUBLE_BUY_EOD_EXIT'),
+        ('DOUBLE_BUY', 22600.0, 920, 'DOUBLE_BUY_EOD_EXIT'),
+        ('ENTRY', 22500.0, 650, 'SL_HIT_BOX_HARD_SL'),
+        ('ENTRY', 22550.0, 650, 'SL_HIT_BOX_HARD_SL'),
+        ('ENTRY', 22600.0, 650, 'SL_HIT_BOX_HARD_SL'),
+        ('HEDGE', 22550.0, 650, 'ALL_ENTRY_SL'),
+        ('HEDGE', 22600.0, 650, 'ALL_ENTRY_SL'),
+        ('REHEDGE', 22300.0, 920, 'EOD CLOSE'),
+    ]
+    rehedge = next(leg for leg in round1 if leg.leg_type == 'REHEDGE')
+    assert (rehedge.option_type, rehedge.entry_time, rehedge.entry_price) == ('P', 651, 40.0)
+    round2 = [leg for leg in legs if leg.entry_round == 2]
+    assert legs_by(round2, 'leg_type', 'entry_time', 'exit_reason') == \
+        [('HEDGE-RE-ENTRY', 705, 'EOD_CLOSE')] * 2 + [('RE-ENTRY', 705, 'EOD_CLOSE')] * 3
+
+
+def test_run_day_stops_at_max_rounds_and_on_disallowed_breakouts(day, params):
+    legs, next_entry = run_day(day, params._replace(max_reentry_rounds=1))
+    assert next_entry == {} and {leg.entry_round for leg in legs} == {1}
+    assert run_day(day, params._replace(preferred_breakout_type='full_candle_breakout')) == ([], {})
+
+
+def test_strategy_day_portfolio_stop(day, params):
+    legs = run_strategy_day(day, params)
+    # entries lost 5850 at 10:50 and the double buys as much again by 10:51: past the 10000 stop
+    assert {leg.entry_round for leg in legs} == {1}
+    assert {leg.total_pnl_per_day for leg in legs} == {-11700.0}
+    stopped = [leg for leg in legs if leg.exit_reason == 'Portfolio Exit - Loss']
+    assert legs_by(stopped, 'leg_type', 'exit_time') == [('DOUBLE_BUY', 651)] * 3 + [('REHEDGE', 651)]
+
+
+def test_strategy_day_closes_rounds_at_the_next_entry(day, params):
+    legs = run_strategy_day(day, params._replace(portfolio_stop_loss_pct=1.0))
+    cut = [leg for leg in legs if leg.exit_reason == 'Closed due to re-entry']
+    assert legs_by(cut, 'entry_round', 'leg_type', 'exit_time') == \
+        [(1, 'DOUBLE_BUY', 705)] * 3 + [(1, 'REHEDGE', 705)]
+    assert sum(leg.entry_round == 2 for leg in legs) == 5
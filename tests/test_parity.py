@@ -0,0 +1,134 @@
+"""Leg diffing in ``src/parity.py`` on engine legs of the scripted ``day``, without Postgres."""
+from decimal import Decimal
+
+import pytest
+
+from src.engine.lifecycle import day_breakouts, next_breakout, round_legs, run_day
+from src.engine.runner import RESULT_COLUMNS, _row, run_strategy_day
+from src.parity import COMPARED, LEG_KEY, diff_legs, legs_frame, stage_of_origin, summarize
+
+
+def _tuples(legs):
+    """``LEG_KEY + COMPARED`` tuples of ``legs``, typed like strategy_run_results rows."""
+    at = [RESULT_COLUMNS.index(c) for c in LEG_KEY + COMPARED]
+    out = []
+    for leg in legs:
+        row = _row(leg, 'run')
+        out.append(tuple(Decimal(str(row[i])) if isinstance(row[i], float) else row[i] for i in at))
+    return out
+
+
+@pytest.fixture
+def rows(day, params):
+    """Result rows of both rounds."""
+    return _tuples(run_strategy_day(day, params._replace(portfolio_stop_loss_pct=1.0)))
+
+
+def _with(rows, leg_type, entry_round, **changes):
+    """``rows`` with ``changes`` applied to the first leg of ``leg_type`` in ``entry_round``."""
+    cols = LEG_KEY + COMPARED
+    out, done = [], False
+    for r in rows:
+        r = dict(zip(cols, r))
+        if not done and r['leg_type'] == leg_type and r['entry_round'] == entry_round:
+            r.update(changes)
+            done = True
+        out.append(tuple(r[c] for c in cols))
+    return out
+
+
+def test_identical_runs_have_no_mismatches(rows):
+    sql = legs_frame(rows)
+    assert len(sql) == 14 and sql['entry_price'].dtype == float
+    assert diff_legs(sql, legs_frame(rows)) == []
+    assert summarize([]).empty
+
+
+def test_price_differences_within_tolerance_are_ignored(rows):
+    engine = _with(rows, 'ENTRY', 1, exit_price=Decimal('84.004'))
+    assert diff_legs(legs_frame(rows), legs_frame(engine)) == []
+
+
+def test_mismatches_point_at_the_producing_stage(rows):
+    engine = _with(rows, 'ENTRY', 1, exit_price=Decimal('83.50'), pnl_amount=Decimal('-1762.50'))
+    engine = _with(engine, 'RE-ENTRY', 2, exit_reason='PROFIT_BOOKED')
+    mismatches = diff_legs(legs_frame(rows), legs_frame(engine))
+    assert sorted((m.entry_round, m.leg_type, m.field, m.stage) for m in mismatches) == [
+        (1, 'ENTRY', 'exit_price', 'mv_entry_sl_executions_round1'),
+        (1, 'ENTRY', 'pnl_amount', 'mv_all_entries_sl_tracking_adjusted'),
+        (2, 'RE-ENTRY', 'exit_reason', 'mv_reentry_eod_close'),
+    ]
+    price = next(m for m in mismatches if m.field == 'exit_price')
+    assert (price.sql_value, price.engine_value, price.strike) == (84.0, 83.5, 22500.0)
+    summary = summarize(mismatches)
+    assert list(summary.columns) == ['stage', 'field', 'mismatches', 'legs', 'days']
+    assert summary['mismatches'].sum() == 3 and summary['days'].max() == 1
+
+
+def test_a_leg_only_one_side_has(rows):
+    dropped = [r for r in rows if r[LEG_KEY.index('leg_type')] != 'REHEDGE']
+    mismatches = diff_legs(legs_frame(rows), legs_frame(dropped))
+    assert [(m.leg_type, m.field, m.sql_value, m.engine_value, m.stage) for m in mismatches] == [
+        ('REHEDGE', 'leg', True, False, 'mv_rehedge_selected_round1'),
+    ]
+
+
+@pytest.mark.parametrize('leg_type, entry_round, field, reason, stage', [
+    ('ENTRY', 1, 'entry_time', None, 'mv_ranked_breakouts_with_rounds'),
+    ('HEDGE-RE-ENTRY', 2, 'entry_time', None, 'mv_reentry_triggered_breakouts'),
+    ('DOUBLE_BUY_REENTRY', 3, 'entry_price', None, 'mv_double_buy_legs_reentry'),
+    ('HEDGE', 1, 'exit_time', 'EOD_CLOSE', 'mv_hedge_eod_exit_round1'),
+    ('RE-ENTRY', 2, 'exit_time', 'EOD_CLOSE', 'mv_reentry_eod_close'),
+    ('ENTRY', 1, 'exit_time', 'SL_HIT_BOX_WIDTH_SL', 'mv_entry_sl_executions_round1'),
+    ('HEDGE', 2, 'exit_price', 'EXIT_3X_HEDGE', 'mv_hedge_reentry_exit_on_partial_conditions'),
+    ('ENTRY', 1, 'pnl_amount', 'Portfolio Exit - Loss', 'mv_portfolio_mtm_pnl'),
+    ('ENTRY', 1, 'exit_reason', 'SOMETHING_NEW', 'mv_portfolio_final_pnl'),
+])
+def test_stage_of_origin(leg_type, entry_round, field, reason, stage):
+    assert stage_of_origin(leg_type, entry_round, field, reason) == stage
+
+
+def _reentry_loop(days, p, frontier):
+    """Legs fn_run_reentry_loop books, with the engine computing each round.
+
+    Every pass triggers the next round from the first SL hit of each booked
+    round (mv_reentry_triggered_breakouts), of only each day's newest round
+    with ``frontier``, and books what is not in the book yet (ON CONFLICT DO
+    NOTHING), until a pass books nothing or the strategy is at
+    max_reentry_rounds.
+    """
+    by_date = {d.trade_date: d for d in days}
+    book, reentry = {}, {}
+    for td, d in by_date.items():
+        first, reentry[td] = day_breakouts(d, p)
+        if first is not None:
+            book[td, 1] = round_legs(d, p, 1, *first)
+    while max(rnd for _, rnd in book) < p.max_reentry_rounds:
+        newest = {}
+        for td, rnd in book:
+            newest[td] = max(newest.get(td, 0), rnd)
+        booked = {}
+        for (td, rnd), (_, sl_exits) in book.items():
+            if not sl_exits or rnd >= p.max_reentry_rounds or (frontier and rnd != newest[td]):
+                continue
+            nxt = next_breakout(reentry[td], sl_exits)
+            if nxt is not None and (td, rnd + 1) not in book:
+                legs, exits = round_legs(by_date[td], p, rnd + 1, *nxt)
+                if legs:
+                    booked[td, rnd + 1] = legs, exits
+        if not booked:
+            break
+        book.update(booked)
+    return [leg for legs, _ in book.values() for leg in legs]
+
+
+def test_reentry_frontier_books_the_same_legs(day, three_round_day, params):
+    p = params._replace(max_reentry_rounds=3)
+    days = [day, three_round_day]
+    full = legs_frame(_tuples(_reentry_loop(days, p, frontier=False)))
+    newest = legs_frame(_tuples(_reentry_loop(days, p, frontier=True)))
+    assert sorted(full.groupby('trade_date')['entry_round'].max()) == [2, 3]
+    assert diff_legs(full, newest) == []
+    # and the same as the engine's per-day kernel
+    kernel = [leg for d in days for leg in run_day(d, p)[0]]
+    assert diff_legs(full, legs_frame(_tuples(kernel))) == []
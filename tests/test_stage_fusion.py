@@ -0,0 +1,106 @@
+"""Stage fusion (``src/stage_fusion.py``) on small hand-written stage files and on the shipped SQL."""
+from src import stage_fusion
+from src.run_schema import SQL_DIR, load_run_schema_sql
+from src.stage_fusion import (
+    EXTERNAL_SQL, fuse_files, inline_ctes, parse_stages, plan_fusion, split_statements,
+)
+
+# one stage per file, like the run-schema SQL
+CHAIN = [
+    ('10_mv_a.sql', """
+DROP MATERIALIZED VIEW IF EXISTS public.mv_a CASCADE;
+CREATE MATERIALIZED VIEW public.mv_a AS
+SELECT strategy_name, trade_date FROM runtime_strategy_config
+WITH NO DATA;
+"""),
+    ('11_mv_b.sql', """
+CREATE MATERIALIZED VIEW public.mv_b (strategy_name, n) AS
+SELECT strategy_name, count(*) FROM public.mv_a GROUP BY strategy_name
+WITH NO DATA;
+CREATE INDEX idx_mv_b ON mv_b (strategy_name);
+"""),
+    ('12_mv_c.sql', """
+CREATE MATERIALIZED VIEW public.mv_c AS
+WITH x AS (SELECT * FROM mv_b)
+SELECT * FROM x
+WITH NO DATA;
+"""),
+]
+
+
+def test_split_statements_ignores_semicolons_in_comments_quotes_and_bodies():
+    text = """
+    -- a comment; not a statement
+    SELECT 'a;b';
+    /* block; comment */
+    CREATE FUNCTION f() RETURNS int LANGUAGE plpgsql AS $fn$
+    BEGIN RETURN 1; END;
+    $fn$;
+    SELECT 2
+    """
+    statements = split_statements(text)
+    assert len(statements) == 3
+    assert statements[0].endswith("SELECT 'a;b'")
+    assert statements[1].startswith('/* block; comment */')
+    assert 'RETURN 1; END;' in statements[1]
+    assert statements[2] == 'SELECT 2'
+
+
+def test_parse_stages_keeps_column_list_and_body():
+    stages = parse_stages(CHAIN)
+    assert list(stages) == ['mv_a', 'mv_b', 'mv_c']
+    assert stages['mv_b'].columns == '(strategy_name, n)'
+    assert stages['mv_a'].body == 'SELECT strategy_name, trade_date FROM runtime_strategy_config'
+
+
+def test_plan_fuses_single_consumer_chain(monkeypatch):
+    monkeypatch.setattr(stage_fusion, 'load_reentry_loop_stages', lambda: set())
+    assert plan_fusion(CHAIN) == {'mv_a': 'mv_b', 'mv_b': 'mv_c'}
+
+
+def test_plan_keeps_stages_read_elsewhere(monkeypatch):
+    monkeypatch.setattr(stage_fusion, 'load_reentry_loop_stages', lambda: set())
+    reader = "CREATE PROCEDURE p() LANGUAGE sql AS $$ SELECT * FROM mv_b $$;"
+    mutable = [(f, t.replace('FROM runtime_strategy_config', 'FROM strategy_leg_book')) for f, t in CHAIN]
+    assert plan_fusion(CHAIN + [('20_proc.sql', reader)]) == {'mv_a': 'mv_b'}
+    assert plan_fusion(CHAIN, [('99_external.sql', reader)]) == {'mv_a': 'mv_b'}
+    assert plan_fusion(mutable) == {'mv_b': 'mv_c'}
+
+
+def test_plan_never_pulls_a_stage_into_the_reentry_loop(monkeypatch):
+    monkeypatch.setattr(stage_fusion, 'load_reentry_loop_stages', lambda: {'mv_c'})
+    assert plan_fusion(CHAIN) == {'mv_a': 'mv_b'}
+
+
+def test_inline_ctes_merges_with_an_existing_with():
+    body = '-- lead\nWITH x AS (SELECT 1) SELECT * FROM x, public.mv_b'
+    out = inline_ctes(body, [('mv_b', '(n)', 'SELECT 2')])
+    assert out == '-- lead\nWITH mv_b (n) AS (\nSELECT 2\n),\nx AS (SELECT 1) SELECT * FROM x, mv_b'
+    assert inline_ctes('SELECT 1', []) == 'SELECT 1'
+
+
+def test_fuse_files_collapses_the_chain_into_its_last_stage(monkeypatch):
+    monkeypatch.setattr(stage_fusion, 'load_reentry_loop_stages', lambda: set())
+    fused, plan = fuse_files(CHAIN)
+    assert plan == {'mv_a': 'mv_b', 'mv_b': 'mv_c'}
+    assert [f for f, _ in fused] == [f for f, _ in CHAIN]
+    assert fused[0][1] == ('-- mv_a: inlined into mv_b (src/stage_fusion.py)\n'
+                           'DROP MATERIALIZED VIEW IF EXISTS public.mv_a CASCADE;\n')
+    stages = parse_stages(fused)
+    assert list(stages) == ['mv_c']
+    body = stages['mv_c'].body
+    assert body.startswith('WITH mv_b (strategy_name, n) AS (\nWITH mv_a AS (')
+    assert 'x AS (SELECT * FROM mv_b)' in body
+
+
+def test_shipped_pipeline_fuses_only_safe_stages():
+    files = load_run_schema_sql(fused=False)
+    external = [(name, (SQL_DIR / name).read_text(encoding='utf8')) for name in EXTERNAL_SQL]
+    stages = parse_stages(files)
+    plan = plan_fusion(files, external)
+    assert plan, 'expected at least one fusable stage in the shipped SQL'
+    for name, consumer in plan.items():
+        assert consumer in stages
+        assert 'strategy_leg_book' not in stages[name].body.lower()
+    fused, _ = fuse_files(files, external)
+    assert set(parse_stages(fused)) == set(stages) - set(plan)
@@ -0,0 +1,77 @@
+"""Stage DAG (``src/stage_graph.py``) from a stubbed catalog and the shipped SQL."""
+import pytest
+
+from src import stage_graph
+from src.stage_graph import (
+    BIND_VIEWS, LEG_BOOK, LOAD_CONFIG, REENTRY_LOOP, STORE_RESULTS, Stage,
+    build_stage_graph, critical_path, load_reentry_loop_stages, load_wrk_fills, topological_order,
+)
+
+# matview -> relations it reads, as pg_depend would report them
+CATALOG = {
+    'mv_base_candles': {'ha_big'},
+    'mv_breakouts': {'runtime_strategy_config', 'v_ha_big_filtered', 'mv_base_candles'},
+    'mv_all_legs_round1': {'mv_breakouts', 'runtime_strategy_dates'},
+    'mv_reentry_triggered_breakouts': {'mv_breakouts', LEG_BOOK},
+    'mv_all_legs_reentry': {'mv_reentry_triggered_breakouts'},
+    'mv_portfolio_final_pnl': {'mv_all_legs_round1', 'wrk_all_legs_reentry'},
+}
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    monkeypatch.setattr(stage_graph, 'fetch_matview_deps', lambda conn, schema='public': CATALOG)
+    return build_stage_graph(conn=None)
+
+
+def test_only_config_driven_stages_are_in_the_run(stages):
+    assert 'mv_base_candles' not in stages
+    assert stages['mv_breakouts'].deps == {LOAD_CONFIG, BIND_VIEWS}
+    assert stages[BIND_VIEWS].deps == {LOAD_CONFIG}
+    assert stages['mv_all_legs_round1'].deps == {'mv_breakouts', LOAD_CONFIG}
+
+
+def test_barriers_mirror_sp_run_strategy(stages):
+    assert stages[LEG_BOOK].kind == 'call' and stages[LEG_BOOK].deps == {'mv_all_legs_round1'}
+    # the loop waits for every in-run stage it refreshes, and the leg book
+    assert {'mv_reentry_triggered_breakouts', 'mv_all_legs_reentry', LEG_BOOK} <= stages[REENTRY_LOOP].deps
+    assert not stages[REENTRY_LOOP].deps & {'mv_breakouts', 'mv_all_legs_round1'}
+    # a stage outside the loop reading what it collects waits for the loop
+    assert REENTRY_LOOP in stages['mv_portfolio_final_pnl'].deps
+    assert stages[STORE_RESULTS].deps == {'mv_portfolio_final_pnl', REENTRY_LOOP}
+    assert stages['mv_breakouts'].sql == "SELECT fn_refresh_stage('mv_breakouts')"
+
+
+def test_topological_order_respects_every_dependency(stages):
+    order = topological_order(stages)
+    assert order[0] == LOAD_CONFIG and order[-1] == STORE_RESULTS
+    position = {name: i for i, name in enumerate(order)}
+    for name, stage in stages.items():
+        assert all(position[d] < position[name] for d in stage.deps)
+
+
+def test_topological_order_rejects_cycles():
+    with pytest.raises(ValueError, match='Cycle'):
+        topological_order({'a': Stage('a', 'matview', '', {'b'}), 'b': Stage('b', 'matview', '', {'a'})})
+
+
+def test_critical_path_follows_the_longest_chain():
+    stages = {
+        'a': Stage('a', 'call', ''),
+        'b': Stage('b', 'matview', '', {'a'}),
+        'c': Stage('c', 'matview', '', {'a'}),
+        'd': Stage('d', 'matview', '', {'b', 'c'}),
+    }
+    assert critical_path(stages, {'a': 1.0, 'b': 5.0, 'c': 2.0, 'd': 1.0}) == (7.0, ['a', 'b', 'd'])
+    assert critical_path({}, {}) == (0.0, [])
+
+
+def test_shipped_sql_fills_and_loop_stages():
+    fills = load_wrk_fills()
+    assert set(fills) == {'wrk_live_prices_entry_round1', 'wrk_entry_leg_live_prices', 'wrk_reentry_live_prices'}
+    for table, sql in fills.items():
+        assert sql.startswith(f'TRUNCATE TABLE {table};\nINSERT INTO {table}')
+    loop = load_reentry_loop_stages()
+    assert {'mv_reentry_triggered_breakouts', 'mv_all_legs_reentry', 'wrk_reentry_live_prices'} <= loop
+    # book-independent, refreshed once before the loop
+    assert 'mv_ranked_breakouts_with_rounds_for_reentry' not in loop
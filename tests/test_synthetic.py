@@ -0,0 +1,79 @@
+"""The synthetic market-data generator (``src/synthetic.py``): determinism and shape."""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.synthetic import SyntheticConfig, generate, trading_days, weekly_expiries
+
+CFG = SyntheticConfig(seed=7, strike_range=200)
+
+
+def days(from_date, to_date, cfg=CFG):
+    return list(generate(from_date, to_date, cfg))
+
+
+def assert_same(a, b):
+    assert [d.trade_date for d in a] == [d.trade_date for d in b]
+    for x, y in zip(a, b):
+        pd.testing.assert_frame_equal(x.nifty50, y.nifty50)
+        pd.testing.assert_frame_equal(x.options, y.options)
+        for table in x.ha:
+            pd.testing.assert_frame_equal(x.ha[table], y.ha[table])
+
+
+@pytest.fixture(scope='module')
+def week():
+    return days(date(2024, 1, 1), date(2024, 1, 7))
+
+
+def test_same_seed_same_rows(week):
+    assert_same(week, days(date(2024, 1, 1), date(2024, 1, 7)))
+
+
+def test_longer_window_extends_without_changing_earlier_days(week):
+    assert_same(week, days(date(2024, 1, 1), date(2024, 1, 10))[:len(week)])
+
+
+def test_other_seed_other_rows(week):
+    other = days(date(2024, 1, 1), date(2024, 1, 7), CFG._replace(seed=8))
+    assert not week[0].nifty50['close'].equals(other[0].nifty50['close'])
+
+
+def test_calendar():
+    assert trading_days(date(2024, 1, 5), date(2024, 1, 8)) == [date(2024, 1, 5), date(2024, 1, 8)]
+    # the expiry day lists itself
+    assert weekly_expiries(date(2024, 1, 4), 2) == [date(2024, 1, 4), date(2024, 1, 11)]
+    assert weekly_expiries(date(2024, 1, 5), 1) == [date(2024, 1, 11)]
+
+
+def test_day_shape(week):
+    assert [d.trade_date for d in week] == trading_days(date(2024, 1, 1), date(2024, 1, 7))
+    d = week[0]
+    assert len(d.nifty50) == 375 and d.nifty50['time'].iloc[[0, -1]].tolist() == ['09:15:00', '15:29:00']
+    assert {t: len(df) for t, df in d.ha.items()} == {'ha_big': 25, 'ha_small': 75, 'ha_1m': 375}
+    # spot carries over: each day opens near the previous close
+    for prev, cur in zip(week, week[1:]):
+        assert abs(cur.nifty50['open'].iloc[0] / prev.nifty50['close'].iloc[-1] - 1) < 0.02
+
+
+def test_option_chains(week):
+    opts = week[0].options
+    centre = round(week[0].nifty50['open'].iloc[0] / 50) * 50
+    assert set(opts['strike']) == set(np.arange(centre - 200, centre + 201, 50.0))
+    assert set(opts['expiry']) == {date(2024, 1, 4), date(2024, 1, 11)}
+    assert len(opts) == 9 * 2 * 2 * 375
+    prices = opts[['open', 'high', 'low', 'close']].to_numpy()
+    assert np.allclose(prices * 20, np.round(prices * 20)) and (prices >= 0.05).all()
+    assert (opts['high'] >= opts[['open', 'close']].max(axis=1)).all()
+    assert (opts['low'] <= opts[['open', 'close']].min(axis=1)).all()
+    # calls get dearer as the strike falls
+    first = opts[(opts['time'] == '09:15:00') & (opts['option_type'] == 'C') & (opts['expiry'] == date(2024, 1, 11))]
+    assert first.sort_values('strike')['open'].is_monotonic_decreasing
+
+
+def test_gap_rate_drops_option_minutes():
+    full = days(date(2024, 1, 2), date(2024, 1, 2))[0].options
+    gappy = days(date(2024, 1, 2), date(2024, 1, 2), CFG._replace(gap_rate=0.3))[0].options
+    assert 0.6 < len(gappy) / len(full) < 0.8